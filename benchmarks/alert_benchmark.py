@@ -0,0 +1,108 @@
+"""
+Alert volume and state growth with and without the alert manager.
+
+Replays a synthetic run through `analyze_values`: temperature climbs over
+its maximum and stays there for most of the run, with noise that keeps
+crossing back over the line, while one sensor drops offline for a stretch.
+"per sample" is the old behaviour, where every analysis stored its full alert
+list and the console re-reported whenever the set of flagged conditions
+changed; "incidents" runs the same conditions through an AlertManager, storing
+only raised/cleared alerts and writing the alerts snapshot on transitions.
+
+Usage: python benchmarks/alert_benchmark.py [--samples N] [--noise X] [--seed S]
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+
+from sensor_monitoring_agent.alerts import AlertManager
+from sensor_monitoring_agent.constraints import compile_constraints
+from sensor_monitoring_agent.store import SENSOR_UNITS
+from sensor_monitoring_agent.sub_agents.analysis_agent.agent import analyze_values
+
+CONSTRAINTS = {
+    "temperature": {"min": 1000, "max": 1200, "unit": "C"},
+    "feeder_rate": {"min": 50, "max": 150, "unit": "kg/h"},
+    "vibration": {"min": 10, "max": 20, "unit": "mm/s"},
+}
+
+
+def scenario(samples: int, noise: float, rng) -> tuple:
+    """(values, online) arrays: an excursion over the temperature maximum and a vibration outage"""
+    sensors = list(SENSOR_UNITS)
+    values = np.empty((samples, len(sensors)))
+    values[:, 0] = 1190 + 15 * np.clip(np.arange(samples) / (samples / 10), 0, 1) + rng.normal(0, noise, samples)
+    values[:, 1] = rng.normal(100, 5, samples)
+    values[:, 2] = rng.normal(15, 1, samples)
+    online = np.ones((samples, len(sensors)), dtype=bool)
+    online[samples // 2: samples // 2 + samples // 20, 2] = False
+    return values, online
+
+
+def run(samples: int, noise: float, seed: int) -> dict:
+    rng = np.random.default_rng(seed)
+    values, online = scenario(samples, noise, rng)
+    sensors = list(SENSOR_UNITS)
+    units = [SENSOR_UNITS[sensor] for sensor in sensors]
+    compiled = compile_constraints(CONSTRAINTS)
+    manager = AlertManager()
+    old = {"alerts": 0, "notifications": 0, "bytes": 0}
+    new = {"alerts": 0, "notifications": 0, "bytes": 0, "snapshots": 0, "snapshot_bytes": 0}
+    last_flagged, update_seconds = frozenset(), 0.0
+
+    for i in range(samples):
+        conditions = []
+        analysis = analyze_values(f"reading_{i + 1}", "", sensors, units, values[i], online[i],
+                                  compiled, "", conditions=conditions)
+        old["alerts"] += len(analysis["alerts"])
+        old["bytes"] += len(json.dumps(analysis["alerts"]))
+        flagged = frozenset((sensor, kind) for sensor, kind, _ in conditions)
+        if flagged != last_flagged:
+            old["notifications"] += 1
+            last_flagged = flagged
+
+        started = time.perf_counter()
+        changes = manager.update(conditions, float(i), dict(zip(sensors, values[i].tolist())), compiled.limits)
+        update_seconds += time.perf_counter() - started
+        stored = [incident["message"] for incident in changes["raised"] + changes["reopened"]]
+        cleared = [incident["message"] for incident in changes["cleared"]]
+        new["alerts"] += len(stored)
+        new["bytes"] += len(json.dumps(stored)) + len(json.dumps(cleared))
+        if stored or cleared:
+            new["notifications"] += 1
+            new["snapshots"] += 1
+            new["snapshot_bytes"] += len(json.dumps(manager.snapshot()))
+
+    new["incidents"] = manager.stats["raised"]
+    new["reopened"] = manager.stats["reopened"]
+    new["update_us"] = update_seconds / samples * 1e6
+    return {"old": old, "new": new}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--samples", type=int, default=3600, help="analyses (one per second)")
+    parser.add_argument("--noise", type=float, default=8.0, help="temperature noise (C, std)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    results = run(args.samples, args.noise, args.seed)
+    old, new = results["old"], results["new"]
+    print(f"{args.samples} analyses, temperature noise {args.noise}C")
+    print(f"{'':<28}  {'per sample':>12}  {'incidents':>12}")
+    print(f"{'alerts stored':<28}  {old['alerts']:>12,}  {new['alerts']:>12,}")
+    print(f"{'notifications':<28}  {old['notifications']:>12,}  {new['notifications']:>12,}")
+    print(f"{'alert bytes in analyses':<28}  {old['bytes']:>12,}  {new['bytes']:>12,}")
+    print(f"{'alerts snapshot bytes':<28}  {'-':>12}  {new['snapshot_bytes']:>12,}  ({new['snapshots']} writes)")
+    print(f"\nincidents raised {new['incidents']}, reopened {new['reopened']}; "
+          f"AlertManager.update {new['update_us']:.1f} us per analysis")
+
+
+if __name__ == "__main__":
+    main()
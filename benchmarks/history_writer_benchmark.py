@@ -0,0 +1,109 @@
+"""
+Per-turn cost of recording interaction history.
+
+Each operator turn records two entries (user_query, agent_response). The
+legacy path fetched the session, copied the whole state and recreated the
+session for every entry; the batched HistoryWriter buffers entries and
+commits them with one state-delta event per flush (once per turn in
+main.py). Both are timed against sessions whose history already holds N
+entries.
+
+Usage: python benchmarks/history_writer_benchmark.py [sizes] [--turns N]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from google.adk.sessions import InMemorySessionService
+
+from sqlite_session_service import SqliteMonitoringSessionService
+from utils import HistoryWriter
+
+APP_NAME = "benchmark"
+USER_ID = "operator"
+
+
+def _entry(i, action="user_query"):
+    return {"action": action, "query": f"query {i}", "timestamp": "2026-01-01 00:00:00"}
+
+
+def _state(size):
+    return {
+        "monitoring_status": "inactive",
+        "constraints": {"temperature": {"min": 1000, "max": 1200, "unit": "C"}},
+        "interaction_history": [_entry(i) for i in range(size)],
+    }
+
+
+async def legacy_update(service, session_id, entry):
+    """The old update_interaction_history: copy the state and recreate the session"""
+    session = await service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session_id)
+    history = session.state.get("interaction_history", [])
+    entry["timestamp"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    history.append(entry)
+    updated_state = session.state.copy()
+    updated_state["interaction_history"] = history
+    # create_session no longer overwrites an existing id, so drop it first
+    await service.delete_session(app_name=APP_NAME, user_id=USER_ID, session_id=session_id)
+    await service.create_session(app_name=APP_NAME, user_id=USER_ID, session_id=session_id, state=updated_state)
+
+
+async def time_legacy(service, size, turns):
+    session = await service.create_session(app_name=APP_NAME, user_id=USER_ID, state=_state(size))
+    started = time.perf_counter()
+    for n in range(turns):
+        await legacy_update(service, session.id, _entry(n))
+        await legacy_update(service, session.id, _entry(n, "agent_response"))
+    return (time.perf_counter() - started) / turns
+
+
+async def time_batched(service, size, turns):
+    session = await service.create_session(app_name=APP_NAME, user_id=USER_ID, state=_state(size))
+    writer = HistoryWriter(service, APP_NAME, USER_ID, session.id)
+    started = time.perf_counter()
+    for n in range(turns):
+        await writer.add(_entry(n))
+        await writer.add(_entry(n, "agent_response"))
+        await writer.flush()
+    return (time.perf_counter() - started) / turns
+
+
+async def run(sizes, turns):
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            row = [size]
+            for make in (InMemorySessionService, lambda: SqliteMonitoringSessionService(os.path.join(tmp, f"{size}.db"))):
+                for timer in (time_legacy, time_batched):
+                    service = make()
+                    row.append(await timer(service, size, turns))
+                    if hasattr(service, "close"):
+                        service.close()
+            results.append(row)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("sizes", nargs="?", default="100,1000,10000",
+                        help="comma-separated existing history lengths")
+    parser.add_argument("--turns", type=int, default=20, help="timed turns per size")
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",")]
+
+    results = asyncio.run(run(sizes, args.turns))
+    print(f"{'history':>8}  {'in-memory legacy':>16}  {'batched':>8}  {'sqlite legacy':>13}  {'batched':>8}   (ms/turn)")
+    for size, memory_legacy, memory_batched, sqlite_legacy, sqlite_batched in results:
+        print(f"{size:>8}  {memory_legacy * 1000:16.3f}  {memory_batched * 1000:8.3f}  "
+              f"{sqlite_legacy * 1000:13.3f}  {sqlite_batched * 1000:8.3f}")
+
+
+if __name__ == "__main__":
+    main()
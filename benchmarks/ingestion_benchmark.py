@@ -0,0 +1,156 @@
+"""
+Ingestion throughput per adapter on one core.
+
+Pushes N samples through each adapter (file tail in line-protocol and CSV,
+TCP, UDP) into a fresh ReadingStore and reports samples per second from the
+first byte to the last sample landing in the store, plus the final lag
+counter. The Modbus-TCP adapter is polled as fast as the local simulator
+answers for a fixed time, since it is request/response bound.
+
+Usage: python benchmarks/ingestion_benchmark.py [--samples N] [--modbus-seconds S]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sensor_monitoring_agent.ingestion import (
+    FileTailAdapter,
+    ModbusPollAdapter,
+    ModbusTcpSimulator,
+    TcpFeedAdapter,
+    UdpFeedAdapter,
+)
+from sensor_monitoring_agent.store import ReadingStore, SENSOR_UNITS
+
+# Lines per UDP datagram
+DATAGRAM_LINES = 40
+
+
+# Samples are generated right before each run, timestamped 1 us apart ending
+# now, so the lag counter shows processing delay rather than the data's age
+def line_protocol(count: int) -> list:
+    base = time.time_ns() - count * 1_000
+    return [
+        f"kiln temperature={1000 + i % 300}.5,feeder_rate={50 + i % 100}.25,vibration={5 + i % 20}.75 {base + i * 1_000}\n"
+        for i in range(count)
+    ]
+
+
+def csv_rows(count: int) -> list:
+    base = time.time() - count / 1e6
+    return ["timestamp,temperature,feeder_rate,vibration\n"] + [
+        f"{base + i / 1e6:.6f},{1000 + i % 300}.5,{50 + i % 100}.25,{5 + i % 20}.75\n"
+        for i in range(count)
+    ]
+
+
+async def wait_for(adapter, count: int, timeout: float = 60.0) -> float:
+    started = time.perf_counter()
+    while adapter.batcher.counters["samples"] + len(adapter.batcher.rows) < count:
+        if time.perf_counter() - started > timeout or adapter.error:
+            break
+        await asyncio.sleep(0.005)
+    adapter.batcher.flush()
+    return time.perf_counter()
+
+
+async def bench_file(lines: list, fmt: str, count: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, f"feed.{fmt}")
+        Path(path).write_text("".join(lines))
+        adapter = FileTailAdapter(ReadingStore(), path, fmt=fmt, from_start=True)
+        started = time.perf_counter()
+        adapter.start()
+        finished = await wait_for(adapter, count)
+        return await _result(adapter, started, finished)
+
+
+async def bench_tcp(lines: list, count: int) -> dict:
+    adapter = TcpFeedAdapter(ReadingStore(), port=0)
+    adapter.start()
+    while adapter.server is None:
+        await asyncio.sleep(0.001)
+    reader, writer = await asyncio.open_connection("127.0.0.1", adapter.port)
+    started = time.perf_counter()
+    payload = "".join(lines).encode()
+    for i in range(0, len(payload), 1 << 16):
+        writer.write(payload[i:i + (1 << 16)])
+        await writer.drain()
+    writer.close()
+    finished = await wait_for(adapter, count)
+    return await _result(adapter, started, finished)
+
+
+async def bench_udp(lines: list, count: int) -> dict:
+    adapter = UdpFeedAdapter(ReadingStore(), port=0)
+    adapter.start()
+    while adapter.transport is None:
+        await asyncio.sleep(0.001)
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    datagrams = ["".join(lines[i:i + DATAGRAM_LINES]).encode() for i in range(0, len(lines), DATAGRAM_LINES)]
+    started = time.perf_counter()
+    for datagram in datagrams:
+        sender.sendto(datagram, ("127.0.0.1", adapter.port))
+        # The sender shares the adapter's loop; yield so it can read the datagram
+        await asyncio.sleep(0)
+    sender.close()
+    finished = await wait_for(adapter, count, timeout=2.0)
+    return await _result(adapter, started, finished)
+
+
+async def bench_modbus(seconds: float) -> dict:
+    sensors = list(SENSOR_UNITS)
+    simulator = ModbusTcpSimulator(sensors, lambda sensor: 42.0, port=0)
+    adapter = ModbusPollAdapter(ReadingStore(), sensors, rate_hz=None, simulator=simulator)
+    started = time.perf_counter()
+    adapter.start()
+    await asyncio.sleep(seconds)
+    finished = time.perf_counter()
+    return await _result(adapter, started, finished)
+
+
+async def _result(adapter, started: float, finished: float) -> dict:
+    stats = await adapter.stop()
+    elapsed = finished - started
+    return {
+        "samples": stats["samples"],
+        "seconds": elapsed,
+        "rate": stats["samples"] / elapsed if elapsed > 0 else 0.0,
+        "lag": stats["lag_seconds"],
+        "batches": stats["batches"],
+        "errors": stats["parse_errors"],
+    }
+
+
+async def run(count: int, modbus_seconds: float) -> list:
+    return [
+        ("file (line protocol)", await bench_file(line_protocol(count), "line", count)),
+        ("file (csv)", await bench_file(csv_rows(count), "csv", count)),
+        ("tcp (line protocol)", await bench_tcp(line_protocol(count), count)),
+        ("udp (line protocol)", await bench_udp(line_protocol(count), count)),
+        ("modbus-tcp simulator", await bench_modbus(modbus_seconds)),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--samples", type=int, default=200_000, help="samples per file/socket run")
+    parser.add_argument("--modbus-seconds", type=float, default=2.0, help="seconds to poll the Modbus simulator")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.samples, args.modbus_seconds))
+    print(f"{'adapter':<22}  {'samples':>9}  {'samples/s':>10}  {'batches':>7}  {'lag s':>7}  {'errors':>6}")
+    for name, result in results:
+        print(f"{name:<22}  {result['samples']:>9}  {result['rate']:>10.0f}  {result['batches']:>7}  "
+              f"{result['lag']:>7}  {result['errors']:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Turn latency of common commands through the local parser vs the agents.
+
+Each command runs once through `call_agent_async` with the local parser
+(tools called directly) and once through the agent tree, whose model is a
+ScriptedLlm making the same tool calls after `--llm-latency` seconds per
+model request, standing in for Gemini. Also reports the parser's own cost
+on a matching and a non-matching command.
+
+Usage: python benchmarks/intent_benchmark.py [--repeats N] [--llm-latency S]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import logging
+import os
+import sys
+import tempfile
+import time
+import warnings
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+from google.adk.runners import Runner
+
+from stub_llm import ScriptedLlm, with_model
+from sqlite_session_service import SqliteMonitoringSessionService
+from utils import add_user_query_to_history, call_agent_async
+from sensor_monitoring_agent.agent import build_sensor_monitoring_agent
+from sensor_monitoring_agent.intents import parse_command
+from sensor_monitoring_agent.pipeline import initial_state
+
+APP_NAME = "benchmark"
+USER_ID = "operator"
+
+# Command -> tool calls the model makes for it
+COMMANDS = {
+    "set temperature between 1000 and 1200, feeder rate between 50 and 150, vibration between 10 and 20": [
+        ("set_constraint", {"sensor_type": "temperature", "min_value": 1000, "max_value": 1200}),
+        ("set_constraint", {"sensor_type": "feeder_rate", "min_value": 50, "max_value": 150}),
+        ("set_constraint", {"sensor_type": "vibration", "min_value": 10, "max_value": 20}),
+    ],
+    "collect a reading": [("collect_sensor_reading", {})],
+    "analyze the latest reading": [("analyze_readings", {})],
+    "generate a detailed report": [("generate_report", {"report_type": "detailed"})],
+}
+
+
+async def run(db_path: str, repeats: int, llm_latency: float) -> dict:
+    llm = ScriptedLlm(latency=llm_latency)
+    session_service = SqliteMonitoringSessionService(db_path)
+    session = await session_service.create_session(app_name=APP_NAME, user_id=USER_ID, state=initial_state())
+    runner = Runner(agent=with_model(build_sensor_monitoring_agent(), llm), app_name=APP_NAME, session_service=session_service)
+
+    results = {}
+    for query, tool_calls in COMMANDS.items():
+        for local in (True, False):
+            latencies, calls_before = [], llm.calls
+            for _ in range(repeats):
+                llm.queue(tool_calls)
+                started = time.perf_counter()
+                await add_user_query_to_history(session_service, APP_NAME, USER_ID, session.id, query)
+                await call_agent_async(runner, USER_ID, session.id, query, verbose=False, cache=None, local=local)
+                latencies.append((time.perf_counter() - started) * 1000)
+            results[query, local] = (np.mean(latencies), (llm.calls - calls_before) / repeats)
+    session_service.close()
+    return results
+
+
+def parse_cost(query: str, repeats: int = 10_000) -> float:
+    started = time.perf_counter()
+    for _ in range(repeats):
+        parse_command(query)
+    return (time.perf_counter() - started) / repeats * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="seconds per model request")
+    args = parser.parse_args()
+    logging.getLogger("google_adk").setLevel(logging.ERROR)
+    warnings.filterwarnings("ignore", message=r"\[EXPERIMENTAL\]")
+
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        results = asyncio.run(run(os.path.join(tmp, "intents.db"), args.repeats, args.llm_latency))
+
+    print(f"{'command':<44}  {'local ms':>9}  {'agents ms':>10}  {'model calls':>11}")
+    for query in COMMANDS:
+        local_ms, _ = results[query, True]
+        agent_ms, calls = results[query, False]
+        label = query if len(query) <= 44 else query[:41] + "..."
+        print(f"{label:<44}  {local_ms:>9.2f}  {agent_ms:>10.2f}  {calls:>11.1f}")
+    first = next(iter(COMMANDS))
+    print(f"\nparse_command: {parse_cost(first):.1f} us matched, {parse_cost('what is the status of kiln 2?'):.1f} us unmatched")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Synthetic load generation rate: LoadGenerator blocks vs per-value random draws.
+
+For each plants x sensors shape, times generating an hour of 1 Hz readings
+with LoadGenerator (drift, correlated load, faults) against the old
+collect_sensor_reading approach of one `random.uniform` per value built into
+a dict per reading. Also times writing the hour to CSV and .npy columns
+and reading the CSV back through replay.py's chunk reader, plus the cost
+of one `sample()` as collect_sensor_reading takes it.
+
+Usage: python benchmarks/loadgen_benchmark.py [--seconds N] [--shapes 1x3 10x100 ...]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from replay import iter_csv_chunks
+from sensor_monitoring_agent.loadgen import SYNTHETIC_RANGES, LoadGenerator, sensor_kind
+
+
+def per_value(plants: int, sensors: list, rows: int) -> float:
+    ranges = [SYNTHETIC_RANGES[sensor_kind(sensor)] for sensor in sensors]
+    started = time.perf_counter()
+    for _ in range(rows):
+        for _ in range(plants):
+            {sensor: round(random.uniform(low, high), 2) for sensor, (low, high) in zip(sensors, ranges)}
+    return time.perf_counter() - started
+
+
+def vectorized(plants: int, sensors: int, seconds: int) -> tuple:
+    generator = LoadGenerator(plants=plants, sensors=sensors, seed=0, start=0)
+    started = time.perf_counter()
+    for _ in generator.stream(seconds):
+        pass
+    return generator, time.perf_counter() - started
+
+
+def files(plants: int, sensors: int, seconds: int) -> dict:
+    timings = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, writer in (("csv", LoadGenerator.write_csv), ("npy", LoadGenerator.write_columns)):
+            generator = LoadGenerator(plants=plants, sensors=sensors, seed=0, start=0)
+            started = time.perf_counter()
+            writer(generator, os.path.join(tmp, name), seconds)
+            timings[name] = time.perf_counter() - started
+        started = time.perf_counter()
+        for plant in generator.plants:
+            for _ in iter_csv_chunks(os.path.join(tmp, "csv", f"{plant}.csv")):
+                pass
+        timings["csv read"] = time.perf_counter() - started
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=int, default=3600, help="readings per plant (1 Hz)")
+    parser.add_argument("--shapes", nargs="+", default=["1x3", "10x30", "50x200"], help="PLANTSxSENSORS")
+    args = parser.parse_args()
+
+    # NumPy's first calls pay one-off setup costs; keep them out of the first shape
+    vectorized(1, 3, 60)
+    print(f"{args.seconds} readings per plant")
+    print(f"{'shape':>8}  {'values':>11}  {'random M/s':>10}  {'numpy M/s':>9}  {'speedup':>7}  "
+          f"{'csv M/s':>7}  {'npy M/s':>7}  {'csv read M/s':>12}")
+    for shape in args.shapes:
+        plants, sensors = (int(n) for n in shape.split("x"))
+        generator, numpy_seconds = vectorized(plants, sensors, args.seconds)
+        values = args.seconds * plants * sensors
+        # The per-value loop is timed on a slice of the rows and scaled up
+        sample_rows = max(1, min(args.seconds, 200_000 // (plants * sensors)))
+        random_seconds = per_value(plants, generator.sensors, sample_rows) * args.seconds / sample_rows
+        timings = files(plants, sensors, args.seconds)
+        rate = lambda seconds: values / seconds / 1e6
+        print(f"{shape:>8}  {values:>11,}  {rate(random_seconds):>10.2f}  {rate(numpy_seconds):>9.2f}  "
+              f"{random_seconds / numpy_seconds:>6.1f}x  {rate(timings['csv']):>7.2f}  {rate(timings['npy']):>7.2f}  "
+              f"{rate(timings['csv read']):>12.2f}")
+
+    generator = LoadGenerator(seed=0)
+    started = time.perf_counter()
+    for _ in range(10_000):
+        generator.sample()
+    sample_us = (time.perf_counter() - started) / 10_000 * 1e6
+    print(f"\nsample(): {sample_us:.1f} us per reading, "
+          f"random.uniform dict: {per_value(1, generator.sensors, 10_000) / 10_000 * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
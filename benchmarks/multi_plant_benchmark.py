@@ -0,0 +1,98 @@
+"""
+Turns per second and turn latency as the number of plants served grows.
+
+Every plant is a closed-loop operator: it sends its next query as soon as
+the previous answer arrives. The root agent's model is replaced by a stub
+that answers after a fixed delay, so the numbers show the runner's
+scheduling (per-plant locks, the in-flight LLM cap, sharding) and session
+overhead rather than a real model's latency. One warm-up turn per plant
+creates its session and is not counted.
+
+Usage: python benchmarks/multi_plant_benchmark.py [plant counts] [--turns N]
+       [--llm-latency S] [--max-llm-calls N] [--workers N ...]
+"""
+import argparse
+import asyncio
+import functools
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from google.adk.agents import Agent
+
+from stub_llm import StubLlm
+from plants import PlantRunner, ShardedPlantRunner
+from sqlite_session_service import SqliteMonitoringSessionService
+from sensor_monitoring_agent.agent import build_sensor_monitoring_agent
+
+
+def make_agent(latency: float):
+    # Same instruction provider as the real root agent, so context rendering is included
+    return Agent(
+        name="sensor_monitoring",
+        model=StubLlm(latency=latency),
+        instruction=build_sensor_monitoring_agent().instruction,
+    )
+
+
+async def drive(runner, plants: list, turns: int) -> float:
+    async def operator(plant):
+        for i in range(turns):
+            await runner.turn(plant, f"status check {i}")
+
+    await asyncio.gather(*(runner.turn(plant, "hello") for plant in plants))
+    runner.latencies.clear()
+    started = time.perf_counter()
+    await asyncio.gather(*(operator(plant) for plant in plants))
+    return time.perf_counter() - started
+
+
+async def bench(plant_count: int, turns: int, latency: float, max_llm_calls: int, workers: int) -> dict:
+    plants = [f"kiln{i}" for i in range(plant_count)]
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "plants.db")
+        if workers == 1:
+            session_service = SqliteMonitoringSessionService(db_path)
+            runner = PlantRunner(session_service, agent=make_agent(latency), max_llm_calls=max_llm_calls)
+            elapsed = await drive(runner, plants, turns)
+            await runner.close()
+            session_service.close()
+        else:
+            runner = ShardedPlantRunner(
+                workers, db_path, max_llm_calls, agent_factory=functools.partial(make_agent, latency)
+            )
+            runner.start()
+            elapsed = await drive(runner, plants, turns)
+            await runner.close()
+    summary = runner.latency()
+    return {
+        "turns_per_second": summary["turns"] / elapsed,
+        "errors": runner.stats["errors"],
+        **summary,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("plants", nargs="*", type=int, default=[1, 4, 16, 64])
+    parser.add_argument("--turns", type=int, default=20, help="timed turns per plant")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="stub model delay in seconds")
+    parser.add_argument("--max-llm-calls", type=int, default=8, help="agent runs in flight per worker")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="worker process counts to try")
+    args = parser.parse_args()
+
+    print(f"stub LLM latency {args.llm_latency * 1000:.0f} ms, {args.max_llm_calls} LLM calls in flight per worker")
+    print(f"{'plants':>6}  {'workers':>7}  {'turns':>6}  {'turns/s':>8}  {'p50 ms':>8}  {'p99 ms':>8}  {'errors':>6}")
+    for count in args.plants:
+        for workers in args.workers:
+            result = asyncio.run(bench(count, args.turns, args.llm_latency, args.max_llm_calls, workers))
+            print(f"{count:>6}  {workers:>7}  {result['turns']:>6}  {result['turns_per_second']:>8.1f}  "
+                  f"{result['p50_ms']:>8.1f}  {result['p99_ms']:>8.1f}  {result['errors']:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Offline benchmark suite: turn latency, tool latency and state growth.
+
+The real agent tree runs with every model replaced by ScriptedLlm, which
+emits the tool calls each scenario needs (including the transfer to the
+sub-agent that owns the tool), so nothing goes over the network and every
+run takes the same path. Measured:
+
+- turn latency through `call_agent_async` for a plain chat turn and for
+  collect, analyze and report turns, with the response cache and the local
+  command parser off, so every turn goes through the model
+- direct tool latency of collect_sensor_reading, analyze_readings and
+  generate_report once the session has history
+- session state size and event count growth per turn
+
+Results are flat metric names (lower is better for all of them) written as
+JSON. The suite runs --rounds times and keeps each metric's best value, as
+timeit does, to damp scheduler noise. With --baseline the run is compared
+against a stored result and the exit status is 1 if any p50, mean or state
+metric is worse by more than --tolerance; p99s are shown but not gated.
+
+Usage: python benchmarks/offline_suite.py [--turns N] [--rounds N] [--output FILE]
+       [--baseline [FILE]] [--tolerance F] [--save-baseline]
+"""
+import argparse
+import asyncio
+import contextlib
+import inspect
+import io
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import warnings
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+from google.adk.runners import Runner
+
+from stub_llm import ScriptedLlm, with_model
+from sqlite_session_service import SqliteMonitoringSessionService
+from utils import add_user_query_to_history, call_agent_async, flush_interaction_history
+from sensor_monitoring_agent.agent import build_sensor_monitoring_agent
+from sensor_monitoring_agent.pipeline import initial_state
+from sensor_monitoring_agent.sub_agents.analysis_agent.agent import analyze_readings, generate_report
+from sensor_monitoring_agent.sub_agents.sensor_agent.agent import collect_sensor_reading
+from sensor_monitoring_agent.tool_runner import DirectToolContext
+
+APP_NAME = "benchmark"
+USER_ID = "operator"
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baselines" / "offline_suite.json"
+
+# Scenario -> (operator query, tool calls the model makes)
+SCENARIOS = {
+    "chat": ("hello", []),
+    "collect": ("collect a reading", [("collect_sensor_reading", {})]),
+    "analyze": ("analyze the latest reading", [("analyze_readings", {})]),
+    "report": ("generate a detailed report", [("generate_report", {"report_type": "detailed"})]),
+}
+TOOLS = {
+    "collect_sensor_reading": (collect_sensor_reading, {}),
+    "analyze_readings": (analyze_readings, {}),
+    "generate_report": (generate_report, {"report_type": "detailed"}),
+}
+
+
+def percentiles(samples: list, prefix: str, scale: float) -> dict:
+    values = np.array(samples) * scale
+    return {
+        f"{prefix}.p50": float(np.percentile(values, 50)),
+        f"{prefix}.p99": float(np.percentile(values, 99)),
+        f"{prefix}.mean": float(values.mean()),
+    }
+
+
+def state_bytes(state: dict) -> int:
+    return len(json.dumps(state, default=str))
+
+
+async def run_turns(session_service, session_id: str, runner: Runner, llm: ScriptedLlm, turns: int) -> dict:
+    """Cycle through the scenarios `turns` times, recording per-turn latency and state size"""
+    latencies = {name: [] for name in SCENARIOS}
+    sizes, events, llm_calls = [], [], []
+    for _ in range(turns):
+        for name, (query, tool_calls) in SCENARIOS.items():
+            llm.queue(tool_calls)
+            calls_before = llm.calls
+            started = time.perf_counter()
+            await add_user_query_to_history(session_service, APP_NAME, USER_ID, session_id, query)
+            await call_agent_async(runner, USER_ID, session_id, query, verbose=False, cache=None, local=False)
+            latencies[name].append(time.perf_counter() - started)
+            llm_calls.append(llm.calls - calls_before)
+            if llm.pending:
+                raise RuntimeError(f"Scenario {name!r} left tool calls unmade: {llm.pending}")
+
+        await flush_interaction_history(session_service, APP_NAME, USER_ID, session_id)
+        session = await session_service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session_id)
+        sizes.append(state_bytes(session.state))
+        events.append(len(session.events))
+
+    metrics = {}
+    for name, samples in latencies.items():
+        metrics.update(percentiles(samples, f"turn.{name}_ms", 1000))
+    # Growth per scenario cycle (one turn of each scenario), from a straight-line fit
+    cycles = np.arange(len(sizes))
+    metrics["state.bytes_final"] = float(sizes[-1])
+    metrics["state.bytes_per_cycle"] = float(np.polyfit(cycles, sizes, 1)[0]) if len(sizes) > 1 else 0.0
+    metrics["state.events_per_cycle"] = float(np.polyfit(cycles, events, 1)[0]) if len(events) > 1 else 0.0
+    metrics["turn.llm_calls_per_turn"] = float(np.mean(llm_calls))
+    return metrics
+
+
+async def time_tools(session_service, session_id: str, repeats: int) -> dict:
+    """Call each tool directly against the session; state writes go to a scratch delta"""
+    metrics = {}
+    for name, (tool, kwargs) in TOOLS.items():
+        session = await session_service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session_id)
+        samples = []
+        for _ in range(repeats):
+            tool_context = DirectToolContext(session)
+            started = time.perf_counter()
+            result = tool(tool_context, **kwargs)
+            if inspect.isawaitable(result):
+                await result
+            samples.append(time.perf_counter() - started)
+        metrics.update(percentiles(samples, f"tool.{name}_us", 1e6))
+    return metrics
+
+
+async def run_suite(turns: int, tool_repeats: int) -> dict:
+    random.seed(0)
+    llm = ScriptedLlm()
+    agent = with_model(build_sensor_monitoring_agent(), llm)
+    with tempfile.TemporaryDirectory() as tmp:
+        session_service = SqliteMonitoringSessionService(os.path.join(tmp, "suite.db"))
+        state = initial_state()
+        state["constraints"]["temperature"].update(min=1000, max=1200)
+        session = await session_service.create_session(app_name=APP_NAME, user_id=USER_ID, state=state)
+        runner = Runner(agent=agent, app_name=APP_NAME, session_service=session_service)
+        # Tools print progress lines; keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            metrics = await run_turns(session_service, session.id, runner, llm, turns)
+            metrics.update(await time_tools(session_service, session.id, tool_repeats))
+        session_service.close()
+    return metrics
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    """Print current vs baseline metrics; return the names of regressed metrics"""
+    regressions = []
+    print(f"{'metric':<40}  {'baseline':>12}  {'current':>12}  {'ratio':>7}")
+    for name, value in current.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<40}  {'-':>12}  {value:>12.3f}  {'new':>7}")
+            continue
+        ratio = value / base if base else (1.0 if not value else float("inf"))
+        flag = ""
+        if ratio > 1 + tolerance and not name.endswith(".p99"):
+            regressions.append(name)
+            flag = "  REGRESSED"
+        print(f"{name:<40}  {base:>12.3f}  {value:>12.3f}  {ratio:>7.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=25, help="turns per scenario")
+    parser.add_argument("--tool-repeats", type=int, default=200, help="direct calls per tool")
+    parser.add_argument("--rounds", type=int, default=3, help="suite runs; each metric keeps its best value")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", nargs="?", const=str(DEFAULT_BASELINE),
+                        help=f"compare against a stored result (default {DEFAULT_BASELINE.name})")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="allowed slowdown before a metric fails")
+    parser.add_argument("--save-baseline", action="store_true", help=f"store this run as {DEFAULT_BASELINE}")
+    args = parser.parse_args()
+    logging.getLogger("google_adk").setLevel(logging.ERROR)
+    warnings.filterwarnings("ignore", message=r"\[EXPERIMENTAL\]")
+
+    metrics = {}
+    for _ in range(args.rounds):
+        for name, value in asyncio.run(run_suite(args.turns, args.tool_repeats)).items():
+            metrics[name] = min(value, metrics.get(name, value))
+    result = {
+        "suite": "offline",
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "turns": args.turns,
+        "rounds": args.rounds,
+        "metrics": metrics,
+    }
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(result, indent=2) + "\n")
+    if args.save_baseline:
+        DEFAULT_BASELINE.parent.mkdir(exist_ok=True)
+        DEFAULT_BASELINE.write_text(json.dumps(result, indent=2) + "\n")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressions = compare(metrics, baseline["metrics"], args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+    else:
+        print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Latency of repeated operator queries with and without the response cache.
+
+An operator repeats a handful of read-only queries ("generate report",
+"what's the status") against one session. The model is a stub that answers
+after a fixed delay standing in for a Gemini round-trip. Every
+`--change-every` turns a reading is collected and analyzed outside the
+agents, which changes state and invalidates the cached answers.
+
+Usage: python benchmarks/response_cache_benchmark.py [--turns N] [--llm-latency S] [--change-every N]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+from google.adk.runners import Runner
+
+from multi_plant_benchmark import make_agent
+from sqlite_session_service import SqliteMonitoringSessionService
+from utils import ResponseCache, add_user_query_to_history, call_agent_async
+from sensor_monitoring_agent.pipeline import collect_and_analyze, initial_state
+
+APP_NAME = "benchmark"
+USER_ID = "operator"
+QUERIES = ["Generate report", "what's the status?", "generate report", "Any violations?"]
+
+
+async def run(db_path: str, turns: int, latency: float, change_every: int, cache) -> dict:
+    session_service = SqliteMonitoringSessionService(db_path)
+    state = initial_state()
+    state["constraints"]["temperature"].update(min=1000, max=1200)
+    session = await session_service.create_session(app_name=APP_NAME, user_id=USER_ID, state=state)
+    runner = Runner(agent=make_agent(latency), app_name=APP_NAME, session_service=session_service)
+
+    latencies = []
+    for i in range(turns):
+        if change_every and i % change_every == 0:
+            with contextlib.redirect_stdout(io.StringIO()):
+                await collect_and_analyze(session_service, APP_NAME, USER_ID, session.id)
+        query = QUERIES[i % len(QUERIES)]
+        started = time.perf_counter()
+        await add_user_query_to_history(session_service, APP_NAME, USER_ID, session.id, query)
+        await call_agent_async(runner, USER_ID, session.id, query, verbose=False, cache=cache, local=False)
+        latencies.append((time.perf_counter() - started) * 1000)
+    session_service.close()
+    values = np.array(latencies)
+    return {
+        "mean_ms": values.mean(),
+        "p50_ms": np.percentile(values, 50),
+        "p99_ms": np.percentile(values, 99),
+        "hit_rate": cache.counters()["hit_rate"] if cache else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="stub model delay in seconds")
+    parser.add_argument("--change-every", type=int, default=20, help="turns between state changes (0: never)")
+    args = parser.parse_args()
+    # The stub root agent has no sub-agents, so ADK warns about the pipeline's tool events
+    logging.getLogger("google_adk").setLevel(logging.ERROR)
+
+    print(f"stub LLM latency {args.llm_latency * 1000:.0f} ms, {args.turns} turns, "
+          f"state change every {args.change_every or 'never'} turns")
+    print(f"{'mode':<10}  {'mean ms':>8}  {'p50 ms':>8}  {'p99 ms':>8}  {'hit rate':>8}")
+    for mode, cache in (("no cache", None), ("cache", ResponseCache())):
+        with tempfile.TemporaryDirectory() as tmp:
+            result = asyncio.run(run(os.path.join(tmp, "cache.db"), args.turns, args.llm_latency,
+                                     args.change_every, cache))
+        print(f"{mode:<10}  {result['mean_ms']:>8.1f}  {result['p50_ms']:>8.2f}  {result['p99_ms']:>8.1f}  "
+              f"{result['hit_rate']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Fold cost, memory and query latency of the tiered rollups.
+
+Feeds D days of 1 Hz readings through a reading store and its rollups (the
+retention policy evicts raw readings as it goes), then times a window
+summary over the last day from the rollup tier against a scan of the same
+day of raw readings.
+
+Usage: python benchmarks/rollup_benchmark.py [--days D] [--sensors N]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+
+from sensor_monitoring_agent.constraints import compile_constraints
+from sensor_monitoring_agent.rollups import TieredRollups
+from sensor_monitoring_agent.store import ReadingStore
+
+# Readings appended between rollup updates, like a feed flushed and analyzed every few minutes
+BATCH = 600
+
+
+def feed(days: int, sensors: int) -> tuple:
+    names = [f"tag{i}" for i in range(sensors)]
+    compiled = compile_constraints({name: {"min": -2.0, "max": 2.0} for name in names})
+    store = ReadingStore(sensors={name: "" for name in names})
+    rollups = TieredRollups()
+    rng = np.random.default_rng(0)
+    start = time.time() - days * 86_400
+    rows = days * 86_400
+    folding = 0.0
+    for first in range(0, rows, BATCH):
+        count = min(BATCH, rows - first)
+        store.append_batch(start + first + np.arange(count, dtype=np.float64), rng.normal(size=(count, sensors)), names)
+        started = time.perf_counter()
+        rollups.consume(store, compiled)
+        folding += time.perf_counter() - started
+    return store, rollups, compiled, folding / rows * 1e6
+
+
+def raw_day_summary(values: np.ndarray, compiled, names: list) -> float:
+    started = time.perf_counter()
+    valid = ~np.isnan(values)
+    below, above = compiled.check(names, values, valid)
+    np.nanmin(values, axis=0), np.nanmax(values, axis=0), np.nanmean(values, axis=0)
+    (below | above).any(axis=1).sum(), below.sum(axis=0), above.sum(axis=0)
+    return (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--sensors", type=int, default=3)
+    args = parser.parse_args()
+
+    store, rollups, compiled, fold_us = feed(args.days, args.sensors)
+    print(f"{args.days} days of 1 Hz readings, {args.sensors} sensors")
+    print(f"fold + retention: {fold_us:.2f} us/reading; raw readings retained {len(store)}, evicted {rollups.evicted}")
+    print(f"rollup memory {rollups.memory_bytes() / 1e6:.2f} MB "
+          f"(a day of raw readings: {86_400 * args.sensors * 9 / 1e6:.2f} MB)")
+
+    end = time.time()
+    for tier in rollups.tiers:
+        started = time.perf_counter()
+        for _ in range(20):
+            tier.summarize(tier.window_slots(end - 86_400, end), args.sensors)
+        print(f"last-day summary from {tier.name} tier: {(time.perf_counter() - started) / 20 * 1000:.3f} ms")
+    day = np.random.default_rng(1).normal(size=(86_400, args.sensors))
+    print(f"last-day summary from raw readings: {raw_day_summary(day, compiled, store.sensors):.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Per-turn session cost as history grows.
+
+Fills the readings/analyses/history/events tables of one session to each
+target size, then times a monitoring turn: get_session followed by
+append_event with a tool-style state delta (one new analysis, one history
+entry and an updated readings summary). With the SQLite service the per-turn
+time should stay flat from thousands to millions of rows.
+
+Usage: python benchmarks/session_service_benchmark.py [sizes] [--turns N] [--in-memory-limit N]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from google.adk.events import Event, EventActions
+from google.adk.sessions import InMemorySessionService
+
+from sqlite_session_service import SqliteMonitoringSessionService
+
+APP_NAME = "benchmark"
+USER_ID = "operator"
+
+
+def _reading(i):
+    return {
+        "collection_id": f"reading_{i}",
+        "timestamp": "2026-01-01 00:00:00",
+        "readings": {
+            "temperature": {"value": 1100.0, "unit": "C", "timestamp": "2026-01-01 00:00:00", "status": "online"},
+            "feeder_rate": {"value": 90.0, "unit": "kg/h", "timestamp": "2026-01-01 00:00:00", "status": "online"},
+            "vibration": {"value": 12.0, "unit": "mm/s", "timestamp": "2026-01-01 00:00:00", "status": "online"},
+        },
+    }
+
+
+def _analysis(i):
+    return {
+        "reading_id": f"reading_{i}",
+        "timestamp": "2026-01-01 00:00:00",
+        "analysis_timestamp": "2026-01-01 00:00:00",
+        "sensor_analyses": {},
+        "overall_status": "normal",
+        "alerts": [],
+        "recommendations": ["All readings within acceptable ranges"],
+    }
+
+
+def _history(i):
+    return {"action": "analysis_performed", "reading_id": f"reading_{i}", "timestamp": "2026-01-01 00:00:00"}
+
+
+def fill_sqlite(db_path, pk, start, stop, batch=50_000):
+    """Bulk-insert rows [start, stop) for session pk straight into the tables"""
+    conn = sqlite3.connect(db_path)
+    event = Event(author="analysis_agent", invocation_id="bench").model_dump_json(exclude_none=True)
+    for lo in range(start, stop, batch):
+        ids = range(lo, min(lo + batch, stop))
+        ts = [1_767_225_600.0 + i for i in ids]
+        conn.executemany(
+            "INSERT INTO readings (session_pk, collection_id, timestamp, payload) VALUES (?, ?, ?, ?)",
+            [(pk, f"reading_{i}", t, json.dumps(_reading(i))) for i, t in zip(ids, ts)],
+        )
+        conn.executemany(
+            "INSERT INTO analyses (session_pk, collection_id, timestamp, payload) VALUES (?, ?, ?, ?)",
+            [(pk, f"reading_{i}", t, json.dumps(_analysis(i))) for i, t in zip(ids, ts)],
+        )
+        conn.executemany(
+            "INSERT INTO history (session_pk, timestamp, payload) VALUES (?, ?, ?)",
+            [(pk, t, json.dumps(_history(i))) for i, t in zip(ids, ts)],
+        )
+        conn.executemany(
+            "INSERT INTO events (session_pk, timestamp, event) VALUES (?, ?, ?)",
+            [(pk, t, event) for t in ts],
+        )
+        conn.commit()
+    conn.close()
+
+
+async def time_turns(service, session_id, turns, first_id):
+    """Average seconds per get_session + append_event turn"""
+    started = time.perf_counter()
+    for n in range(turns):
+        session = await service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session_id)
+        i = first_id + n
+        analyses = session.state.get("analysis_results", [])
+        analyses.append(_analysis(i))
+        history = session.state.get("interaction_history", [])
+        history.append(_history(i))
+        delta = {
+            "analysis_results": analyses,
+            "interaction_history": history,
+            "sensor_readings": {"count": i, "latest": _reading(i)},
+        }
+        event = Event(author="analysis_agent", invocation_id="bench", actions=EventActions(state_delta=delta))
+        await service.append_event(session, event)
+    return (time.perf_counter() - started) / turns
+
+
+async def bench_sqlite(sizes, turns):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        service = SqliteMonitoringSessionService(db_path)
+        session = await service.create_session(app_name=APP_NAME, user_id=USER_ID, state={"monitoring_status": "inactive"})
+        pk = sqlite3.connect(db_path).execute("SELECT pk FROM sessions WHERE id = ?", (session.id,)).fetchone()[0]
+        rows = 0
+        results = []
+        for size in sizes:
+            fill_sqlite(db_path, pk, rows, size)
+            rows = size
+            per_turn = await time_turns(service, session.id, turns, rows)
+            rows += turns
+            results.append((size, per_turn))
+        service.close()
+    return results
+
+
+async def bench_in_memory(sizes, turns):
+    results = []
+    for size in sizes:
+        service = InMemorySessionService()
+        state = {
+            "monitoring_status": "inactive",
+            "analysis_results": [_analysis(i) for i in range(size)],
+            "interaction_history": [_history(i) for i in range(size)],
+        }
+        session = await service.create_session(app_name=APP_NAME, user_id=USER_ID, state=state)
+        results.append((size, await time_turns(service, session.id, turns, size)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("sizes", nargs="?", default="1000,10000,100000,1000000",
+                        help="comma-separated row counts per table")
+    parser.add_argument("--turns", type=int, default=200, help="timed turns per size")
+    parser.add_argument("--in-memory-turns", type=int, default=10,
+                        help="timed turns per size for InMemorySessionService, which is much slower")
+    parser.add_argument("--in-memory-limit", type=int, default=10_000,
+                        help="largest size to also run against InMemorySessionService (0 to skip)")
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",")]
+
+    sqlite_results = asyncio.run(bench_sqlite(sizes, args.turns))
+    memory_sizes = [s for s in sizes if s <= args.in_memory_limit]
+    memory_results = dict(asyncio.run(bench_in_memory(memory_sizes, args.in_memory_turns))) if memory_sizes else {}
+
+    print(f"{'rows':>10}  {'sqlite ms/turn':>15}  {'in-memory ms/turn':>18}")
+    for size, per_turn in sqlite_results:
+        in_memory = memory_results.get(size)
+        in_memory_txt = f"{in_memory * 1000:18.3f}" if in_memory is not None else f"{'-':>18}"
+        print(f"{size:>10}  {per_turn * 1000:15.3f}  {in_memory_txt}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Cold-start cost of the CLI: import time and time to the first prompt.
+
+Every measurement runs in a fresh interpreter, `--runs` times, and the
+median is reported:
+
+- interpreter: `python -c pass`, the floor under everything else
+- import main: importing main.py (session service, tools, console)
+- first prompt: `python main.py` until the command prompt is printed,
+  with a new session in a scratch database
+- agent tree: building the root agent and the ADK Runner, which is
+  deferred until the first query the local parser doesn't cover
+
+It also lists which heavy modules `import main` loads.
+
+Usage: python benchmarks/startup_benchmark.py [--runs N]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+# Modules whose presence after `import main` means the Runner wasn't deferred
+HEAVY_MODULES = ("google.adk.runners",)
+
+IMPORT_MAIN = """
+import sys, time
+started = time.perf_counter()
+import main
+print((time.perf_counter() - started) * 1000)
+print(",".join(m for m in {heavy!r} if m in sys.modules))
+"""
+AGENT_TREE = """
+import time
+import main
+started = time.perf_counter()
+from utils import LazyRunner
+LazyRunner("startup", main.session_service).runner
+print((time.perf_counter() - started) * 1000)
+"""
+
+
+def python(code: str, env: dict) -> list:
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return output.stdout.strip().splitlines()
+
+
+def first_prompt_ms(env: dict) -> float:
+    """Milliseconds from launching main.py to its prompt"""
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-u", "main.py"], cwd=ROOT, env=env, text=True,
+                               stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    for line in process.stdout:
+        if line.startswith("Type 'exit'"):
+            elapsed = (time.perf_counter() - started) * 1000
+            break
+    else:
+        raise RuntimeError("main.py exited before printing its prompt")
+    process.communicate("exit\n", timeout=60)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    samples = {"interpreter": [], "import main": [], "first prompt": [], "agent tree": []}
+    heavy = set()
+    with tempfile.TemporaryDirectory() as tmp:
+        for run in range(args.runs):
+            env = {**os.environ, "SESSION_DB": os.path.join(tmp, f"startup{run}.db"), "SHOW_STATE": "0"}
+            env.pop("TRACE_FILE", None)
+            env.pop("METRICS_PORT", None)
+            started = time.perf_counter()
+            python("pass", env)
+            samples["interpreter"].append((time.perf_counter() - started) * 1000)
+            import_ms, loaded = (python(IMPORT_MAIN.format(heavy=HEAVY_MODULES), env) + [""])[:2]
+            samples["import main"].append(float(import_ms))
+            heavy.update(filter(None, loaded.split(",")))
+            samples["first prompt"].append(first_prompt_ms(env))
+            samples["agent tree"].append(float(python(AGENT_TREE, env)[-1]))
+
+    for name, values in samples.items():
+        print(f"{name:<14} {statistics.median(values):8.1f} ms  (min {min(values):.1f}, max {max(values):.1f})")
+    print(f"heavy modules loaded by `import main`: {', '.join(sorted(heavy)) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
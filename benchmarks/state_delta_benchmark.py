@@ -0,0 +1,118 @@
+"""
+Per-call cost and event size of tool state writes: whole-list reassignment vs state_ops.
+
+A tool call that records one analysis and one history entry is committed
+against sessions already holding N of each. "reassign" is the old pattern
+(read the list, append, assign it back), whose state delta carries the whole
+list; "ops" uses state_ops.append, whose delta carries just the new items.
+Sessions are loaded with all N rows (recent_rows=N), as a service that keeps
+full lists in state would hold them.
+
+Usage: python benchmarks/state_delta_benchmark.py [sizes] [--calls N]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from google.adk.events import Event, EventActions
+
+from sensor_monitoring_agent.state_ops import append
+from sensor_monitoring_agent.tool_runner import DirectToolContext, new_invocation_id
+from sqlite_session_service import SqliteMonitoringSessionService
+
+APP_NAME = "benchmark"
+USER_ID = "operator"
+
+
+def _analysis(i):
+    return {
+        "reading_id": f"reading_{i}",
+        "timestamp": "2026-01-01 00:00:00",
+        "overall_status": "normal",
+        "sensor_analyses": {"temperature": {"value": 1100.0, "constraint_status": "within_range"}},
+        "alerts": [],
+    }
+
+
+def _entry(i):
+    return {"action": "analysis_performed", "reading_id": f"reading_{i}", "timestamp": "2026-01-01 00:00:00"}
+
+
+def reassign_tool(tool_context, i):
+    state = tool_context.state
+    analyses = state.get("analysis_results", [])
+    analyses.append(_analysis(i))
+    state["analysis_results"] = analyses
+    history = state.get("interaction_history", [])
+    history.append(_entry(i))
+    state["interaction_history"] = history
+
+
+def ops_tool(tool_context, i):
+    append(tool_context, "analysis_results", _analysis(i))
+    append(tool_context, "interaction_history", _entry(i))
+
+
+async def time_tool(db_path, size, calls, tool):
+    service = SqliteMonitoringSessionService(db_path, recent_rows=size + calls)
+    session = await service.create_session(app_name=APP_NAME, user_id=USER_ID, state={
+        "analysis_results": [_analysis(i) for i in range(size)],
+        "interaction_history": [_entry(i) for i in range(size)],
+    })
+    session = await service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session.id)
+    delta_bytes, tool_seconds = 0, 0.0
+    started = time.perf_counter()
+    for n in range(calls):
+        tool_context = DirectToolContext(session)
+        tool_started = time.perf_counter()
+        tool(tool_context, size + n)
+        tool_seconds += time.perf_counter() - tool_started
+        delta = dict(tool_context.state_delta)
+        delta_bytes += len(json.dumps(delta))
+        event = Event(invocation_id=new_invocation_id(), author="analysis_agent",
+                      actions=EventActions(state_delta=delta))
+        await service.append_event(session, event)
+    elapsed = time.perf_counter() - started
+    rows = service._conn.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+    service.close()
+    assert rows == size + calls, (rows, size + calls)
+    return {"bytes": delta_bytes / calls, "tool_us": tool_seconds / calls * 1e6, "ms": elapsed / calls * 1000}
+
+
+async def run(sizes, calls):
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            row = {"size": size}
+            for name, tool in (("reassign", reassign_tool), ("ops", ops_tool)):
+                row[name] = await time_tool(os.path.join(tmp, f"{name}-{size}.db"), size, calls, tool)
+            results.append(row)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("sizes", nargs="?", default="100,1000,10000",
+                        help="comma-separated list lengths already in state")
+    parser.add_argument("--calls", type=int, default=50, help="timed tool calls per size")
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",")]
+
+    results = asyncio.run(run(sizes, args.calls))
+    print(f"{'items':>7}  {'reassign bytes':>14}  {'ops bytes':>9}  {'reassign ms':>11}  {'ops ms':>6}  "
+          f"{'reassign tool us':>16}  {'ops tool us':>11}   (per call)")
+    for row in results:
+        old, new = row["reassign"], row["ops"]
+        print(f"{row['size']:>7}  {old['bytes']:>14,.0f}  {new['bytes']:>9,.0f}  {old['ms']:>11.3f}  {new['ms']:>6.3f}  "
+              f"{old['tool_us']:>16.1f}  {new['tool_us']:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
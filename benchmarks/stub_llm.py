@@ -0,0 +1,96 @@
+"""
+Local stand-ins for Gemini, so benchmarks run without network access.
+
+StubLlm answers every request with the same text. ScriptedLlm plays a
+queue of tool calls through the real agent tree: when the agent it is
+serving lacks the next tool, it first transfers to the sub-agent that owns
+it, so turns take the same agent and tool path they take with Gemini.
+`with_model` swaps the model of an existing agent tree for either stub.
+"""
+import asyncio
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+
+def _response(part: types.Part) -> LlmResponse:
+    return LlmResponse(
+        content=types.Content(role="model", parts=[part]),
+        usage_metadata=types.GenerateContentResponseUsageMetadata(
+            prompt_token_count=0, candidates_token_count=0, total_token_count=0
+        ),
+    )
+
+
+class StubLlm(BaseLlm):
+    """Answers every request with a fixed text after `latency` seconds"""
+
+    model: str = "stub"
+    latency: float = 0.05
+
+    async def generate_content_async(self, llm_request, stream: bool = False):
+        await asyncio.sleep(self.latency)
+        yield _response(types.Part(text="All sensors nominal."))
+
+
+class ScriptedLlm(BaseLlm):
+    """
+    Deterministic model that emits queued tool calls, then a text answer.
+
+    Call `queue` before each turn with the (tool name, args) pairs the turn
+    should make. Each model request pops the next call; once the queue is
+    empty the agent answers with a text naming the tools it ran. Turns must
+    run one at a time, since all agents in the tree share the queue.
+    """
+
+    model: str = "scripted"
+    latency: float = 0.0
+    owners: dict = {}  # tool name -> name of the agent that has it
+    pending: list = []
+    ran: list = []
+    calls: int = 0  # model requests served
+
+    def queue(self, tool_calls: list) -> None:
+        self.pending = list(tool_calls)
+        self.ran = []
+
+    async def generate_content_async(self, llm_request, stream: bool = False):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if not self.pending:
+            answer = f"Done: {', '.join(self.ran)}." if self.ran else "Hello, all sensors are being monitored."
+            yield _response(types.Part(text=answer))
+            return
+
+        name, args = self.pending[0]
+        if name not in llm_request.tools_dict:
+            owner = self.owners.get(name)
+            if owner is None or "transfer_to_agent" not in llm_request.tools_dict:
+                raise ValueError(f"No agent can reach tool {name!r} from here")
+            name, args = "transfer_to_agent", {"agent_name": owner}
+        else:
+            self.pending.pop(0)
+            self.ran.append(name)
+        yield _response(types.Part(function_call=types.FunctionCall(name=name, args=args)))
+
+
+def tool_owners(agent) -> dict:
+    """Tool name -> agent name for every tool in an agent tree"""
+    owners = {}
+    for tool in agent.tools:
+        owners[getattr(tool, "__name__", getattr(tool, "name", None))] = agent.name
+    for sub_agent in agent.sub_agents:
+        owners.update(tool_owners(sub_agent))
+    return owners
+
+
+def with_model(agent, llm: BaseLlm):
+    """Copy of an agent tree with every agent's model replaced by `llm`"""
+    if isinstance(llm, ScriptedLlm) and not llm.owners:
+        llm.owners = tool_owners(agent)
+    return agent.clone(update={
+        "model": llm,
+        "sub_agents": [with_model(sub_agent, llm) for sub_agent in agent.sub_agents],
+    })
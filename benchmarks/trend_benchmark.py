@@ -0,0 +1,123 @@
+"""
+Trend statistics cost, and how long they hold up the event loop.
+
+For each window shape (rows x sensors of LoadGenerator data, one plant),
+times compute_trends against a per-sensor loop computing the same
+statistics with np.percentile / np.polyfit, then measures the longest
+event-loop stall while run_trends answers the window inline and through
+the process pool. The stall is the worst lateness of a 1 ms heartbeat
+task running alongside, which is what other operators' requests would wait.
+
+Usage: python benchmarks/trend_benchmark.py [--shapes 3600x3 3600x200 ...] [--repeats N]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+
+from sensor_monitoring_agent import trends
+from sensor_monitoring_agent.loadgen import LoadGenerator
+from sensor_monitoring_agent.trends import TREND_PERCENTILES, compute_trends, reading_durations, run_trends
+
+
+def window(rows: int, sensors: int) -> tuple:
+    generator = LoadGenerator(sensors=sensors, seed=0, start=0)
+    timestamps, values, online = generator.block(rows)
+    values = np.where(online[:, 0], values[:, 0], np.nan)
+    # Limits at each sensor's 90th percentile, so about a tenth of the time is in violation
+    violated = (values > np.nanpercentile(values, 90, axis=0)).astype(np.float64)
+    return timestamps, reading_durations(timestamps), values, violated
+
+
+def per_sensor(timestamps, durations, values, violated) -> list:
+    """The same statistics one column at a time"""
+    hours = (timestamps - timestamps[0]) / 3600
+    results = []
+    for col in range(values.shape[1]):
+        valid = ~np.isnan(values[:, col])
+        v = values[valid, col]
+        flagged = violated[:, col] > 0
+        starts = np.flatnonzero(flagged & ~np.concatenate(([False], flagged[:-1])))
+        results.append({
+            "percentiles": np.percentile(v, TREND_PERCENTILES),
+            "mean": v.mean(),
+            "slope": np.polyfit(hours[valid], v, 1)[0],
+            "violation_seconds": float((violated[:, col] * durations).sum()),
+            "excursions": len(starts),
+            "between": float(np.diff(timestamps[starts]).mean()) if len(starts) > 1 else None,
+        })
+    return results
+
+
+def best_of(repeats: int, fn, *args) -> float:
+    times = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn(*args)
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+async def stall(inputs: tuple, pool_min_values: int) -> tuple:
+    """(longest heartbeat lateness, report time) while run_trends answers the window"""
+    trends.POOL_MIN_VALUES = pool_min_values
+    worst = 0.0
+    running = True
+
+    async def heartbeat():
+        nonlocal worst
+        while running:
+            started = time.perf_counter()
+            await asyncio.sleep(0.001)
+            worst = max(worst, time.perf_counter() - started - 0.001)
+
+    beat = asyncio.create_task(heartbeat())
+    await asyncio.sleep(0.01)
+    started = time.perf_counter()
+    await run_trends(*inputs)
+    elapsed = time.perf_counter() - started
+    running = False
+    await beat
+    return worst, elapsed
+
+
+async def run(shapes: list, repeats: int) -> list:
+    results = []
+    # Start the workers before timing; the first submit forks them
+    await stall(window(10, 3), 0)
+    for rows, sensors in shapes:
+        inputs = window(rows, sensors)
+        loop_seconds = best_of(repeats, per_sensor, *inputs)
+        vector_seconds = best_of(repeats, compute_trends, *inputs)
+        inline_stall, inline_seconds = await stall(inputs, sys.maxsize)
+        pool_stall, pool_seconds = await stall(inputs, 0)
+        results.append((rows, sensors, loop_seconds, vector_seconds, inline_stall, inline_seconds,
+                        pool_stall, pool_seconds))
+    trends.shutdown_trend_pool()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--shapes", nargs="+", default=["3600x3", "3600x50", "3600x200", "10800x500"],
+                        help="ROWSxSENSORS")
+    parser.add_argument("--repeats", type=int, default=3, help="timed runs per shape (best is kept)")
+    args = parser.parse_args()
+    shapes = [tuple(int(n) for n in shape.split("x")) for shape in args.shapes]
+
+    results = asyncio.run(run(shapes, args.repeats))
+    print(f"{'window':>11}  {'per-sensor ms':>13}  {'vectorized ms':>13}  {'speedup':>7}  "
+          f"{'inline stall ms':>15}  {'pool stall ms':>13}  {'pool ms':>7}")
+    for rows, sensors, loop_s, vector_s, inline_stall, _, pool_stall, pool_s in results:
+        print(f"{f'{rows}x{sensors}':>11}  {loop_s * 1000:>13.2f}  {vector_s * 1000:>13.2f}  "
+              f"{loop_s / vector_s:>6.1f}x  {inline_stall * 1000:>15.2f}  {pool_stall * 1000:>13.2f}  "
+              f"{pool_s * 1000:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import asyncio
+import sys
+import threading
+from typing import Optional
+
+# Notifications buffered while the console is busy; the oldest is dropped when full
+NOTIFICATION_QUEUE_SIZE = 100
+
+
+class AsyncConsole:
+    """
+    Operator console that never blocks the event loop.
+
+    A daemon thread reads stdin lines onto a command queue, so lines typed
+    while an agent run is in progress wait their turn instead of being lost.
+    Notifications (e.g. monitoring alerts) go through their own queue to a
+    printer task, so they appear while the operator is typing or an agent is
+    running, and the prompt is redrawn after them.
+    """
+
+    def __init__(self, prompt: str = "Operator: "):
+        self.prompt = prompt
+        self.commands = None
+        self.notifications = None
+        self.waiting = False
+        self.dropped_notifications = 0
+        self._printer = None
+
+    def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        self.commands = asyncio.Queue()
+        self.notifications = asyncio.Queue(maxsize=NOTIFICATION_QUEUE_SIZE)
+        # A daemon thread rather than the default executor, so a pending
+        # readline can't hold up interpreter shutdown
+        threading.Thread(target=self._read_stdin, args=(loop,), name="console-stdin", daemon=True).start()
+        self._printer = asyncio.create_task(self._print_notifications(), name="console-notifications")
+
+    def _read_stdin(self, loop) -> None:
+        while True:
+            line = sys.stdin.readline()
+            if not line:
+                loop.call_soon_threadsafe(self.commands.put_nowait, None)
+                return
+            loop.call_soon_threadsafe(self.commands.put_nowait, line.rstrip("\n"))
+
+    async def read_command(self) -> Optional[str]:
+        """Next operator command, or None once stdin is closed"""
+        if not self.commands.empty():
+            command = self.commands.get_nowait()
+            if command is not None:
+                print(f"{self.prompt}{command}")
+            return command
+        print(self.prompt, end="", flush=True)
+        self.waiting = True
+        try:
+            return await self.commands.get()
+        finally:
+            self.waiting = False
+
+    def notify(self, message: str) -> None:
+        """Queue a message for display; safe to call from any task on the loop"""
+        if self.notifications.full():
+            self.notifications.get_nowait()
+            self.dropped_notifications += 1
+        self.notifications.put_nowait(message)
+
+    def _show(self, message: str) -> None:
+        if self.waiting:
+            print()
+        print(message)
+        if self.waiting:
+            print(self.prompt, end="", flush=True)
+
+    async def _print_notifications(self) -> None:
+        while True:
+            self._show(await self.notifications.get())
+
+    async def close(self) -> None:
+        """Stop the printer after showing any notifications still queued"""
+        if self._printer:
+            self._printer.cancel()
+            await asyncio.gather(self._printer, return_exceptions=True)
+            self._printer = None
+        while self.notifications and not self.notifications.empty():
+            self._show(self.notifications.get_nowait())
@@ -1,60 +1,54 @@
 import asyncio
+import os
 from datetime import datetime
 from dotenv import load_dotenv
-from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
-from utils import add_user_query_to_history, call_agent_async
-from sensor_monitoring_agent.agent import sensor_monitoring_agent
+from console import AsyncConsole
+from sqlite_session_service import SqliteMonitoringSessionService
+from utils import (
+    LazyRunner,
+    add_user_query_to_history,
+    call_agent_async,
+    display_pipeline_results,
+    flush_interaction_history,
+    monitoring_alert_printer,
+    response_cache,
+)
+from sensor_monitoring_agent.ingestion import stop_adapters
+from sensor_monitoring_agent.pipeline import auto_pipeline_steps, collect_and_analyze, open_session
+from sensor_monitoring_agent.scheduler import set_monitoring_listener, stop_scheduler
+from sensor_monitoring_agent.telemetry import configure_from_env, telemetry
+from sensor_monitoring_agent.trends import shutdown_trend_pool
 
 load_dotenv()
+# TRACE_FILE / METRICS_PORT turn on span tracing and the Prometheus endpoint
+configure_from_env()
 
-session_service = InMemorySessionService()
-
-initial_state = {
-    "user_name": "System Operator",
-    "constraints": {
-        "temperature": {"min": None, "max": None, "unit": "C"},
-        "feeder_rate": {"min": None, "max": None, "unit": "kg/h"},
-        "vibration": {"min": None, "max": None, "unit": "mm/s"},
-    },
-    "sensor_readings": [],
-    "analysis_results": [],
-    "interaction_history": [],
-    "monitoring_status": "inactive"
-}
-
-def all_constraints_set(constraints):
-    """Check if all three sensors have at least one constraint (min or max) set"""
-    required_sensors = ["temperature", "feeder_rate", "vibration"]
-    for sensor in required_sensors:
-        constraint = constraints.get(sensor, {})
-        if constraint.get("min") is None and constraint.get("max") is None:
-            return False
-    return True
-
-def constraints_exist(constraints):
-    """Check if any constraints are set"""
-    for c in constraints.values():
-        if c.get("min") is None or c.get("max") is None:
-            return False
-    return True
+session_service = SqliteMonitoringSessionService(os.getenv("SESSION_DB", "sensor_monitoring.db"))
+# SHOW_STATE=0 skips the before/after state dumps around every turn
+SHOW_STATE = os.getenv("SHOW_STATE", "1") != "0"
 
 async def main_async():
     APP_NAME = "Sensor Monitoring"
     USER_ID = "operator_001"
-    new_session = await session_service.create_session(
-        app_name=APP_NAME,
-        user_id=USER_ID,
-        state=initial_state,
-    )
-    SESSION_ID = new_session.id
-    print(f"Created new sensor monitoring session: {SESSION_ID}")
 
-    runner = Runner(
-        agent=sensor_monitoring_agent,
-        app_name=APP_NAME,
-        session_service=session_service,
-    )
+    # Commands and background alerts share the console without blocking the event loop
+    console = AsyncConsole()
+    console.start()
+    # Background monitoring reports alerts to the console as they change
+    set_monitoring_listener(monitoring_alert_printer(console.notify))
+
+    # Resume the operator's latest session so readings and analyses survive restarts
+    session, restored = await open_session(session_service, APP_NAME, USER_ID)
+    SESSION_ID = session.id
+    if restored is None:
+        print(f"Created new sensor monitoring session: {SESSION_ID}")
+    else:
+        print(f"Resumed sensor monitoring session: {SESSION_ID} ({restored} readings restored)")
+        if session.state.get("monitoring_status") == "active" and session.state.get("monitoring_config"):
+            print("Continuous monitoring resumed")
+
+    # The agents are only loaded once a query needs the model
+    runner = LazyRunner(APP_NAME, session_service)
 
     print("\nWelcome to Sensor Monitoring System!")
     print("Available commands:")
@@ -65,43 +59,47 @@ async def main_async():
     print("- Start or stop monitoring mode")
     print("Type 'exit' or 'quit' to end the session.\n")
 
-    while True:
-        user_input = input("Operator: ")
-        if user_input.lower() in ["exit", "quit"]:
-            print("Ending monitoring session. Goodbye!")
-            break
-
-        await add_user_query_to_history(
-            session_service, APP_NAME, USER_ID, SESSION_ID, user_input
-        )
-        await call_agent_async(runner, USER_ID, SESSION_ID, user_input)
+    try:
+        while True:
+            user_input = await console.read_command()
+            if user_input is None or user_input.lower() in ["exit", "quit"]:
+                print("Ending monitoring session. Goodbye!")
+                break
 
-        # Get updated session state
-        session = await session_service.get_session(
-            app_name=APP_NAME, 
-            user_id=USER_ID, 
-            session_id=SESSION_ID
-        )
-        constraints = session.state.get("constraints", {})
-        readings = session.state.get("sensor_readings", [])
+            await add_user_query_to_history(
+                session_service, APP_NAME, USER_ID, SESSION_ID, user_input
+            )
+            await call_agent_async(runner, USER_ID, SESSION_ID, user_input, show_state=SHOW_STATE)
 
-        # Auto-trigger sensor collection when all constraints are set
-        if all_constraints_set(constraints) and not readings:
-            print("\n🔄 All constraints set! Auto-collecting sensor readings...")
-            await call_agent_async(runner, USER_ID, SESSION_ID, "Collect current sensor readings")
-            
-            # Get updated state after sensor collection
+            # Get updated session state
             session = await session_service.get_session(
                 app_name=APP_NAME, 
                 user_id=USER_ID, 
                 session_id=SESSION_ID
             )
-            readings = session.state.get("sensor_readings", [])
-
-        # Auto-trigger analysis when both constraints and readings exist
-        if constraints_exist(constraints) and readings:
-            print("\n🔍 Auto-triggering sensor data analysis...")
-            await call_agent_async(runner, USER_ID, SESSION_ID, "Analyze the latest readings")
+            # Auto-trigger collection once all constraints are set, and analysis
+            # when both constraints and readings exist
+            collect, analyze = auto_pipeline_steps(session.state)
+            if collect:
+                print("\n🔄 All constraints set! Auto-collecting sensor readings...")
+            if analyze:
+                print("\n🔍 Auto-triggering sensor data analysis...")
+
+            # Both steps are deterministic tool runs, so skip the LLM round-trips
+            if collect or analyze:
+                await flush_interaction_history(session_service, APP_NAME, USER_ID, SESSION_ID)
+                results = await collect_and_analyze(
+                    session_service, APP_NAME, USER_ID, SESSION_ID, collect=collect, analyze=analyze
+                )
+                display_pipeline_results(results)
+    finally:
+        await stop_scheduler(SESSION_ID)
+        await stop_adapters(SESSION_ID)
+        shutdown_trend_pool()
+        # Buffered history entries are committed in batches; don't lose the tail on exit
+        await flush_interaction_history(session_service, APP_NAME, USER_ID, SESSION_ID)
+        await console.close()
+        telemetry.close()
 
     final_session = await session_service.get_session(
         app_name=APP_NAME, 
@@ -111,6 +109,7 @@ async def main_async():
     print("\nFinal Session State:")
     for key, value in final_session.state.items():
         print(f"{key}: {value}")
+    print(f"\nResponse cache: {response_cache.counters()}")
 
 def main():
     asyncio.run(main_async())
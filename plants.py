@@ -0,0 +1,429 @@
+"""
+Serve several plants' monitoring sessions from one process.
+
+Each plant is an independent session owned by the user "plant_<name>".
+Turns for different plants run concurrently on one event loop. Turns for
+the same plant are serialized by a per-plant lock, and a semaphore caps how
+many agent (LLM) runs are in flight at once. Plants can also be sharded
+across worker processes by a stable hash of their name, so a plant's
+process-local state (reading store, compiled constraints, scheduler) always
+lives in the same worker.
+
+Usage: python plants.py kiln1 kiln2 kiln3 [--workers N] [--max-llm-calls N]
+
+Commands are typed as "<plant>: <query>", e.g. "kiln2: set vibration below 20".
+"""
+import argparse
+import asyncio
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+import zlib
+from collections import deque
+from typing import Callable, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+from google.adk.sessions.base_session_service import GetSessionConfig
+
+from console import AsyncConsole
+from sqlite_session_service import SqliteMonitoringSessionService
+from sensor_monitoring_agent.telemetry import configure_from_env, telemetry
+from utils import (
+    LazyRunner,
+    add_user_query_to_history,
+    call_agent_async,
+    flush_interaction_history,
+    monitoring_alert_printer,
+    response_cache,
+)
+from sensor_monitoring_agent.ingestion import stop_adapters
+from sensor_monitoring_agent.intents import parse_command
+from sensor_monitoring_agent.pipeline import auto_pipeline_steps, collect_and_analyze, open_session
+from sensor_monitoring_agent.scheduler import set_monitoring_listener, stop_scheduler
+from sensor_monitoring_agent.store import get_reading_store
+from sensor_monitoring_agent.tool_runner import run_tool
+from sensor_monitoring_agent.trends import shutdown_trend_pool
+
+APP_NAME = "Sensor Monitoring"
+# Agent runs in flight at once per process
+DEFAULT_MAX_LLM_CALLS = 4
+# Turn latencies kept for percentiles
+LATENCY_WINDOW = 10_000
+
+
+def plant_user_id(plant: str) -> str:
+    return f"plant_{plant}"
+
+
+def shard_for(plant: str, workers: int) -> int:
+    """Worker index that owns a plant; stable across runs, unlike hash()"""
+    return zlib.crc32(plant.encode()) % workers
+
+
+def latency_summary(latencies) -> dict:
+    """Turn count and p50/p99/max latency in milliseconds"""
+    if not latencies:
+        return {"turns": 0, "p50_ms": None, "p99_ms": None, "max_ms": None}
+    values = np.fromiter(latencies, dtype=np.float64)
+    p50, p99 = np.percentile(values, [50, 99])
+    return {
+        "turns": len(values),
+        "p50_ms": round(float(p50), 2),
+        "p99_ms": round(float(p99), 2),
+        "max_ms": round(float(values.max()), 2),
+    }
+
+
+class PlantRunner:
+    """
+    Drives many plant sessions concurrently on one event loop.
+
+    Each turn records the query in the plant's history, runs the agents
+    (holding one of `max_llm_calls` slots) and then runs the same
+    deterministic collect/analyze cycle as main.py.
+    """
+
+    def __init__(self, session_service, agent=None, app_name: str = APP_NAME,
+                 max_llm_calls: int = DEFAULT_MAX_LLM_CALLS, verbose: bool = False,
+                 agent_factory: Optional[Callable] = None):
+        self.session_service = session_service
+        self.app_name = app_name
+        self.verbose = verbose
+        # The agent tree is only built once a turn needs the model
+        self.runner = LazyRunner(app_name, session_service, agent=agent, agent_factory=agent_factory)
+        self.sessions = {}  # plant -> session id
+        self._locks = {}
+        self._llm_slots = asyncio.Semaphore(max_llm_calls)
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.stats = {
+            "turns": 0,
+            "errors": 0,
+            "local_turns": 0,
+            "llm_in_flight": 0,
+            "max_llm_in_flight": 0,
+            "waiting_for_llm": 0,
+        }
+
+    def _lock(self, plant: str) -> asyncio.Lock:
+        lock = self._locks.get(plant)
+        if lock is None:
+            lock = self._locks[plant] = asyncio.Lock()
+        return lock
+
+    async def open(self, plant: str) -> str:
+        """Resume or create the plant's session and return its id"""
+        async with self._lock(plant):
+            return await self._open(plant)
+
+    async def _open(self, plant: str) -> str:
+        session_id = self.sessions.get(plant)
+        if session_id is None:
+            session, _ = await open_session(self.session_service, self.app_name, plant_user_id(plant))
+            session_id = self.sessions[plant] = session.id
+        return session_id
+
+    def plant_for(self, session_id: str) -> Optional[str]:
+        """Plant whose session this is, if it was opened by this runner"""
+        return next((plant for plant, sid in self.sessions.items() if sid == session_id), None)
+
+    async def session(self, plant: str):
+        """The plant's session, without its event history"""
+        session_id = await self.open(plant)
+        return await self.session_service.get_session(
+            app_name=self.app_name,
+            user_id=plant_user_id(plant),
+            session_id=session_id,
+            config=GetSessionConfig(num_recent_events=0),
+        )
+
+    async def analyze(self, plant: str, collect: bool = True) -> dict:
+        """Run the collect/analyze pipeline for a plant without an agent turn"""
+        user_id = plant_user_id(plant)
+        async with self._lock(plant):
+            session_id = await self._open(plant)
+            await flush_interaction_history(self.session_service, self.app_name, user_id, session_id)
+            return await collect_and_analyze(
+                self.session_service, self.app_name, user_id, session_id, collect=collect, analyze=True
+            )
+
+    async def tool(self, plant: str, tool: Callable, agent_name: str, **kwargs) -> dict:
+        """Run one tool directly against a plant's session, in turn with its agent turns"""
+        async with self._lock(plant):
+            session_id = await self._open(plant)
+            session = await self.session_service.get_session(
+                app_name=self.app_name,
+                user_id=plant_user_id(plant),
+                session_id=session_id,
+                config=GetSessionConfig(num_recent_events=0),
+            )
+            return await run_tool(self.session_service, session, tool, agent_name, **kwargs)
+
+    async def turn(self, plant: str, query: str) -> dict:
+        """Run one operator query for a plant; latency includes waiting for the plant's lock"""
+        started = time.perf_counter()
+        user_id = plant_user_id(plant)
+        try:
+            async with self._lock(plant):
+                session_id = await self._open(plant)
+                await add_user_query_to_history(
+                    self.session_service, self.app_name, user_id, session_id, query
+                )
+                response = await self._run_agent(user_id, session_id, query)
+
+                session = await self.session_service.get_session(
+                    app_name=self.app_name,
+                    user_id=user_id,
+                    session_id=session_id,
+                    config=GetSessionConfig(num_recent_events=0),
+                )
+                collect, analyze = auto_pipeline_steps(session.state)
+                pipeline = None
+                if collect or analyze:
+                    await flush_interaction_history(self.session_service, self.app_name, user_id, session_id)
+                    pipeline = await collect_and_analyze(
+                        self.session_service, self.app_name, user_id, session_id,
+                        collect=collect, analyze=analyze,
+                    )
+        except Exception as e:
+            self.stats["errors"] += 1
+            return {"status": "error", "plant": plant, "message": f"Turn failed: {e}"}
+
+        latency_ms = (time.perf_counter() - started) * 1000
+        self.latencies.append(latency_ms)
+        self.stats["turns"] += 1
+        result = {"status": "success", "plant": plant, "response": response, "latency_ms": round(latency_ms, 2)}
+        if pipeline:
+            result["pipeline"] = pipeline
+        return result
+
+    async def _run_agent(self, user_id: str, session_id: str, query: str) -> Optional[str]:
+        # Commands the local parser covers make no model calls, so they don't wait for a slot
+        if parse_command(query, get_reading_store(session_id).sensors) is not None:
+            self.stats["local_turns"] += 1
+            return await call_agent_async(self.runner, user_id, session_id, query, verbose=self.verbose)
+        self.stats["waiting_for_llm"] += 1
+        async with self._llm_slots:
+            self.stats["waiting_for_llm"] -= 1
+            self.stats["llm_in_flight"] += 1
+            self.stats["max_llm_in_flight"] = max(self.stats["max_llm_in_flight"], self.stats["llm_in_flight"])
+            try:
+                return await call_agent_async(self.runner, user_id, session_id, query, verbose=self.verbose)
+            finally:
+                self.stats["llm_in_flight"] -= 1
+
+    def latency(self) -> dict:
+        return latency_summary(self.latencies)
+
+    async def close(self) -> None:
+        """Stop background work and flush buffered history for every open plant"""
+        for plant, session_id in self.sessions.items():
+            await stop_scheduler(session_id)
+            await stop_adapters(session_id)
+            await flush_interaction_history(
+                self.session_service, self.app_name, plant_user_id(plant), session_id
+            )
+        shutdown_trend_pool()
+
+
+def _serve_shard(db_path: str, max_llm_calls: int, agent_factory: Optional[Callable],
+                 requests, responses) -> None:
+    asyncio.run(_shard_loop(db_path, max_llm_calls, agent_factory, requests, responses))
+
+
+async def _shard_loop(db_path, max_llm_calls, agent_factory, requests, responses) -> None:
+    # Each worker traces to its own file; /metrics is only served by a single-process runner
+    trace_path = os.getenv("TRACE_FILE")
+    if trace_path:
+        telemetry.configure(f"{trace_path}.{multiprocessing.current_process().name}")
+    session_service = SqliteMonitoringSessionService(db_path)
+    plants = PlantRunner(session_service, max_llm_calls=max_llm_calls, agent_factory=agent_factory)
+    pending = set()
+
+    async def answer(request_id, plant, query):
+        responses.put((request_id, await plants.turn(plant, query)))
+
+    while True:
+        request = await asyncio.to_thread(requests.get)
+        if request is None:
+            break
+        task = asyncio.create_task(answer(*request))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+    await asyncio.gather(*pending)
+    await plants.close()
+    session_service.close()
+    telemetry.close()
+
+
+class ShardedPlantRunner:
+    """
+    Spreads plants over worker processes, each running its own PlantRunner.
+
+    Plants map to workers with shard_for, so one plant's turns always go to
+    the same process. Workers share the SQLite database and each holds up to
+    `max_llm_calls` agent runs in flight.
+
+    Args:
+        agent_factory: picklable callable building the root agent in each
+            worker, or None for the default agent
+    """
+
+    def __init__(self, workers: int, db_path: str, max_llm_calls: int = DEFAULT_MAX_LLM_CALLS,
+                 agent_factory: Optional[Callable] = None):
+        if workers <= 0:
+            raise ValueError("workers must be positive")
+        self.workers = workers
+        self.db_path = db_path
+        self.max_llm_calls = max_llm_calls
+        self.agent_factory = agent_factory
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.stats = {"turns": 0, "errors": 0}
+        self._ids = itertools.count()
+        self._futures = {}
+        self._processes = []
+        self._requests = []
+        self._responses = None
+        self._reader = None
+
+    def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        # spawn, not fork: the parent already has threads and an event loop
+        context = multiprocessing.get_context("spawn")
+        self._responses = context.Queue()
+        for shard in range(self.workers):
+            requests = context.Queue()
+            process = context.Process(
+                target=_serve_shard,
+                args=(self.db_path, self.max_llm_calls, self.agent_factory, requests, self._responses),
+                name=f"plant-shard-{shard}",
+                daemon=True,
+            )
+            process.start()
+            self._requests.append(requests)
+            self._processes.append(process)
+        self._reader = threading.Thread(target=self._read_responses, args=(loop,), name="plant-shard-responses", daemon=True)
+        self._reader.start()
+
+    def _read_responses(self, loop) -> None:
+        while True:
+            response = self._responses.get()
+            if response is None:
+                return
+            loop.call_soon_threadsafe(self._resolve, *response)
+
+    def _resolve(self, request_id: int, result: dict) -> None:
+        future = self._futures.pop(request_id, None)
+        if future is not None and not future.done():
+            future.set_result(result)
+
+    async def turn(self, plant: str, query: str) -> dict:
+        started = time.perf_counter()
+        request_id = next(self._ids)
+        future = self._futures[request_id] = asyncio.get_running_loop().create_future()
+        self._requests[shard_for(plant, self.workers)].put((request_id, plant, query))
+        result = await future
+        if result.get("status") == "success":
+            latency_ms = (time.perf_counter() - started) * 1000
+            self.latencies.append(latency_ms)
+            self.stats["turns"] += 1
+            result["latency_ms"] = round(latency_ms, 2)
+        else:
+            self.stats["errors"] += 1
+        return result
+
+    def latency(self) -> dict:
+        return latency_summary(self.latencies)
+
+    async def close(self) -> None:
+        """Let the workers finish their in-flight turns, then stop them"""
+        for requests in self._requests:
+            requests.put(None)
+        for process in self._processes:
+            await asyncio.to_thread(process.join)
+        if self._responses is not None:
+            self._responses.put(None)
+        if self._reader is not None:
+            await asyncio.to_thread(self._reader.join)
+
+
+def split_plant_command(line: str, plants: list) -> tuple:
+    """Split "<plant>: <query>" into (plant, query); plant is None if it isn't one of `plants`"""
+    plant, sep, query = line.partition(":")
+    plant = plant.strip()
+    if not sep or plant not in plants:
+        return None, line.strip()
+    return plant, query.strip()
+
+
+async def serve(plants: list, workers: int, max_llm_calls: int, db_path: str) -> None:
+    console = AsyncConsole()
+    console.start()
+    if workers > 1:
+        runner = ShardedPlantRunner(workers, db_path, max_llm_calls)
+        runner.start()
+        session_service = None
+    else:
+        session_service = SqliteMonitoringSessionService(db_path)
+        runner = PlantRunner(session_service, max_llm_calls=max_llm_calls)
+        set_monitoring_listener(monitoring_alert_printer(console.notify))
+        for plant in plants:
+            await runner.open(plant)
+
+    print(f"Serving plants: {', '.join(plants)} ({workers} worker{'s' if workers > 1 else ''})")
+    print('Type "<plant>: <query>", "stats", or "exit".\n')
+
+    async def run_turn(plant, query):
+        result = await runner.turn(plant, query)
+        if result["status"] == "success":
+            console.notify(f"[{plant}] {result.get('response') or '(no response)'} ({result['latency_ms']:.0f} ms)")
+        else:
+            console.notify(f"[{plant}] {result['message']}")
+
+    pending = set()
+    try:
+        while True:
+            line = await console.read_command()
+            if line is None or line.strip().lower() in ["exit", "quit"]:
+                break
+            if line.strip().lower() == "stats":
+                stats = {**runner.stats, **runner.latency()}
+                if session_service is not None:
+                    stats["response_cache"] = response_cache.counters()
+                print(stats)
+                continue
+            plant, query = split_plant_command(line, plants)
+            if plant is None or not query:
+                print(f'Unknown plant; use "<plant>: <query>" with one of {", ".join(plants)}')
+                continue
+            # Don't wait for the answer: other plants' commands can run meanwhile
+            task = asyncio.create_task(run_turn(plant, query))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+    finally:
+        await asyncio.gather(*pending)
+        await runner.close()
+        if session_service is not None:
+            session_service.close()
+        await console.close()
+
+
+def main():
+    load_dotenv()
+    configure_from_env()
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("plants", nargs="+", help="plant names, e.g. kiln1 kiln2")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes to shard plants across")
+    parser.add_argument("--max-llm-calls", type=int, default=DEFAULT_MAX_LLM_CALLS,
+                        help="agent runs in flight at once per worker")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.plants, args.workers, args.max_llm_calls, os.getenv("SESSION_DB", "sensor_monitoring.db")))
+    finally:
+        telemetry.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,367 @@
+"""
+Replay archived sensor data through constraint analysis and the report aggregates.
+
+Reads a CSV file (header `timestamp,<sensor>,...`; epoch seconds or
+"YYYY-MM-DD HH:MM:SS" timestamps; empty cells are offline) or a directory of
+binary column files (`timestamp.npy` / `<sensor>.npy`, or raw float64
+`.f64`). Files are memory-mapped and processed a chunk of rows at a time, so
+memory use does not depend on file size. Every row gets the same checks,
+anomaly detectors and alert incidents as analyze_readings and is folded
+into the same running aggregates that back generate_report.
+
+Usage:
+    python replay.py kiln_2025.csv --limit temperature=1000:1200 --limit vibration=:20
+    python replay.py archive/ --constraints limits.json --speed 60 --json report.json
+"""
+import argparse
+import io
+import json
+import mmap
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+
+from sensor_monitoring_agent.aggregates import (
+    empty_aggregates,
+    recent_alerts,
+    update_aggregates_bulk,
+)
+from sensor_monitoring_agent.alerts import AlertManager
+from sensor_monitoring_agent.anomaly import StreamingDetectors, with_limits
+from sensor_monitoring_agent.constraints import compile_constraints
+from sensor_monitoring_agent.store import SENSOR_UNITS, format_timestamp, parse_timestamp
+from sensor_monitoring_agent.sub_agents.analysis_agent.agent import analyze_values
+
+# Rows analyzed per chunk
+DEFAULT_CHUNK_ROWS = 65_536
+
+# Longest single sleep in real-time mode, so progress and Ctrl-C stay responsive
+MAX_PACING_SLEEP = 0.5
+
+
+def iter_csv_chunks(path: str, chunk_rows: int = DEFAULT_CHUNK_ROWS):
+    """Yield (sensors, timestamps, values) chunks from a memory-mapped CSV file"""
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        header_end = mm.find(b"\n")
+        if header_end < 0:
+            return
+        columns = [c.strip() for c in mm[:header_end].decode().split(",")]
+        sensors = columns[1:]
+
+        # Timestamps may be epoch seconds or formatted strings; check the first data row
+        first_row_end = mm.find(b"\n", header_end + 1)
+        first_cell = mm[header_end + 1:first_row_end if first_row_end >= 0 else len(mm)].split(b",")[0]
+        try:
+            float(first_cell)
+            converters = None
+        except ValueError:
+            converters = {0: parse_timestamp}
+
+        # Estimate bytes per chunk from the first row, then cut chunks at newlines
+        row_bytes = max((first_row_end if first_row_end >= 0 else len(mm)) - header_end, 1)
+        chunk_bytes = row_bytes * chunk_rows
+        start = header_end + 1
+        while start < len(mm):
+            end = mm.find(b"\n", min(start + chunk_bytes, len(mm) - 1))
+            end = len(mm) if end < 0 else end + 1
+            data = _parse_csv_chunk(mm[start:end], len(columns), converters)
+            # Drop the parsed pages from this process so resident memory stays at one chunk
+            if hasattr(mm, "madvise"):
+                released = start - start % mmap.PAGESIZE
+                mm.madvise(mmap.MADV_DONTNEED, released, end - released)
+            if len(data):
+                yield sensors, data[:, 0], data[:, 1:]
+            start = end
+
+
+def _parse_csv_chunk(chunk: bytes, width: int, converters) -> np.ndarray:
+    try:
+        data = np.loadtxt(io.BytesIO(chunk), delimiter=",", dtype=np.float64,
+                          converters=converters, ndmin=2, encoding="utf-8")
+    except ValueError:
+        # Empty cells (offline sensors) need the slower parser
+        data = np.genfromtxt(io.BytesIO(chunk), delimiter=",", dtype=np.float64,
+                             converters=converters, filling_values=np.nan, encoding="utf-8")
+        data = np.atleast_2d(data)
+    return data.reshape(-1, width)
+
+
+def _column_layout(path: Path) -> tuple:
+    """(dtype, data offset, length) of a .npy or raw float64 .f64 column file"""
+    if path.suffix == ".f64":
+        return np.dtype(np.float64), 0, path.stat().st_size // 8
+    with open(path, "rb") as f:
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, _, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, _, dtype = np.lib.format.read_array_header_2_0(f)
+        if len(shape) != 1:
+            raise ValueError(f"{path.name} is not a 1-D column")
+        return dtype, f.tell(), shape[0]
+
+
+def iter_column_chunks(directory: str, chunk_rows: int = DEFAULT_CHUNK_ROWS):
+    """
+    Yield (sensors, timestamps, values) chunks from memory-mapped column files.
+
+    Each chunk maps only its own window of every file and drops it afterwards,
+    so resident pages stay at one chunk however long the archive is.
+    """
+    columns = {
+        path.stem: (path, *_column_layout(path))
+        for path in sorted(Path(directory).iterdir())
+        if path.suffix in (".npy", ".f64")
+    }
+    if "timestamp" not in columns:
+        raise ValueError(f"{directory} has no timestamp.npy or timestamp.f64 column")
+    length = columns["timestamp"][3]
+    if any(column[3] != length for column in columns.values()):
+        raise ValueError("column files have different lengths")
+    sensors = [name for name in columns if name != "timestamp"]
+
+    def window(name, start, stop):
+        path, dtype, offset, _ = columns[name]
+        mapped = np.memmap(path, dtype=dtype, mode="r", offset=offset + start * dtype.itemsize,
+                           shape=(stop - start,))
+        data = np.array(mapped, dtype=np.float64)
+        del mapped
+        return data
+
+    for start in range(0, length, chunk_rows):
+        stop = min(start + chunk_rows, length)
+        values = np.empty((stop - start, len(sensors)))
+        for col, sensor in enumerate(sensors):
+            values[:, col] = window(sensor, start, stop)
+        yield sensors, window("timestamp", start, stop), values
+
+
+class ReplayAnalyzer:
+    """
+    Equivalent of calling analyze_readings on every replayed row.
+
+    Limit checks, statuses and violation counts are computed a chunk at a
+    time with array comparisons, and the streaming detectors fold each chunk
+    with one update_block. Rows with a condition (a violation, an offline
+    sensor or an anomaly), and rows while an alert incident is open or
+    pending, also go through analyze_values and the AlertManager, so alerts
+    are counted as incidents with the same hysteresis as live analyses:
+    debounced like continuous monitoring, or (with continuous=False) raising
+    limit breaches at once like analyze_readings called on demand.
+    """
+
+    def __init__(self, constraints: dict, alert_capacity=None, continuous: bool = True):
+        self.constraints = constraints
+        self.continuous = continuous
+        self.compiled = compile_constraints(constraints)
+        self.aggregates = empty_aggregates() if alert_capacity is None else empty_aggregates(alert_capacity)
+        self.detectors = StreamingDetectors()
+        self.alerts = AlertManager()
+        self.rows = 0
+        self.sensors = None
+        self.last_row = None
+
+    def _unit(self, sensor: str) -> str:
+        return SENSOR_UNITS.get(sensor, self.constraints.get(sensor, {}).get("unit", ""))
+
+    def analyze(self, sensors: list, timestamps: np.ndarray, values: np.ndarray) -> None:
+        if not len(timestamps):
+            return
+        self.sensors = sensors
+        units = [self._unit(sensor) for sensor in sensors]
+        online = ~np.isnan(values)
+        mins, maxs, _ = self.compiled.bounds_for(sensors)
+        anomalies = with_limits(self.detectors.update_block(values, online, timestamps), values, mins, maxs)
+        # Stored readings carry two decimals, so compare what analyze_readings would see
+        below, above = self.compiled.check(sensors, np.round(values, 2), online)
+        anomalous = online & (anomalies["spike"] | anomalies["drift_up"] | anomalies["drift_down"]
+                              | anomalies["approaching_limit"])
+        alert_rows = (below | above).any(axis=1)
+        warning_rows = ~alert_rows & anomalous.any(axis=1)
+        flagged_rows = alert_rows | warning_rows | ~online.all(axis=1)
+
+        first_id = self.rows + 1
+        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        raised = []
+        changes = None
+        for row in range(len(timestamps)):
+            if not (flagged_rows[row] or self.alerts.active or self.alerts.pending):
+                changes = None
+                continue
+            conditions = []
+            analyze_values(
+                f"reading_{first_id + row}", format_timestamp(timestamps[row]), sensors, units,
+                values[row], online[row], self.compiled, current_time,
+                {key: array[row] for key, array in anomalies.items()}, conditions,
+            )
+            involved = {sensor for sensor, _, _ in conditions}.union(self.alerts.by_sensor)
+            changes = self.alerts.update(
+                conditions,
+                float(timestamps[row]),
+                {sensor: None if np.isnan(values[row, col]) else round(float(values[row, col]), 2)
+                 for col, sensor in enumerate(sensors) if sensor in involved},
+                self.compiled.limits,
+                continuous=self.continuous,
+            )
+            raised.extend(incident["message"] for incident in changes["raised"] + changes["reopened"])
+
+        n = len(timestamps)
+        n_alert, n_warning = int(alert_rows.sum()), int(warning_rows.sum())
+        status_counts = {"alert": n_alert, "warning": n_warning, "normal": n - n_alert - n_warning}
+        sensor_violations = {
+            sensor: {
+                "below_min": int(below[:, col].sum()),
+                "above_max": int(above[:, col].sum()),
+                "offline": int((~online[:, col]).sum()),
+            }
+            for col, sensor in enumerate(sensors)
+        }
+        update_aggregates_bulk(
+            self.aggregates, n, {k: v for k, v in status_counts.items() if v},
+            sensor_violations, len(raised), raised, f"reading_{first_id + n - 1}",
+        )
+        self.rows += n
+        self.last_row = (
+            sensors, float(timestamps[-1]), values[-1].copy(), f"reading_{self.rows}",
+            {key: array[-1] for key, array in anomalies.items()},
+            changes or {"raised": [], "reopened": [], "cleared": []},
+        )
+
+    def latest_analysis(self):
+        """analyze_readings-style analysis of the last replayed row, with its anomaly fields and alert transitions"""
+        if self.last_row is None:
+            return None
+        sensors, timestamp, values, reading_id, anomalies, changes = self.last_row
+        analysis = analyze_values(
+            reading_id, format_timestamp(timestamp), sensors, [self._unit(sensor) for sensor in sensors],
+            values, ~np.isnan(values), self.compiled, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), anomalies,
+        )
+        analysis["raised"] = [incident["message"] for incident in changes["raised"] + changes["reopened"]]
+        analysis["cleared"] = [incident["message"] for incident in changes["cleared"]]
+        analysis["active_alerts"] = len(self.alerts)
+        return analysis
+
+
+def replay(chunks, analyzer: ReplayAnalyzer, speed=None, progress=None) -> dict:
+    """
+    Run chunks through the analyzer.
+
+    Args:
+        speed: None for as fast as possible, otherwise data seconds per wall-clock
+               second (1.0 is real time)
+        progress: called with the analyzer after each processed slice
+    """
+    started = time.perf_counter()
+    data_start = wall_start = None
+    for sensors, timestamps, values in chunks:
+        if speed is None:
+            analyzer.analyze(sensors, timestamps, values)
+            if progress:
+                progress(analyzer)
+            continue
+        if data_start is None:
+            data_start, wall_start = float(timestamps[0]), time.perf_counter()
+        position = 0
+        while position < len(timestamps):
+            # Rows whose time has come on the replay clock
+            replay_now = data_start + (time.perf_counter() - wall_start) * speed
+            due = int(np.searchsorted(timestamps, replay_now, side="right"))
+            if due > position:
+                analyzer.analyze(sensors, timestamps[position:due], values[position:due])
+                position = due
+                if progress:
+                    progress(analyzer)
+                continue
+            wait = (float(timestamps[position]) - replay_now) / speed
+            time.sleep(min(max(wait, 0.0), MAX_PACING_SLEEP))
+    return {"rows": analyzer.rows, "seconds": time.perf_counter() - started}
+
+
+def load_constraints(args) -> dict:
+    constraints = {}
+    if args.constraints:
+        constraints.update(json.loads(Path(args.constraints).read_text()))
+    for spec in args.limit or []:
+        sensor, _, bounds = spec.partition("=")
+        low, _, high = bounds.partition(":")
+        constraints[sensor] = {
+            "min": float(low) if low else None,
+            "max": float(high) if high else None,
+            "unit": SENSOR_UNITS.get(sensor, ""),
+        }
+    return constraints
+
+
+def print_report(result: dict, analyzer: ReplayAnalyzer) -> None:
+    aggregates = analyzer.aggregates
+    rate = result["rows"] / result["seconds"] if result["seconds"] else 0.0
+    print(f"\nReplayed {result['rows']} rows in {result['seconds']:.2f}s ({rate:,.0f} rows/s)")
+    print(f"Status counts: {aggregates['status_counts']}")
+    print("Violations per sensor:")
+    for sensor, counts in aggregates["sensor_violations"].items():
+        print(f"  - {sensor}: {counts['below_min']} below min, {counts['above_max']} above max, "
+              f"{counts['offline']} offline")
+    stats = analyzer.alerts.stats
+    print(f"Total alerts: {aggregates['total_alerts']} ({stats['raised']} raised, {stats['reopened']} reopened, "
+          f"{stats['cleared']} cleared)")
+    for alert in recent_alerts(aggregates, 10):
+        print(f"    - {alert}")
+    active = analyzer.alerts.active_alerts()
+    if active:
+        print(f"Active at the end ({len(active)}):")
+        for incident in active:
+            print(f"    - [{incident['severity']}] {incident['message']} (since {incident['raised_at']})")
+    latest = analyzer.latest_analysis()
+    if latest:
+        print(f"Latest reading ({latest['timestamp']}): {latest['overall_status']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("source", help="CSV file or directory of column files")
+    parser.add_argument("--limit", action="append", metavar="SENSOR=MIN:MAX",
+                        help="constraint for a sensor; either bound may be empty (repeatable)")
+    parser.add_argument("--constraints", help="JSON file of constraints in session-state format")
+    parser.add_argument("--speed", type=float, default=None,
+                        help="pace the replay at this many data seconds per second (1 = real time); "
+                             "default is as fast as possible")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS, help="rows per chunk")
+    parser.add_argument("--json", help="write the aggregates and latest analysis to this file")
+    args = parser.parse_args()
+
+    if args.speed is not None and args.speed <= 0:
+        parser.error("--speed must be positive")
+    constraints = load_constraints(args)
+    if os.path.isdir(args.source):
+        chunks = iter_column_chunks(args.source, args.chunk_rows)
+    else:
+        chunks = iter_csv_chunks(args.source, args.chunk_rows)
+
+    analyzer = ReplayAnalyzer(constraints)
+
+    def progress(analyzer):
+        print(f"\r{analyzer.rows:,} rows, {analyzer.aggregates['total_alerts']:,} alerts", end="", flush=True)
+
+    started = time.perf_counter()
+    try:
+        result = replay(chunks, analyzer, speed=args.speed, progress=progress)
+    except KeyboardInterrupt:
+        result = {"rows": analyzer.rows, "seconds": time.perf_counter() - started}
+        print("\nReplay interrupted")
+    print_report(result, analyzer)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({
+            "constraints": constraints,
+            "rows": analyzer.rows,
+            "report_aggregates": analyzer.aggregates,
+            "alerts": analyzer.alerts.snapshot(),
+            "latest_analysis": analyzer.latest_analysis(),
+        }, indent=2))
+        print(f"Wrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+from typing import Optional
+
+from .state_ops import apply_at, push_at
+
+# Alerts kept in the aggregate ring buffer
+ALERT_HISTORY = 50
+
+
+def empty_aggregates(alert_capacity: int = ALERT_HISTORY) -> dict:
+    """Fresh running aggregates for the report_aggregates state key"""
+    return {
+        "total_analyses": 0,
+        "status_counts": {},
+        "sensor_violations": {},
+        "total_alerts": 0,
+        "alert_ring": [None] * alert_capacity,
+        "latest_reading_id": None,
+    }
+
+
+def aggregate_ops(aggregates: dict, analysis: dict) -> list:
+    """
+    The changes folding one analysis makes, as ("increment" | "set", path, value)
+    or ("push", ring path, [counter path, items]).
+
+    Paths are relative to the aggregates dict. Counters are increments and
+    alerts are pushed into the ring at the slots total_alerts points to when
+    applied, so state_ops can record them as deltas that merge with
+    concurrent analyses of the same session; only the latest reading id is
+    a set. Alerts are the incidents the analysis raised, or every alert it
+    lists when it went through no alert manager.
+    """
+    ops = [("increment", ["total_analyses"], 1)]
+
+    status = analysis.get("overall_status", "unknown")
+    ops.append(("increment", ["status_counts", status], 1))
+
+    for sensor, sensor_analysis in analysis.get("sensor_analyses", {}).items():
+        counts = {"below_min": 0, "above_max": 0, "offline": 0}
+        for violation in sensor_analysis.get("violations", []):
+            if violation.startswith("Below"):
+                counts["below_min"] += 1
+            elif violation.startswith("Above"):
+                counts["above_max"] += 1
+        if sensor_analysis.get("constraint_status") == "sensor_offline":
+            counts["offline"] += 1
+        # A sensor seen for the first time gets all three counters, even at zero
+        new = sensor not in aggregates["sensor_violations"]
+        ops.extend(("increment", ["sensor_violations", sensor, kind], n)
+                   for kind, n in counts.items() if n or new)
+
+    alerts = analysis.get("raised", analysis.get("alerts", []))
+    if alerts:
+        ops.append(("push", ["alert_ring"], [["total_alerts"], list(alerts)]))
+
+    ops.append(("set", ["latest_reading_id"], analysis.get("reading_id")))
+    return ops
+
+
+def update_aggregates(aggregates: dict, analysis: dict) -> dict:
+    """Fold one stored analysis (the newest in analysis_results) into the running aggregates in place"""
+    for op, path, value in aggregate_ops(aggregates, analysis):
+        if op == "push":
+            push_at(aggregates, path, *value)
+        else:
+            apply_at(aggregates, path, op, value)
+    return aggregates
+
+
+def update_aggregates_bulk(aggregates: dict, count: int, status_counts: dict, sensor_violations: dict,
+                           alert_count: int, alerts_tail: list, latest_reading_id: Optional[str]) -> dict:
+    """
+    Fold many analyses at once, e.g. from a vectorized replay.
+
+    Args:
+        count: analyses folded in
+        status_counts: overall_status -> count among them
+        sensor_violations: sensor -> {"below_min", "above_max", "offline"} counts among them
+        alert_count: alerts raised by them
+        alerts_tail: their last alerts, oldest first (at most the ring size is kept)
+    """
+    aggregates["total_analyses"] += count
+    for status, n in status_counts.items():
+        aggregates["status_counts"][status] = aggregates["status_counts"].get(status, 0) + n
+    for sensor, counts in sensor_violations.items():
+        totals = aggregates["sensor_violations"].setdefault(
+            sensor, {"below_min": 0, "above_max": 0, "offline": 0}
+        )
+        for key, n in counts.items():
+            totals[key] += n
+
+    ring = aggregates["alert_ring"]
+    alerts_tail = alerts_tail[-len(ring):]
+    first = aggregates["total_alerts"] + alert_count - len(alerts_tail)
+    for i, alert in enumerate(alerts_tail):
+        ring[(first + i) % len(ring)] = alert
+    aggregates["total_alerts"] += alert_count
+
+    if count:
+        aggregates["latest_reading_id"] = latest_reading_id
+    return aggregates
+
+
+def recent_alerts(aggregates: dict, limit: Optional[int] = None) -> list:
+    """Alerts from the ring buffer, oldest first"""
+    ring = aggregates["alert_ring"]
+    total = aggregates["total_alerts"]
+    count = min(total, len(ring))
+    if limit is not None:
+        count = min(count, limit)
+    return [ring[i % len(ring)] for i in range(total - count, total)]
+
+
+def latest_analysis(aggregates: Optional[dict], analyses: list) -> Optional[dict]:
+    """
+    The newest analysis the aggregates have counted.
+
+    Every analysis is counted as it is appended to analysis_results, so it
+    is the last one there; analyses may be only the most recent part of the
+    history (as loaded by a row-backed session service).
+    """
+    if not aggregates or not aggregates.get("total_analyses") or not analyses:
+        return None
+    return analyses[-1]
+
+
+def rebuild_aggregates(analyses: list, alert_capacity: int = ALERT_HISTORY) -> dict:
+    """Recompute the aggregates from the full analysis history"""
+    aggregates = empty_aggregates(alert_capacity)
+    for analysis in analyses:
+        update_aggregates(aggregates, analysis)
+    return aggregates
+
+
+def check_aggregates(aggregates: Optional[dict], analyses: list) -> dict:
+    """
+    Compare the running aggregates with a rebuild from raw history.
+
+    Returns the rebuilt aggregates and the names of any fields that differ.
+    """
+    capacity = len(aggregates["alert_ring"]) if aggregates else ALERT_HISTORY
+    rebuilt = rebuild_aggregates(analyses, capacity)
+    current = aggregates or empty_aggregates(capacity)
+    mismatches = [key for key in rebuilt if key != "alert_ring" and current.get(key) != rebuilt[key]]
+    if recent_alerts(current) != recent_alerts(rebuilt):
+        mismatches.append("alert_ring")
+    return {
+        "consistent": not mismatches,
+        "mismatches": mismatches,
+        "rebuilt": rebuilt,
+    }
@@ -0,0 +1,265 @@
+from collections import deque
+from typing import Optional
+
+from .store import format_timestamp
+
+# Consecutive readings a condition must be seen in before its alert is raised;
+# a single noisy sample over a limit doesn't open an incident
+RAISE_AFTER = 2
+# Kinds raised on the first reading that shows them when analysis is on demand;
+# only continuous monitoring sees enough readings to debounce a limit breach
+IMMEDIATE_KINDS = ("below_min", "above_max")
+# Consecutive readings without the condition before an active alert clears
+CLEAR_AFTER = 3
+# A limit alert only counts as clear once the value is back inside the limit by
+# this fraction of the limit, so a value hovering on the line doesn't flap
+CLEAR_BAND = 0.01
+# An alert raised again this soon after clearing reopens its old incident
+COOLDOWN_SECONDS = 300.0
+# Cleared incidents kept for reports
+RESOLVED_HISTORY = 50
+
+# Condition kind -> severity; limit and offline alerts outrank anomaly warnings
+SEVERITY = {
+    "below_min": "alert",
+    "above_max": "alert",
+    "offline": "alert",
+    "spike": "warning",
+    "drift_up": "warning",
+    "drift_down": "warning",
+    "approaching_min": "warning",
+    "approaching_max": "warning",
+}
+
+
+class AlertManager:
+    """
+    Alert incidents for one session, keyed by (sensor, kind).
+
+    `update` takes the (sensor, kind, message) conditions found in one
+    reading. A condition opens an incident once it has been seen in
+    RAISE_AFTER consecutive readings (limit breaches at once, for on-demand
+    analysis); while the incident is active, repeats only bump its sample
+    count, last-seen time and peak value. It clears after CLEAR_AFTER
+    readings without the condition (and, for limit alerts, with the value
+    back inside the limit by CLEAR_BAND). An alert that comes back within
+    COOLDOWN_SECONDS of clearing reopens the same incident instead of
+    raising a new one. Streaks count readings, not analyses: a reading no
+    newer than the last one folded changes nothing.
+
+    Active incidents are indexed by key and by sensor. `snapshot` gives a
+    JSON-safe copy for session state; it only needs writing when `update`
+    reports a change.
+    """
+
+    def __init__(self, raise_after: int = RAISE_AFTER, clear_after: int = CLEAR_AFTER,
+                 clear_band: float = CLEAR_BAND, cooldown: float = COOLDOWN_SECONDS):
+        self.raise_after = raise_after
+        self.clear_after = clear_after
+        self.clear_band = clear_band
+        self.cooldown = cooldown
+        self.active = {}  # (sensor, kind) -> incident
+        self.by_sensor = {}  # sensor -> {kind: incident}
+        self.pending = {}  # (sensor, kind) -> consecutive readings seen, before raising
+        self.clearing = {}  # (sensor, kind) -> consecutive readings without the condition
+        self.cooling = {}  # (sensor, kind) -> (cleared incident, cleared at)
+        self.last_reading = None  # timestamp of the newest reading folded
+        self.resolved = deque(maxlen=RESOLVED_HISTORY)
+        self.next_id = 1
+        self.stats = {"raised": 0, "reopened": 0, "cleared": 0, "repeats": 0}
+
+    def __len__(self) -> int:
+        return len(self.active)
+
+    def _activate(self, key: tuple, incident: dict) -> None:
+        self.active[key] = incident
+        self.by_sensor.setdefault(key[0], {})[key[1]] = incident
+
+    def _deactivate(self, key: tuple) -> dict:
+        incident = self.active.pop(key)
+        kinds = self.by_sensor[key[0]]
+        del kinds[key[1]]
+        if not kinds:
+            del self.by_sensor[key[0]]
+        self.clearing.pop(key, None)
+        return incident
+
+    def _inside_band(self, key: tuple, value, limits: dict) -> bool:
+        """Whether a limit alert's sensor value is far enough back inside its limit to clear"""
+        sensor, kind = key
+        if kind not in ("below_min", "above_max"):
+            return True
+        limit = limits.get(sensor, {}).get("min" if kind == "below_min" else "max")
+        if limit is None or value is None or value != value:
+            return True
+        band = abs(limit) * self.clear_band
+        return value >= limit + band if kind == "below_min" else value <= limit - band
+
+    def update(self, conditions: list, now: float, values: Optional[dict] = None,
+               limits: Optional[dict] = None, continuous: bool = True) -> dict:
+        """
+        Fold one reading's conditions into the incidents.
+
+        Args:
+            conditions: (sensor, kind, message) for every condition the analysis found
+            now: the analyzed reading's timestamp (epoch seconds)
+            values: sensor -> value in that reading, for the clear band and peaks
+            limits: tag -> {"min", "max"} constraints, for the clear band
+            continuous: False for on-demand analysis, which raises IMMEDIATE_KINDS at once
+
+        Returns "raised", "reopened" and "cleared" lists of incidents.
+        """
+        values = values or {}
+        limits = limits or {}
+        changes = {"raised": [], "reopened": [], "cleared": []}
+        if self.last_reading is not None and now <= self.last_reading:
+            return changes
+        self.last_reading = now
+        seen = set()
+        stamp = format_timestamp(now)
+
+        for sensor, kind, message in conditions:
+            key = (sensor, kind)
+            seen.add(key)
+            value = values.get(sensor)
+            incident = self.active.get(key)
+            if incident is not None:
+                incident["samples"] += 1
+                incident["last_seen"] = stamp
+                incident["value"] = value
+                if value is not None and (incident["peak"] is None or
+                                          (value < incident["peak"] if kind == "below_min" else value > incident["peak"])):
+                    incident["peak"] = value
+                self.clearing.pop(key, None)
+                self.stats["repeats"] += 1
+                continue
+
+            self.pending[key] = self.pending.get(key, 0) + 1
+            if self.pending[key] < self.raise_after and (continuous or kind not in IMMEDIATE_KINDS):
+                continue
+            del self.pending[key]
+
+            cooled = self.cooling.pop(key, None)
+            if cooled is not None and now - cooled[1] <= self.cooldown:
+                incident = cooled[0]
+                incident.update(state="active", cleared_at=None, last_seen=stamp, value=value, message=message)
+                incident["samples"] += 1
+                incident["reopened"] += 1
+                if incident in self.resolved:
+                    self.resolved.remove(incident)
+                self.stats["reopened"] += 1
+                changes["reopened"].append(incident)
+            else:
+                incident = {
+                    "id": self.next_id,
+                    "sensor": sensor,
+                    "kind": kind,
+                    "severity": SEVERITY.get(kind, "warning"),
+                    "state": "active",
+                    "message": message,
+                    "raised_at": stamp,
+                    "last_seen": stamp,
+                    "cleared_at": None,
+                    "samples": 1,
+                    "value": value,
+                    "peak": value,
+                    "reopened": 0,
+                }
+                self.next_id += 1
+                self.stats["raised"] += 1
+                changes["raised"].append(incident)
+            self._activate(key, incident)
+
+        # A streak toward raising is broken by one reading without the condition
+        for key in [key for key in self.pending if key not in seen]:
+            del self.pending[key]
+
+        for key in [key for key in self.active if key not in seen]:
+            if not self._inside_band(key, values.get(key[0]), limits):
+                self.clearing.pop(key, None)
+                continue
+            self.clearing[key] = self.clearing.get(key, 0) + 1
+            if self.clearing[key] < self.clear_after:
+                continue
+            incident = self._deactivate(key)
+            incident.update(state="cleared", cleared_at=stamp)
+            self.cooling[key] = (incident, now)
+            self.resolved.append(incident)
+            self.stats["cleared"] += 1
+            changes["cleared"].append(incident)
+
+        # Cooldowns that have run out no longer matter
+        if self.cooling:
+            for key in [key for key, (_, cleared) in self.cooling.items() if now - cleared > self.cooldown]:
+                del self.cooling[key]
+        return changes
+
+    def active_alerts(self, sensor: Optional[str] = None, severity: Optional[str] = None) -> list:
+        """Active incidents, oldest first, optionally for one sensor or severity"""
+        incidents = self.by_sensor.get(sensor, {}).values() if sensor is not None else self.active.values()
+        if severity is not None:
+            incidents = [incident for incident in incidents if incident["severity"] == severity]
+        return sorted(incidents, key=lambda incident: incident["id"])
+
+    def is_active(self, sensor: str, kind: Optional[str] = None) -> bool:
+        kinds = self.by_sensor.get(sensor)
+        return bool(kinds) and (kind is None or kind in kinds)
+
+    def snapshot(self) -> dict:
+        """JSON-safe copy for the alerts state key"""
+        return {
+            "active": [dict(incident) for incident in self.active_alerts()],
+            "resolved": [dict(incident) for incident in self.resolved],
+            "cooling": [[*key, incident["id"], cleared] for key, (incident, cleared) in self.cooling.items()],
+            "next_id": self.next_id,
+            "last_reading": self.last_reading,
+            "stats": dict(self.stats),
+        }
+
+    @classmethod
+    def from_state(cls, data: Optional[dict], **kwargs) -> "AlertManager":
+        """Rebuild from a `snapshot`; streaks toward raising or clearing start over"""
+        manager = cls(**kwargs)
+        if not data:
+            return manager
+        for incident in data.get("active", []):
+            manager._activate((incident["sensor"], incident["kind"]), dict(incident))
+        manager.resolved.extend(dict(incident) for incident in data.get("resolved", []))
+        resolved = {incident["id"]: incident for incident in manager.resolved}
+        for sensor, kind, incident_id, cleared in data.get("cooling", []):
+            if incident_id in resolved:
+                manager.cooling[(sensor, kind)] = (resolved[incident_id], cleared)
+        manager.next_id = data.get("next_id", 1)
+        manager.last_reading = data.get("last_reading")
+        manager.stats.update(data.get("stats", {}))
+        return manager
+
+
+def alert_summary(incident: dict) -> dict:
+    """Compact view of an incident for prompts and tool results"""
+    return {
+        "id": incident["id"],
+        "sensor": incident["sensor"],
+        "kind": incident["kind"],
+        "severity": incident["severity"],
+        "message": incident["message"],
+        "since": incident["raised_at"],
+        "samples": incident["samples"],
+        "peak": incident["peak"],
+    }
+
+
+# Process-local alert managers, one per session
+_managers = {}
+
+
+def get_alert_manager(session_id: str, state=None) -> AlertManager:
+    """The session's alert manager, restored from the alerts state key on first use"""
+    manager = _managers.get(session_id)
+    if manager is None:
+        manager = _managers[session_id] = AlertManager.from_state(state.get("alerts") if state is not None else None)
+    return manager
+
+
+def drop_alert_manager(session_id: str) -> None:
+    _managers.pop(session_id, None)
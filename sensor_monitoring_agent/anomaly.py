@@ -0,0 +1,352 @@
+from typing import Optional
+import numpy as np
+
+from .store import STATUS_ONLINE
+
+# Weight of the newest sample in the EWMA mean, variance and rate of change.
+# These defaults give about 1 false flag per 10k samples of Gaussian noise per
+# sensor and flag a 0.05 sigma/sample ramp within ~20 samples.
+DEFAULT_ALPHA = 0.02
+# Samples a sensor needs before its statistics are trusted
+WARMUP_SAMPLES = 50
+# |z| above this marks a spike
+Z_THRESHOLD = 4.5
+# CUSUM slack and decision threshold, in EWMA standard deviations
+CUSUM_SLACK = 0.5
+CUSUM_THRESHOLD = 8.0
+# Warn when the current rate of change reaches a limit within this many seconds
+LIMIT_HORIZON_SECONDS = 600.0
+# Values (rows x columns) folded per update_block call while catching up,
+# which bounds the block's temporary arrays
+CATCHUP_VALUES = 1 << 18
+# Shorter backlogs are folded one `update` per row, which costs less than a block's setup
+BLOCK_MIN_ROWS = 4
+# Rows per segment of a linear recurrence scan; the running products of
+# (1 - alpha) stay far from float64 underflow over this many rows
+SCAN_ROWS = 256
+
+
+def _linear_scan(a: np.ndarray, b: np.ndarray, initial: np.ndarray) -> np.ndarray:
+    """
+    x[r] = a[r] * x[r - 1] + b[r] down the rows of (rows, columns) arrays, from x[-1] = initial.
+
+    Every a must be in (0, 1]. Each segment is solved in closed form from
+    the cumulative product of a: x[r] = P[r] * (initial + sum(b[j] / P[j])).
+    """
+    out = np.empty_like(b)
+    for start in range(0, len(a), SCAN_ROWS):
+        segment = slice(start, start + SCAN_ROWS)
+        product = np.cumprod(a[segment], axis=0)
+        out[segment] = product * (initial + np.cumsum(b[segment] / product, axis=0))
+        initial = out[segment][-1]
+    return out
+
+
+def _clamped_walk(steps: np.ndarray, apply: np.ndarray, initial: np.ndarray, cap: float) -> np.ndarray:
+    """
+    s[r] = clip(s[r - 1] + steps[r], 0, cap) where apply[r], else s[r - 1], for all rows at once.
+
+    Without the cap this is a walk reflected at 0, which has a closed form
+    from the cumulative sums. Columns that reach the cap are redone with a
+    doubling prefix scan: each row is the map x -> clip(x + add, low, high),
+    and two such maps compose into one of the same form, so log2(rows)
+    vectorized steps give every row's map from the initial value.
+    """
+    add = np.where(apply, steps, 0.0)
+    total = np.cumsum(add, axis=0)
+    walk = total - np.minimum(-initial, np.minimum.accumulate(total, axis=0))
+    capped = (walk > cap).any(axis=0)
+    if not capped.any():
+        return walk
+
+    add = add[:, capped]
+    low = np.where(apply[:, capped], 0.0, -np.inf)
+    high = np.where(apply[:, capped], cap, np.inf)
+    shift = 1
+    while shift < len(add):
+        # Compose each row's map after the map ending `shift` rows earlier
+        later_add, later_low, later_high = add[shift:], low[shift:], high[shift:]
+        composed = (
+            add[:-shift] + later_add,
+            np.clip(low[:-shift] + later_add, later_low, later_high),
+            np.clip(high[:-shift] + later_add, later_low, later_high),
+        )
+        add[shift:], low[shift:], high[shift:] = composed
+        shift *= 2
+    walk[:, capped] = np.clip(initial[capped] + add, low, high)
+    return walk
+
+
+def _time_to_limit(rate: np.ndarray, values: np.ndarray, mins: np.ndarray, maxs: np.ndarray) -> np.ndarray:
+    with np.errstate(invalid="ignore", divide="ignore"):
+        to_max = np.where((rate > 0) & (values < maxs), (maxs - values) / rate, np.nan)
+        to_min = np.where((rate < 0) & (values > mins), (values - mins) / -rate, np.nan)
+    return np.where(np.isnan(to_max), to_min, to_max)
+
+
+def with_limits(fields: dict, values: np.ndarray, mins: np.ndarray, maxs: np.ndarray) -> dict:
+    """Add time_to_limit / approaching_limit to detector fields for one sample or a (rows, columns) block"""
+    rate = fields["rate"]
+    # Only a confirmed drift toward a limit counts; the rate alone is too noisy
+    heading = (fields["drift_up"] & (rate > 0)) | (fields["drift_down"] & (rate < 0))
+    time_to_limit = np.where(heading, _time_to_limit(rate, values, mins, maxs), np.nan)
+    fields["time_to_limit"] = time_to_limit
+    fields["approaching_limit"] = time_to_limit <= LIMIT_HORIZON_SECONDS
+    return fields
+
+
+class StreamingDetectors:
+    """
+    Online anomaly statistics for every sensor column of a reading store.
+
+    Per sensor it keeps an EWMA mean and variance, the z-score of the newest
+    sample against them, an EWMA of the rate of change (units per second)
+    and a two-sided CUSUM of the z-scores that catches slow drifts the
+    z-score misses. A drift heading for a limit also gets an estimated time
+    to reach it. Each sample updates all sensors with a few vectorized
+    operations, in constant memory.
+
+    The detectors follow a ReadingStore: `consume` processes every reading
+    appended since the last call, oldest first, so each sample is seen once
+    whoever triggers the analysis (operator turn, scheduler, ingestion). A
+    backlog is folded with `update_block`, which computes the same
+    recurrences for a whole block of rows with array scans instead of one
+    `update` per row.
+    """
+
+    def __init__(self, alpha: float = DEFAULT_ALPHA, z_threshold: float = Z_THRESHOLD,
+                 cusum_slack: float = CUSUM_SLACK, cusum_threshold: float = CUSUM_THRESHOLD,
+                 warmup: int = WARMUP_SAMPLES):
+        self.alpha = alpha
+        self.z_threshold = z_threshold
+        self.cusum_slack = cusum_slack
+        self.cusum_threshold = cusum_threshold
+        self.warmup = warmup
+        self.columns = 0
+        self.mean = np.zeros(0)
+        self.var = np.zeros(0)
+        self.count = np.zeros(0, dtype=np.int64)
+        self.last_value = np.full(0, np.nan)
+        self.last_time = np.full(0, np.nan)
+        self.rate = np.zeros(0)
+        self.cusum_pos = np.zeros(0)
+        self.cusum_neg = np.zeros(0)
+        self.z = np.full(0, np.nan)
+        self.spike = np.zeros(0, dtype=bool)
+        self.drift_up = np.zeros(0, dtype=bool)
+        self.drift_down = np.zeros(0, dtype=bool)
+        self.position = 0  # store.total already consumed
+        self.skipped = 0  # readings the store dropped before they could be consumed
+
+    def _grow(self, columns: int) -> None:
+        extra = columns - self.columns
+        if extra <= 0:
+            return
+        self.mean = np.concatenate([self.mean, np.zeros(extra)])
+        self.var = np.concatenate([self.var, np.zeros(extra)])
+        self.count = np.concatenate([self.count, np.zeros(extra, dtype=np.int64)])
+        self.last_value = np.concatenate([self.last_value, np.full(extra, np.nan)])
+        self.last_time = np.concatenate([self.last_time, np.full(extra, np.nan)])
+        self.rate = np.concatenate([self.rate, np.zeros(extra)])
+        self.cusum_pos = np.concatenate([self.cusum_pos, np.zeros(extra)])
+        self.cusum_neg = np.concatenate([self.cusum_neg, np.zeros(extra)])
+        self.z = np.concatenate([self.z, np.full(extra, np.nan)])
+        self.spike = np.concatenate([self.spike, np.zeros(extra, dtype=bool)])
+        self.drift_up = np.concatenate([self.drift_up, np.zeros(extra, dtype=bool)])
+        self.drift_down = np.concatenate([self.drift_down, np.zeros(extra, dtype=bool)])
+        self.columns = columns
+
+    def update(self, values: np.ndarray, online: np.ndarray, timestamp: float) -> None:
+        """Fold one sample vector (one value per column, NaN for none) into the statistics"""
+        self._grow(len(values))
+        valid = online & ~np.isnan(values)
+        seen = valid & (self.count > 0)
+        first = valid & (self.count == 0)
+        warm = self.count >= self.warmup
+        # Plain running averages until 1/n drops below alpha, so the first
+        # samples don't bias the EWMAs
+        alpha = np.maximum(self.alpha, 1.0 / (self.count + 1))
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            dt = timestamp - self.last_time
+            std = np.sqrt(self.var)
+            z = np.where(seen & (std > 0), (values - self.mean) / std, 0.0)
+            rated = seen & (dt > 0)
+            step_rate = np.where(rated, (values - self.last_value) / dt, 0.0)
+
+        # Rate of change: EWMA of the per-second step, seeded by the first step
+        rate_alpha = np.maximum(self.alpha, 1.0 / np.maximum(self.count, 1))
+        self.rate = np.where(rated, self.rate + rate_alpha * (step_rate - self.rate), self.rate)
+
+        # Two-sided CUSUM on the z-scores, once the statistics are warm. Each
+        # z is clipped to the spike threshold so one spike can't signal a
+        # drift on its own. The sums are capped rather than restarted after
+        # signalling, so a drift stays flagged while it lasts and clears a few
+        # samples after it stops
+        cap = 2 * self.cusum_threshold
+        tracked = seen & warm
+        step = np.clip(z, -self.z_threshold, self.z_threshold)
+        self.cusum_pos = np.where(tracked, np.clip(self.cusum_pos + step - self.cusum_slack, 0.0, cap), self.cusum_pos)
+        self.cusum_neg = np.where(tracked, np.clip(self.cusum_neg - step - self.cusum_slack, 0.0, cap), self.cusum_neg)
+        self.drift_up = warm & (self.cusum_pos > self.cusum_threshold)
+        self.drift_down = warm & (self.cusum_neg > self.cusum_threshold)
+
+        self.z = np.where(valid, np.where(seen, z, 0.0), np.nan)
+        self.spike = seen & warm & (np.abs(z) > self.z_threshold)
+
+        # Incremental EWMA mean and variance
+        diff = np.where(seen, values - self.mean, 0.0)
+        increment = alpha * diff
+        self.mean = np.where(first, values, self.mean + increment)
+        self.var = np.where(first, 0.0, (1 - alpha) * (self.var + diff * increment))
+
+        self.last_value = np.where(valid, values, self.last_value)
+        self.last_time = np.where(valid, timestamp, self.last_time)
+        self.count = self.count + valid
+
+    def update_block(self, values: np.ndarray, online: np.ndarray, timestamps: np.ndarray) -> dict:
+        """
+        Fold a block of samples, oldest first, as `update` would one row at a time.
+
+        Args:
+            values: (rows, columns) values, NaN for none
+            online: (rows, columns) online flags
+            timestamps: (rows,) epoch seconds
+
+        Returns each row's statistics as (rows, columns) arrays, with the keys
+        of `snapshot` apart from the limit fields (see `with_limits`).
+        """
+        rows, columns = values.shape
+        self._grow(columns)
+        valid = online & ~np.isnan(values)
+        # Samples each column had seen before each row
+        before = self.count + np.cumsum(valid, axis=0) - valid
+        seen = valid & (before > 0)
+        first = valid & (before == 0)
+        warm = before >= self.warmup
+        alpha = np.maximum(self.alpha, 1.0 / (before + 1))
+        keep = np.where(seen, 1 - alpha, 1.0)
+
+        # EWMA mean; a column's first sample replaces its (still untouched) initial mean
+        mean = _linear_scan(keep, np.where(seen, alpha * values, np.where(first, values - self.mean, 0.0)), self.mean)
+        prev_mean = np.vstack([self.mean, mean[:-1]])
+        diff = np.where(seen, values - prev_mean, 0.0)
+        # As in `update`, the variance also decays on rows where a column has
+        # no sample; it is 0 until a column's first sample
+        var = _linear_scan(np.where(before > 0, 1 - alpha, 1.0), (1 - alpha) * alpha * diff * diff, self.var)
+        std = np.sqrt(np.vstack([self.var, var[:-1]]))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            z = np.where(seen & (std > 0), diff / std, 0.0)
+
+        # Each column's previous valid sample, from this block or before it
+        latest = np.maximum.accumulate(np.where(valid, np.arange(rows)[:, None], -1), axis=0)
+        previous = np.vstack([np.full(columns, -1), latest[:-1]])
+        from_block = previous >= 0
+        prev_time = np.where(from_block, timestamps[np.maximum(previous, 0)], self.last_time)
+        prev_value = np.where(from_block, np.take_along_axis(values, np.maximum(previous, 0), axis=0), self.last_value)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            dt = timestamps[:, None] - prev_time
+            rated = seen & (dt > 0)
+            step_rate = np.where(rated, (values - prev_value) / dt, 0.0)
+
+        # The first rated step (second sample) replaces the initial rate, like `update` with weight 1
+        rate_alpha = np.maximum(self.alpha, 1.0 / np.maximum(before, 1))
+        reset = rated & (before == 1)
+        rate = _linear_scan(
+            np.where(rated & ~reset, 1 - rate_alpha, 1.0),
+            np.where(reset, step_rate - self.rate, np.where(rated, rate_alpha * step_rate, 0.0)),
+            self.rate,
+        )
+
+        tracked = seen & warm
+        step = np.clip(z, -self.z_threshold, self.z_threshold)
+        cap = 2 * self.cusum_threshold
+        cusum_pos = _clamped_walk(step - self.cusum_slack, tracked, self.cusum_pos, cap)
+        cusum_neg = _clamped_walk(-step - self.cusum_slack, tracked, self.cusum_neg, cap)
+        drift_up = warm & (cusum_pos > self.cusum_threshold)
+        drift_down = warm & (cusum_neg > self.cusum_threshold)
+        z = np.where(valid, z, np.nan)
+        spike = tracked & (np.abs(z) > self.z_threshold)
+
+        count = before + valid
+        self.mean, self.var, self.rate = mean[-1], var[-1], rate[-1]
+        self.cusum_pos, self.cusum_neg = cusum_pos[-1], cusum_neg[-1]
+        self.z, self.spike, self.drift_up, self.drift_down = z[-1], spike[-1], drift_up[-1], drift_down[-1]
+        last = latest[-1]
+        self.last_value = np.where(last >= 0, values[np.maximum(last, 0), np.arange(columns)], self.last_value)
+        self.last_time = np.where(last >= 0, timestamps[np.maximum(last, 0)], self.last_time)
+        self.count = count[-1]
+        return {
+            "warm": count >= self.warmup,
+            "mean": mean,
+            "std": np.sqrt(var),
+            "z": z,
+            "rate": rate,
+            "cusum": np.where(cusum_pos >= cusum_neg, cusum_pos, -cusum_neg),
+            "spike": spike,
+            "drift_up": drift_up,
+            "drift_down": drift_down,
+        }
+
+    def consume(self, store) -> int:
+        """Process the store's readings appended since the last call; returns how many"""
+        if store.total < self.position:
+            # The store was rebuilt (e.g. restored after a restart); follow it from here
+            self.position = max(store.total - 1, 0)
+        backlog = min(store.total - self.position, len(store))
+        self.skipped += store.total - self.position - backlog
+        if backlog < BLOCK_MIN_ROWS:
+            for position in range(store.total - backlog, store.total):
+                slot = position % store.capacity
+                self.update(store.values[slot], store.status[slot] == STATUS_ONLINE, store.timestamps[slot])
+        else:
+            rows = max(CATCHUP_VALUES // max(len(store.sensors), 1), 1)
+            for start in range(store.total - backlog, store.total, rows):
+                slots = np.arange(start, min(start + rows, store.total)) % store.capacity
+                self.update_block(store.values[slots], store.status[slots] == STATUS_ONLINE, store.timestamps[slots])
+        self.position = store.total
+        return backlog
+
+    def time_to_limit(self, values: np.ndarray, mins: np.ndarray, maxs: np.ndarray) -> np.ndarray:
+        """Seconds until each sensor reaches the limit it is heading for at the current rate; NaN if not heading for one"""
+        return _time_to_limit(self.rate[:len(values)], values, mins, maxs)
+
+    def snapshot(self, values: np.ndarray, mins: np.ndarray, maxs: np.ndarray) -> dict:
+        """Per-column arrays for analyze_values, describing the newest consumed sample"""
+        n = len(values)
+        return with_limits({
+            "warm": self.count[:n] >= self.warmup,
+            "mean": self.mean[:n],
+            "std": np.sqrt(self.var[:n]),
+            "z": self.z[:n],
+            "rate": self.rate[:n],
+            "cusum": np.where(self.cusum_pos[:n] >= self.cusum_neg[:n], self.cusum_pos[:n], -self.cusum_neg[:n]),
+            "spike": self.spike[:n],
+            "drift_up": self.drift_up[:n],
+            "drift_down": self.drift_down[:n],
+        }, values, mins, maxs)
+
+
+# Process-local detectors, one per session
+_detectors = {}
+
+
+def get_detectors(session_id: str) -> StreamingDetectors:
+    detectors = _detectors.get(session_id)
+    if detectors is None:
+        detectors = _detectors[session_id] = StreamingDetectors()
+    return detectors
+
+
+def drop_detectors(session_id: str) -> None:
+    _detectors.pop(session_id, None)
+
+
+def latest_anomalies(session_id: str, store, mins: np.ndarray, maxs: np.ndarray) -> Optional[dict]:
+    """Bring the session's detectors up to date with its store and describe the latest reading"""
+    slot = store.latest_slot()
+    if slot is None:
+        return None
+    detectors = get_detectors(session_id)
+    detectors.consume(store)
+    return detectors.snapshot(store.values[slot], mins, maxs)
@@ -0,0 +1,127 @@
+import re
+from typing import Optional
+import numpy as np
+
+from .store import SENSOR_UNITS
+
+# Tags are plant historian style names: letters, digits and _ . : / -
+TAG_PATTERN = re.compile(r"^[A-Za-z0-9_.:/-]{1,128}$")
+
+
+def resolve_tag(name: str, known) -> Optional[str]:
+    """
+    Canonical spelling of a sensor tag, or None if it isn't a valid tag.
+
+    A tag that matches a known tag case-insensitively takes the known
+    spelling, so "Temperature" and "KILN1.tt101" find existing entries.
+    """
+    name = name.strip()
+    if not TAG_PATTERN.match(name):
+        return None
+    lowered = name.lower()
+    for tag in known:
+        if tag.lower() == lowered:
+            return tag
+    return name
+
+
+class CompiledConstraints:
+    """
+    Dense, array form of the constraints state for vectorized checks.
+
+    `mins`/`maxs` hold each tag's limits (NaN where unset) and
+    `has_min`/`has_max`/`enabled` mark which limits apply. Tag -> column,
+    unit and original limit lookups go through dicts. `bounds_for` aligns
+    the arrays with any sensor column order (e.g. a ReadingStore's) and
+    caches the alignment for the layout last asked for, so a sample vector
+    is checked with one comparison per bound.
+    """
+
+    def __init__(self, constraints: dict, version: int = 0):
+        self.version = version
+        self.tags = list(constraints)
+        self.index = {tag: i for i, tag in enumerate(self.tags)}
+        self.limits = {tag: dict(constraint) for tag, constraint in constraints.items()}
+        self.units = {
+            tag: constraint.get("unit") or SENSOR_UNITS.get(tag, "")
+            for tag, constraint in constraints.items()
+        }
+        self.mins = np.array(
+            [np.nan if c.get("min") is None else c["min"] for c in constraints.values()], dtype=np.float64
+        )
+        self.maxs = np.array(
+            [np.nan if c.get("max") is None else c["max"] for c in constraints.values()], dtype=np.float64
+        )
+        self.has_min = ~np.isnan(self.mins)
+        self.has_max = ~np.isnan(self.maxs)
+        self.enabled = self.has_min | self.has_max
+        # (sensors, aligned bounds) for the last layout; a store's columns only
+        # grow, so older layouts are never asked for again and aren't kept
+        self._aligned = None
+
+    def __len__(self) -> int:
+        return len(self.tags)
+
+    def bounds_for(self, sensors: list) -> tuple:
+        """(mins, maxs, constrained) aligned with `sensors`; NaN/False for tags without constraints"""
+        cached = self._aligned
+        if cached is not None and cached[0] == sensors:
+            return cached[1]
+        cols = np.array([self.index.get(sensor, -1) for sensor in sensors], dtype=np.int64)
+        known = cols >= 0
+        mins = np.full(len(sensors), np.nan)
+        maxs = np.full(len(sensors), np.nan)
+        mins[known] = self.mins[cols[known]]
+        maxs[known] = self.maxs[cols[known]]
+        self._aligned = (list(sensors), (mins, maxs, known))
+        return self._aligned[1]
+
+    def check(self, sensors: list, values: np.ndarray, online: np.ndarray) -> tuple:
+        """
+        Boolean (below_min, above_max) masks for a sample vector or a (rows, sensors) block.
+
+        NaN bounds compare False, so unset limits and offline sensors never flag.
+        """
+        mins, maxs, _ = self.bounds_for(sensors)
+        with np.errstate(invalid="ignore"):
+            below = online & (values < mins)
+            above = online & (values > maxs)
+        return below, above
+
+    def active(self) -> int:
+        """Tags with at least one limit set"""
+        return int(self.enabled.sum())
+
+
+def compile_constraints(constraints: Optional[dict], version: int = 0) -> CompiledConstraints:
+    return CompiledConstraints(constraints or {}, version)
+
+
+# Process-local compiled constraints, one per session
+_compiled = {}
+
+
+def get_compiled_constraints(session_id: str, state) -> CompiledConstraints:
+    """
+    Compiled form of the session's constraints, rebuilt only when constraints_version moves past it.
+
+    set_constraint / clear_constraints bump constraints_version in state
+    whenever they change something, so analyses reuse the arrays otherwise.
+    A state older than the compiled version (e.g. the monitoring scheduler's
+    session copy between commits) keeps the newer constraints.
+    """
+    version = state.get("constraints_version", 0)
+    compiled = _compiled.get(session_id)
+    if compiled is None or compiled.version < version:
+        compiled = _compiled[session_id] = compile_constraints(state.get("constraints", {}), version)
+    return compiled
+
+
+def current_constraints(session_id: str) -> CompiledConstraints:
+    """The session's constraints as last compiled, for code that has no session state (e.g. store listeners)"""
+    compiled = _compiled.get(session_id)
+    return compiled if compiled is not None else compile_constraints(None)
+
+
+def drop_compiled_constraints(session_id: str) -> None:
+    _compiled.pop(session_id, None)
@@ -0,0 +1,196 @@
+import json
+import math
+import os
+import re
+import warnings
+from typing import Optional
+import numpy as np
+from google.adk.agents.readonly_context import ReadonlyContext
+
+from .aggregates import empty_aggregates, latest_analysis
+from .alerts import get_alert_manager
+from .constraints import get_compiled_constraints
+from .store import STATUS_ONLINE, format_timestamp, get_reading_store
+
+# Budget for the rendered state placeholders, overridable via CONTEXT_TOKEN_BUDGET
+DEFAULT_TOKEN_BUDGET = 1500
+# Readings covered by the rolling per-sensor statistics
+ROLLING_WINDOW = 300
+# Most recent history entries searched for constraint changes
+CONSTRAINT_HISTORY = 50
+
+# (history entries, alerts listed, include rolling stats, constraint tags listed), most to least detailed
+_DETAIL_LEVELS = [
+    (5, 5, True, 20),
+    (3, 3, True, 10),
+    (1, 1, True, 5),
+    (0, 1, False, 3),
+]
+
+_PLACEHOLDER = re.compile(r"\{(\w+)\}")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) used for budgeting"""
+    return math.ceil(len(text) / 4)
+
+
+def _compact(value) -> str:
+    return json.dumps(value, separators=(",", ":"), default=str)
+
+
+def readings_view(session_id: str, include_stats: bool = True) -> dict:
+    """Latest reading plus rolling per-sensor min/max/mean over recent readings"""
+    store = get_reading_store(session_id)
+    latest_slot = store.latest_slot()
+    if latest_slot is None:
+        return {"total_collected": 0}
+
+    latest = {}
+    offline = []
+    for col, sensor in enumerate(store.sensors):
+        if store.status[latest_slot, col] != STATUS_ONLINE:
+            offline.append(sensor)
+        else:
+            latest[sensor] = f"{store.values[latest_slot, col]:.2f} {store.units[sensor]}"
+    view = {
+        "total_collected": store.collected,
+        "latest": {
+            "id": store.ids[latest_slot],
+            "time": format_timestamp(store.timestamps[latest_slot]),
+            "values": latest,
+        },
+    }
+    if offline:
+        view["latest"]["offline"] = offline
+
+    if include_stats:
+        slots = store.select(last_n=ROLLING_WINDOW)
+        values = np.where(store.status[slots] == STATUS_ONLINE, store.values[slots], np.nan)
+        counts = (~np.isnan(values)).sum(axis=0)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN columns
+            mins, maxs, means = np.nanmin(values, axis=0), np.nanmax(values, axis=0), np.nanmean(values, axis=0)
+        view["rolling"] = {"readings": int(len(slots))}
+        for col, sensor in enumerate(store.sensors):
+            if counts[col]:
+                view["rolling"][sensor] = {
+                    "min": round(float(mins[col]), 2),
+                    "max": round(float(maxs[col]), 2),
+                    "mean": round(float(means[col]), 2),
+                }
+    return view
+
+
+def analysis_view(state, session_id: str, max_alerts: int = 5) -> dict:
+    """Latest analysis and status counts from the report aggregates, plus the active alert incidents"""
+    aggregates = state.get("report_aggregates") or empty_aggregates()
+    latest = latest_analysis(aggregates, state.get("analysis_results", []))
+    if not latest:
+        return {"total_analyses": aggregates["total_analyses"]}
+    alerts = get_alert_manager(session_id, state).active_alerts()
+    return {
+        "total_analyses": aggregates["total_analyses"],
+        "status_counts": aggregates["status_counts"],
+        "latest": {
+            "reading_id": latest.get("reading_id"),
+            "time": latest.get("timestamp"),
+            "status": latest.get("overall_status"),
+        },
+        "active_alerts": len(alerts),
+        "alerts": [f"{incident['message']} (since {incident['raised_at']})" for incident in alerts[:max_alerts]],
+    }
+
+
+def constraints_view(state, session_id: str, max_tags: int = 20) -> dict:
+    """
+    Constraint counts plus the tags worth the model's attention.
+
+    Up to `max_tags` constraints are listed in full. Past that only the tags
+    the latest reading violates and the ones changed most recently are
+    listed (up to `max_tags` of each); the rest are only counted.
+    """
+    constraints = state.get("constraints") or {}
+    compiled = get_compiled_constraints(session_id, state)
+    view = {"tags": len(constraints), "with_limits": compiled.active()}
+    if len(constraints) <= max_tags:
+        view["constraints"] = constraints
+        return view
+
+    store = get_reading_store(session_id)
+    slot = store.latest_slot()
+    violated = []
+    if slot is not None and view["with_limits"]:
+        online = store.status[slot] == STATUS_ONLINE
+        below, above = compiled.check(store.sensors, np.round(store.values[slot], 2), online)
+        violated = [store.sensors[col] for col in np.flatnonzero(below | above)[:max_tags]]
+    changed = []
+    for entry in reversed(state.get("interaction_history", [])[-CONSTRAINT_HISTORY:]):
+        tag = entry.get("sensor_type")
+        if entry.get("action") == "constraint_set" and tag in constraints and tag not in changed:
+            changed.append(tag)
+            if len(changed) == max_tags:
+                break
+    view["violated"] = {tag: constraints[tag] for tag in violated}
+    view["recently_changed"] = {tag: constraints[tag] for tag in changed}
+    return view
+
+
+def history_view(state, entries: int = 5) -> dict:
+    """Last few interaction history entries"""
+    history = state.get("interaction_history", [])
+    return {
+        "total_interactions": len(history),
+        "recent": history[-entries:] if entries else [],
+    }
+
+
+def render_context(state, session_id: str, token_budget: Optional[int] = None) -> dict:
+    """
+    Render the heavy state placeholders as compact views that fit the token budget.
+
+    Views are rendered at decreasing levels of detail until they fit; as a last
+    resort each one is truncated to an equal share of the budget.
+    """
+    if token_budget is None:
+        token_budget = int(os.getenv("CONTEXT_TOKEN_BUDGET", DEFAULT_TOKEN_BUDGET))
+
+    for history_entries, max_alerts, include_stats, max_tags in _DETAIL_LEVELS:
+        views = {
+            "constraints": _compact(constraints_view(state, session_id, max_tags)),
+            "sensor_readings": _compact(readings_view(session_id, include_stats)),
+            "analysis_results": _compact(analysis_view(state, session_id, max_alerts)),
+            "interaction_history": _compact(history_view(state, history_entries)),
+        }
+        if sum(estimate_tokens(v) for v in views.values()) <= token_budget:
+            return views
+
+    share = max(token_budget // len(views), 1) * 4
+    return {
+        key: view if len(view) <= share else view[: max(share - 3, 0)] + "..."
+        for key, view in views.items()
+    }
+
+
+def context_instruction(template: str, token_budget: Optional[int] = None):
+    """
+    Build an instruction provider that fills `{key}` placeholders from session state.
+
+    constraints, sensor_readings, analysis_results and interaction_history are
+    replaced with the bounded views from render_context; other keys are
+    inserted as-is.
+    """
+
+    def provider(ctx: ReadonlyContext) -> str:
+        state = ctx.state
+        views = render_context(state, ctx.session.id, token_budget)
+
+        def substitute(match):
+            key = match.group(1)
+            if key in views:
+                return views[key]
+            return str(state.get(key, ""))
+
+        return _PLACEHOLDER.sub(substitute, template)
+
+    return provider
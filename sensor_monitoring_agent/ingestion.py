@@ -0,0 +1,504 @@
+import asyncio
+import math
+import os
+import socket
+import struct
+import time
+from typing import Callable, Optional
+import numpy as np
+
+from .store import SENSOR_UNITS, ReadingStore
+
+# Rows per bulk append, and the longest a row waits before a partial batch is flushed
+DEFAULT_BATCH_SIZE = 2048
+DEFAULT_MAX_DELAY = 0.05
+
+# Bytes read per file/socket chunk
+READ_CHUNK = 1 << 16
+
+# Requested kernel receive buffer for UDP feeds (the kernel may cap it)
+UDP_RECEIVE_BUFFER = 1 << 22
+
+# Modbus holding-register layout: one big-endian float32 (two registers) per sensor, from address 0
+MODBUS_READ_HOLDING_REGISTERS = 3
+MODBUS_ILLEGAL_FUNCTION = 1
+MODBUS_ILLEGAL_ADDRESS = 2
+
+
+def parse_line_protocol(line: str) -> Optional[tuple]:
+    """
+    Parse `<measurement>[,tags] field=value[,field=value...] [timestamp_ns]`.
+
+    Returns (epoch seconds, {sensor: value}) or None for blank/comment lines;
+    the timestamp defaults to now.
+    """
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+    parts = line.split(" ")
+    if len(parts) < 2:
+        raise ValueError(f"no fields in line: {line!r}")
+    values = {}
+    for field in parts[1].split(","):
+        key, _, value = field.partition("=")
+        values[key] = float(value.rstrip("i"))
+    timestamp = int(parts[2]) / 1e9 if len(parts) > 2 and parts[2] else time.time()
+    return timestamp, values
+
+
+class CsvParser:
+    """
+    Parse `timestamp,<sensor>,...` rows; an empty cell is a missing value.
+
+    A first line that isn't numeric is taken as the header. Without one the
+    columns are timestamp followed by the default sensors. An empty timestamp
+    means now.
+    """
+
+    def __init__(self, columns: Optional[list] = None):
+        self.columns = columns
+        self.header_checked = columns is not None
+
+    def __call__(self, line: str) -> Optional[tuple]:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            return None
+        cells = line.split(",")
+        if not self.header_checked:
+            self.header_checked = True
+            try:
+                float(cells[0] or 0)
+            except ValueError:
+                self.columns = [cell.strip() for cell in cells]
+                return None
+            self.columns = ["timestamp", *SENSOR_UNITS]
+        timestamp = float(cells[0]) if cells[0] else time.time()
+        values = {
+            sensor: float(cell) if cell else math.nan
+            for sensor, cell in zip(self.columns[1:], cells[1:])
+        }
+        return timestamp, values
+
+
+def make_parser(fmt: str) -> Callable:
+    if fmt == "line":
+        return parse_line_protocol
+    if fmt == "csv":
+        return CsvParser()
+    raise ValueError(f"unknown format {fmt!r}; use 'line' or 'csv'")
+
+
+class MicroBatcher:
+    """
+    Collects parsed rows and writes them to a ReadingStore with one bulk append per batch.
+
+    Rows are flushed when `batch_size` are pending or, via `flush_if_due`,
+    once the oldest pending row is `max_delay` seconds old. Counters cover
+    throughput (samples, batches, samples/s) and lag (seconds between a
+    sample's timestamp and its arrival in the store).
+    """
+
+    def __init__(self, store: ReadingStore, batch_size: int = DEFAULT_BATCH_SIZE,
+                 max_delay: float = DEFAULT_MAX_DELAY):
+        self.store = store
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.timestamps = []
+        self.rows = []
+        self.first_pending_at = None
+        self.started_at = time.monotonic()
+        self.counters = {
+            "samples": 0,
+            "batches": 0,
+            "parse_errors": 0,
+            "last_batch_size": 0,
+            "last_flush_ms": None,
+            "lag_seconds": None,
+            "max_lag_seconds": 0.0,
+        }
+
+    def add(self, timestamp: float, values: dict) -> None:
+        if not self.rows:
+            self.first_pending_at = time.monotonic()
+        self.timestamps.append(timestamp)
+        self.rows.append(values)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush_if_due(self) -> int:
+        if self.rows and time.monotonic() - self.first_pending_at >= self.max_delay:
+            return self.flush()
+        return 0
+
+    def flush(self) -> int:
+        if not self.rows:
+            return 0
+        started = time.perf_counter()
+        timestamps, rows = self.timestamps, self.rows
+        self.timestamps, self.rows = [], []
+
+        sensors = list(dict.fromkeys(sensor for row in rows for sensor in row))
+        nan = math.nan
+        values = np.array([[row.get(sensor, nan) for sensor in sensors] for row in rows], dtype=np.float64)
+        count = self.store.append_batch(np.array(timestamps), values, sensors)
+
+        lag = max(time.time() - timestamps[-1], 0.0)
+        counters = self.counters
+        counters["samples"] += count
+        counters["batches"] += 1
+        counters["last_batch_size"] = count
+        counters["last_flush_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        counters["lag_seconds"] = round(lag, 4)
+        counters["max_lag_seconds"] = round(max(counters["max_lag_seconds"], lag), 4)
+        return count
+
+    def stats(self) -> dict:
+        elapsed = time.monotonic() - self.started_at
+        return {
+            **self.counters,
+            "pending": len(self.rows),
+            "samples_per_second": round(self.counters["samples"] / elapsed, 1) if elapsed > 0 else None,
+        }
+
+
+class IngestionAdapter:
+    """
+    Base class for a background feed into a session's ReadingStore.
+
+    Subclasses implement `run()`, which receives data and passes each text
+    line to `ingest_line` (or parsed rows to `batcher.add`). A companion task
+    flushes partial batches every `max_delay` seconds.
+    """
+
+    source = "adapter"
+
+    def __init__(self, store: ReadingStore, fmt: str = "line",
+                 batch_size: int = DEFAULT_BATCH_SIZE, max_delay: float = DEFAULT_MAX_DELAY):
+        self.fmt = fmt
+        self.parser = make_parser(fmt) if fmt else None
+        self.batcher = MicroBatcher(store, batch_size, max_delay)
+        self.tasks = []
+        self.error = None
+
+    @property
+    def running(self) -> bool:
+        return bool(self.tasks) and not self.tasks[0].done()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self.batcher.started_at = time.monotonic()
+        self.tasks = [
+            asyncio.create_task(self._run(), name=f"ingest-{self.source}"),
+            asyncio.create_task(self._flush_loop(), name=f"ingest-{self.source}-flush"),
+        ]
+
+    async def stop(self) -> dict:
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        await self.close()
+        self.batcher.flush()
+        return self.stats()
+
+    async def _run(self) -> None:
+        try:
+            await self.run()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.error = str(e)
+            print(f"Error in {self.source} ingestion: {e}")
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.batcher.max_delay)
+            self.batcher.flush_if_due()
+
+    async def run(self) -> None:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        """Release sockets/files; called after the tasks are cancelled"""
+
+    def ingest_line(self, line: str) -> None:
+        try:
+            row = self.parser(line)
+        except (ValueError, IndexError):
+            self.batcher.counters["parse_errors"] += 1
+            return
+        if row is not None:
+            self.batcher.add(*row)
+
+    def ingest_text(self, text: str) -> None:
+        for line in text.splitlines():
+            self.ingest_line(line)
+
+    def stats(self) -> dict:
+        return {
+            "source": self.source,
+            "format": self.fmt,
+            "running": self.running,
+            "error": self.error,
+            **self.batcher.stats(),
+        }
+
+
+class FileTailAdapter(IngestionAdapter):
+    """Follow a CSV or line-protocol file as it grows (like `tail -f`)"""
+
+    source = "file"
+
+    def __init__(self, store: ReadingStore, path: str, fmt: str = "line", from_start: bool = False,
+                 poll_interval: float = 0.02, **kwargs):
+        super().__init__(store, fmt, **kwargs)
+        self.path = path
+        self.from_start = from_start
+        self.poll_interval = poll_interval
+
+    async def run(self) -> None:
+        with open(self.path, "r") as f:
+            if not self.from_start:
+                f.seek(0, os.SEEK_END)
+            partial = ""
+            while True:
+                chunk = f.read(READ_CHUNK)
+                if not chunk:
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+                lines = (partial + chunk).split("\n")
+                partial = lines.pop()
+                for line in lines:
+                    self.ingest_line(line)
+                await asyncio.sleep(0)
+
+
+class _DatagramProtocol(asyncio.DatagramProtocol):
+    def __init__(self, adapter):
+        self.adapter = adapter
+
+    def datagram_received(self, data, addr):
+        self.adapter.ingest_text(data.decode("utf-8", "replace"))
+
+
+class UdpFeedAdapter(IngestionAdapter):
+    """Listen for datagrams of one or more newline-separated rows"""
+
+    source = "udp"
+
+    def __init__(self, store: ReadingStore, host: str = "127.0.0.1", port: int = 8089,
+                 fmt: str = "line", receive_buffer: int = UDP_RECEIVE_BUFFER, **kwargs):
+        super().__init__(store, fmt, **kwargs)
+        self.host = host
+        self.port = port
+        self.receive_buffer = receive_buffer
+        self.transport = None
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        self.transport, _ = await loop.create_datagram_endpoint(
+            lambda: _DatagramProtocol(self), local_addr=(self.host, self.port)
+        )
+        # Bursts beyond the kernel's default buffer would be dropped silently
+        self.transport.get_extra_info("socket").setsockopt(
+            socket.SOL_SOCKET, socket.SO_RCVBUF, self.receive_buffer
+        )
+        self.port = self.transport.get_extra_info("sockname")[1]
+        await asyncio.Event().wait()
+
+    async def close(self) -> None:
+        if self.transport:
+            self.transport.close()
+            self.transport = None
+
+
+class TcpFeedAdapter(IngestionAdapter):
+    """Accept TCP connections that stream newline-separated rows"""
+
+    source = "tcp"
+
+    def __init__(self, store: ReadingStore, host: str = "127.0.0.1", port: int = 8094,
+                 fmt: str = "line", **kwargs):
+        super().__init__(store, fmt, **kwargs)
+        self.host = host
+        self.port = port
+        self.server = None
+
+    async def run(self) -> None:
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        await self.server.serve_forever()
+
+    async def _handle(self, reader, writer) -> None:
+        partial = ""
+        try:
+            while True:
+                chunk = await reader.read(READ_CHUNK)
+                if not chunk:
+                    break
+                lines = (partial + chunk.decode("utf-8", "replace")).split("\n")
+                partial = lines.pop()
+                for line in lines:
+                    self.ingest_line(line)
+            if partial:
+                self.ingest_line(partial)
+        finally:
+            writer.close()
+
+    async def close(self) -> None:
+        if self.server:
+            self.server.close()
+            self.server = None
+
+
+class ModbusTcpSimulator:
+    """
+    Local Modbus-TCP server standing in for a PLC.
+
+    Serves Read Holding Registers (function 3); each sensor occupies two
+    registers holding a big-endian float32, refreshed from `sample_fn(sensor)`
+    on every read.
+    """
+
+    def __init__(self, sensors: list, sample_fn: Callable, host: str = "127.0.0.1", port: int = 5020):
+        self.sensors = list(sensors)
+        self.sample_fn = sample_fn
+        self.host = host
+        self.port = port
+        self.server = None
+        self.connections = {}  # handler task -> writer
+
+    async def start(self) -> None:
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self.server:
+            self.server.close()
+            # Closing the connections lets their handlers finish on their own
+            for writer in self.connections.values():
+                writer.close()
+            await asyncio.gather(*self.connections, return_exceptions=True)
+            await self.server.wait_closed()
+            self.server = None
+
+    async def _handle(self, reader, writer) -> None:
+        task = asyncio.current_task()
+        self.connections[task] = writer
+        try:
+            while True:
+                header = await reader.readexactly(7)
+                transaction, protocol, length, unit = struct.unpack(">HHHB", header)
+                pdu = await reader.readexactly(length - 1)
+                writer.write(self._respond(transaction, protocol, unit, pdu))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.connections.pop(task, None)
+            writer.close()
+
+    def _respond(self, transaction: int, protocol: int, unit: int, pdu: bytes) -> bytes:
+        function = pdu[0]
+        if function != MODBUS_READ_HOLDING_REGISTERS:
+            body = struct.pack(">BB", function | 0x80, MODBUS_ILLEGAL_FUNCTION)
+        else:
+            start, quantity = struct.unpack(">HH", pdu[1:5])
+            registers = b"".join(struct.pack(">f", self.sample_fn(sensor)) for sensor in self.sensors)
+            data = registers[start * 2:(start + quantity) * 2]
+            if len(data) != quantity * 2:
+                body = struct.pack(">BB", function | 0x80, MODBUS_ILLEGAL_ADDRESS)
+            else:
+                body = struct.pack(">BB", function, len(data)) + data
+        return struct.pack(">HHHB", transaction, protocol, len(body) + 1, unit) + body
+
+
+class ModbusPollAdapter(IngestionAdapter):
+    """Poll a Modbus-TCP device's holding registers laid out as in ModbusTcpSimulator"""
+
+    source = "modbus"
+
+    def __init__(self, store: ReadingStore, sensors: list, host: str = "127.0.0.1", port: int = 5020,
+                 rate_hz: Optional[float] = 10.0, unit_id: int = 1,
+                 simulator: Optional[ModbusTcpSimulator] = None, **kwargs):
+        super().__init__(store, fmt=None, **kwargs)
+        self.fmt = "modbus"
+        self.sensors = list(sensors)
+        self.host = host
+        self.port = port
+        self.rate_hz = rate_hz
+        self.unit_id = unit_id
+        self.simulator = simulator  # started and stopped with the adapter
+        self.writer = None
+
+    async def run(self) -> None:
+        if self.simulator:
+            await self.simulator.start()
+            self.host, self.port = self.simulator.host, self.simulator.port
+        reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        quantity = 2 * len(self.sensors)
+        loop = asyncio.get_running_loop()
+        next_at = loop.time()
+        transaction = 0
+        while True:
+            transaction = (transaction + 1) & 0xFFFF
+            request = struct.pack(">HHHBBHH", transaction, 0, 6, self.unit_id,
+                                  MODBUS_READ_HOLDING_REGISTERS, 0, quantity)
+            self.writer.write(request)
+            header = await reader.readexactly(7)
+            _, _, length, _ = struct.unpack(">HHHB", header)
+            pdu = await reader.readexactly(length - 1)
+            if pdu[0] & 0x80:
+                raise ConnectionError(f"modbus exception code {pdu[1]}")
+            floats = struct.unpack(f">{len(self.sensors)}f", pdu[2:2 + 2 * quantity])
+            self.batcher.add(time.time(), dict(zip(self.sensors, floats)))
+
+            if self.rate_hz:
+                next_at += 1.0 / self.rate_hz
+                await asyncio.sleep(max(next_at - loop.time(), 0))
+            else:
+                await asyncio.sleep(0)
+
+    async def close(self) -> None:
+        if self.writer:
+            self.writer.close()
+            self.writer = None
+        if self.simulator:
+            await self.simulator.stop()
+
+
+# Process-local adapters, per session and source
+_adapters = {}
+
+
+def get_adapters(session_id: str) -> dict:
+    return _adapters.get(session_id, {})
+
+
+def feed_active(session_id: str) -> bool:
+    return any(adapter.running for adapter in get_adapters(session_id).values())
+
+
+async def start_adapter(session_id: str, adapter: IngestionAdapter) -> IngestionAdapter:
+    """Start an adapter for the session, replacing one already running for the same source"""
+    await stop_adapters(session_id, adapter.source)
+    _adapters.setdefault(session_id, {})[adapter.source] = adapter
+    adapter.start()
+    return adapter
+
+
+async def stop_adapters(session_id: str, source: Optional[str] = None) -> dict:
+    """Stop one source (or all) for the session; returns source -> final stats"""
+    adapters = _adapters.get(session_id, {})
+    sources = [source] if source else list(adapters)
+    stopped = {}
+    for name in sources:
+        adapter = adapters.pop(name, None)
+        if adapter is not None:
+            stopped[name] = await adapter.stop()
+    return stopped
+
+
+def ingestion_stats(session_id: str) -> dict:
+    return {source: adapter.stats() for source, adapter in get_adapters(session_id).items()}
@@ -0,0 +1,289 @@
+"""
+Local parser for the common operator commands.
+
+Constraint, clear, collect, analyze and report commands are matched against
+a small grammar and run as direct tool calls, recorded with the same events
+and history entries as when the agents make them. A command may chain
+several clauses ("set temperature between 1000 and 1200, feeder rate
+between 50 and 150"); if any clause doesn't match, or names something that
+isn't clearly a sensor tag, the whole command goes to the LLM instead.
+"""
+import re
+from typing import Optional
+
+from google.adk.events import Event
+from google.adk.sessions.base_session_service import GetSessionConfig
+from google.genai import types
+
+from .store import SENSOR_UNITS
+from .sub_agents.analysis_agent.agent import analyze_readings, generate_report
+from .sub_agents.constraint_agent.agent import clear_constraints, set_constraint
+from .sub_agents.sensor_agent.agent import collect_sensor_reading
+from .telemetry import telemetry
+from .tool_runner import new_invocation_id, run_tool
+
+# Spoken sensor names -> tags
+SENSOR_ALIASES = {
+    "temp": "temperature",
+    "feeder rate": "feeder_rate",
+    "feed rate": "feeder_rate",
+    "feeder": "feeder_rate",
+    "vibrations": "vibration",
+}
+# Unit spellings -> the unit stored with a constraint
+UNIT_ALIASES = {
+    "c": "C", "°c": "C", "degrees": "C", "degree": "C", "degrees c": "C", "degrees celsius": "C",
+    "f": "F", "°f": "F",
+    "kg/h": "kg/h", "mm/s": "mm/s", "bar": "bar", "psi": "psi", "rpm": "rpm", "%": "%",
+}
+# Hours per unit of a report period ("for the last 3 days")
+PERIOD_HOURS = {"hour": 1, "day": 24, "week": 168}
+
+_NUM = r"-?\d+(?:\.\d+)?"
+_UNIT = r"(?:\s*(?P<{}>°\s?[cf]|degrees?(?:\s+c(?:elsius)?)?|kg/h|mm/s|bar|psi|rpm|%|[cf]\b))?"
+_TAG = r"(?:the\s+)?(?P<tag>feeder\s+rate|feed\s+rate|[a-z][\w.:/-]*)"
+# Optional in the pattern so chained clauses can share the first clause's verb;
+# parse_command requires it on a constraint clause that doesn't follow another one
+_SET = r"(?P<verb>(?:please\s+)?(?:set|change|update|limit|constrain|keep)\s+)?"
+_LIMITS = r"(?:\s+(?:constraints?|limits?|range))?(?:\s+(?:to|at|should\s+be|must\s+be))?"
+
+CLAUSES = [
+    ("range", re.compile(
+        _SET + _TAG + _LIMITS + rf"\s+(?:between\s+|from\s+)?(?P<low>{_NUM}){_UNIT.format('unit1')}"
+        rf"\s*(?:and|to|-)\s*(?P<high>{_NUM}){_UNIT.format('unit')}", re.I)),
+    ("minmax", re.compile(
+        _SET + _TAG + _LIMITS + rf"\s+min(?:imum)?\s+(?P<low>{_NUM}){_UNIT.format('unit1')}"
+        rf"\s*(?:,\s*|and\s+)?max(?:imum)?\s+(?P<high>{_NUM}){_UNIT.format('unit')}", re.I)),
+    ("max", re.compile(
+        _SET + _TAG + _LIMITS + r"\s+(?:below|under|less\s+than|at\s+most|max(?:imum)?(?:\s+of)?|<=?)"
+        rf"\s*(?P<high>{_NUM}){_UNIT.format('unit')}", re.I)),
+    ("min", re.compile(
+        _SET + _TAG + _LIMITS + r"\s+(?:above|over|more\s+than|greater\s+than|at\s+least|min(?:imum)?(?:\s+of)?|>=?)"
+        rf"\s*(?P<low>{_NUM}){_UNIT.format('unit')}", re.I)),
+    ("clear", re.compile(
+        r"(?:please\s+)?(?:clear|reset|remove)\s+(?:all\s+)?(?:the\s+)?(?:sensor\s+)?(?:constraints|limits)"
+        r"(?:\s+(?:for|on)\s+" + _TAG + r")?", re.I)),
+    ("collect", re.compile(
+        r"(?:please\s+)?(?:collect|take|get|read|request|fetch)\s+(?:a\s+|an\s+|the\s+|new\s+|fresh\s+|latest\s+|current\s+)*"
+        r"(?:sensor\s+)?(?:readings?|data|sample)(?:\s+now)?", re.I)),
+    ("analyze", re.compile(
+        r"(?:please\s+)?(?:analy[sz]e|check)\s+(?:the\s+)?(?:latest\s+|last\s+|current\s+|new\s+)?(?:sensor\s+)?"
+        r"(?:readings?|data)(?:\s+(?P<reading_id>reading_\d+))?", re.I)),
+    ("report", re.compile(
+        r"(?:please\s+)?(?:(?:generate|create|make|produce|show|give|get)(?:\s+me)?\s+)?(?:a\s+|an\s+|the\s+)?"
+        r"(?P<type>summary|detailed|alerts?|trends?)?\s*report"
+        r"(?:\s+(?:for|over)\s+the\s+(?:last|past)\s+(?P<count>\d+(?:\.\d+)?)?\s*(?P<period>hour|day|week)s?)?", re.I)),
+]
+# Between clauses: a comma or semicolon (optionally followed by "and"/"then"), or a bare "and"/"then"
+SEPARATOR = re.compile(r"\s*[,;]\s*(?:and\s+|then\s+)?|\s+(?:and|then)\s+", re.I)
+
+
+def _tag(name: str, known) -> Optional[str]:
+    """A constrainable tag for `name`, or None when it could be anything but a sensor"""
+    name = re.sub(r"\s+", " ", name.strip())
+    lowered = name.lower()
+    if lowered in SENSOR_ALIASES:
+        return SENSOR_ALIASES[lowered]
+    for tag in known:
+        if tag.lower() == lowered:
+            return tag
+    # Unknown words ("it", "all") are left to the LLM; plant tags carry digits or separators
+    if re.search(r"[\d.:/-]", name):
+        return name
+    return None
+
+
+def _number(text: str):
+    value = float(text)
+    return int(value) if value.is_integer() else value
+
+
+def _unit(match) -> Optional[str]:
+    unit = match.group("unit")
+    return UNIT_ALIASES.get(re.sub(r"\s+", " ", unit.strip().lower())) if unit else None
+
+
+def _intent(kind: str, match, known) -> Optional[tuple]:
+    if kind in ("range", "minmax", "max", "min"):
+        tag = _tag(match.group("tag"), known)
+        if tag is None:
+            return None
+        kwargs = {"sensor_type": tag}
+        if kind != "max":
+            kwargs["min_value"] = _number(match.group("low"))
+        if kind != "min":
+            kwargs["max_value"] = _number(match.group("high"))
+        unit = _unit(match)
+        if unit:
+            kwargs["unit"] = unit
+        return set_constraint, "constraint_agent", kwargs
+    if kind == "clear":
+        if match.group("tag") is None:
+            return clear_constraints, "constraint_agent", {}
+        tag = _tag(match.group("tag"), known)
+        return (clear_constraints, "constraint_agent", {"sensor_type": tag}) if tag else None
+    if kind == "collect":
+        return collect_sensor_reading, "sensor_agent", {}
+    if kind == "analyze":
+        reading_id = match.group("reading_id")
+        return analyze_readings, "analysis_agent", {"reading_id": reading_id} if reading_id else {}
+    kwargs = {"report_type": (match.group("type") or "summary").lower()}
+    if kwargs["report_type"] in ("alert", "trend"):
+        kwargs["report_type"] += "s"
+    if match.group("period"):
+        kwargs["period_hours"] = _number(match.group("count") or "1") * PERIOD_HOURS[match.group("period").lower()]
+    return generate_report, "analysis_agent", kwargs
+
+
+def parse_command(query: str, known=()) -> Optional[list]:
+    """
+    The (tool, agent name, kwargs) calls for an operator command, or None.
+
+    `known` lists tag spellings besides the default sensors (e.g. the tags
+    of a session's reading store). Constraint clauses need a set verb
+    ("set", "limit", "keep", ...), which later clauses of the same chain
+    may leave out. None means the command isn't fully covered by the
+    grammar and should go to the agents.
+    """
+    text = query.strip().rstrip(" .!")
+    known = [*SENSOR_UNITS, *known]
+    calls, pos = [], 0
+    while True:
+        for kind, pattern in CLAUSES:
+            match = pattern.match(text, pos)
+            # A clause must end at a separator or the end of the command
+            if match and (match.end() == len(text) or SEPARATOR.match(text, match.end())):
+                break
+        else:
+            return None
+        intent = _intent(kind, match, known)
+        if intent is None:
+            return None
+        # "temperature above 1000" is a question or a statement, not a command to
+        # change the limit, unless it continues a "set ..." clause
+        if intent[0] is set_constraint and match.group("verb") is None and (
+                not calls or calls[-1][0] is not set_constraint):
+            return None
+        calls.append(intent)
+        pos = match.end()
+        if pos == len(text):
+            return calls
+        pos = SEPARATOR.match(text, pos).end()
+
+
+def _report_text(report: dict) -> str:
+    lines = [
+        f"{report['report_type'].title()} report ({report['generated_at']}): {report['total_readings']} readings, "
+        f"{report['total_analyses']} analyses, {report['constraints_set']} constrained sensors, "
+        f"monitoring {report['monitoring_status']}."
+    ]
+    summary = report.get("summary") or {}
+    if summary:
+        lines.append(f"Latest status {summary['latest_status']} with {summary['current_alerts']} alerts "
+                     f"at {summary['last_reading_time']}.")
+    latest = report.get("latest_analysis")
+    if latest:
+        lines.append(f"Latest analysis {latest.get('reading_id')}: {latest.get('overall_status')}.")
+    if report.get("status_counts"):
+        lines.append("Status counts: " + ", ".join(f"{k} {v}" for k, v in report["status_counts"].items()) + ".")
+    violations = {
+        sensor: ", ".join(f"{count} {kind.replace('_', ' ')}" for kind, count in counts.items() if count)
+        for sensor, counts in (report.get("sensor_violations") or {}).items()
+    }
+    flagged = [f"{sensor} ({counts})" for sensor, counts in violations.items() if counts]
+    if flagged:
+        lines.append("Violations: " + "; ".join(flagged) + ".")
+    if "active_alerts" in report:
+        lines.append(f"{len(report['active_alerts'])} active alerts.")
+    for alert in report.get("active_alerts", []):
+        lines.append(f"- [{alert['severity']}] {alert['message']} (since {alert['since']}, {alert['samples']} readings)")
+    for alert in report.get("recently_cleared", []):
+        lines.append(f"- cleared {alert['cleared_at']}: {alert['message']}")
+    for recommendation in report.get("recommendations", []):
+        lines.append(f"- {recommendation}")
+    period = report.get("period")
+    if period and period.get("sensors"):
+        lines.append(f"Last {period['period_hours']} hours ({period['readings']} readings, {period['tier']} tier):")
+        for sensor, stats in period["sensors"].items():
+            lines.append(f"- {sensor}: min {stats['min']}, mean {stats['mean']}, max {stats['max']}, "
+                         f"{stats['violations']} violations")
+    trends = report.get("trends")
+    if trends and trends.get("message"):
+        lines.append(trends["message"] + ".")
+    elif trends and trends.get("sensors"):
+        lines.append(f"Trends over the last {trends['period_hours']} hours ({trends['rows']} rows, {trends['tier']}):")
+        for sensor, stats in trends["sensors"].items():
+            if stats["slope_per_hour"] is None:
+                lines.append(f"- {sensor}: not enough readings ({stats['samples']})")
+                continue
+            line = (f"- {sensor}: p5 {stats['percentiles']['p5']}, median {stats['percentiles']['p50']}, "
+                    f"p95 {stats['percentiles']['p95']} {stats['unit']}, slope {stats['slope_per_hour']}/h")
+            if stats["excursions"] and stats["time_in_violation_pct"] is not None:
+                line += (f", {stats['time_in_violation_pct']}% of the time in violation over "
+                         f"{stats['excursions']} excursions")
+                if stats["mean_time_between_excursions_seconds"] is not None:
+                    line += f" (one every {stats['mean_time_between_excursions_seconds'] / 60:.1f} min)"
+            lines.append(line)
+    elif trends is not None:
+        lines.append(f"No readings in the last {trends['period_hours']} hours.")
+    return "\n".join(lines)
+
+
+def describe_result(tool_name: str, result: dict) -> str:
+    """Operator-facing text for a tool result, in place of the agent's answer"""
+    if result.get("status") != "success":
+        return f"{tool_name} failed: {result.get('message')}"
+    if tool_name == "collect_sensor_reading":
+        values = ", ".join(
+            f"{sensor} {info.get('value')} {info.get('unit', '')}".rstrip()
+            for sensor, info in result.get("readings", {}).items()
+        )
+        return f"{result['message']} ({result.get('collection_id')}): {values}"
+    if tool_name == "analyze_readings":
+        analysis = result["analysis"]
+        lines = [f"{result['message']}: {analysis.get('overall_status')}."]
+        lines += [f"- {alert}" for alert in analysis.get("alerts", [])]
+        lines += [f"- cleared: {alert}" for alert in analysis.get("cleared", [])]
+        if analysis.get("active_alerts"):
+            lines.append(f"{analysis['active_alerts']} alerts active.")
+        return "\n".join(lines)
+    if tool_name == "generate_report":
+        return _report_text(result["report"])
+    return result["message"]
+
+
+async def run_command(session_service, app_name: str, user_id: str, session_id: str,
+                      query: str, calls: list) -> tuple:
+    """
+    Run parsed tool calls against a session as one agent turn would.
+
+    The query and the final answer are appended as user and agent text
+    events around the tool events, so a later LLM turn sees the exchange.
+    Returns (agent name, answer).
+    """
+    session = await session_service.get_session(
+        app_name=app_name,
+        user_id=user_id,
+        session_id=session_id,
+        config=GetSessionConfig(num_recent_events=0),
+    )
+    invocation_id = new_invocation_id()
+    await session_service.append_event(session, Event(
+        invocation_id=invocation_id,
+        author="user",
+        content=types.Content(role="user", parts=[types.Part(text=query)]),
+    ))
+
+    telemetry.count("local_command")
+    answers = []
+    for tool, agent_name, kwargs in calls:
+        result = await run_tool(session_service, session, tool, agent_name, **kwargs)
+        answers.append(describe_result(tool.__name__, result))
+    answer = "\n".join(answers)
+
+    await session_service.append_event(session, Event(
+        invocation_id=invocation_id,
+        author=agent_name,
+        content=types.Content(role="model", parts=[types.Part(text=answer)]),
+    ))
+    return agent_name, answer
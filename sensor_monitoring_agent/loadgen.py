@@ -0,0 +1,324 @@
+"""
+Seeded synthetic sensor load: many sensors across many plants, generated in blocks.
+
+Every sensor column is a sum of:
+- its nominal level, the middle of its kind's range
+- the plant's load, shared by all of the plant's sensors. Kiln temperature
+  and feeder rate follow it closely, so they rise and fall together
+- slow drift
+- measurement noise
+
+On top of that, faults come and go at configured rates:
+- a step offset
+- a stuck sensor that repeats its last value
+- an offline sensor (NaN)
+
+All of it is drawn as NumPy arrays, one (rows, plants, sensors) block at a
+time. The same seed and block sizes always produce the same workload, so
+throughput runs can be repeated from files written by `write_csv`,
+`write_columns` or `write_line_protocol`.
+"""
+import math
+import os
+import random
+import time
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from .store import SENSOR_UNITS
+
+# Operating range per sensor kind; the nominal level is its middle, and the
+# load swing, drift, noise and step size below are fractions of its width
+SYNTHETIC_RANGES = {
+    "temperature": (900.0, 1300.0),
+    "feeder_rate": (30.0, 180.0),
+    "vibration": (5.0, 25.0),
+}
+LOAD_SWING = 0.12
+DRIFT_AMPLITUDE = 0.05
+NOISE = 0.01
+STEP_SIZE = 0.25
+
+# How closely each kind follows its plant's load (1 = exactly, 0 = independent)
+LOAD_COUPLING = {"feeder_rate": 1.0, "temperature": 0.9, "vibration": 0.5}
+# Seconds for a load swing to decay by a factor of e
+LOAD_TIME_CONSTANT = 300.0
+# Drift periods are drawn per sensor from this range (hours)
+DRIFT_PERIOD_HOURS = (2.0, 8.0)
+
+# Fault onsets per sensor-hour and how long each fault lasts (seconds)
+FAULT_RATES = {"step": 0.5, "stuck": 0.2, "offline": 0.2}
+FAULT_SECONDS = {"step": 120.0, "stuck": 300.0, "offline": 60.0}
+
+# Rows generated per block by the stream and file writers
+DEFAULT_BLOCK_ROWS = 4096
+# `sample` draws this many rows ahead, so a single reading doesn't pay for a whole block
+SAMPLE_AHEAD_ROWS = 256
+
+
+def sensor_names(count: int) -> list:
+    """Column names for `count` sensors: the default three, then temperature_2, feeder_rate_2, ..."""
+    kinds = list(SYNTHETIC_RANGES)
+    names = []
+    for i in range(count):
+        kind, group = kinds[i % len(kinds)], i // len(kinds)
+        names.append(kind if group == 0 else f"{kind}_{group + 1}")
+    return names
+
+
+def sensor_kind(sensor: str) -> str:
+    return sensor if sensor in SYNTHETIC_RANGES else sensor.rsplit("_", 1)[0]
+
+
+def _triangle(x: np.ndarray) -> np.ndarray:
+    """Triangle wave in [-1, 1] with period 1"""
+    return 2 * np.abs(2 * (x - np.floor(x + 0.5))) - 1
+
+
+class LoadGenerator:
+    """
+    Synthetic readings for `plants` plants of `sensors` sensors each at `rate_hz`.
+
+    `block(rows)` returns the next rows as (timestamps, values, online) with
+    values and online shaped (rows, plants, sensors). Blocks continue where
+    the last one stopped: the load, drift, and any fault still in progress
+    carry over. `sample` gives one plant's next row as a sensor -> value
+    dict, the way collect_sensor_reading records it.
+    """
+
+    def __init__(self, plants=1, sensors=3, rate_hz: float = 1.0, seed: Optional[int] = None,
+                 start: Optional[float] = None, fault_rates: Optional[dict] = None):
+        """
+        Args:
+            plants: number of plants, or a list of plant names
+            sensors: sensors per plant, or a list of sensor names (see `sensor_names`)
+            seed: random seed; None draws one from `random`
+            start: epoch seconds of the first row, defaults to now
+            fault_rates: overrides for FAULT_RATES
+        """
+        if rate_hz <= 0:
+            raise ValueError("rate_hz must be positive")
+        self.plants = [f"plant_{i + 1}" for i in range(plants)] if isinstance(plants, int) else list(plants)
+        self.sensors = sensor_names(sensors) if isinstance(sensors, int) else list(sensors)
+        self.kinds = [sensor_kind(sensor) for sensor in self.sensors]
+        self.units = {sensor: SENSOR_UNITS.get(kind, "") for sensor, kind in zip(self.sensors, self.kinds)}
+        self.rate_hz = rate_hz
+        self.seed = random.getrandbits(32) if seed is None else seed
+        self.start = start if start is not None else float(math.floor(time.time()))
+        self.rows = 0  # rows generated so far
+        self.rng = np.random.default_rng(self.seed)
+
+        shape = (len(self.plants), len(self.sensors))
+        ranges = np.array([SYNTHETIC_RANGES[kind] for kind in self.kinds])
+        width = ranges[:, 1] - ranges[:, 0]
+        self.nominal = np.broadcast_to(ranges.mean(axis=1), shape).copy()
+        self.swing = width * LOAD_SWING
+        self.noise = width * NOISE
+        coupling = np.array([LOAD_COUPLING.get(kind, 0.0) for kind in self.kinds])
+        self.coupling, self.own = coupling, np.sqrt(1 - coupling ** 2)
+        self.drift = self.rng.uniform(0.5, 1.0, shape) * width * DRIFT_AMPLITUDE
+        periods = self.rng.uniform(*DRIFT_PERIOD_HOURS, shape) * 3600.0
+        self.drift_rate = 1.0 / (periods * rate_hz)  # drift cycles per row
+        self.drift_phase = self.rng.random(shape)
+        self.step = self.rng.choice([-1.0, 1.0], shape) * width * STEP_SIZE
+
+        # Load is an AR(1) process per plant plus one per sensor, with unit variance
+        self.decay = math.exp(-1.0 / (LOAD_TIME_CONSTANT * rate_hz))
+        self.load = self.rng.standard_normal(len(self.plants))
+        self.own_load = self.rng.standard_normal(shape)
+
+        rates = {**FAULT_RATES, **(fault_rates or {})}
+        self.fault_p = {kind: rates[kind] / 3600.0 / rate_hz for kind in FAULT_SECONDS}
+        self.fault_rows = {kind: max(1, round(seconds * rate_hz)) for kind, seconds in FAULT_SECONDS.items()}
+        self.remaining = {kind: np.zeros(shape[0] * shape[1], dtype=np.int64) for kind in FAULT_SECONDS}
+        self.held = None  # last row's values, repeated by stuck sensors
+        self.faults = {kind: 0 for kind in FAULT_SECONDS}
+        self.ahead = None  # (values, online, next row) drawn ahead by `sample`
+
+    def _ar1(self, start: np.ndarray, rows: int) -> np.ndarray:
+        """`rows` steps of the unit-variance AR(1) load after `start`, shaped (rows, *start.shape)"""
+        out = np.empty((rows, *start.shape))
+        scale = math.sqrt(1 - self.decay ** 2)
+        # x_t = a^t (x_0 + sum_j a^-j e_j), in chunks short enough that a^-j stays finite
+        chunk = max(1, min(rows, int(50 / -math.log(self.decay)) if self.decay < 1 else rows))
+        x = start
+        for first in range(0, rows, chunk):
+            n = min(chunk, rows - first)
+            powers = self.decay ** np.arange(1, n + 1).reshape(-1, *([1] * start.ndim))
+            shocks = self.rng.standard_normal((n, *start.shape)) * scale
+            out[first:first + n] = powers * (x + np.cumsum(shocks / powers, axis=0))
+            x = out[first + n - 1]
+        return out
+
+    def _faults(self, kind: str, rows: int) -> tuple:
+        """
+        Sensors in a `kind` fault during the next `rows` rows.
+
+        Returns (cells, mask): the flat (plant, sensor) indices touched by the
+        fault, and a (rows, len(cells)) mask of when. Faults still running at
+        the end of the last block carry over. Only the touched columns are
+        built, so the cost follows the fault count rather than the block size.
+        """
+        remaining = self.remaining[kind]
+        duration = self.fault_rows[kind]
+        onsets = self.rng.binomial(rows * len(remaining), self.fault_p[kind])
+        row, cell = np.divmod(self.rng.integers(0, rows * len(remaining), onsets), len(remaining))
+        self.faults[kind] += int(onsets)
+
+        cells = np.union1d(np.flatnonzero(remaining), cell)
+        mask = np.arange(rows).reshape(-1, 1) < remaining[cells]
+        for r, column in zip(row.tolist(), np.searchsorted(cells, cell).tolist()):
+            mask[r:r + duration, column] = True
+
+        end = remaining.copy()
+        np.maximum.at(end, cell, row + duration)
+        self.remaining[kind] = np.maximum(end - rows, 0)
+        return cells, mask
+
+    def block(self, rows: int) -> tuple:
+        """The next `rows` rows as (timestamps, values, online)"""
+        index = self.rows + np.arange(rows)
+        timestamps = self.start + index / self.rate_hz
+
+        plant_load = self._ar1(self.load, rows)
+        values = self._ar1(self.own_load, rows)
+        self.load, self.own_load = plant_load[-1], values[-1].copy()
+        # Built up in place: load, then drift, noise and the nominal level
+        values *= self.own
+        values += plant_load[:, :, None] * self.coupling
+        values *= self.swing
+        values += _triangle(index.reshape(-1, 1, 1) * self.drift_rate + self.drift_phase) * self.drift
+        values += self.rng.standard_normal(values.shape) * self.noise
+        values += self.nominal
+        flat = values.reshape(rows, -1)
+
+        cells, mask = self._faults("step", rows)
+        if len(cells):
+            flat[:, cells] += mask * self.step.reshape(-1)[cells]
+
+        # Stuck sensors repeat the last value they read before sticking
+        cells, mask = self._faults("stuck", rows)
+        if len(cells):
+            columns = flat[:, cells]
+            held = columns[0] if self.held is None else self.held.reshape(-1)[cells]
+            source = np.maximum.accumulate(np.where(mask, 0, np.arange(1, rows + 1).reshape(-1, 1)), axis=0)
+            flat[:, cells] = np.take_along_axis(np.vstack([held, columns]), source, axis=0)
+        np.round(values, 2, out=values)
+        self.held = values[-1].copy()
+
+        online = np.ones(values.shape, dtype=bool)
+        cells, mask = self._faults("offline", rows)
+        if len(cells):
+            online.reshape(rows, -1)[:, cells] = ~mask
+            flat[:, cells] = np.where(mask, np.nan, flat[:, cells])
+        self.rows += rows
+        return timestamps, values, online
+
+    def stream(self, seconds: float, block_rows: int = DEFAULT_BLOCK_ROWS):
+        """Yield blocks covering the next `seconds` of readings"""
+        total = int(round(seconds * self.rate_hz))
+        for first in range(0, total, block_rows):
+            yield self.block(min(block_rows, total - first))
+
+    def sample(self, plant: int = 0) -> dict:
+        """
+        One plant's next row as sensor -> value (None while offline).
+
+        Rows are drawn SAMPLE_AHEAD_ROWS at a time and handed out one per
+        call; every plant advances together, whichever one is asked for.
+        """
+        if self.ahead is None or self.ahead[2] == len(self.ahead[0]):
+            _, values, online = self.block(SAMPLE_AHEAD_ROWS)
+            self.ahead = (values.tolist(), online.tolist(), 0)
+        values, online, row = self.ahead
+        self.ahead = (values, online, row + 1)
+        return {
+            sensor: value if up else None
+            for sensor, value, up in zip(self.sensors, values[row][plant], online[row][plant])
+        }
+
+    def write_csv(self, directory: str, seconds: float, block_rows: int = DEFAULT_BLOCK_ROWS) -> list:
+        """Write `<plant>.csv` per plant (replay/ingestion CSV layout, empty cells offline); returns the paths"""
+        os.makedirs(directory, exist_ok=True)
+        paths = [os.path.join(directory, f"{plant}.csv") for plant in self.plants]
+        files = [open(path, "w") for path in paths]
+        try:
+            for f in files:
+                f.write(",".join(["timestamp", *self.sensors]) + "\n")
+            for timestamps, values, _ in self.stream(seconds, block_rows):
+                for p, f in enumerate(files):
+                    rows = np.column_stack([timestamps, values[:, p]])
+                    text = "\n".join(",".join(row) for row in rows.astype(str).tolist()) + "\n"
+                    f.write(text.replace("nan", ""))
+        finally:
+            for f in files:
+                f.close()
+        return paths
+
+    def write_columns(self, directory: str, seconds: float, block_rows: int = DEFAULT_BLOCK_ROWS) -> list:
+        """Write `<plant>/timestamp.npy` and `<plant>/<sensor>.npy` column files; returns the plant directories"""
+        total = int(round(seconds * self.rate_hz))
+        directories = [Path(directory) / plant for plant in self.plants]
+        columns = []
+        for path in directories:
+            path.mkdir(parents=True, exist_ok=True)
+            columns.append([
+                np.lib.format.open_memmap(path / f"{name}.npy", mode="w+", dtype=np.float64, shape=(total,))
+                for name in ["timestamp", *self.sensors]
+            ])
+        written = 0
+        for timestamps, values, _ in self.stream(seconds, block_rows):
+            rows = slice(written, written + len(timestamps))
+            for p, files in enumerate(columns):
+                files[0][rows] = timestamps
+                for col, column in enumerate(files[1:]):
+                    column[rows] = values[:, p, col]
+            written += len(timestamps)
+        for files in columns:
+            for column in files:
+                column.flush()
+        return [str(path) for path in directories]
+
+    def write_line_protocol(self, directory: str, seconds: float, block_rows: int = DEFAULT_BLOCK_ROWS) -> list:
+        """Write `<plant>.lp` line-protocol files (offline sensors are left out of a line); returns the paths"""
+        os.makedirs(directory, exist_ok=True)
+        paths = [os.path.join(directory, f"{plant}.lp") for plant in self.plants]
+        files = [open(path, "w") for path in paths]
+        try:
+            for timestamps, values, online in self.stream(seconds, block_rows):
+                stamps = (timestamps * 1e9).astype(np.int64).tolist()
+                for p, (plant, f) in enumerate(zip(self.plants, files)):
+                    lines = []
+                    for stamp, row, up in zip(stamps, values[:, p].tolist(), online[:, p].tolist()):
+                        fields = ",".join(f"{sensor}={value}" for sensor, value, ok in zip(self.sensors, row, up) if ok)
+                        if fields:
+                            lines.append(f"{plant} {fields} {stamp}\n")
+                    f.write("".join(lines))
+        finally:
+            for f in files:
+                f.close()
+        return paths
+
+
+# Process-local generators behind collect_sensor_reading, one per session
+_generators = {}
+
+
+def get_load_generator(session_id: str) -> LoadGenerator:
+    """
+    The session's single-plant generator.
+
+    LOADGEN_SEED fixes its seed; otherwise the seed comes from `random`, so
+    seeding `random` also makes collected readings repeatable.
+    """
+    generator = _generators.get(session_id)
+    if generator is None:
+        seed = os.getenv("LOADGEN_SEED")
+        generator = _generators[session_id] = LoadGenerator(seed=int(seed) if seed else None)
+    return generator
+
+
+def drop_load_generator(session_id: str) -> None:
+    _generators.pop(session_id, None)
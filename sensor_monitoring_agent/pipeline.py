@@ -0,0 +1,108 @@
+from google.adk.sessions.base_session_service import GetSessionConfig
+
+from .aggregates import empty_aggregates
+from .constraints import get_compiled_constraints
+from .store import DEFAULT_CAPACITY, restore_reading_store
+from .sub_agents.analysis_agent.agent import analyze_readings
+from .sub_agents.sensor_agent.agent import collect_sensor_reading, start_monitoring_scheduler
+from .tool_runner import run_tool
+
+
+def initial_state() -> dict:
+    """State for a new monitoring session"""
+    return {
+        "user_name": "System Operator",
+        "constraints": {
+            "temperature": {"min": None, "max": None, "unit": "C"},
+            "feeder_rate": {"min": None, "max": None, "unit": "kg/h"},
+            "vibration": {"min": None, "max": None, "unit": "mm/s"},
+        },
+        "sensor_readings": {"count": 0, "latest": None},
+        "analysis_results": [],
+        "report_aggregates": empty_aggregates(),
+        "interaction_history": [],
+        "monitoring_status": "inactive"
+    }
+
+
+def all_constraints_set(constraints):
+    """Check if all three sensors have at least one constraint (min or max) set"""
+    required_sensors = ["temperature", "feeder_rate", "vibration"]
+    for sensor in required_sensors:
+        constraint = constraints.get(sensor, {})
+        if constraint.get("min") is None and constraint.get("max") is None:
+            return False
+    return True
+
+
+def constraints_exist(constraints):
+    """Check if any constraints are set"""
+    for c in constraints.values():
+        if c.get("min") is None or c.get("max") is None:
+            return False
+    return True
+
+
+def auto_pipeline_steps(state: dict) -> tuple:
+    """
+    (collect, analyze) flags for the cycle that follows an operator turn.
+
+    Collect once all constraints are set and nothing has been collected yet;
+    analyze when constraints exist and there are readings to check.
+    """
+    constraints = state.get("constraints", {})
+    readings = state.get("sensor_readings", {})
+    collect = all_constraints_set(constraints) and not readings.get("count")
+    analyze = bool(constraints_exist(constraints) and (collect or readings.get("count")))
+    return collect, analyze
+
+
+async def open_session(session_service, app_name: str, user_id: str) -> tuple:
+    """
+    Resume the user's latest session, or create one.
+
+    Restores the session's reading store (rebuilding its rollups against the
+    session's constraints) and, if it was left in continuous monitoring
+    mode, restarts its scheduler. Returns (session, restored)
+    where restored is the number of readings restored, or None for a new
+    session.
+    """
+    existing = await session_service.list_sessions(app_name=app_name, user_id=user_id)
+    if not existing.sessions:
+        session = await session_service.create_session(
+            app_name=app_name,
+            user_id=user_id,
+            state=initial_state(),
+        )
+        return session, None
+
+    session = existing.sessions[-1]
+    readings = await session_service.recent_readings(app_name, user_id, session.id, DEFAULT_CAPACITY)
+    get_compiled_constraints(session.id, session.state)
+    restore_reading_store(session.id, readings, session.state.get("sensor_readings", {}).get("count"))
+    if session.state.get("monitoring_status") == "active" and session.state.get("monitoring_config"):
+        await start_monitoring_scheduler(
+            session_service, app_name, user_id, session.id, session.state["monitoring_config"]
+        )
+    return session, len(readings)
+
+
+async def collect_and_analyze(session_service, app_name: str, user_id: str, session_id: str,
+                              collect: bool = True, analyze: bool = True) -> dict:
+    """
+    Deterministic collect -> analyze cycle that bypasses LLM routing.
+
+    Returns the raw tool results keyed by "collection" and "analysis".
+    """
+    session = await session_service.get_session(
+        app_name=app_name,
+        user_id=user_id,
+        session_id=session_id,
+        config=GetSessionConfig(num_recent_events=0),
+    )
+    results = {}
+    if collect:
+        results["collection"] = await run_tool(session_service, session, collect_sensor_reading, "sensor_agent")
+    if analyze:
+        results["analysis"] = await run_tool(session_service, session, analyze_readings, "analysis_agent")
+    return results
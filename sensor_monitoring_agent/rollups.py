@@ -0,0 +1,293 @@
+from typing import Optional
+import numpy as np
+
+from .constraints import current_constraints
+from .store import RAW_RETENTION_SECONDS, STATUS_ONLINE, format_timestamp, on_new_store
+
+# Rollup tiers as (name, bucket seconds, retention seconds), finest first
+ROLLUP_TIERS = (
+    ("1m", 60, 2 * 24 * 3600),
+    ("1h", 3600, 90 * 24 * 3600),
+)
+# A tier answers a window question when the window spans at least this many of its buckets
+MIN_BUCKETS = 12
+# Store listeners fold once this many readings (at most a quarter of the store) are waiting;
+# readers fold whatever is pending first, so single appends skip the per-tier fold
+FOLD_BACKLOG = 256
+
+
+class RollupTier:
+    """
+    Fixed-capacity ring of per-bucket aggregates for every sensor column.
+
+    Each bucket holds the readings folded into it and, per sensor, the count
+    of values, their sum, min and max, and how many were below/above the
+    constraints in force when they were folded. A bucket's slot is its index
+    modulo the capacity, so a new bucket silently replaces the one that fell
+    out of retention and memory never grows past `capacity` buckets.
+    """
+
+    def __init__(self, name: str, resolution: float, retention: float, columns: int = 0):
+        self.name = name
+        self.resolution = resolution
+        self.retention = retention
+        self.capacity = max(int(retention // resolution), 1)
+        self.newest = -1  # newest bucket index folded
+        self.bucket = np.full(self.capacity, -1, dtype=np.int64)  # bucket index held by each slot
+        self.readings = np.zeros(self.capacity, dtype=np.int64)
+        self.violating = np.zeros(self.capacity, dtype=np.int64)  # readings with any violation
+        self.columns = 0
+        self._allocate(max(columns, 1))
+
+    def _allocate(self, columns: int) -> None:
+        shape = (self.capacity, columns)
+        used = self.columns
+        arrays = {
+            "count": np.zeros(shape, dtype=np.int32),
+            "total": np.zeros(shape, dtype=np.float64),
+            "low": np.full(shape, np.inf, dtype=np.float32),
+            "high": np.full(shape, -np.inf, dtype=np.float32),
+            "below": np.zeros(shape, dtype=np.int32),
+            "above": np.zeros(shape, dtype=np.int32),
+        }
+        for name, array in arrays.items():
+            if used:
+                array[:, :used] = getattr(self, name)[:, :used]
+            setattr(self, name, array)
+        self._width = columns
+
+    def _reset(self, slots: np.ndarray) -> None:
+        self.readings[slots] = 0
+        self.violating[slots] = 0
+        self.count[slots] = 0
+        self.total[slots] = 0.0
+        self.low[slots] = np.inf
+        self.high[slots] = -np.inf
+        self.below[slots] = 0
+        self.above[slots] = 0
+
+    def fold(self, timestamps: np.ndarray, values: np.ndarray, valid: np.ndarray,
+             below: np.ndarray, above: np.ndarray) -> None:
+        """Add a block of readings (rows) to their buckets; values/valid/below/above are (rows, columns)"""
+        columns = values.shape[1]
+        if columns > self._width:
+            # Columns grow geometrically, like the reading store's
+            self._allocate(max(columns, 2 * self._width))
+        self.columns = max(self.columns, columns)
+
+        buckets = np.floor(timestamps / self.resolution).astype(np.int64)
+        self.newest = max(self.newest, int(buckets.max()))
+        keep = buckets > self.newest - self.capacity
+        slots = buckets % self.capacity
+        # Rows for a bucket whose slot already moved on to a newer bucket are too old to keep
+        keep &= self.bucket[slots] <= buckets
+        if not keep.all():
+            buckets, slots = buckets[keep], slots[keep]
+            values, valid, below, above = values[keep], valid[keep], below[keep], above[keep]
+        if not len(buckets):
+            return
+
+        unique, first = np.unique(buckets, return_index=True)
+        unique_slots = slots[first]
+        stale = self.bucket[unique_slots] != unique
+        self._reset(unique_slots[stale])
+        self.bucket[unique_slots] = unique
+
+        cols = slice(0, columns)
+        np.add.at(self.readings, slots, 1)
+        np.add.at(self.violating, slots, (below | above).any(axis=1))
+        np.add.at(self.count[:, cols], slots, valid.astype(np.int32))
+        np.add.at(self.total[:, cols], slots, np.where(valid, values, 0.0))
+        np.minimum.at(self.low[:, cols], slots, np.where(valid, values, np.inf).astype(np.float32))
+        np.maximum.at(self.high[:, cols], slots, np.where(valid, values, -np.inf).astype(np.float32))
+        np.add.at(self.below[:, cols], slots, below.astype(np.int32))
+        np.add.at(self.above[:, cols], slots, above.astype(np.int32))
+
+    def oldest_start(self) -> Optional[float]:
+        """Start time of the oldest bucket still held"""
+        held = self.bucket[self.bucket > self.newest - self.capacity]
+        held = held[held >= 0]
+        return None if not len(held) else float(held.min() * self.resolution)
+
+    def window_slots(self, start: Optional[float], end: Optional[float]) -> np.ndarray:
+        """Slots of the held buckets overlapping [start, end], oldest first"""
+        if self.newest < 0:
+            return np.zeros(0, dtype=np.int64)
+        first = self.newest - self.capacity + 1
+        if start is not None:
+            first = max(first, int(np.floor(start / self.resolution)))
+        last = self.newest if end is None else min(self.newest, int(np.floor(end / self.resolution)))
+        if last < first:
+            return np.zeros(0, dtype=np.int64)
+        wanted = np.arange(first, last + 1, dtype=np.int64)
+        slots = wanted % self.capacity
+        return slots[self.bucket[slots] == wanted]
+
+    def summarize(self, slots: np.ndarray, columns: int) -> dict:
+        """Per-column totals over some buckets; columns added after the last fold read as empty"""
+        used = min(columns, self.columns)
+        cols = slice(0, used)
+        totals = {
+            "count": np.zeros(columns, dtype=np.int64),
+            "sum": np.zeros(columns),
+            "low": np.full(columns, np.inf),
+            "high": np.full(columns, -np.inf),
+            "below": np.zeros(columns, dtype=np.int64),
+            "above": np.zeros(columns, dtype=np.int64),
+        }
+        if len(slots) and used:
+            totals["count"][cols] = self.count[slots, cols].sum(axis=0)
+            totals["sum"][cols] = self.total[slots, cols].sum(axis=0)
+            totals["low"][cols] = self.low[slots, cols].min(axis=0)
+            totals["high"][cols] = self.high[slots, cols].max(axis=0)
+            totals["below"][cols] = self.below[slots, cols].sum(axis=0)
+            totals["above"][cols] = self.above[slots, cols].sum(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            totals["mean"] = totals.pop("sum") / totals["count"]
+        totals["readings"] = int(self.readings[slots].sum())
+        totals["violating"] = int(self.violating[slots].sum())
+        return totals
+
+    def series(self, slots: np.ndarray, col: int, max_points: int) -> list:
+        """
+        One sensor's buckets as compact points, oldest first.
+
+        Runs of consecutive buckets are merged so at most `max_points` come back.
+        """
+        if col >= self.columns:
+            return []
+        group = -(-len(slots) // max_points) if len(slots) else 1
+        points = []
+        for i in range(0, len(slots), group):
+            run = slots[i:i + group]
+            count = int(self.count[run, col].sum())
+            if not count:
+                continue
+            points.append({
+                "time": format_timestamp(self.bucket[run[0]] * self.resolution),
+                "mean": round(float(self.total[run, col].sum() / count), 2),
+                "min": round(float(self.low[run, col].min()), 2),
+                "max": round(float(self.high[run, col].max()), 2),
+                "violations": int(self.below[run, col].sum() + self.above[run, col].sum()),
+            })
+        return points
+
+
+class TieredRollups:
+    """
+    Rollup tiers that follow a session's ReadingStore.
+
+    `consume` folds every reading appended since the last call into each
+    tier, then applies the raw retention policy by evicting readings older
+    than RAW_RETENTION_SECONDS from the store. Violation counts use the
+    constraints in force when a reading is folded. `follow_store` runs it
+    once FOLD_BACKLOG readings are waiting, so the store's ring can't
+    overwrite readings that were never folded (unless one batch nearly
+    fills the ring by itself).
+    """
+
+    def __init__(self, raw_retention: float = RAW_RETENTION_SECONDS, tiers=ROLLUP_TIERS):
+        self.raw_retention = raw_retention
+        self.tiers = [RollupTier(name, resolution, retention) for name, resolution, retention in tiers]
+        self.position = 0  # store.total already folded
+        self.evicted = 0  # raw readings dropped by the retention policy
+        self.skipped = 0  # readings the ring overwrote before they could be folded
+
+    def consume(self, store, compiled) -> int:
+        """Fold new readings into every tier and evict raw readings past retention; returns how many were folded"""
+        if store.total < self.position:
+            self.position = store.total
+        backlog = min(store.total - self.position, len(store))
+        self.skipped += store.total - self.position - backlog
+        if backlog:
+            slots = np.arange(store.total - backlog, store.total) % store.capacity
+            values = store.values[slots]
+            valid = (store.status[slots] == STATUS_ONLINE) & ~np.isnan(values)
+            below, above = compiled.check(store.sensors, values, valid)
+            timestamps = store.timestamps[slots]
+            for tier in self.tiers:
+                tier.fold(timestamps, values, valid, below, above)
+        self.position = store.total
+
+        latest = store.latest_slot()
+        if latest is not None:
+            self.evicted += store.evict_before(store.timestamps[latest] - self.raw_retention)
+        return backlog
+
+    def tier(self, name: str) -> RollupTier:
+        return next(tier for tier in self.tiers if tier.name == name)
+
+    def pick(self, start: float, end: float, raw_oldest: Optional[float] = None) -> Optional[RollupTier]:
+        """
+        Coarsest tier that answers a question about [start, end], or None for raw readings.
+
+        Raw readings are used whenever they still cover the window or
+        nothing has been evicted yet (given `raw_oldest`). Otherwise
+        a tier answers if it still holds the window start and the window spans
+        at least MIN_BUCKETS of its buckets; failing that, the finest tier
+        holding the start, or the one reaching furthest back.
+        """
+        if raw_oldest is not None and (start >= raw_oldest or not self.evicted):
+            return None
+        held = [tier for tier in self.tiers if tier.oldest_start() is not None]
+        if not held:
+            return None
+        covering = [tier for tier in held if start >= tier.oldest_start()]
+        for tier in reversed(covering):
+            if (end - start) / tier.resolution >= MIN_BUCKETS:
+                return tier
+        if covering:
+            return covering[0]
+        return min(held, key=lambda tier: tier.oldest_start())
+
+    def memory_bytes(self) -> int:
+        """Bytes held by the tier arrays"""
+        return sum(
+            getattr(tier, name).nbytes
+            for tier in self.tiers
+            for name in ("bucket", "readings", "violating", "count", "total", "low", "high", "below", "above")
+        )
+
+
+# Process-local rollups, one per session
+_rollups = {}
+
+
+def get_rollups(session_id: str, store=None, compiled=None) -> TieredRollups:
+    """The session's rollups, brought up to date with its store when one is given"""
+    rollups = _rollups.get(session_id)
+    if rollups is None:
+        rollups = _rollups[session_id] = TieredRollups()
+    if store is not None and compiled is not None:
+        rollups.consume(store, compiled)
+    return rollups
+
+
+def drop_rollups(session_id: str) -> None:
+    _rollups.pop(session_id, None)
+
+
+def fold_pending(session_id: str, store, backlog: int = 0) -> None:
+    """Fold the store's waiting readings against the session's current constraints, if at least `backlog` are waiting"""
+    rollups = get_rollups(session_id)
+    if store.total - rollups.position >= backlog:
+        rollups.consume(store, current_constraints(session_id))
+
+
+def follow_store(session_id: str, store) -> TieredRollups:
+    """
+    Fold appends to a new or restored session store into fresh rollups.
+
+    A restored store's readings are folded at once, so the tiers are rebuilt
+    from what was persisted. Later appends (tool collections, ingestion
+    batches) are folded in chunks of FOLD_BACKLOG, against the session's
+    current compiled constraints.
+    """
+    rollups = _rollups[session_id] = TieredRollups()
+    backlog = max(min(FOLD_BACKLOG, store.capacity // 4), 1)
+    store.listeners.append(lambda store: fold_pending(session_id, store, backlog))
+    rollups.consume(store, current_constraints(session_id))
+    return rollups
+
+
+on_new_store(follow_store)
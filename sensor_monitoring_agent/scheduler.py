@@ -0,0 +1,264 @@
+import asyncio
+import inspect
+import time
+from typing import Callable, Optional
+from google.adk.events import Event, EventActions
+from google.adk.sessions.base_session_service import GetSessionConfig
+
+from .ingestion import feed_active
+from .state_ops import apply_delta
+from .store import get_reading_store
+from .telemetry import telemetry
+from .tool_runner import DirectToolContext, new_invocation_id
+
+# Samples per second for each sensor in continuous monitoring mode
+DEFAULT_SAMPLE_RATES = {
+    "temperature": 1.0,
+    "feeder_rate": 1.0,
+    "vibration": 4.0,
+}
+
+# Seconds between constraint analyses
+DEFAULT_ANALYSIS_INTERVAL = 1.0
+
+# Samples buffered per sensor between analyses; the oldest is dropped when full
+DEFAULT_QUEUE_SIZE = 32
+
+# A sensor with no sample for this many of its sample periods is reported offline
+STALE_PERIODS = 3
+
+# Analyses whose state changes are committed to the session as one event
+DEFAULT_COMMIT_TICKS = 5
+
+
+class MonitoringScheduler:
+    """
+    Background sampling and analysis for one session.
+
+    One task per sensor calls `sample_fn(sensor)` at that sensor's rate and
+    puts the sample on a bounded queue; when a queue is full its oldest sample
+    is dropped. Every `analysis_interval` seconds the queues are drained and
+    coalesced to the latest sample per sensor, which is appended to the
+    session's reading store (unless an ingestion feed is filling it) and
+    checked with `analyze_tool`, run directly without the LLM. Ticks that
+    fall behind are skipped rather than queued up.
+
+    Samples don't produce events of their own: the store holds them and the
+    session service persists them with the next readings summary. Each tick
+    analyzes a freshly loaded session (without its events), so operator
+    changes to constraints or alerts apply at the next tick; the state
+    changes of the ticks not yet committed are replayed onto it first. Those
+    changes go out as a single event every `commit_ticks` ticks, instead of
+    a tool call/response pair per sample and analysis, and stay buffered
+    until the event has been appended.
+    """
+
+    def __init__(self, session_service, app_name: str, user_id: str, session_id: str,
+                 analyze_tool: Callable, sample_fn: Callable,
+                 sample_rates: Optional[dict] = None,
+                 analysis_interval: float = DEFAULT_ANALYSIS_INTERVAL,
+                 queue_size: int = DEFAULT_QUEUE_SIZE,
+                 commit_ticks: int = DEFAULT_COMMIT_TICKS,
+                 listener: Optional[Callable] = None):
+        self.session_service = session_service
+        self.app_name = app_name
+        self.user_id = user_id
+        self.session_id = session_id
+        self.analyze_tool = analyze_tool
+        self.sample_fn = sample_fn
+        self.sample_rates = dict(sample_rates or DEFAULT_SAMPLE_RATES)
+        self.analysis_interval = analysis_interval
+        self.commit_ticks = max(commit_ticks, 1)
+        self.listener = listener or _default_listener
+        self.actions = EventActions()  # state changes of the ticks analyzed since the last commit
+        self.pending = 0  # ticks analyzed since the last commit
+
+        self.queues = {sensor: asyncio.Queue(maxsize=queue_size) for sensor in self.sample_rates}
+        self.last_samples = {}  # sensor -> (value, epoch seconds)
+        self.tasks = []
+        self.stats = {
+            "samples": 0,
+            "dropped": 0,
+            "coalesced": 0,
+            "analyses": 0,
+            "commits": 0,
+            "skipped_ticks": 0,
+            "errors": 0,
+            "last_tick_ms": None,
+        }
+
+    @property
+    def running(self) -> bool:
+        return any(not task.done() for task in self.tasks)
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self.tasks = [
+            asyncio.create_task(self._sample_loop(sensor, rate), name=f"sample-{sensor}")
+            for sensor, rate in self.sample_rates.items()
+        ]
+        self.tasks.append(asyncio.create_task(self._analysis_loop(), name="analysis"))
+
+    async def stop(self) -> dict:
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        await self.commit()
+        return dict(self.stats)
+
+    async def _sample_loop(self, sensor: str, rate: float) -> None:
+        loop = asyncio.get_running_loop()
+        period = 1.0 / rate
+        queue = self.queues[sensor]
+        next_at = loop.time()
+        while True:
+            sample = (self.sample_fn(sensor), time.time())
+            if queue.full():
+                queue.get_nowait()
+                self.stats["dropped"] += 1
+            queue.put_nowait(sample)
+            self.stats["samples"] += 1
+
+            next_at += period
+            delay = next_at - loop.time()
+            if delay < 0:
+                next_at = loop.time()
+            await asyncio.sleep(max(delay, 0))
+
+    async def _analysis_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        interval = self.analysis_interval
+        next_at = loop.time() + interval
+        while True:
+            await asyncio.sleep(max(next_at - loop.time(), 0))
+            started = loop.time()
+            try:
+                await self.tick()
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"Error in monitoring tick: {e}")
+            finished = loop.time()
+            self.stats["last_tick_ms"] = round((finished - started) * 1000, 2)
+
+            next_at += interval
+            if finished > next_at:
+                skipped = int((finished - next_at) // interval) + 1
+                self.stats["skipped_ticks"] += skipped
+                next_at += skipped * interval
+
+    def _coalesce(self) -> dict:
+        """Drain every queue and return sensor -> latest value (None if stale)"""
+        now = time.time()
+        values = {}
+        for sensor, queue in self.queues.items():
+            drained = 0
+            while not queue.empty():
+                self.last_samples[sensor] = queue.get_nowait()
+                drained += 1
+            if drained > 1:
+                self.stats["coalesced"] += drained - 1
+            sample = self.last_samples.get(sensor)
+            stale = sample is None or now - sample[1] > STALE_PERIODS / self.sample_rates[sensor]
+            values[sensor] = None if stale else sample[0]
+        return values
+
+    async def tick(self) -> Optional[dict]:
+        """Record and analyze one coalesced sample; returns the analysis tool result"""
+        values = self._coalesce()
+        store = get_reading_store(self.session_id)
+        if not feed_active(self.session_id):
+            store.append(values, timestamp=time.time())
+        session = await self._load_session()
+        if session is None:
+            return None
+        # The stored state doesn't hold the uncommitted ticks' changes yet
+        apply_delta(session.state, self.actions.state_delta)
+        context = DirectToolContext(session)
+
+        with telemetry.span("tool", self.analyze_tool.__name__, direct=True):
+            result = self.analyze_tool(context)
+            if inspect.isawaitable(result):
+                result = await result
+        self.actions.state_delta.update(context.state_delta)
+        self.stats["analyses"] += 1
+        self.pending += 1
+        if self.listener:
+            self.listener(result, self.session_id)
+        if self.pending >= self.commit_ticks:
+            await self.commit()
+        return result
+
+    async def _load_session(self):
+        return await self.session_service.get_session(
+            app_name=self.app_name,
+            user_id=self.user_id,
+            session_id=self.session_id,
+            config=GetSessionConfig(num_recent_events=0),
+        )
+
+    async def commit(self) -> None:
+        """Append the uncommitted ticks' state changes, with the current readings summary, as one event"""
+        if not self.pending:
+            return
+        session = await self._load_session()
+        if session is None:
+            return
+        delta = dict(self.actions.state_delta)
+        delta["sensor_readings"] = get_reading_store(self.session_id).summary()
+        try:
+            await self.session_service.append_event(session, Event(
+                invocation_id=new_invocation_id(),
+                author="analysis_agent",
+                actions=EventActions(state_delta=delta),
+            ))
+        except asyncio.CancelledError:
+            # Stopped mid-append; the write may have landed, so don't commit the changes twice
+            self.actions, self.pending = EventActions(), 0
+            raise
+        # A failed append keeps the changes for the next commit
+        self.actions, self.pending = EventActions(), 0
+        self.stats["commits"] += 1
+
+
+# Process-local schedulers, one per session
+_schedulers = {}
+
+# Called with each analysis result and the session id when a scheduler has no listener of its own
+_default_listener = None
+
+
+def set_monitoring_listener(listener: Optional[Callable]) -> None:
+    """Set the analysis callback used by schedulers started without one, e.g. by the agent's tool"""
+    global _default_listener
+    _default_listener = listener
+
+
+def get_scheduler(session_id: str) -> Optional[MonitoringScheduler]:
+    return _schedulers.get(session_id)
+
+
+def monitoring_active(session_id: str) -> bool:
+    """Whether the session's readings are being analyzed continuously, rather than on demand"""
+    scheduler = _schedulers.get(session_id)
+    return scheduler is not None and scheduler.running
+
+
+async def start_scheduler(session_service, app_name: str, user_id: str, session_id: str,
+                          **kwargs) -> MonitoringScheduler:
+    """Start (or restart with new settings) the session's background monitoring"""
+    await stop_scheduler(session_id)
+    scheduler = _schedulers[session_id] = MonitoringScheduler(
+        session_service, app_name, user_id, session_id, **kwargs
+    )
+    scheduler.start()
+    return scheduler
+
+
+async def stop_scheduler(session_id: str) -> Optional[dict]:
+    """Stop the session's background monitoring; returns its final stats, or None if it wasn't running"""
+    scheduler = _schedulers.pop(session_id, None)
+    if scheduler is None:
+        return None
+    return await scheduler.stop()
@@ -0,0 +1,181 @@
+"""
+Minimal state deltas for tool writes.
+
+Assigning `state[key] = whole_list` puts the whole list in the event's
+state delta, so events grow with the history they touch. The operations
+here change the live session state in place and record only the change
+under a unique op key ("interaction_history|append|17" -> the new item),
+which keeps each event's delta the size of the change and lets deltas
+from parallel tool calls (or concurrent sessions writing the same stored
+state) merge without overwriting each other. Increments and field sets
+can reach into nested dicts through a path, e.g. a counter inside
+report_aggregates. A push writes items into a fixed-size ring at the
+slots its counter points to when the op is applied, so concurrent pushes
+land in consecutive slots instead of the same one.
+
+Op keys are only understood by session services that resolve them
+(SqliteMonitoringSessionService, whose sessions carry
+`supports_state_ops`). For any other session the helpers fall back to
+assigning the whole updated value, as a plain `state[key] = value` would;
+that value is a copy, so later changes to the live state don't reach
+events already built.
+"""
+import copy
+import itertools
+import threading
+from typing import Any, Optional, Sequence, Union
+
+# Separates the state key, the operation and the sequence number in an op key
+OP_SEPARATOR = "|"
+OPERATIONS = ("append", "increment", "set", "push")
+# ADK's State.APP_PREFIX / USER_PREFIX / TEMP_PREFIX; importing google.adk.sessions
+# here would load every session service into the tool modules
+SCOPED_PREFIXES = ("app:", "user:", "temp:")
+
+# Process-wide, so ops from parallel tool calls never share a delta key when
+# ADK merges their deltas into one event
+_sequence = itertools.count()
+# Tools may run on worker threads; read-modify-write ops take this
+_lock = threading.Lock()
+
+
+def op_key(key: str, op: str) -> str:
+    if op not in OPERATIONS:
+        raise ValueError(f"Unknown state operation {op!r}")
+    if key.startswith(SCOPED_PREFIXES) or OP_SEPARATOR in key:
+        raise ValueError(f"State operations only apply to plain session keys, not {key!r}")
+    return f"{key}{OP_SEPARATOR}{op}{OP_SEPARATOR}{next(_sequence)}"
+
+
+def parse_op_key(delta_key: str) -> Optional[tuple]:
+    """(key, op) for an op key, None for a plain state key"""
+    parts = delta_key.split(OP_SEPARATOR)
+    if len(parts) != 3 or parts[1] not in OPERATIONS or not parts[2].isdigit():
+        return None
+    return parts[0], parts[1]
+
+
+def _as_path(field: Union[str, int, Sequence]) -> list:
+    return list(field) if isinstance(field, (list, tuple)) else [field]
+
+
+def apply_at(target: dict, path: list, op: str, value: Any) -> Any:
+    """
+    Increment or set the entry at `path` below `target`; returns its new value.
+
+    Missing or non-container steps along the path become dicts; an int step
+    indexes into a list that is already there (e.g. a ring buffer slot).
+    """
+    for part in path[:-1]:
+        if isinstance(target, list):
+            target = target[part]
+            continue
+        if not isinstance(target.get(part), (dict, list)):
+            target[part] = {}
+        target = target[part]
+    last = path[-1]
+    if op == "increment":
+        current = target[last] if isinstance(target, list) else target.get(last)
+        value = (current or 0) + value
+    target[last] = value
+    return value
+
+
+def push_at(target: dict, ring_path: list, counter_path: list, items: list) -> int:
+    """
+    Write items into the ring list at `ring_path` below `target`; returns the counter's new value.
+
+    Slots come from the counter at `counter_path` as it is when applied, and
+    the counter advances by one per item.
+    """
+    ring = target
+    for part in ring_path:
+        ring = ring[part]
+    counter = target
+    for part in counter_path[:-1]:
+        counter = counter[part]
+    last = counter_path[-1]
+    for item in items:
+        ring[counter[last] % len(ring)] = item
+        counter[last] += 1
+    return counter[last]
+
+
+def apply_op(state: dict, key: str, op: str, value: Any) -> Any:
+    """Apply one op's delta value to a state dict; returns the value written"""
+    if op == "push":
+        return push_at(state[key], *value)
+    if op == "append":
+        state.setdefault(key, []).append(value)
+        return value
+    if op == "increment":
+        # A bare amount increments the key itself, [path, amount] a nested counter
+        path, amount = value if isinstance(value, list) else ([], value)
+        return apply_at(state, [key, *_as_path(path)], op, amount)
+    field, field_value = value
+    return apply_at(state, [key, *_as_path(field)], op, field_value)
+
+
+def apply_delta(state: dict, delta: dict) -> None:
+    """Apply an event's state delta in order: op keys as operations, everything else as assignments"""
+    for delta_key, value in delta.items():
+        parsed = parse_op_key(delta_key)
+        if parsed is None:
+            state[delta_key] = value
+        else:
+            apply_op(state, parsed[0], parsed[1], value)
+
+
+def supports_state_ops(tool_context) -> bool:
+    """Whether the tool's session comes from a service that resolves op keys"""
+    return getattr(tool_context.session, "supports_state_ops", False)
+
+
+def _record(tool_context, key: str, op: str, value: Any) -> Any:
+    # The live session state is updated here rather than through
+    # tool_context.state, which would store the op key in it as well
+    live, delta = tool_context.session.state, tool_context.actions.state_delta
+    with _lock:
+        written = apply_op(live, key, op, value)
+        if key in delta or not supports_state_ops(tool_context):
+            # The whole value is (or now has to be) part of this delta; keep it
+            # current, as a copy the live state can't change after the event is
+            # built. Appended items aren't changed afterwards, so a list only
+            # needs a copy of itself; nested counters and fields need a deep one
+            delta[key] = list(live[key]) if op == "append" else copy.deepcopy(live[key])
+        else:
+            delta[op_key(key, op)] = value
+        return written
+
+
+def append(tool_context, key: str, item: Any) -> None:
+    """Append one item to a list in state; the delta carries only the item"""
+    _record(tool_context, key, "append", item)
+
+
+def increment(tool_context, key: str, amount: Union[int, float] = 1,
+              path: Union[str, Sequence] = ()) -> Union[int, float]:
+    """
+    Add to a counter in state and return its new value; the delta carries only the amount.
+
+    Args:
+        path: field (or list of fields) of a counter nested in the key's dict
+    """
+    path = _as_path(path) if path else []
+    return _record(tool_context, key, "increment", [path, amount] if path else amount)
+
+
+def set_field(tool_context, key: str, field: Union[str, Sequence], value: Any) -> None:
+    """Set one field (or nested path) of a dict in state; the delta carries only that field"""
+    _record(tool_context, key, "set", [field if isinstance(field, str) else list(field), value])
+
+
+def push(tool_context, key: str, ring: Union[str, Sequence], counter: Union[str, Sequence], items: list) -> int:
+    """
+    Write items into a ring buffer in state and return its counter's new value.
+
+    Args:
+        ring: field (or path) of the fixed-size list below the key
+        counter: field (or path) of the count of items ever pushed, which picks the slots
+    """
+    return _record(tool_context, key, "push", [_as_path(ring), _as_path(counter), list(items)])
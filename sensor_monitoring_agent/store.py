@@ -0,0 +1,370 @@
+from datetime import datetime
+from typing import Optional
+import numpy as np
+
+# Default sensors and their units, in column order
+SENSOR_UNITS = {
+    "temperature": "C",
+    "feeder_rate": "kg/h",
+    "vibration": "mm/s",
+}
+
+STATUS_OFFLINE = 0
+STATUS_ONLINE = 1
+STATUS_NAMES = {STATUS_OFFLINE: "offline", STATUS_ONLINE: "online"}
+STATUS_CODES = {name: code for code, name in STATUS_NAMES.items()}
+
+# Retention policy: raw readings are kept this long (measured from the newest
+# reading), then only survive in the rollup tiers
+RAW_RETENTION_SECONDS = 60 * 60
+# Rows per second a session store is sized for; the scheduler appends one per analysis tick
+EXPECTED_ROWS_PER_SECOND = 1
+# Twice the raw retention at the expected rate, so bursts and manual collections fit too
+DEFAULT_CAPACITY = 2 * RAW_RETENTION_SECONDS * EXPECTED_ROWS_PER_SECOND
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def format_timestamp(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch).strftime(TIMESTAMP_FORMAT)
+
+
+def parse_timestamp(value) -> float:
+    """Accept epoch seconds or a TIMESTAMP_FORMAT string and return epoch seconds"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    return datetime.strptime(value, TIMESTAMP_FORMAT).timestamp()
+
+
+class ReadingStore:
+    """
+    Fixed-capacity columnar ring buffer of sensor readings.
+
+    Each slot holds one collection: an epoch timestamp, one float64 value per
+    sensor column and one int8 status per sensor column. Appends overwrite the
+    oldest slot once the buffer is full, and `collection_id` -> slot lookups go
+    through a dict, so append and lookup are O(1) and memory is bounded by
+    `capacity`. Callables in `listeners` run with the store after every
+    append, while the new rows are still held.
+    """
+
+    def __init__(self, sensors: Optional[dict] = None, capacity: int = DEFAULT_CAPACITY):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.units = dict(sensors if sensors is not None else SENSOR_UNITS)
+        self.sensors = list(self.units)
+        self.sensor_index = {sensor: i for i, sensor in enumerate(self.sensors)}
+
+        self.timestamps = np.full(capacity, np.nan)
+        self._values = np.full((capacity, len(self.sensors)), np.nan)
+        self._status = np.full((capacity, len(self.sensors)), STATUS_OFFLINE, dtype=np.int8)
+        self.values, self.status = self._values, self._status
+        self.ids = [None] * capacity
+        self.index = {}
+        self.total = 0  # readings appended to this buffer
+        self.first = 0  # position (in appends) of the oldest reading not evicted by age
+        self.id_base = 0  # readings collected before this buffer existed (e.g. before a restart)
+        self.listeners = []
+
+    def __len__(self) -> int:
+        return min(self.total - self.first, self.capacity)
+
+    def add_sensor(self, sensor: str, unit: str = "") -> int:
+        """Add a sensor column (no-op if it exists) and return its column index"""
+        if sensor in self.sensor_index:
+            return self.sensor_index[sensor]
+        self.units[sensor] = unit
+        self.sensors.append(sensor)
+        self.sensor_index[sensor] = len(self.sensors) - 1
+        if len(self.sensors) > self._values.shape[1]:
+            self._grow_columns(2 * len(self.sensors))
+        self.values = self._values[:, :len(self.sensors)]
+        self.status = self._status[:, :len(self.sensors)]
+        return self.sensor_index[sensor]
+
+    def _grow_columns(self, columns: int) -> None:
+        # Columns grow geometrically so adding thousands of tags one at a time
+        # copies the buffer O(log n) times; `values`/`status` are views of the
+        # used columns
+        used = self._values.shape[1]
+        values = np.full((self.capacity, columns), np.nan)
+        status = np.full((self.capacity, columns), STATUS_OFFLINE, dtype=np.int8)
+        values[:, :used] = self._values
+        status[:, :used] = self._status
+        self._values, self._status = values, status
+
+    @property
+    def collected(self) -> int:
+        """Readings ever collected for the session; drives collection ids"""
+        return self.id_base + self.total
+
+    def next_collection_id(self) -> str:
+        return f"reading_{self.collected + 1}"
+
+    def append(self, values: dict, timestamp: Optional[float] = None,
+               statuses: Optional[dict] = None, collection_id: Optional[str] = None) -> str:
+        """
+        Store one collection and return its collection_id.
+
+        Args:
+            values: sensor -> numeric value (None for no value)
+            timestamp: epoch seconds, defaults to now
+            statuses: sensor -> "online"/"offline", defaults to online for sensors with a value
+        """
+        slot = self.total % self.capacity
+        evicted = self.ids[slot]
+        if evicted is not None:
+            del self.index[evicted]
+
+        collection_id = collection_id or self.next_collection_id()
+        statuses = statuses or {}
+
+        self.values[slot] = np.nan
+        self.status[slot] = STATUS_OFFLINE
+        for sensor, value in values.items():
+            col = self.sensor_index.get(sensor)
+            if col is None:
+                col = self.add_sensor(sensor)
+            if value is not None:
+                self.values[slot, col] = value
+            default_status = "offline" if value is None else "online"
+            self.status[slot, col] = STATUS_CODES[statuses.get(sensor, default_status)]
+
+        self.timestamps[slot] = datetime.now().timestamp() if timestamp is None else timestamp
+        self.ids[slot] = collection_id
+        self.index[collection_id] = slot
+        self.total += 1
+        self._notify()
+        return collection_id
+
+    def append_batch(self, timestamps: np.ndarray, values: np.ndarray, sensors: list) -> int:
+        """
+        Store many collections at once and return how many were stored.
+
+        Args:
+            timestamps: (n,) epoch seconds, oldest first
+            values: (n, len(sensors)) values, NaN for no value (stored as offline)
+            sensors: sensor name of each values column
+        """
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64).reshape(len(timestamps), len(sensors))
+        count = len(timestamps)
+        if count == 0:
+            return 0
+        if count > self.capacity:
+            # Only the newest `capacity` rows survive; the rest still count as collected
+            self.id_base += count - self.capacity
+            timestamps, values = timestamps[-self.capacity:], values[-self.capacity:]
+        cols = [self.add_sensor(sensor) for sensor in sensors]
+
+        n = len(timestamps)
+        slots = (self.total + np.arange(n)) % self.capacity
+        first_id = self.collected + 1
+        ids = [f"reading_{first_id + i}" for i in range(n)]
+        slot_list = slots.tolist()
+        for slot in slot_list:
+            evicted = self.ids[slot]
+            if evicted is not None:
+                del self.index[evicted]
+
+        self.values[slots] = np.nan
+        self.status[slots] = STATUS_OFFLINE
+        self.values[np.ix_(slots, cols)] = values
+        self.status[np.ix_(slots, cols)] = np.where(np.isnan(values), STATUS_OFFLINE, STATUS_ONLINE)
+        self.timestamps[slots] = timestamps
+        for slot, collection_id in zip(slot_list, ids):
+            self.ids[slot] = collection_id
+            self.index[collection_id] = slot
+        self.total += n
+        self._notify()
+        return count
+
+    def _notify(self) -> None:
+        for listener in self.listeners:
+            listener(self)
+
+    def slot_of(self, collection_id: str) -> Optional[int]:
+        return self.index.get(collection_id)
+
+    def latest_slot(self) -> Optional[int]:
+        if not len(self):
+            return None
+        return (self.total - 1) % self.capacity
+
+    def oldest_slot(self) -> Optional[int]:
+        if not len(self):
+            return None
+        return (self.total - len(self)) % self.capacity
+
+    def evict_before(self, timestamp: float) -> int:
+        """
+        Drop the oldest retained readings stamped before `timestamp` (epoch seconds).
+
+        Used by retention policies once older readings have been rolled up.
+        Eviction stops at the first reading that is new enough, so a reading
+        that arrived out of order never leaves a gap. Returns how many readings
+        were dropped.
+        """
+        oldest = self.oldest_slot()
+        if oldest is None or not self.timestamps[oldest] < timestamp:
+            # Nothing is old enough; this runs after every append, so skip the scan
+            return 0
+        slots = self.slots()
+        old = self.timestamps[slots] < timestamp
+        count = len(slots) if old.all() else int(old.argmin())
+        for slot in slots[:count].tolist():
+            del self.index[self.ids[slot]]
+            self.ids[slot] = None
+        self.values[slots[:count]] = np.nan
+        self.status[slots[:count]] = STATUS_OFFLINE
+        self.timestamps[slots[:count]] = np.nan
+        self.first = self.total - len(slots) + count
+        return count
+
+    def collected_slots(self, after: int, upto: Optional[int] = None) -> np.ndarray:
+        """
+        Slots of the retained readings collected after the first `after` (up to the first `upto`), oldest first.
+
+        Positions count every reading ever collected (see `collected`), so a
+        caller that remembers how far it got can pick up the rest.
+        """
+        upto = self.collected if upto is None else min(upto, self.collected)
+        start = max(after - self.id_base, self.total - len(self))
+        end = max(upto - self.id_base, start)
+        return np.arange(start, end) % self.capacity
+
+    def slots(self) -> np.ndarray:
+        """Slot indices of retained readings, oldest first"""
+        count = len(self)
+        start = self.total - count
+        return np.arange(start, self.total) % self.capacity
+
+    def select(self, last_n: Optional[int] = None, start: Optional[float] = None,
+               end: Optional[float] = None, collection_ids: Optional[list] = None) -> np.ndarray:
+        """
+        Slot indices of a window of readings, oldest first.
+
+        Args:
+            last_n: keep only the newest N readings
+            start, end: inclusive epoch-second bounds on the reading timestamp
+            collection_ids: explicit readings; unknown or evicted IDs are skipped
+        """
+        if collection_ids is not None:
+            slots = np.array(
+                [s for s in (self.slot_of(cid) for cid in collection_ids) if s is not None],
+                dtype=np.int64,
+            )
+            slots = slots[np.argsort(self.timestamps[slots], kind="stable")]
+        else:
+            slots = self.slots()
+        if start is not None or end is not None:
+            ts = self.timestamps[slots]
+            mask = np.ones(len(slots), dtype=bool)
+            if start is not None:
+                mask &= ts >= start
+            if end is not None:
+                mask &= ts <= end
+            slots = slots[mask]
+        if last_n is not None:
+            slots = slots[len(slots) - min(max(last_n, 0), len(slots)):]
+        return slots
+
+    def reading(self, slot: int) -> dict:
+        """Expand one slot into the nested reading dict the tools and prompts use"""
+        timestamp = format_timestamp(self.timestamps[slot])
+        readings = {}
+        for col, sensor in enumerate(self.sensors):
+            value = self.values[slot, col]
+            readings[sensor] = {
+                "value": None if np.isnan(value) else round(float(value), 2),
+                "unit": self.units[sensor],
+                "timestamp": timestamp,
+                "status": STATUS_NAMES[int(self.status[slot, col])],
+            }
+        return {
+            "readings": readings,
+            "timestamp": timestamp,
+            "collection_id": self.ids[slot],
+        }
+
+    def get(self, collection_id: str) -> Optional[dict]:
+        slot = self.slot_of(collection_id)
+        return None if slot is None else self.reading(slot)
+
+    def latest(self) -> Optional[dict]:
+        slot = self.latest_slot()
+        return None if slot is None else self.reading(slot)
+
+    def summary(self) -> dict:
+        """Small, constant-size view of the store kept in session state"""
+        return {
+            "count": self.collected,
+            "retained": len(self),
+            "capacity": self.capacity,
+            "latest": self.latest(),
+        }
+
+
+# Process-local stores, one per session
+_stores = {}
+# hook(session_id, store) for every store created or restored, e.g. to follow its appends
+_store_hooks = []
+
+
+def on_new_store(hook) -> None:
+    """Call `hook(session_id, store)` for each session store created or restored from now on"""
+    _store_hooks.append(hook)
+
+
+def drop_store_hook(hook) -> None:
+    if hook in _store_hooks:
+        _store_hooks.remove(hook)
+
+
+def _created(session_id: str, store: ReadingStore) -> ReadingStore:
+    for hook in _store_hooks:
+        hook(session_id, store)
+    return store
+
+
+def get_reading_store(session_id: str) -> ReadingStore:
+    store = _stores.get(session_id)
+    if store is None:
+        store = _stores[session_id] = ReadingStore()
+        _created(session_id, store)
+    return store
+
+
+def find_reading_store(session_id: str) -> Optional[ReadingStore]:
+    """The session's store if this process has one; unlike get_reading_store, never creates it"""
+    return _stores.get(session_id)
+
+
+def drop_reading_store(session_id: str) -> None:
+    _stores.pop(session_id, None)
+
+
+def restore_reading_store(session_id: str, readings: list, total: Optional[int] = None) -> ReadingStore:
+    """
+    Rebuild a session's store from nested reading dicts (oldest first), e.g. after a restart.
+
+    Args:
+        total: readings ever collected, so new collection ids continue the sequence
+    """
+    store = ReadingStore()
+    for reading in readings:
+        sensors = reading.get("readings", {})
+        for sensor, info in sensors.items():
+            store.add_sensor(sensor, info.get("unit", ""))
+        store.append(
+            {sensor: info.get("value") for sensor, info in sensors.items()},
+            timestamp=parse_timestamp(reading["timestamp"]),
+            statuses={sensor: info.get("status", "online") for sensor, info in sensors.items()},
+            collection_id=reading.get("collection_id"),
+        )
+    if total is not None:
+        store.id_base = max(total - store.total, 0)
+    # Hooks see the restored readings at once rather than one append at a time
+    _stores[session_id] = store
+    return _created(session_id, store)
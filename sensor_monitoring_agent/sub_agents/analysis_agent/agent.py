@@ -1,143 +1,753 @@
 from datetime import datetime
 from typing import Optional
+import numpy as np
+
 from google.adk.agents import Agent
 from google.adk.tools.tool_context import ToolContext
 
-
-def analyze_readings(tool_context: ToolContext, reading_id: Optional[str] = None) -> dict:
+from ...alerts import alert_summary, get_alert_manager
+from ...anomaly import latest_anomalies
+from ...aggregates import (
+    aggregate_ops,
+    check_aggregates,
+    empty_aggregates,
+    latest_analysis,
+    recent_alerts,
+    update_aggregates,
+)
+from ...constraints import CompiledConstraints, compile_constraints, get_compiled_constraints
+from ...context import context_instruction
+from ...rollups import RAW_RETENTION_SECONDS, RollupTier, get_rollups
+from ...scheduler import monitoring_active
+from ...state_ops import append, increment, push, set_field
+from ...store import STATUS_ONLINE, format_timestamp, get_reading_store, parse_timestamp
+from ...trends import TREND_PERCENTILES, reading_durations, run_trends
+
+
+# Above this many sensors an analysis lists only offline or violating sensors
+DETAILED_SENSOR_LIMIT = 50
+# Points per sensor in a report's trend series
+TREND_POINTS = 48
+# Period a detailed report covers when none is given
+DEFAULT_DETAILED_PERIOD_HOURS = 24
+# Window of a trends report when none is given
+DEFAULT_TRENDS_PERIOD_HOURS = 1
+# Fewer rows than this in the window give no trends (a slope needs two points)
+MIN_TREND_ROWS = 2
+
+
+def _optional(value: float, digits: int = 2):
+    return None if np.isnan(value) else round(float(value), digits)
+
+
+def _raw_oldest(store) -> Optional[float]:
+    """Timestamp of the oldest raw reading still retained, for RollupTier picks"""
+    slot = store.oldest_slot()
+    return None if slot is None else float(store.timestamps[slot])
+
+
+def _anomaly_fields(sensor_type: str, value: float, unit: str, col: int, anomalies: dict,
+                    compiled: CompiledConstraints, conditions: list) -> dict:
+    """Streaming statistics for one sensor, plus conditions for spikes, drifts and limits being approached"""
+    if not anomalies["warm"][col] or value is None:
+        return {"anomalies": []}
+    fields = {
+        "ewma_mean": _optional(anomalies["mean"][col]),
+        "ewma_std": _optional(anomalies["std"][col], 3),
+        "z_score": _optional(anomalies["z"][col]),
+        "rate_of_change": _optional(anomalies["rate"][col], 4),
+        "cusum": _optional(anomalies["cusum"][col]),
+        "time_to_limit_seconds": _optional(anomalies["time_to_limit"][col], 0),
+        "anomalies": [],
+    }
+    name = sensor_type.title()
+    if anomalies["spike"][col]:
+        fields["anomalies"].append("spike")
+        conditions.append((sensor_type, "spike", f"{name} reading ({value}{unit}) is anomalous (z-score {fields['z_score']})"))
+    if anomalies["drift_up"][col] or anomalies["drift_down"][col]:
+        direction = "up" if anomalies["drift_up"][col] else "down"
+        fields["anomalies"].append(f"drift_{direction}")
+        conditions.append((
+            sensor_type, f"drift_{direction}",
+            f"{name} is drifting {direction}ward (mean {fields['ewma_mean']}{unit}, "
+            f"{fields['rate_of_change']}{unit}/s)"
+        ))
+    if anomalies["approaching_limit"][col]:
+        limit = "max" if anomalies["rate"][col] > 0 else "min"
+        fields["anomalies"].append(f"approaching_{limit}")
+        conditions.append((
+            sensor_type, f"approaching_{limit}",
+            f"{name} is heading for its {limit}imum ({compiled.limits[sensor_type][limit]}{unit}), "
+            f"about {int(fields['time_to_limit_seconds'])}s away at the current rate"
+        ))
+    return fields
+
+
+def analyze_values(reading_id: str, timestamp: str, sensors: list, units: list, values: np.ndarray,
+                   online: np.ndarray, compiled: CompiledConstraints, current_time: str,
+                   anomalies: Optional[dict] = None, conditions: Optional[list] = None) -> dict:
     """
-    Analyze sensor readings against established constraints.
+    Check one sample vector against compiled constraints.
 
     Args:
-        reading_id: Specific reading to analyze, or None for latest reading
+        values: one value per sensor, NaN for no value
+        online: per-sensor online flag
+        anomalies: StreamingDetectors.snapshot arrays for this sample; adds
+            per-sensor statistics and anomaly alerts when given
+        conditions: receives a (sensor, kind, message) tuple per alert, for
+            the alert manager
     """
-    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-    # Get constraints and readings from state
-    constraints = tool_context.state.get("constraints", {})
-    all_readings = tool_context.state.get("sensor_readings", [])
-
-    if not all_readings:
-        return {
-            "status": "error",
-            "message": "No sensor readings available for analysis"
-        }
+    conditions = [] if conditions is None else conditions
+    values = np.round(values, 2)
+    has_value = ~np.isnan(values)
+    below, above = compiled.check(sensors, values, online & has_value)
+    _, _, constrained = compiled.bounds_for(sensors)
+    offline = ~online
+    flagged = offline | below | above
+    anomalous = np.zeros(len(sensors), dtype=bool)
+    if anomalies is not None:
+        anomalous = has_value & online & (
+            anomalies["spike"] | anomalies["drift_up"] | anomalies["drift_down"] | anomalies["approaching_limit"]
+        )
+        flagged |= anomalous
 
-    # Select reading to analyze
-    if reading_id:
-        target_reading = None
-        for reading in all_readings:
-            if reading.get("collection_id") == reading_id:
-                target_reading = reading
-                break
-        if not target_reading:
-            return {
-                "status": "error",
-                "message": f"Reading with ID {reading_id} not found"
-            }
+    if (below | above).any():
+        overall_status = "alert"
+    elif anomalous.any():
+        overall_status = "warning"
     else:
-        target_reading = all_readings[-1]  # Most recent reading
-
-    # Perform analysis
+        overall_status = "normal"
     analysis_results = {
-        "reading_id": target_reading.get("collection_id"),
-        "timestamp": target_reading.get("timestamp"),
+        "reading_id": reading_id,
+        "timestamp": timestamp,
         "analysis_timestamp": current_time,
         "sensor_analyses": {},
-        "overall_status": "normal",
+        "overall_status": overall_status,
         "alerts": [],
         "recommendations": []
     }
 
-    reading_data = target_reading.get("readings", {})
-
-    for sensor_type, reading_info in reading_data.items():
+    detailed = len(sensors) <= DETAILED_SENSOR_LIMIT
+    if not detailed:
+        analysis_results["sensors_checked"] = len(sensors)
+    for col in (range(len(sensors)) if detailed else np.flatnonzero(flagged)):
+        sensor_type = sensors[col]
+        value = round(float(values[col]), 2) if has_value[col] else None
+        unit = units[col]
         sensor_analysis = {
-            "value": reading_info.get("value"),
-            "unit": reading_info.get("unit"),
-            "sensor_status": reading_info.get("status"),
+            "value": value,
+            "unit": unit,
+            "sensor_status": "online" if online[col] else "offline",
             "constraint_status": "no_constraints",
             "violations": []
         }
 
-        # Check if sensor is online
-        if reading_info.get("status") == "offline":
-            analysis_results["alerts"].append(f"{sensor_type.title()} sensor is offline")
+        if offline[col]:
+            conditions.append((sensor_type, "offline", f"{sensor_type.title()} sensor is offline"))
             sensor_analysis["constraint_status"] = "sensor_offline"
-        elif reading_info.get("value") is not None and sensor_type in constraints:
-            # Analyze against constraints
-            constraint = constraints[sensor_type]
-            value = reading_info.get("value")
-
+        elif value is not None and constrained[col]:
+            constraint = compiled.limits[sensor_type]
             violations = []
-            if constraint.get("min") is not None and value < constraint["min"]:
+            if below[col]:
                 violations.append(f"Below minimum ({constraint['min']})")
-                analysis_results["alerts"].append(
-                    f"{sensor_type.title()} reading ({value}{reading_info.get('unit', '')}) "
+                conditions.append((
+                    sensor_type, "below_min",
+                    f"{sensor_type.title()} reading ({value}{unit}) "
                     f"is below minimum threshold ({constraint['min']})"
-                )
-
-            if constraint.get("max") is not None and value > constraint["max"]:
+                ))
+            if above[col]:
                 violations.append(f"Above maximum ({constraint['max']})")
-                analysis_results["alerts"].append(
-                    f"{sensor_type.title()} reading ({value}{reading_info.get('unit', '')}) "
+                conditions.append((
+                    sensor_type, "above_max",
+                    f"{sensor_type.title()} reading ({value}{unit}) "
                     f"is above maximum threshold ({constraint['max']})"
-                )
+                ))
+            sensor_analysis["constraint_status"] = "violation" if violations else "normal"
+            sensor_analysis["violations"] = violations
 
-            if violations:
-                sensor_analysis["constraint_status"] = "violation"
-                sensor_analysis["violations"] = violations
-                analysis_results["overall_status"] = "alert"
-            else:
-                sensor_analysis["constraint_status"] = "normal"
+        if anomalies is not None and online[col]:
+            sensor_analysis.update(
+                _anomaly_fields(sensor_type, value, unit, col, anomalies, compiled, conditions)
+            )
 
         analysis_results["sensor_analyses"][sensor_type] = sensor_analysis
 
+    analysis_results["alerts"] = [message for _, _, message in conditions]
+
     # Generate recommendations
     if analysis_results["alerts"]:
-        analysis_results["recommendations"].append("Review constraint violations and take corrective action")
-        if any("offline" in alert.lower() for alert in analysis_results["alerts"]):
+        if (below | above | offline).any():
+            analysis_results["recommendations"].append("Review constraint violations and take corrective action")
+        if offline.any():
             analysis_results["recommendations"].append("Check offline sensors and restore connectivity")
+        if anomalous.any():
+            analysis_results["recommendations"].append(
+                "Investigate drifting or anomalous sensors before they cross their limits"
+            )
     else:
         analysis_results["recommendations"].append("All readings within acceptable ranges")
 
-    # Store analysis results
-    current_analyses = tool_context.state.get("analysis_results", [])
-    current_analyses.append(analysis_results)
-    tool_context.state["analysis_results"] = current_analyses
+    return analysis_results
+
+
+def analyze_reading(target_reading: dict, constraints, current_time: str) -> dict:
+    """
+    Check one nested reading dict against constraints.
+
+    Args:
+        constraints: constraints state dict, or an already compiled CompiledConstraints
+    """
+    compiled = constraints if isinstance(constraints, CompiledConstraints) else compile_constraints(constraints)
+    readings = target_reading.get("readings", {})
+    infos = list(readings.values())
+    return analyze_values(
+        target_reading.get("collection_id"),
+        target_reading.get("timestamp"),
+        list(readings),
+        [info.get("unit") for info in infos],
+        np.array([np.nan if info.get("value") is None else info["value"] for info in infos], dtype=np.float64),
+        np.array([info.get("status") != "offline" for info in infos], dtype=bool),
+        compiled,
+        current_time,
+    )
+
+
+def analyze_readings(tool_context: ToolContext, reading_id: Optional[str] = None) -> dict:
+    """
+    Analyze sensor readings against established constraints.
+
+    Args:
+        reading_id: Specific reading to analyze, or None for latest reading
+    """
+    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    # Get constraints from state and readings from the session's store
+    compiled = get_compiled_constraints(tool_context.session.id, tool_context.state)
+    store = get_reading_store(tool_context.session.id)
+    if not len(store):
+        return {
+            "status": "error",
+            "message": "No sensor readings available for analysis"
+        }
+
+    # Streaming statistics see every reading before the retention policy can evict it
+    mins, maxs, _ = compiled.bounds_for(store.sensors)
+    anomalies = latest_anomalies(tool_context.session.id, store, mins, maxs)
+    get_rollups(tool_context.session.id, store, compiled)
+
+    # Select reading to analyze
+    if reading_id:
+        slot = store.slot_of(reading_id)
+        if slot is None:
+            return {
+                "status": "error",
+                "message": f"Reading with ID {reading_id} not found (raw readings are kept for "
+                           f"{RAW_RETENTION_SECONDS // 60} minutes)"
+            }
+    else:
+        slot = store.latest_slot()  # Most recent reading
+
+    # Streaming statistics describe the newest sample, so only the latest reading gets them
+    if slot != store.latest_slot():
+        anomalies = None
+
+    # Perform analysis on the store's columns in one vectorized pass
+    conditions = []
+    analysis_results = analyze_values(
+        store.ids[slot],
+        format_timestamp(store.timestamps[slot]),
+        store.sensors,
+        [store.units[sensor] for sensor in store.sensors],
+        store.values[slot],
+        store.status[slot] == STATUS_ONLINE,
+        compiled,
+        current_time,
+        anomalies,
+        conditions,
+    )
+
+    # Alerts become incidents: a condition that persists across readings is
+    # raised once, so "raised" (what the aggregates count) holds only the
+    # transitions while "alerts" keeps every condition the reading shows.
+    # Re-analyzing an older reading leaves the incidents alone.
+    if slot == store.latest_slot():
+        manager = get_alert_manager(tool_context.session.id, tool_context.state)
+        row = store.values[slot]
+        involved = {sensor for sensor, _, _ in conditions}.union(manager.by_sensor)
+        changes = manager.update(
+            conditions,
+            float(store.timestamps[slot]),
+            {sensor: _optional(row[store.sensor_index[sensor]])
+             for sensor in involved if sensor in store.sensor_index},
+            compiled.limits,
+            continuous=monitoring_active(tool_context.session.id),
+        )
+        analysis_results["raised"] = [incident["message"] for incident in changes["raised"] + changes["reopened"]]
+        analysis_results["cleared"] = [incident["message"] for incident in changes["cleared"]]
+        analysis_results["active_alerts"] = len(manager)
+        if any(changes.values()):
+            for field, value in manager.snapshot().items():
+                set_field(tool_context, "alerts", field, value)
+
+    # Store analysis results; the event carries just this one
+    append(tool_context, "analysis_results", analysis_results)
+
+    # Fold into the running report aggregates as counter deltas, so concurrent
+    # analyses of the session (scheduler and LLM turns) add up instead of
+    # overwriting each other
+    aggregates = tool_context.state.get("report_aggregates")
+    if aggregates is None:
+        tool_context.state["report_aggregates"] = update_aggregates(empty_aggregates(), analysis_results)
+    else:
+        for op, path, value in aggregate_ops(aggregates, analysis_results):
+            if op == "increment":
+                increment(tool_context, "report_aggregates", value, path)
+            elif op == "push":
+                push(tool_context, "report_aggregates", path, *value)
+            else:
+                set_field(tool_context, "report_aggregates", path, value)
 
     # Add to interaction history
-    current_history = tool_context.state.get("interaction_history", [])
-    current_history.append({
+    append(tool_context, "interaction_history", {
         "action": "analysis_performed",
-        "reading_id": target_reading.get("collection_id"),
+        "reading_id": analysis_results["reading_id"],
         "overall_status": analysis_results["overall_status"],
         "alerts_count": len(analysis_results["alerts"]),
         "timestamp": current_time
     })
-    tool_context.state["interaction_history"] = current_history
 
     return {
         "status": "success",
-        "message": f"Analysis completed for reading {target_reading.get('collection_id')}",
+        "message": f"Analysis completed for reading {analysis_results['reading_id']}",
         "analysis": analysis_results
     }
 
 
-def generate_report(tool_context: ToolContext, report_type: str = "summary") -> dict:
+def _raw_window(slots: np.ndarray, store, compiled: CompiledConstraints, current_time: str) -> Optional[dict]:
+    """Window analysis over raw readings (store slots, oldest first)"""
+    if not len(slots):
+        return None
+
+    values = store.values[slots]
+    timestamps = store.timestamps[slots]
+    online = (store.status[slots] == STATUS_ONLINE) & ~np.isnan(values)
+    mins, maxs, _ = compiled.bounds_for(store.sensors)
+    below, above = compiled.check(store.sensors, values, online)
+    violations = below | above
+    excursion = np.where(below, mins - values, np.where(above, values - maxs, 0.0))
+
+    below_counts = below.sum(axis=0)
+    above_counts = above.sum(axis=0)
+    offline_counts = (~online).sum(axis=0)
+    worst_rows = excursion.argmax(axis=0)
+    has_violation = violations.any(axis=0)
+    first_rows = violations.argmax(axis=0)
+    last_rows = len(slots) - 1 - violations[::-1].argmax(axis=0)
+
+    sensor_summaries = {}
+    for col, sensor in enumerate(store.sensors):
+        summary = {
+            "unit": store.units[sensor],
+            "min_constraint": None if np.isnan(mins[col]) else float(mins[col]),
+            "max_constraint": None if np.isnan(maxs[col]) else float(maxs[col]),
+            "violations": int(below_counts[col] + above_counts[col]),
+            "below_min": int(below_counts[col]),
+            "above_max": int(above_counts[col]),
+            "offline_readings": int(offline_counts[col]),
+            "first_violation": None,
+            "last_violation": None,
+            "worst_excursion": None,
+        }
+        if has_violation[col]:
+            worst = worst_rows[col]
+            summary["first_violation"] = format_timestamp(timestamps[first_rows[col]])
+            summary["last_violation"] = format_timestamp(timestamps[last_rows[col]])
+            summary["worst_excursion"] = {
+                "reading_id": store.ids[slots[worst]],
+                "timestamp": format_timestamp(timestamps[worst]),
+                "value": round(float(values[worst, col]), 2),
+                "exceeded_by": round(float(excursion[worst, col]), 2),
+                "direction": "below_min" if below[worst, col] else "above_max",
+            }
+        sensor_summaries[sensor] = summary
+
+    violating_readings = int(violations.any(axis=1).sum())
+    return {
+        "analysis_timestamp": current_time,
+        "tier": "raw",
+        "window_start": format_timestamp(timestamps[0]),
+        "window_end": format_timestamp(timestamps[-1]),
+        "first_reading_id": store.ids[slots[0]],
+        "last_reading_id": store.ids[slots[-1]],
+        "readings_analyzed": int(len(slots)),
+        "violating_readings": violating_readings,
+        "overall_status": "alert" if violating_readings else "normal",
+        "sensor_summaries": sensor_summaries,
+    }
+
+
+def _tier_window(tier: RollupTier, slots: np.ndarray, store, compiled: CompiledConstraints,
+                 current_time: str) -> Optional[dict]:
+    """
+    Window analysis over rollup buckets (tier slots, oldest first).
+
+    The window is widened to whole buckets, violation times are bucket start
+    times and the worst excursion comes from the bucket extremes, so it has
+    no reading id.
+    """
+    if not len(slots):
+        return None
+    n = len(store.sensors)
+    totals = tier.summarize(slots, n)
+    mins, maxs, _ = compiled.bounds_for(store.sensors)
+    starts = tier.bucket[slots] * tier.resolution
+
+    used = min(n, tier.columns)
+    violations = np.zeros((len(slots), n), dtype=bool)
+    violations[:, :used] = (tier.below[slots, :used] + tier.above[slots, :used]) > 0
+    has_violation = violations.any(axis=0)
+    first_rows = violations.argmax(axis=0)
+    last_rows = len(slots) - 1 - violations[::-1].argmax(axis=0)
+    with np.errstate(invalid="ignore"):
+        below_by = np.where(totals["below"] > 0, np.maximum(mins - totals["low"], 0.0), np.nan)
+        above_by = np.where(totals["above"] > 0, np.maximum(totals["high"] - maxs, 0.0), np.nan)
+
+    sensor_summaries = {}
+    for col, sensor in enumerate(store.sensors):
+        count = int(totals["count"][col])
+        summary = {
+            "unit": store.units[sensor],
+            "min_constraint": None if np.isnan(mins[col]) else float(mins[col]),
+            "max_constraint": None if np.isnan(maxs[col]) else float(maxs[col]),
+            "min": round(float(totals["low"][col]), 2) if count else None,
+            "max": round(float(totals["high"][col]), 2) if count else None,
+            "mean": round(float(totals["mean"][col]), 2) if count else None,
+            "violations": int(totals["below"][col] + totals["above"][col]),
+            "below_min": int(totals["below"][col]),
+            "above_max": int(totals["above"][col]),
+            "offline_readings": totals["readings"] - count,
+            "first_violation": None,
+            "last_violation": None,
+            "worst_excursion": None,
+        }
+        if has_violation[col]:
+            summary["first_violation"] = format_timestamp(starts[first_rows[col]])
+            summary["last_violation"] = format_timestamp(starts[last_rows[col]])
+            below_col = not np.isnan(below_by[col]) and (np.isnan(above_by[col]) or below_by[col] >= above_by[col])
+            if col < tier.columns:
+                extremes = tier.low[slots, col] if below_col else -tier.high[slots, col]
+                worst = int(extremes.argmin())
+                summary["worst_excursion"] = {
+                    "timestamp": format_timestamp(starts[worst]),
+                    "value": round(float(totals["low"][col] if below_col else totals["high"][col]), 2),
+                    "exceeded_by": round(float(below_by[col] if below_col else above_by[col]), 2),
+                    "direction": "below_min" if below_col else "above_max",
+                }
+        sensor_summaries[sensor] = summary
+
+    violating_readings = totals["violating"]
+    return {
+        "analysis_timestamp": current_time,
+        "tier": tier.name,
+        "window_start": format_timestamp(starts[0]),
+        "window_end": format_timestamp(starts[-1] + tier.resolution),
+        "readings_analyzed": totals["readings"],
+        "violating_readings": violating_readings,
+        "overall_status": "alert" if violating_readings else "normal",
+        "sensor_summaries": sensor_summaries,
+    }
+
+
+def analyze_reading_window(
+    tool_context: ToolContext,
+    last_n: Optional[int] = None,
+    last_minutes: Optional[float] = None,
+    start_time: Optional[str] = None,
+    end_time: Optional[str] = None,
+    reading_ids: Optional[list[str]] = None,
+) -> dict:
+    """
+    Check every reading in a window against constraints in one pass.
+
+    Args:
+        last_n: Analyze the newest N readings
+        last_minutes: Analyze readings from the last N minutes (e.g. 60 for "the last hour")
+        start_time: Window start, "YYYY-MM-DD HH:MM:SS"
+        end_time: Window end, "YYYY-MM-DD HH:MM:SS"
+        reading_ids: Analyze exactly these readings
+    With no arguments, every retained reading is analyzed. Windows reaching
+    past the raw retention period are answered from the 1-minute or 1-hour
+    rollups ("tier" in the result).
+    """
+    now = datetime.now()
+    current_time = now.strftime("%Y-%m-%d %H:%M:%S")
+
+    compiled = get_compiled_constraints(tool_context.session.id, tool_context.state)
+    store = get_reading_store(tool_context.session.id)
+    if not len(store):
+        return {
+            "status": "error",
+            "message": "No sensor readings available for analysis"
+        }
+
+    try:
+        start = parse_timestamp(start_time) if start_time else None
+        end = parse_timestamp(end_time) if end_time else None
+    except ValueError:
+        return {
+            "status": "error",
+            "message": "Times must be formatted as YYYY-MM-DD HH:MM:SS"
+        }
+    if last_minutes is not None:
+        window_start = now.timestamp() - last_minutes * 60
+        start = window_start if start is None else max(start, window_start)
+
+    # Long or old windows are answered from the rollup tiers; raw readings when they still cover it
+    rollups = get_rollups(tool_context.session.id, store, compiled)
+    tier = None
+    if last_n is None and reading_ids is None and start is not None:
+        tier = rollups.pick(start, now.timestamp() if end is None else end, _raw_oldest(store))
+
+    if tier is not None:
+        window_analysis = _tier_window(tier, tier.window_slots(start, end), store, compiled, current_time)
+    else:
+        slots = store.select(last_n=last_n, start=start, end=end, collection_ids=reading_ids)
+        window_analysis = _raw_window(slots, store, compiled, current_time)
+    if window_analysis is None:
+        return {
+            "status": "error",
+            "message": "No sensor readings in the requested window"
+        }
+    violating_readings = window_analysis["violating_readings"]
+
+    # Add to interaction history
+    append(tool_context, "interaction_history", {
+        "action": "window_analysis_performed",
+        "tier": window_analysis["tier"],
+        "readings_analyzed": window_analysis["readings_analyzed"],
+        "violating_readings": violating_readings,
+        "overall_status": window_analysis["overall_status"],
+        "timestamp": current_time
+    })
+
+    return {
+        "status": "success",
+        "message": (
+            f"Analyzed {window_analysis['readings_analyzed']} readings "
+            f"({window_analysis['window_start']} to {window_analysis['window_end']})"
+        ),
+        "analysis": window_analysis
+    }
+
+
+def _raw_period(period: dict, slots: np.ndarray, store, compiled: CompiledConstraints, trends: bool) -> dict:
+    """_report_period's statistics from raw readings, for windows they still cover"""
+    n = len(store.sensors)
+    values = store.values[slots]
+    timestamps = store.timestamps[slots]
+    online = (store.status[slots] == STATUS_ONLINE) & ~np.isnan(values)
+    below, above = compiled.check(store.sensors, values, online)
+    flagged = below | above
+    violations = flagged.sum(axis=0)
+    total = np.where(online, values, 0.0)
+    masked = np.where(online, values, np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = total.sum(axis=0) / online.sum(axis=0)
+    low, high = np.fmin.reduce(masked, axis=0), np.fmax.reduce(masked, axis=0)
+    # With many sensors only the ones that violated a limit are listed
+    cols = range(n) if n <= DETAILED_SENSOR_LIMIT else np.flatnonzero(violations)
+    period.update({
+        "tier": "raw",
+        "window_start": format_timestamp(timestamps[0]),
+        "readings": int(len(slots)),
+        "violating_readings": int(flagged.any(axis=1).sum()),
+        "sensors": {
+            store.sensors[col]: {
+                "mean": _optional(mean[col]),
+                "min": _optional(low[col]),
+                "max": _optional(high[col]),
+                "violations": int(violations[col]),
+            }
+            for col in cols
+        },
+    })
+    if trends:
+        # Runs of consecutive readings stand in for a tier's buckets
+        starts = np.arange(0, len(slots), -(-len(slots) // TREND_POINTS))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            run_mean = np.add.reduceat(total, starts, axis=0) / np.add.reduceat(online, starts, axis=0)
+        run_low, run_high = np.fmin.reduceat(masked, starts, axis=0), np.fmax.reduceat(masked, starts, axis=0)
+        run_violations = np.add.reduceat(flagged, starts, axis=0).T.tolist()
+        # Each run's time is shared by every sensor; format and round once, not per point
+        times = [format_timestamp(first) for first in timestamps[starts].tolist()]
+        present = ~np.isnan(run_mean.T)
+        run_mean, run_low, run_high = (np.round(run, 2).T.tolist() for run in (run_mean, run_low, run_high))
+        period["trends"] = {
+            store.sensors[col]: [
+                {
+                    "time": times[i],
+                    "mean": run_mean[col][i],
+                    "min": run_low[col][i],
+                    "max": run_high[col][i],
+                    "violations": run_violations[col][i],
+                }
+                for i in np.flatnonzero(present[col]).tolist()
+            ]
+            for col in cols
+        }
+    return period
+
+
+def _report_period(rollups, store, compiled: CompiledConstraints, hours: float, now: float,
+                   trends: bool) -> dict:
+    """
+    Per-sensor statistics for the last `hours`.
+
+    Raw readings answer while they still cover the window, the coarsest
+    rollup tier that answers it once they don't.
+    """
+    start = now - hours * 3600
+    period = {"period_hours": hours, "tier": None, "readings": 0}
+    if rollups is None:
+        return period
+    tier = rollups.pick(start, now, _raw_oldest(store))
+    if tier is None:
+        slots = store.select(start=start, end=now)
+        return _raw_period(period, slots, store, compiled, trends) if len(slots) else period
+    slots = tier.window_slots(start, now)
+    if not len(slots):
+        return period
+
+    n = len(store.sensors)
+    totals = tier.summarize(slots, n)
+    violations = totals["below"] + totals["above"]
+    # With many sensors only the ones that violated a limit are listed
+    cols = range(n) if n <= DETAILED_SENSOR_LIMIT else np.flatnonzero(violations)
+    period.update({
+        "tier": tier.name,
+        "window_start": format_timestamp(tier.bucket[slots[0]] * tier.resolution),
+        "readings": totals["readings"],
+        "violating_readings": totals["violating"],
+        "sensors": {
+            store.sensors[col]: {
+                "mean": _optional(totals["mean"][col]),
+                "min": _optional(totals["low"][col]) if totals["count"][col] else None,
+                "max": _optional(totals["high"][col]) if totals["count"][col] else None,
+                "violations": int(violations[col]),
+            }
+            for col in cols
+        },
+    })
+    if trends:
+        period["trends"] = {store.sensors[col]: tier.series(slots, col, TREND_POINTS) for col in cols}
+    return period
+
+
+def _raw_trend_inputs(slots: np.ndarray, store, compiled: CompiledConstraints) -> tuple:
+    """compute_trends arrays for raw readings: offline values are NaN, each reading violates fully or not at all"""
+    timestamps = store.timestamps[slots]
+    values = store.values[slots]
+    online = (store.status[slots] == STATUS_ONLINE) & ~np.isnan(values)
+    below, above = compiled.check(store.sensors, values, online)
+    return (timestamps, reading_durations(timestamps), np.where(online, values, np.nan),
+            (below | above).astype(np.float64))
+
+
+def _tier_trend_inputs(tier: RollupTier, slots: np.ndarray, columns: int) -> tuple:
+    """
+    compute_trends arrays for rollup buckets.
+
+    Each bucket contributes its mean, so percentiles and slope are over bucket
+    means, and the share of its readings that violated a limit stands for the
+    share of its time in violation.
+    """
+    used = min(columns, tier.columns)
+    values = np.full((len(slots), columns), np.nan)
+    violated = np.zeros((len(slots), columns))
+    count = tier.count[slots, :used]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        values[:, :used] = np.where(count > 0, tier.total[slots, :used] / count, np.nan)
+        violated[:, :used] = np.where(
+            count > 0, np.minimum((tier.below[slots, :used] + tier.above[slots, :used]) / count, 1.0), 0.0
+        )
+    return tier.bucket[slots] * tier.resolution, np.full(len(slots), float(tier.resolution)), values, violated
+
+
+async def _trend_report(rollups, store, compiled: CompiledConstraints, hours: float, now: float) -> dict:
+    """Per-sensor trend statistics for the last `hours`, from raw readings while they cover the window"""
+    start = now - hours * 3600
+    trends = {"period_hours": hours, "tier": None, "rows": 0, "sensors": {}}
+    if rollups is None:
+        return trends
+    tier = rollups.pick(start, now, _raw_oldest(store))
+    n = len(store.sensors)
+    if tier is None:
+        slots = store.select(start=start, end=now)
+    else:
+        slots = tier.window_slots(start, now)
+    if len(slots) < MIN_TREND_ROWS:
+        # An empty window renders as "no readings"; a lone row has no spread to measure
+        trends["rows"] = int(len(slots))
+        if len(slots):
+            trends["message"] = f"Not enough readings for trends (1 in the last {hours} hours)"
+        return trends
+    inputs = _raw_trend_inputs(slots, store, compiled) if tier is None else _tier_trend_inputs(tier, slots, n)
+
+    stats, computed = await run_trends(*inputs)
+    timestamps, durations = inputs[0], inputs[1]
+    # With many sensors only the ones that spent time in violation are listed
+    cols = range(n) if n <= DETAILED_SENSOR_LIMIT else np.flatnonzero(stats["violation_seconds"] > 0)
+    trends.update({
+        "tier": "raw" if tier is None else tier.name,
+        "window_start": format_timestamp(timestamps[0]),
+        "window_end": format_timestamp(timestamps[-1] + durations[-1]),
+        "rows": int(len(slots)),
+        "computed": computed,
+        "sensors": {
+            store.sensors[col]: {
+                "unit": store.units[store.sensors[col]],
+                "samples": int(stats["samples"][col]),
+                "mean": _optional(stats["mean"][col]),
+                "percentiles": {
+                    f"p{q}": _optional(stats["percentiles"][i, col]) for i, q in enumerate(TREND_PERCENTILES)
+                },
+                "slope_per_hour": _optional(stats["slope_per_hour"][col], 4),
+                "time_in_violation_seconds": _optional(stats["violation_seconds"][col], 1),
+                "time_in_violation_pct": _optional(stats["violation_fraction"][col] * 100),
+                "excursions": int(stats["excursions"][col]),
+                "excursions_per_hour": _optional(stats["excursions_per_hour"][col], 3),
+                "mean_time_between_excursions_seconds": _optional(stats["mean_seconds_between"][col], 1),
+            }
+            for col in cols
+        },
+    })
+    return trends
+
+
+async def generate_report(tool_context: ToolContext, report_type: str = "summary",
+                          period_hours: Optional[float] = None) -> dict:
     """
     Generate a comprehensive report of sensor monitoring status.
 
     Args:
-        report_type: Type of report ("summary", "detailed", "alerts")
+        report_type: Type of report ("summary", "detailed", "alerts", "trends")
+        period_hours: Add per-sensor statistics for the last N hours (e.g. 168 for
+            "the last week"); detailed reports cover the last 24 hours by default.
+            For a trends report, the window the trends cover (default 1 hour)
     """
-    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    now = datetime.now()
+    current_time = now.strftime("%Y-%m-%d %H:%M:%S")
 
-    # Get data from state
+    # Get data from state; history is only reached through the aggregates
     constraints = tool_context.state.get("constraints", {})
-    all_readings = tool_context.state.get("sensor_readings", [])
-    all_analyses = tool_context.state.get("analysis_results", [])
+    store = get_reading_store(tool_context.session.id)
+    compiled = get_compiled_constraints(tool_context.session.id, tool_context.state)
+    # Nothing to fold or evict before the first reading
+    rollups = get_rollups(tool_context.session.id, store, compiled) if len(store) else None
+    aggregates = tool_context.state.get("report_aggregates") or empty_aggregates()
+    latest = latest_analysis(aggregates, tool_context.state.get("analysis_results", []))
     monitoring_status = tool_context.state.get("monitoring_status", "inactive")
+    alerts = get_alert_manager(tool_context.session.id, tool_context.state)
 
     report = {
         "report_type": report_type,
@@ -147,49 +757,62 @@ def generate_report(tool_context: ToolContext, report_type: str = "summary") ->
             1 for c in constraints.values() 
             if c.get("min") is not None or c.get("max") is not None
         ),
-        "total_readings": len(all_readings),
-        "total_analyses": len(all_analyses),
+        "total_readings": store.collected,
+        "total_analyses": aggregates["total_analyses"],
         "summary": {}
     }
 
     if report_type == "summary":
         # Basic summary information
-        if all_analyses:
-            latest_analysis = all_analyses[-1]
+        if latest:
             report["summary"] = {
-                "latest_status": latest_analysis.get("overall_status", "unknown"),
-                "current_alerts": len(latest_analysis.get("alerts", [])),
-                "last_reading_time": latest_analysis.get("timestamp", "unknown")
+                "latest_status": latest.get("overall_status", "unknown"),
+                "current_alerts": len(alerts),
+                "last_reading_time": latest.get("timestamp", "unknown"),
+                "status_counts": aggregates["status_counts"],
             }
 
     elif report_type == "detailed":
         # Detailed information including trends
         report["constraints"] = constraints
 
-        if all_readings:
-            latest_reading = all_readings[-1]
+        latest_reading = store.latest()
+        if latest_reading:
             report["latest_readings"] = latest_reading.get("readings", {})
 
-        if all_analyses:
-            latest_analysis = all_analyses[-1]
-            report["latest_analysis"] = latest_analysis
+        if latest:
+            report["latest_analysis"] = latest
 
-        # Alert summary
-        all_alerts = []
-        for analysis in all_analyses:
-            all_alerts.extend(analysis.get("alerts", []))
-        report["alert_history"] = all_alerts[-10:]  # Last 10 alerts
+        report["status_counts"] = aggregates["status_counts"]
+        report["sensor_violations"] = aggregates["sensor_violations"]
+        report["total_alerts"] = aggregates["total_alerts"]
+        report["alert_history"] = recent_alerts(aggregates, 10)  # Last 10 alerts
+        report["active_alerts"] = [alert_summary(incident) for incident in alerts.active_alerts()]
 
     elif report_type == "alerts":
         # Focus on alerts and violations
-        active_alerts = []
-        if all_analyses:
-            latest_analysis = all_analyses[-1]
-            active_alerts = latest_analysis.get("alerts", [])
-
-        report["active_alerts"] = active_alerts
-        report["recommendations"] = (
-            latest_analysis.get("recommendations", []) if all_analyses else []
+        report["active_alerts"] = [alert_summary(incident) for incident in alerts.active_alerts()]
+        report["recently_cleared"] = [
+            {**alert_summary(incident), "cleared_at": incident["cleared_at"]}
+            for incident in list(alerts.resolved)[-10:]
+        ]
+        report["alert_stats"] = dict(alerts.stats)
+        report["recommendations"] = latest.get("recommendations", []) if latest else []
+        report["sensor_violations"] = aggregates["sensor_violations"]
+
+    elif report_type == "trends":
+        # Percentiles, slope and excursion statistics; large windows go to the process pool
+        report["trends"] = await _trend_report(
+            rollups, store, compiled, period_hours or DEFAULT_TRENDS_PERIOD_HOURS, now.timestamp()
+        )
+        period_hours = None
+
+    # Long-range statistics; from the rollup tiers once raw readings no longer cover the period
+    if period_hours is None and report_type == "detailed":
+        period_hours = DEFAULT_DETAILED_PERIOD_HOURS
+    if period_hours is not None:
+        report["period"] = _report_period(
+            rollups, store, compiled, period_hours, now.timestamp(), trends=report_type == "detailed"
         )
 
     return {
@@ -199,57 +822,121 @@ def generate_report(tool_context: ToolContext, report_type: str = "summary") ->
     }
 
 
-# Create the analysis agent
-analysis_agent = Agent(
-    name="analysis_agent",
-    model="gemini-2.0-flash",
-    description="Agent for analyzing sensor readings against constraints",
-    instruction="""
-    You are the analysis agent for a sensor monitoring system.
-    Your role is to analyze sensor readings against established constraints and provide insights.
-
-    <user_info>
-    Name: {user_name}
-    </user_info>
-
-    <current_constraints>
-    {constraints}
-    </current_constraints>
-
-    <recent_readings>
-    Recent Readings: {sensor_readings}
-    </recent_readings>
-
-    <analysis_results>
-    Previous Analyses: {analysis_results}
-    </analysis_results>
-
-    When users request analysis:
-    1. Use analyze_readings to compare latest readings against constraints
-    2. Can analyze specific reading by ID or latest reading
-    3. Identify constraint violations clearly
-    4. Provide actionable recommendations
-    5. Track offline sensors
-
-    When users request reports:
-    1. Use generate_report to create comprehensive summaries
-    2. Available report types: summary, detailed, alerts
-    3. Include trends and patterns when possible
-    4. Highlight critical issues prominently
-
-    Analysis capabilities:
-    - Compare readings against min/max constraints
-    - Identify constraint violations with specific values
-    - Track sensor health (online/offline status)
-    - Generate alerts for out-of-range conditions
-    - Provide recommendations for corrective action
-
-    Always:
-    - Be clear about constraint violations
-    - Explain the severity of issues
-    - Provide specific values and thresholds
-    - Suggest next steps when problems are found
-    - Acknowledge when everything is normal
-    """,
-    tools=[analyze_readings, generate_report],
-)
+async def verify_report_aggregates(tool_context: ToolContext, repair: bool = False) -> dict:
+    """
+    Check the running report aggregates against a rebuild from the full analysis history.
+
+    Args:
+        repair: Replace the aggregates with the rebuilt ones if they differ
+    """
+    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    aggregates = tool_context.state.get("report_aggregates")
+    analyses = tool_context.state.get("analysis_results", [])
+
+    # Row-backed session services only load recent analyses into state
+    if aggregates and len(analyses) < aggregates["total_analyses"]:
+        session = tool_context.session
+        session_service = tool_context.get_invocation_context().session_service
+        if hasattr(session_service, "trimmed_rows"):
+            trimmed = (await session_service.trimmed_rows(session.app_name, session.user_id, session.id)).get("analyses")
+            if trimmed:
+                return {
+                    "status": "error",
+                    "message": (
+                        f"{trimmed['rows']} analyses before {format_timestamp(trimmed['before'])} were trimmed "
+                        "by the retention policy; the aggregates can't be rebuilt from what is left"
+                    )
+                }
+        if hasattr(session_service, "analysis_history"):
+            analyses = await session_service.analysis_history(session.app_name, session.user_id, session.id)
+
+    result = check_aggregates(aggregates, analyses)
+
+    repaired = False
+    if repair and not result["consistent"]:
+        tool_context.state["report_aggregates"] = result["rebuilt"]
+        repaired = True
+
+    return {
+        "status": "success",
+        "message": (
+            "Report aggregates match analysis history" if result["consistent"]
+            else f"Report aggregates differ from analysis history in: {', '.join(result['mismatches'])}"
+        ),
+        "consistent": result["consistent"],
+        "mismatches": result["mismatches"],
+        "analyses_checked": len(analyses),
+        "repaired": repaired,
+        "timestamp": current_time
+    }
+
+
+def build_analysis_agent() -> Agent:
+    """The analysis agent; replay.py and the local parser only need its tools"""
+    return Agent(
+        name="analysis_agent",
+        model="gemini-2.0-flash",
+        description="Agent for analyzing sensor readings against constraints",
+        instruction=context_instruction("""
+        You are the analysis agent for a sensor monitoring system.
+        Your role is to analyze sensor readings against established constraints and provide insights.
+
+        <user_info>
+        Name: {user_name}
+        </user_info>
+
+        <current_constraints>
+        {constraints}
+        </current_constraints>
+
+        <recent_readings>
+        Recent Readings: {sensor_readings}
+        </recent_readings>
+
+        <analysis_results>
+        Previous Analyses: {analysis_results}
+        </analysis_results>
+
+        When users request analysis:
+        1. Use analyze_readings to compare latest readings against constraints
+        2. Can analyze specific reading by ID or latest reading
+        3. Use analyze_reading_window to check many readings at once
+           (last N readings, last N minutes, a time range or a list of IDs);
+           prefer it over repeated analyze_readings calls for "the last hour" style requests.
+           Raw readings are kept for an hour; older windows are summarized from
+           1-minute and 1-hour rollups
+        4. Identify constraint violations clearly
+        5. Provide actionable recommendations
+        6. Track offline sensors
+
+        When users request reports:
+        1. Use generate_report to create comprehensive summaries
+        2. Available report types: summary, detailed, alerts, trends
+        3. Include trends and patterns when possible; pass period_hours for
+           questions about the last day, week or month (detailed reports include
+           a 24 hour trend by default). The trends report gives per-sensor
+           percentiles, slope per hour, time in violation, excursion frequency
+           and mean time between excursions over period_hours (default 1 hour)
+        4. Highlight critical issues prominently
+        5. Use verify_report_aggregates if report totals look inconsistent with the analysis history
+
+        Analysis capabilities:
+        - Compare readings against min/max constraints
+        - Identify constraint violations with specific values
+        - Track sensor health (online/offline status)
+        - Generate alerts for out-of-range conditions; a condition that persists
+          is one alert incident, so analyze_readings lists only alerts just raised
+          or cleared and the alerts report lists every incident still active
+        - Flag spikes (z-score), slow drifts (CUSUM) and sensors heading for a limit
+          (rate of change), reported as a "warning" status before any limit is crossed
+        - Provide recommendations for corrective action
+
+        Always:
+        - Be clear about constraint violations
+        - Explain the severity of issues
+        - Provide specific values and thresholds
+        - Suggest next steps when problems are found
+        - Acknowledge when everything is normal
+        """),
+        tools=[analyze_readings, analyze_reading_window, generate_report, verify_report_aggregates],
+    )
@@ -1,37 +1,87 @@
 from datetime import datetime
 from typing import Optional
+
 from google.adk.agents import Agent
 from google.adk.tools.tool_context import ToolContext
 
-def set_constraint(tool_context: ToolContext, sensor_type: str, min_value: Optional[float] = None, max_value: Optional[float] = None) -> dict:
+from ...constraints import get_compiled_constraints, resolve_tag
+from ...rollups import fold_pending
+from ...state_ops import append, increment, set_field
+from ...store import SENSOR_UNITS, find_reading_store, get_reading_store
+
+def _known_tags(tool_context: ToolContext, constraints: dict) -> list:
+    store = get_reading_store(tool_context.session.id)
+    return [*constraints, *SENSOR_UNITS, *store.sensors]
+
+def _bump_constraints_version(tool_context: ToolContext) -> None:
+    """Mark the constraints as changed and recompile them, so rollups fold new readings against the new limits"""
+    # Readings still waiting to be folded were taken under the old limits
+    store = find_reading_store(tool_context.session.id)
+    if store is not None:
+        fold_pending(tool_context.session.id, store)
+    increment(tool_context, "constraints_version")
+    get_compiled_constraints(tool_context.session.id, tool_context.state)
+
+def set_constraint(tool_context: ToolContext, sensor_type: str, min_value: Optional[float] = None,
+                   max_value: Optional[float] = None, unit: Optional[str] = None) -> dict:
+    """
+    Set min and/or max limits for a sensor tag.
+
+    Args:
+        sensor_type: Sensor tag, e.g. "temperature" or "KILN1.TT-101"
+        min_value: Lower limit, or None to leave it unchanged
+        max_value: Upper limit, or None to leave it unchanged
+        unit: Unit for a new tag, e.g. "C"
+    """
     current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    valid_sensors = ["temperature", "feeder_rate", "vibration"]
-    
-    if sensor_type.lower() not in valid_sensors:
-        return {"status": "error", "message": f"Invalid sensor type. Must be one of: {', '.join(valid_sensors)}"}
-    
-    sensor_type = sensor_type.lower()
     current_constraints = tool_context.state.get("constraints", {})
-    
-    if sensor_type not in current_constraints:
-        current_constraints[sensor_type] = {"min": None, "max": None, "unit": ""}
-    
+
+    tag = resolve_tag(sensor_type, _known_tags(tool_context, current_constraints))
+    if tag is None:
+        return {
+            "status": "error",
+            "message": "Invalid sensor tag. Use letters, digits and _ . : / - (up to 128 characters)."
+        }
+    sensor_type = tag
+
+    existing = current_constraints.get(sensor_type, {})
+    new_min = existing.get("min") if min_value is None else min_value
+    new_max = existing.get("max") if max_value is None else max_value
+    if new_min is not None and new_max is not None and new_min > new_max:
+        return {
+            "status": "error",
+            "message": f"Minimum ({new_min}) is above maximum ({new_max}) for {sensor_type}"
+        }
+
+    if existing:
+        constraint = dict(existing)
+    else:
+        default_unit = get_reading_store(tool_context.session.id).units.get(sensor_type, "")
+        constraint = {
+            "min": None,
+            "max": None,
+            "unit": SENSOR_UNITS.get(sensor_type, default_unit),
+        }
+
     if min_value is not None:
-        current_constraints[sensor_type]["min"] = min_value
+        constraint["min"] = min_value
     if max_value is not None:
-        current_constraints[sensor_type]["max"] = max_value
-    
-    tool_context.state["constraints"] = current_constraints
+        constraint["max"] = max_value
+    if unit:
+        constraint["unit"] = unit
+
+    # Only this tag's entry goes into the state delta
+    if constraint != existing:
+        set_field(tool_context, "constraints", sensor_type, constraint)
+        _bump_constraints_version(tool_context)
     
-    current_history = tool_context.state.get("interaction_history", [])
-    current_history.append({
+    append(tool_context, "interaction_history", {
         "action": "constraint_set",
         "sensor_type": sensor_type,
         "min_value": min_value,
         "max_value": max_value,
         "timestamp": current_time
     })
-    tool_context.state["interaction_history"] = current_history
     
     return {
         "status": "success",
@@ -45,38 +95,48 @@ def set_constraint(tool_context: ToolContext, sensor_type: str, min_value: Optio
 def clear_constraints(tool_context: ToolContext, sensor_type: Optional[str] = None) -> dict:
     current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     current_constraints = tool_context.state.get("constraints", {})
+    changed = False
     
     if sensor_type:
-        if sensor_type.lower() in current_constraints:
-            current_constraints[sensor_type.lower()] = {"min": None, "max": None, "unit": current_constraints[sensor_type.lower()].get("unit", "")}
-            message = f"Cleared constraints for {sensor_type}"
-        else:
+        tag = resolve_tag(sensor_type, current_constraints)
+        if tag not in current_constraints:
             return {"status": "error", "message": f"No constraints found for {sensor_type}"}
+        tags = [tag]
+        message = f"Cleared constraints for {tag}"
     else:
-        for sensor in current_constraints:
-            current_constraints[sensor]["min"] = None
-            current_constraints[sensor]["max"] = None
+        tags = list(current_constraints)
         message = "Cleared all sensor constraints"
+
+    # Tags that were already unconstrained stay out of the delta
+    for tag in tags:
+        constraint = current_constraints[tag]
+        if constraint.get("min") is not None or constraint.get("max") is not None:
+            set_field(tool_context, "constraints", tag, {**constraint, "min": None, "max": None})
+            changed = True
+    if changed:
+        _bump_constraints_version(tool_context)
     
-    tool_context.state["constraints"] = current_constraints
-    
-    current_history = tool_context.state.get("interaction_history", [])
-    current_history.append({"action": "constraints_cleared", "sensor_type": sensor_type, "timestamp": current_time})
-    tool_context.state["interaction_history"] = current_history
+    append(tool_context, "interaction_history",
+           {"action": "constraints_cleared", "sensor_type": sensor_type, "timestamp": current_time})
     
     return {"status": "success", "message": message, "timestamp": current_time}
 
-constraint_agent = Agent(
-    name="constraint_agent",
-    model="gemini-2.0-flash", 
-    description="Agent for setting and managing sensor monitoring constraints",
-    instruction="""You are the constraint management agent for a sensor monitoring system.
-    
-    Available sensors: Temperature (°C), Feeder_rate (kg/h), Vibration (mm/s)
-    
-    Use set_constraint tool to set min/max values for sensors.
-    Use clear_constraints tool to clear constraints for specific sensors or all.
-    
-    Always confirm constraint changes and explain monitoring implications.""",
-    tools=[set_constraint, clear_constraints],
-)
\ No newline at end of file
+
+def build_constraint_agent() -> Agent:
+    """The constraint agent, built when the root agent tree is"""
+    return Agent(
+        name="constraint_agent",
+        model="gemini-2.0-flash", 
+        description="Agent for setting and managing sensor monitoring constraints",
+        instruction="""You are the constraint management agent for a sensor monitoring system.
+        
+        Default sensors: Temperature (°C), Feeder_rate (kg/h), Vibration (mm/s)
+        Any other plant sensor tag (e.g. KILN1.TT-101) can be constrained too; pass its unit
+        the first time it is set.
+        
+        Use set_constraint tool to set min/max values for sensors.
+        Use clear_constraints tool to clear constraints for specific sensors or all.
+        
+        Always confirm constraint changes and explain monitoring implications.""",
+        tools=[set_constraint, clear_constraints],
+    )
@@ -1,87 +1,292 @@
 import random
 from datetime import datetime
+from typing import Optional
+
 from google.adk.agents import Agent
 from google.adk.tools.tool_context import ToolContext
 
-def collect_sensor_reading(tool_context: ToolContext) -> dict:
-    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
-    readings = {
-        "temperature": {
-            "value": round(random.uniform(900.0, 1300.0), 2),
-            "unit": "C",
-            "timestamp": current_time,
-            "status": "online",
-        },
-        "feeder_rate": {
-            "value": round(random.uniform(30.0, 180.0), 2),
-            "unit": "kg/h",
-            "timestamp": current_time,
-            "status": "online",
-        },
-        "vibration": {
-            "value": round(random.uniform(5.0, 25.0), 2),
-            "unit": "mm/s",
-            "timestamp": current_time,
-            "status": "online",
-        },
-    }
+from ...ingestion import (
+    FileTailAdapter,
+    ModbusPollAdapter,
+    ModbusTcpSimulator,
+    TcpFeedAdapter,
+    UdpFeedAdapter,
+    feed_active,
+    ingestion_stats,
+    start_adapter,
+    stop_adapters,
+)
+from ...loadgen import SYNTHETIC_RANGES, get_load_generator
+from ...scheduler import DEFAULT_SAMPLE_RATES, start_scheduler, stop_scheduler
+from ...store import get_reading_store
+from ..analysis_agent.agent import analyze_readings
+
+def synthetic_value(sensor: str) -> float:
+    low, high = SYNTHETIC_RANGES[sensor]
+    return round(random.uniform(low, high), 2)
+
+def record_sensor_sample(tool_context: ToolContext, values: dict, timestamp: Optional[float] = None) -> dict:
+    """
+    Store one set of sensor values in the session's reading store.
+
+    Args:
+        values: sensor -> value, None for a sensor that is offline
+        timestamp: epoch seconds of the sample, defaults to now
+    """
+    now = datetime.now() if timestamp is None else datetime.fromtimestamp(timestamp)
+    current_time = now.strftime("%Y-%m-%d %H:%M:%S")
 
-    current_readings = tool_context.state.get("sensor_readings", [])
-    reading_entry = {
+    store = get_reading_store(tool_context.session.id)
+    collection_id = store.append(values, timestamp=now.timestamp())
+    readings = store.get(collection_id)["readings"]
+    tool_context.state["sensor_readings"] = store.summary()
+
+    return {
+        "status": "success",
+        "message": "Sensor readings recorded.",
         "readings": readings,
         "timestamp": current_time,
-        "collection_id": f"reading_{len(current_readings) + 1}"
+        "collection_id": collection_id,
     }
-    current_readings.append(reading_entry)
-    tool_context.state["sensor_readings"] = current_readings
+
+def collect_sensor_reading(tool_context: ToolContext) -> dict:
+    store = get_reading_store(tool_context.session.id)
+    if feed_active(tool_context.session.id) and len(store):
+        # An ingestion feed is filling the store; report its newest reading
+        latest = store.latest()
+        tool_context.state["sensor_readings"] = store.summary()
+        return {
+            "status": "success",
+            "message": "Latest ingested sensor readings.",
+            "readings": latest["readings"],
+            "timestamp": latest["timestamp"],
+            "collection_id": latest["collection_id"],
+        }
+
+    # One row of the session's seeded load: correlated, drifting, with occasional faults
+    values = get_load_generator(tool_context.session.id).sample()
+    result = record_sensor_sample(tool_context, values)
     
     # Optionally, log
-    print(f"Synthetic sensor data collected at {current_time}")
+    print(f"Synthetic sensor data collected at {result['timestamp']}")
     
+    result["message"] = "Synthetic sensor readings collected."
+    return result
+
+def load_sampler(session_id: str):
+    """
+    Per-sensor sample function backed by the session's load generator.
+
+    Each sensor reads its value from the generator's current row; a sensor
+    asking again (it samples faster than the others) moves everyone on to
+    the next row.
+    """
+    generator = get_load_generator(session_id)
+    row, taken = {}, set()
+
+    def sample(sensor: str) -> Optional[float]:
+        nonlocal row
+        if sensor in taken or not row:
+            row = generator.sample()
+            taken.clear()
+        taken.add(sensor)
+        return row.get(sensor)
+
+    return sample
+
+async def start_monitoring_scheduler(session_service, app_name, user_id, session_id, config):
+    """Start the background scheduler for a session from a monitoring_config dict"""
+    return await start_scheduler(
+        session_service, app_name, user_id, session_id,
+        analyze_tool=analyze_readings,
+        sample_fn=load_sampler(session_id),
+        sample_rates=config["sample_rates"],
+        analysis_interval=config["analysis_interval"],
+    )
+
+async def start_monitoring(tool_context: ToolContext, sample_rate_hz: Optional[float] = None,
+                           analysis_interval_seconds: float = 1.0) -> dict:
+    """
+    Start continuous monitoring: sample every sensor in the background and analyze each sample.
+
+    Args:
+        sample_rate_hz: Samples per second for every sensor, or None for the per-sensor defaults
+        analysis_interval_seconds: Seconds between constraint analyses
+    """
+    if sample_rate_hz is not None and sample_rate_hz <= 0:
+        return {"status": "error", "message": "sample_rate_hz must be positive"}
+    if analysis_interval_seconds <= 0:
+        return {"status": "error", "message": "analysis_interval_seconds must be positive"}
+
+    if sample_rate_hz is None:
+        sample_rates = dict(DEFAULT_SAMPLE_RATES)
+    else:
+        sample_rates = {sensor: sample_rate_hz for sensor in DEFAULT_SAMPLE_RATES}
+    config = {"sample_rates": sample_rates, "analysis_interval": analysis_interval_seconds}
+
+    session = tool_context.session
+    await start_monitoring_scheduler(
+        tool_context.get_invocation_context().session_service,
+        session.app_name, session.user_id, session.id, config,
+    )
+    tool_context.state["monitoring_status"] = "active"
+    tool_context.state["monitoring_config"] = config
+
     return {
         "status": "success",
-        "message": "Synthetic sensor readings collected.",
-        "readings": readings,
-        "timestamp": current_time,
-        "collection_id": reading_entry["collection_id"],
+        "message": f"Monitoring started; analyzing every {analysis_interval_seconds}s.",
+        "config": config,
     }
 
-# Create the sensor agent
-sensor_agent = Agent(
-    name="sensor_agent",
-    model="gemini-2.0-flash",
-    description="""
-    You are the sensor data collection agent for an industrial monitoring system. 
-    Your responsibility is to autonomously collect and manage sensor readings for multiple sensor types.
-
-    <user_info>
-    Name: {user_name}
-    </user_info>
-
-    <monitoring_status>
-    Status: {monitoring_status}
-    </monitoring_status>
-
-    <recent_readings>
-    Recent Sensor Readings: {sensor_readings}
-    </recent_readings>
-
-    Supported Sensors:
-    - Temperature (°C)
-    - Feeder Rate (kg/h)
-    - Vibration (mm/s)
-
-    When requested, generate synthetic readings for one or all sensors.
-    Store all readings with timestamps in the shared system state.
-
-    Always:
-    - Provide values clearly with units.
-    - Indicate sensor online/offline status.
-    - Alert if any sensor is offline.
-    - Clearly communicate monitoring status changes.
-
-    Note: Currently generating synthetic sensor data for testing. Production will integrate with real sensor APIs.
-    """,
-    tools=[collect_sensor_reading],
-)
+async def stop_monitoring(tool_context: ToolContext) -> dict:
+    """Stop continuous monitoring"""
+    stats = await stop_scheduler(tool_context.session.id)
+    tool_context.state["monitoring_status"] = "inactive"
+    if stats is None:
+        return {"status": "success", "message": "Monitoring was not running."}
+    return {
+        "status": "success",
+        "message": "Monitoring stopped.",
+        "stats": stats,
+    }
+
+def _host_port(target: str, default_port: int) -> tuple:
+    host, _, port = target.rpartition(":")
+    if not port:
+        return host or "127.0.0.1", default_port
+    return host or "127.0.0.1", int(port)
+
+async def start_ingestion(tool_context: ToolContext, source: str, target: str = "", fmt: str = "line",
+                          from_start: bool = False) -> dict:
+    """
+    Start feeding readings into the store from an external source.
+
+    Args:
+        source: "file" (tail a file), "udp" or "tcp" (listen on a local socket), "modbus" (poll a
+                Modbus-TCP device) or "modbus_sim" (poll a local simulated Modbus-TCP device)
+        target: file path for "file"; "host:port" (or ":port") for the others, empty for the default port
+        fmt: "line" (line protocol) or "csv", for file and socket sources
+        from_start: for "file", also read what the file already contains
+    """
+    store = get_reading_store(tool_context.session.id)
+    try:
+        if source == "file":
+            if not target:
+                return {"status": "error", "message": "A file path is required for file ingestion"}
+            adapter = FileTailAdapter(store, target, fmt=fmt, from_start=from_start)
+        elif source == "udp":
+            host, port = _host_port(target, 8089)
+            adapter = UdpFeedAdapter(store, host, port, fmt=fmt)
+        elif source == "tcp":
+            host, port = _host_port(target, 8094)
+            adapter = TcpFeedAdapter(store, host, port, fmt=fmt)
+        elif source == "modbus":
+            host, port = _host_port(target, 502)
+            adapter = ModbusPollAdapter(store, list(SYNTHETIC_RANGES), host, port)
+        elif source == "modbus_sim":
+            host, port = _host_port(target, 5020)
+            simulator = ModbusTcpSimulator(list(SYNTHETIC_RANGES), synthetic_value, host, port)
+            adapter = ModbusPollAdapter(store, list(SYNTHETIC_RANGES), simulator=simulator)
+        else:
+            return {
+                "status": "error",
+                "message": f"Unknown source {source!r}; use file, udp, tcp, modbus or modbus_sim",
+            }
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+
+    await start_adapter(tool_context.session.id, adapter)
+    return {
+        "status": "success",
+        "message": f"Started {source} ingestion.",
+        "source": adapter.source,
+        "target": target,
+        "format": adapter.fmt,
+    }
+
+async def stop_ingestion(tool_context: ToolContext, source: Optional[str] = None) -> dict:
+    """
+    Stop ingestion feeds.
+
+    Args:
+        source: "file", "udp", "tcp" or "modbus" to stop one feed, or None to stop all
+    """
+    stopped = await stop_adapters(tool_context.session.id, source)
+    store = get_reading_store(tool_context.session.id)
+    tool_context.state["sensor_readings"] = store.summary()
+    if not stopped:
+        return {"status": "success", "message": "No ingestion feed was running."}
+    return {
+        "status": "success",
+        "message": f"Stopped {', '.join(stopped)} ingestion.",
+        "stats": stopped,
+    }
+
+def ingestion_status(tool_context: ToolContext) -> dict:
+    """Throughput and lag counters of the session's ingestion feeds"""
+    store = get_reading_store(tool_context.session.id)
+    tool_context.state["sensor_readings"] = store.summary()
+    stats = ingestion_stats(tool_context.session.id)
+    return {
+        "status": "success",
+        "message": f"{len(stats)} ingestion feed(s).",
+        "feeds": stats,
+        "readings_collected": store.collected,
+    }
+
+
+def build_sensor_agent() -> Agent:
+    """The sensor agent; the pipeline and scheduler only use its tools"""
+    return Agent(
+        name="sensor_agent",
+        model="gemini-2.0-flash",
+        description="""
+        You are the sensor data collection agent for an industrial monitoring system. 
+        Your responsibility is to autonomously collect and manage sensor readings for multiple sensor types.
+
+        <user_info>
+        Name: {user_name}
+        </user_info>
+
+        <monitoring_status>
+        Status: {monitoring_status}
+        </monitoring_status>
+
+        <recent_readings>
+        Recent Sensor Readings: {sensor_readings}
+        </recent_readings>
+
+        Supported Sensors:
+        - Temperature (°C)
+        - Feeder Rate (kg/h)
+        - Vibration (mm/s)
+
+        When requested, generate synthetic readings for one or all sensors.
+        Store all readings with timestamps in the shared system state.
+
+        Use start_monitoring when the operator asks to start (continuous) monitoring: it samples
+        every sensor in the background and analyzes each sample against the constraints every
+        second without further requests. Use stop_monitoring to end it.
+
+        Use start_ingestion to take readings from a real feed instead of synthetic data: a tailed
+        CSV/line-protocol file, a local UDP or TCP socket, or a Modbus-TCP device (modbus_sim for a
+        local simulator). While a feed is running, collect_sensor_reading returns its newest reading.
+        Use ingestion_status for throughput and lag, and stop_ingestion to end a feed.
+
+        Always:
+        - Provide values clearly with units.
+        - Indicate sensor online/offline status.
+        - Alert if any sensor is offline.
+        - Clearly communicate monitoring status changes.
+
+        Note: Currently generating synthetic sensor data for testing. Production will integrate with real sensor APIs.
+        """,
+        tools=[
+            collect_sensor_reading,
+            start_monitoring,
+            stop_monitoring,
+            start_ingestion,
+            stop_ingestion,
+            ingestion_status,
+        ],
+    )
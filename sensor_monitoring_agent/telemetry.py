@@ -0,0 +1,237 @@
+"""
+Hot-path instrumentation: spans, token counters and state sizes.
+
+Spans cover each runner invocation, each agent run (a transfer starts a new
+one), each model call, each tool call and each session-service read or
+write. Finished spans are appended to a JSONL trace file and folded into
+Prometheus-format histograms and counters served on /metrics.
+
+Everything is off unless TRACE_FILE or METRICS_PORT is set (see
+`configure_from_env`). While off, `span` hands back one shared no-op
+context manager and no runner plugin is installed, so the cost is one
+attribute check per session-service call.
+"""
+import contextlib
+import itertools
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+# Upper bounds (seconds) of the span duration histogram buckets
+SPAN_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_NOOP = contextlib.nullcontext()
+
+
+def _label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Telemetry:
+    """Process-wide span recorder; `telemetry` below is the instance everything uses"""
+
+    def __init__(self):
+        self.enabled = False
+        self.trace_path = None
+        self._trace = None
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._server = None
+        self.reset()
+
+    def reset(self) -> None:
+        """Drop all collected metrics"""
+        self.spans = {}  # (kind, name) -> [bucket counts..., sum, count]
+        self.tokens = {}  # (agent, kind) -> tokens
+        self.counters = {}  # name -> count
+        self.state_bytes = {}  # state key -> serialized size after the last invocation
+
+    def configure(self, trace_path: Optional[str] = None, metrics_port: Optional[int] = None) -> None:
+        """Enable instrumentation, writing spans to `trace_path` and/or serving /metrics on `metrics_port`"""
+        self.close()
+        self.trace_path = trace_path
+        if trace_path:
+            self._trace = open(trace_path, "a", buffering=1 << 16)
+        if metrics_port is not None:
+            self._server = serve_metrics(self, metrics_port)
+        self.enabled = bool(trace_path or metrics_port is not None)
+
+    def close(self) -> None:
+        self.enabled = False
+        if self._trace is not None:
+            self._trace.close()
+            self._trace = None
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    # --- spans --------------------------------------------------------------
+
+    def start(self, kind: str, name: str, trace_id: Optional[str] = None,
+              parent: Optional[int] = None, **attrs) -> dict:
+        """Open a span; pass the result to `end`"""
+        return {
+            "span_id": next(self._ids),
+            "parent": parent,
+            "trace_id": trace_id,
+            "kind": kind,
+            "name": name,
+            "start": time.time(),
+            "_t0": time.perf_counter(),
+            "attrs": attrs,
+        }
+
+    def end(self, span: dict, **attrs) -> float:
+        """Close a span opened with `start`; returns its duration in seconds"""
+        duration = time.perf_counter() - span.pop("_t0")
+        span["duration_ms"] = round(duration * 1000, 4)
+        span["attrs"].update(attrs)
+        with self._lock:
+            key = (span["kind"], span["name"])
+            stats = self.spans.get(key)
+            if stats is None:
+                stats = self.spans[key] = [0] * len(SPAN_BUCKETS) + [0.0, 0]
+            index = bisect_left(SPAN_BUCKETS, duration)
+            if index < len(SPAN_BUCKETS):
+                stats[index] += 1
+            stats[-2] += duration
+            stats[-1] += 1
+            if self._trace is not None:
+                self._trace.write(json.dumps(span, default=str) + "\n")
+        return duration
+
+    @contextlib.contextmanager
+    def _span(self, kind, name, attrs):
+        span = self.start(kind, name, **attrs)
+        try:
+            yield span
+        except BaseException as e:
+            self.end(span, error=type(e).__name__)
+            raise
+        self.end(span)
+
+    def span(self, kind: str, name: str, **attrs):
+        """Context manager timing a block; a shared no-op while disabled"""
+        if not self.enabled:
+            return _NOOP
+        return self._span(kind, name, attrs)
+
+    # --- counters -----------------------------------------------------------
+
+    def count(self, name: str, amount: int = 1) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def add_tokens(self, agent: str, usage) -> None:
+        """Fold a model response's usage metadata into the per-agent token counters"""
+        if usage is None:
+            return
+        with self._lock:
+            for kind, value in (
+                ("prompt", usage.prompt_token_count),
+                ("response", usage.candidates_token_count),
+                ("cached", usage.cached_content_token_count),
+            ):
+                if value:
+                    self.tokens[(agent, kind)] = self.tokens.get((agent, kind), 0) + value
+
+    def observe_state(self, state: dict) -> dict:
+        """Record the serialized size of each state key"""
+        sizes = {key: len(json.dumps(value, default=str)) for key, value in state.items()}
+        with self._lock:
+            self.state_bytes = sizes
+        return sizes
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._trace is not None:
+                self._trace.flush()
+
+    # --- export -------------------------------------------------------------
+
+    def prometheus(self) -> str:
+        """Metrics in the Prometheus text exposition format"""
+        with self._lock:
+            spans = {key: list(stats) for key, stats in self.spans.items()}
+            tokens = dict(self.tokens)
+            counters = dict(self.counters)
+            state_bytes = dict(self.state_bytes)
+
+        lines = [
+            "# HELP sensor_span_seconds Time spent in runner invocations, agent runs, model calls, tool calls and session reads/writes",
+            "# TYPE sensor_span_seconds histogram",
+        ]
+        for (kind, name), stats in sorted(spans.items()):
+            labels = f'kind="{_label(kind)}",name="{_label(name)}"'
+            cumulative = 0
+            for bound, count in zip(SPAN_BUCKETS, stats):
+                cumulative += count
+                lines.append(f'sensor_span_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'sensor_span_seconds_bucket{{{labels},le="+Inf"}} {stats[-1]}')
+            lines.append(f"sensor_span_seconds_sum{{{labels}}} {stats[-2]:.6f}")
+            lines.append(f"sensor_span_seconds_count{{{labels}}} {stats[-1]}")
+
+        lines += ["# HELP sensor_llm_tokens_total Model tokens by agent and kind (prompt, response, cached)",
+                  "# TYPE sensor_llm_tokens_total counter"]
+        for (agent, kind), value in sorted(tokens.items()):
+            lines.append(f'sensor_llm_tokens_total{{agent="{_label(agent)}",kind="{kind}"}} {value}')
+
+        lines += ["# HELP sensor_events_total Agent events by kind", "# TYPE sensor_events_total counter"]
+        for name, value in sorted(counters.items()):
+            lines.append(f'sensor_events_total{{kind="{_label(name)}"}} {value}')
+
+        lines += ["# HELP sensor_state_bytes Serialized size of each session state key after the last invocation",
+                  "# TYPE sensor_state_bytes gauge"]
+        for key, value in sorted(state_bytes.items()):
+            lines.append(f'sensor_state_bytes{{key="{_label(key)}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def runner_plugins(self) -> list:
+        """Plugins to pass to Runner(plugins=...); empty while disabled"""
+        if not self.enabled:
+            return []
+        # Only runners need the plugin, and with it the ADK callback machinery
+        from .tracing import TracingPlugin
+        return [TracingPlugin(self)]
+
+
+telemetry = Telemetry()
+
+
+def configure_from_env() -> Telemetry:
+    """Enable instrumentation from TRACE_FILE (JSONL path) and METRICS_PORT, if set"""
+    trace_path = os.getenv("TRACE_FILE") or None
+    port = os.getenv("METRICS_PORT")
+    if trace_path or port:
+        telemetry.configure(trace_path, int(port) if port else None)
+    return telemetry
+
+
+def serve_metrics(source: Telemetry, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve `source.prometheus()` on http://host:port/metrics from a daemon thread"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = source.prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
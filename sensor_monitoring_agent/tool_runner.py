@@ -0,0 +1,68 @@
+import inspect
+import uuid
+from google.adk.events import Event, EventActions
+from google.adk.sessions.state import State
+from google.genai import types
+
+from .telemetry import telemetry
+
+
+def new_invocation_id() -> str:
+    """An invocation id in ADK's "e-<uuid>" format, without importing the ADK agent stack"""
+    return f"e-{uuid.uuid4()}"
+
+
+class DirectToolContext:
+    """
+    Minimal stand-in for ToolContext when a tool runs without the model.
+
+    Exposes the `state`, `session` and `actions` attributes the tools use;
+    state writes are collected in `state_delta` (the same dict as
+    `actions.state_delta`) so they can be committed as an event.
+    """
+
+    def __init__(self, session):
+        self.session = session
+        self.actions = EventActions()
+        self.state_delta = self.actions.state_delta
+        self.state = State(session.state, self.state_delta)
+
+
+async def run_tool(session_service, session, tool, agent_name: str, **kwargs) -> dict:
+    """
+    Run a tool directly against a session and record it like a model-issued call.
+
+    Appends a function_call event and a function_response event carrying the
+    tool's state delta, so history, state and later LLM turns see the same
+    trail as when the agent calls the tool itself.
+    """
+    invocation_id = new_invocation_id()
+    call_id = f"adk-{uuid.uuid4()}"
+
+    call_event = Event(
+        invocation_id=invocation_id,
+        author=agent_name,
+        content=types.Content(
+            role="model",
+            parts=[types.Part(function_call=types.FunctionCall(id=call_id, name=tool.__name__, args=kwargs))],
+        ),
+    )
+    await session_service.append_event(session, call_event)
+
+    tool_context = DirectToolContext(session)
+    with telemetry.span("tool", tool.__name__, trace_id=invocation_id, direct=True):
+        result = tool(tool_context, **kwargs)
+        if inspect.isawaitable(result):
+            result = await result
+
+    response_event = Event(
+        invocation_id=invocation_id,
+        author=agent_name,
+        content=types.Content(
+            role="user",
+            parts=[types.Part(function_response=types.FunctionResponse(id=call_id, name=tool.__name__, response=result))],
+        ),
+        actions=EventActions(state_delta=dict(tool_context.state_delta)),
+    )
+    await session_service.append_event(session, response_event)
+    return result
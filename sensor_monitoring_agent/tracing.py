@@ -0,0 +1,119 @@
+"""
+Runner plugin feeding ADK callbacks into telemetry.py.
+
+Kept apart from telemetry.py so the session service and tool runner can use
+spans without importing the ADK plugin and agent machinery; the plugin is
+only loaded when a runner is built with telemetry enabled.
+"""
+from typing import Optional
+
+from google.adk.plugins.base_plugin import BasePlugin
+
+from .telemetry import Telemetry
+
+
+class TracingPlugin(BasePlugin):
+    """
+    Runner plugin that opens and closes spans from the ADK callbacks.
+
+    Agent runs are children of their invocation; model and tool calls are
+    children of the agent that made them. After each invocation the size of
+    every session state key is recorded and the trace file is flushed.
+    """
+
+    def __init__(self, source: Telemetry):
+        super().__init__(name="tracing")
+        self.telemetry = source
+        self._invocations = {}  # invocation_id -> invocation span
+        self._agents = {}  # (invocation_id, agent name) -> agent span
+        self._models = {}  # (invocation_id, agent name) -> model call span
+        self._tools = {}  # function call id -> tool span
+
+    def _agent_parent(self, invocation_id: str, agent_name: str) -> Optional[int]:
+        span = self._agents.get((invocation_id, agent_name))
+        return span["span_id"] if span else None
+
+    async def before_run_callback(self, *, invocation_context):
+        invocation_id = invocation_context.invocation_id
+        self._invocations[invocation_id] = self.telemetry.start(
+            "invocation", invocation_context.agent.name, trace_id=invocation_id,
+            session_id=invocation_context.session.id,
+        )
+        return None
+
+    async def after_run_callback(self, *, invocation_context):
+        invocation_id = invocation_context.invocation_id
+        span = self._invocations.pop(invocation_id, None)
+        sizes = self.telemetry.observe_state(invocation_context.session.state)
+        if span is not None:
+            self.telemetry.end(span, state_bytes=sum(sizes.values()))
+        for key in [key for key in self._agents if key[0] == invocation_id]:
+            self.telemetry.end(self._agents.pop(key), incomplete=True)
+        self.telemetry.flush()
+
+    async def before_agent_callback(self, *, agent, callback_context):
+        invocation_id = callback_context.invocation_id
+        invocation = self._invocations.get(invocation_id)
+        if any(key[0] == invocation_id for key in self._agents):
+            self.telemetry.count("agent_transfer")
+        self._agents[(invocation_id, agent.name)] = self.telemetry.start(
+            "agent", agent.name, trace_id=invocation_id,
+            parent=invocation["span_id"] if invocation else None,
+        )
+        return None
+
+    async def after_agent_callback(self, *, agent, callback_context):
+        span = self._agents.pop((callback_context.invocation_id, agent.name), None)
+        if span is not None:
+            self.telemetry.end(span)
+        return None
+
+    async def before_model_callback(self, *, callback_context, llm_request):
+        invocation_id, agent_name = callback_context.invocation_id, callback_context.agent_name
+        self._models[(invocation_id, agent_name)] = self.telemetry.start(
+            "llm", agent_name, trace_id=invocation_id, parent=self._agent_parent(invocation_id, agent_name),
+        )
+        return None
+
+    async def after_model_callback(self, *, callback_context, llm_response):
+        if llm_response.partial:
+            return None
+        agent_name = callback_context.agent_name
+        span = self._models.pop((callback_context.invocation_id, agent_name), None)
+        usage = llm_response.usage_metadata
+        self.telemetry.add_tokens(agent_name, usage)
+        self.telemetry.count("llm_call")
+        if span is not None:
+            self.telemetry.end(
+                span,
+                prompt_tokens=usage.prompt_token_count if usage else None,
+                response_tokens=usage.candidates_token_count if usage else None,
+            )
+        return None
+
+    async def on_model_error_callback(self, *, callback_context, llm_request, error):
+        span = self._models.pop((callback_context.invocation_id, callback_context.agent_name), None)
+        if span is not None:
+            self.telemetry.end(span, error=type(error).__name__)
+        return None
+
+    async def before_tool_callback(self, *, tool, tool_args, tool_context):
+        invocation_id, agent_name = tool_context.invocation_id, tool_context.agent_name
+        self._tools[tool_context.function_call_id] = self.telemetry.start(
+            "tool", tool.name, trace_id=invocation_id, parent=self._agent_parent(invocation_id, agent_name),
+        )
+        self.telemetry.count("tool_call")
+        return None
+
+    async def after_tool_callback(self, *, tool, tool_args, tool_context, result):
+        span = self._tools.pop(tool_context.function_call_id, None)
+        if span is not None:
+            status = result.get("status") if isinstance(result, dict) else None
+            self.telemetry.end(span, status=status)
+        return None
+
+    async def on_tool_error_callback(self, *, tool, tool_args, tool_context, error):
+        span = self._tools.pop(tool_context.function_call_id, None)
+        if span is not None:
+            self.telemetry.end(span, error=type(error).__name__)
+        return None
@@ -0,0 +1,175 @@
+"""
+Per-sensor trend statistics over a window, for the "trends" report.
+
+`compute_trends` works on plain arrays, one row per raw reading or rollup
+bucket, so the same code serves both and can run in a worker process.
+`run_trends` sends windows with more than POOL_MIN_VALUES values to a
+process pool; smaller ones are cheaper to compute than to ship. Large
+windows reach the workers as .npy files in shared memory (/dev/shm where
+there is one), written from a thread and memory-mapped by the worker:
+pickling tens of megabytes through the pool's pipe holds the GIL long
+enough to stall the event loop by itself.
+"""
+import asyncio
+import multiprocessing
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+
+# Percentiles reported for each sensor
+TREND_PERCENTILES = (5, 25, 50, 75, 95)
+# Windows with more values (rows x sensors) than this are computed in the process pool
+POOL_MIN_VALUES = 200_000
+# Worker processes for large windows (TREND_WORKERS overrides)
+DEFAULT_WORKERS = 2
+# A raw reading followed by a gap longer than this many median intervals
+# stands for one interval, not the whole gap (monitoring was stopped)
+MAX_GAP_INTERVALS = 10
+# Seconds a lone reading stands for, with no neighbour to measure from (the stores' 1 Hz rate)
+NOMINAL_INTERVAL_SECONDS = 1.0
+# Where window arrays are written for the workers; tmpfs keeps it in memory
+SHARED_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+# compute_trends arguments, in order, as file names
+_ARRAYS = ("timestamps", "durations", "values", "violated")
+
+
+def reading_durations(timestamps: np.ndarray) -> np.ndarray:
+    """Seconds each raw reading stands for: the time to the next one, with long gaps cut to the median interval"""
+    if len(timestamps) < 2:
+        return np.full(len(timestamps), NOMINAL_INTERVAL_SECONDS)
+    gaps = np.diff(timestamps)
+    interval = float(np.median(gaps))
+    durations = np.append(gaps, interval)
+    return np.where(durations > MAX_GAP_INTERVALS * interval, interval, durations)
+
+
+def nan_percentiles(values: np.ndarray, samples: np.ndarray, percentiles=TREND_PERCENTILES) -> np.ndarray:
+    """
+    (len(percentiles), columns) percentiles of each column, ignoring NaN.
+
+    Same linear interpolation as np.nanpercentile, which falls back to a
+    per-column loop as soon as a column holds a NaN; sorting pushes NaNs to
+    the end, so each column's percentiles index into its first `samples` rows.
+    """
+    ordered = np.sort(values, axis=0)
+    position = np.asarray(percentiles, dtype=np.float64)[:, None] / 100 * np.maximum(samples - 1, 0)
+    low = np.floor(position).astype(np.int64)
+    high = np.minimum(low + 1, np.maximum(samples - 1, 0))
+    below = np.take_along_axis(ordered, low, axis=0)
+    above = np.take_along_axis(ordered, high, axis=0)
+    result = below + (above - below) * (position - low)
+    return np.where(samples > 0, result, np.nan)
+
+
+def compute_trends(timestamps: np.ndarray, durations: np.ndarray, values: np.ndarray,
+                   violated: np.ndarray) -> dict:
+    """
+    Trend statistics for every column of a window, vectorized across columns.
+
+    Args:
+        timestamps: (rows,) start of each row, epoch seconds, oldest first
+        durations: (rows,) seconds each row stands for
+        values: (rows, columns) values, NaN where a row has no data
+        violated: (rows, columns) fraction of each row's time spent outside a limit
+
+    An excursion is a run of consecutive rows with any time in violation; the
+    mean time between excursions is measured start to start. Returns arrays
+    with one entry per column (NaN where a statistic is undefined).
+    """
+    valid = ~np.isnan(values)
+    samples = valid.sum(axis=0)
+    percentiles = nan_percentiles(values, samples)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.nansum(values, axis=0) / samples
+
+        # Least-squares slope per column over its own valid rows, in units per hour
+        hours = (timestamps - timestamps[0]) / 3600
+        hours_mean = np.where(valid, hours[:, None], 0.0).sum(axis=0) / samples
+        dh = np.where(valid, hours[:, None] - hours_mean, 0.0)
+        dv = np.where(valid, values - mean, 0.0)
+        spread = (dh * dh).sum(axis=0)
+        slope = np.where(spread > 0, (dh * dv).sum(axis=0) / spread, np.nan)
+
+    covered = np.where(valid, durations[:, None], 0.0).sum(axis=0)
+    in_violation = (violated * durations[:, None]).sum(axis=0)
+
+    flagged = violated > 0
+    starts = flagged.copy()
+    starts[1:] &= ~flagged[:-1]
+    excursions = starts.sum(axis=0)
+    # Start rows grouped by column, so consecutive entries of one column are its excursions in order
+    cols, rows = np.nonzero(starts.T)
+    same = cols[1:] == cols[:-1]
+    between = np.bincount(cols[1:][same], weights=np.diff(timestamps[rows])[same], minlength=values.shape[1])
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return {
+            "samples": samples,
+            "percentiles": percentiles,
+            "mean": mean,
+            "slope_per_hour": slope,
+            "covered_seconds": covered,
+            "violation_seconds": in_violation,
+            "violation_fraction": np.where(covered > 0, in_violation / covered, np.nan),
+            "excursions": excursions,
+            "excursions_per_hour": np.where(covered > 0, excursions / (covered / 3600), np.nan),
+            "mean_seconds_between": np.where(excursions > 1, between / (excursions - 1), np.nan),
+        }
+
+
+# Started on first use; shared by every session in the process
+_pool = None
+
+
+def _trend_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # Forked workers start at once and don't re-import the entry script
+        # (main.py opens the session database at import); they only run
+        # compute_trends on the arrays they are sent
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork") if "fork" in methods else None
+        _pool = ProcessPoolExecutor(max_workers=int(os.getenv("TREND_WORKERS", DEFAULT_WORKERS)),
+                                    mp_context=context)
+    return _pool
+
+
+def _write_arrays(arrays: tuple) -> str:
+    directory = tempfile.mkdtemp(prefix="trends-", dir=SHARED_DIR)
+    for name, array in zip(_ARRAYS, arrays):
+        np.save(os.path.join(directory, name), array)
+    return directory
+
+
+def _trends_from_files(directory: str) -> dict:
+    """Worker side: compute_trends over the memory-mapped window arrays"""
+    arrays = [np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r") for name in _ARRAYS]
+    return compute_trends(*arrays)
+
+
+async def run_trends(timestamps: np.ndarray, durations: np.ndarray, values: np.ndarray,
+                     violated: np.ndarray) -> tuple:
+    """(compute_trends result, "pool" or "inline"), off the event loop for large windows"""
+    args = (timestamps, durations, values, violated)
+    if values.size <= POOL_MIN_VALUES:
+        return compute_trends(*args), "inline"
+    global _pool
+    directory = await asyncio.to_thread(_write_arrays, args)
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_trend_pool(), _trends_from_files, directory), "pool"
+    except BrokenProcessPool:
+        # A worker died; start a fresh pool next time and answer this one inline
+        _pool = None
+        return compute_trends(*args), "inline"
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def shutdown_trend_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
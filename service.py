@@ -0,0 +1,271 @@
+"""
+Headless service: the monitoring agents behind a local HTTP/WebSocket API.
+
+Every plant is a session served by one PlantRunner, so per-plant ordering,
+the in-flight LLM cap and the auto collect/analyze pipeline are the same as
+in plants.py. Responses are JSON; nothing is printed unless --verbose is
+given.
+
+Usage: python service.py [--host H] [--port P] [--max-llm-calls N] [--verbose]
+
+HTTP:
+  POST /plants/{plant}/turns        {"query": "..."} -> agent answer (+ pipeline results)
+  POST /plants/{plant}/analyze      collect (unless {"collect": false}) and analyze, no LLM
+  GET  /plants/{plant}/readings     ?last_n=N
+  GET  /plants/{plant}/analysis     latest analysis
+  GET  /plants/{plant}/alerts       active alert incidents and recently cleared ones
+  GET  /plants/{plant}/report       ?report_type=summary|detailed|alerts&period_hours=H
+  GET  /plants/{plant}/window       ?last_minutes=M or ?last_n=N
+  GET  /stats                       turn latency, runner and cache counters
+WebSocket /ws?plants=a,b:
+  send {"plant": ..., "query": ..., "id": ...} to run a turn; alerts for the
+  subscribed plants (all if none given) are pushed as {"type": "alert", ...}
+"""
+import argparse
+import asyncio
+import inspect
+import os
+from contextlib import asynccontextmanager
+from typing import Optional
+
+import uvicorn
+from dotenv import load_dotenv
+from fastapi import Body, FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+
+from plants import DEFAULT_MAX_LLM_CALLS, PlantRunner
+from sqlite_session_service import SqliteMonitoringSessionService
+from utils import response_cache
+from sensor_monitoring_agent.aggregates import empty_aggregates, latest_analysis
+from sensor_monitoring_agent.alerts import alert_summary, get_alert_manager
+from sensor_monitoring_agent.scheduler import set_monitoring_listener
+from sensor_monitoring_agent.store import get_reading_store
+from sensor_monitoring_agent.sub_agents.analysis_agent.agent import analyze_reading_window, generate_report
+from sensor_monitoring_agent.telemetry import configure_from_env, telemetry
+from sensor_monitoring_agent.tool_runner import DirectToolContext
+
+# Alert messages queued per subscriber; the oldest are dropped when a subscriber falls behind
+SUBSCRIBER_QUEUE_SIZE = 100
+# Readings returned by /readings when last_n isn't given
+DEFAULT_READINGS = 10
+
+
+def alert_message(plant: str, analysis: dict) -> dict:
+    return {
+        "type": "alert",
+        "plant": plant,
+        "reading_id": analysis.get("reading_id"),
+        "timestamp": analysis.get("timestamp"),
+        "overall_status": analysis.get("overall_status"),
+        "alerts": analysis.get("raised", []),
+        "cleared": analysis.get("cleared", []),
+        "active_alerts": analysis.get("active_alerts", 0),
+    }
+
+
+class AlertHub:
+    """
+    Fans analysis alerts out to WebSocket subscribers.
+
+    A plant's analysis is published when the alert manager raised or
+    cleared an incident, the same rule the console printer uses. Each
+    subscriber has a bounded queue; a slow subscriber loses its oldest
+    messages instead of holding up the others.
+    """
+
+    def __init__(self, queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.subscribers = {}  # queue -> set of plants, or None for all
+        self.stats = {"published": 0, "delivered": 0, "dropped": 0}
+
+    def subscribe(self, plants: Optional[set] = None) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self.subscribers[queue] = plants
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self.subscribers.pop(queue, None)
+
+    def publish(self, plant: str, analysis: dict) -> bool:
+        """Queue an analysis's alert transitions for subscribers; returns whether there were any"""
+        if not analysis.get("raised") and not analysis.get("cleared"):
+            return False
+        message = alert_message(plant, analysis)
+        self.stats["published"] += 1
+        for queue, plants in self.subscribers.items():
+            if plants and plant not in plants:
+                continue
+            if queue.full():
+                queue.get_nowait()
+                self.stats["dropped"] += 1
+            queue.put_nowait(message)
+            self.stats["delivered"] += 1
+        return True
+
+    def publish_result(self, plant: Optional[str], result: Optional[dict]) -> None:
+        """Publish an analyze_readings tool result"""
+        if plant and result and result.get("status") == "success":
+            self.publish(plant, result["analysis"])
+
+
+def create_app(runner: PlantRunner, hub: AlertHub) -> FastAPI:
+    """The HTTP/WebSocket API over a PlantRunner"""
+
+    @asynccontextmanager
+    async def lifespan(app):
+        # Background monitoring analyses (schedulers) are pushed to subscribers too
+        set_monitoring_listener(lambda result, session_id: hub.publish_result(runner.plant_for(session_id), result))
+        yield
+        set_monitoring_listener(None)
+        await runner.close()
+
+    app = FastAPI(title="Sensor Monitoring", lifespan=lifespan)
+
+    async def turn(plant: str, query: str) -> dict:
+        result = await runner.turn(plant, query)
+        hub.publish_result(plant, result.get("pipeline", {}).get("analysis"))
+        return result
+
+    async def read_only(plant: str, tool, **kwargs) -> dict:
+        # Report-style tools read state; run them without recording events
+        result = tool(DirectToolContext(await runner.session(plant)), **kwargs)
+        return await result if inspect.isawaitable(result) else result
+
+    @app.post("/plants/{plant}/turns")
+    async def post_turn(plant: str, query: str = Body(..., embed=True)):
+        return await turn(plant, query)
+
+    @app.post("/plants/{plant}/analyze")
+    async def post_analyze(plant: str, collect: bool = Body(True, embed=True)):
+        results = await runner.analyze(plant, collect=collect)
+        hub.publish_result(plant, results.get("analysis"))
+        return {"status": "success", "plant": plant, **results}
+
+    @app.get("/plants/{plant}/readings")
+    async def get_readings(plant: str, last_n: int = DEFAULT_READINGS):
+        store = get_reading_store(await runner.open(plant))
+        slots = store.select(last_n=last_n)
+        return {
+            "status": "success",
+            "plant": plant,
+            "collected": store.collected,
+            "readings": [store.reading(slot) for slot in slots.tolist()],
+        }
+
+    @app.get("/plants/{plant}/analysis")
+    async def get_analysis(plant: str):
+        session = await runner.session(plant)
+        aggregates = session.state.get("report_aggregates") or empty_aggregates()
+        analysis = latest_analysis(aggregates, session.state.get("analysis_results", []))
+        if not analysis:
+            raise HTTPException(404, f"No analyses yet for plant {plant}")
+        return {"status": "success", "plant": plant, "analysis": analysis}
+
+    @app.get("/plants/{plant}/alerts")
+    async def get_alerts(plant: str, history: int = 10, sensor: Optional[str] = None,
+                         severity: Optional[str] = None):
+        session = await runner.session(plant)
+        aggregates = session.state.get("report_aggregates") or empty_aggregates()
+        latest = latest_analysis(aggregates, session.state.get("analysis_results", []))
+        alerts = get_alert_manager(session.id, session.state)
+        return {
+            "status": "success",
+            "plant": plant,
+            "overall_status": latest.get("overall_status") if latest else None,
+            "active_alerts": [alert_summary(incident) for incident in alerts.active_alerts(sensor, severity)],
+            "recently_cleared": [
+                {**alert_summary(incident), "cleared_at": incident["cleared_at"]}
+                for incident in list(alerts.resolved)[-history:]
+            ] if history > 0 else [],
+            "alert_stats": alerts.stats,
+            "total_alerts": aggregates["total_alerts"],
+        }
+
+    @app.get("/plants/{plant}/report")
+    async def get_report(plant: str, report_type: str = "summary", period_hours: Optional[float] = None):
+        return await read_only(plant, generate_report, report_type=report_type, period_hours=period_hours)
+
+    @app.get("/plants/{plant}/window")
+    async def get_window(plant: str, last_minutes: Optional[float] = None, last_n: Optional[int] = None):
+        return await runner.tool(plant, analyze_reading_window, "analysis_agent",
+                                 last_minutes=last_minutes, last_n=last_n)
+
+    @app.get("/stats")
+    async def get_stats():
+        return {
+            "status": "success",
+            "plants": sorted(runner.sessions),
+            "latency": runner.latency(),
+            "runner": runner.stats,
+            "response_cache": response_cache.counters(),
+            "alerts": {**hub.stats, "subscribers": len(hub.subscribers)},
+        }
+
+    @app.websocket("/ws")
+    async def websocket(socket: WebSocket, plants: Optional[str] = None):
+        await socket.accept()
+        queue = hub.subscribe(set(plants.split(",")) if plants else None)
+
+        async def push_alerts():
+            while True:
+                await socket.send_json(await queue.get())
+
+        async def run_turn(message: dict):
+            result = await turn(message["plant"], message["query"])
+            await socket.send_json({"type": "turn", "id": message.get("id"), **result})
+
+        pusher = asyncio.create_task(push_alerts())
+        turns = set()
+        try:
+            while True:
+                message = await socket.receive_json()
+                if not message.get("plant") or not message.get("query"):
+                    await socket.send_json({
+                        "type": "error", "id": message.get("id"),
+                        "message": 'Expected {"plant": ..., "query": ...}',
+                    })
+                    continue
+                # Turns run concurrently; the runner keeps each plant's turns in order
+                task = asyncio.create_task(run_turn(message))
+                turns.add(task)
+                task.add_done_callback(turns.discard)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            hub.unsubscribe(queue)
+            pusher.cancel()
+            for task in turns:
+                task.cancel()
+
+    return app
+
+
+async def serve(host: str, port: int, max_llm_calls: int, verbose: bool, db_path: str) -> None:
+    session_service = SqliteMonitoringSessionService(db_path)
+    runner = PlantRunner(session_service, max_llm_calls=max_llm_calls, verbose=verbose)
+    app = create_app(runner, AlertHub())
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="info" if verbose else "warning"))
+    try:
+        await server.serve()
+    finally:
+        session_service.close()
+
+
+def main():
+    load_dotenv()
+    configure_from_env()
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--max-llm-calls", type=int, default=DEFAULT_MAX_LLM_CALLS,
+                        help="agent runs in flight at once")
+    parser.add_argument("--verbose", action="store_true", help="print agent events, answers and state to the terminal")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.max_llm_calls, args.verbose,
+                          os.getenv("SESSION_DB", "sensor_monitoring.db")))
+    finally:
+        telemetry.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,607 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, ClassVar, Optional
+from google.adk.errors.already_exists_error import AlreadyExistsError
+from google.adk.errors.session_not_found_error import SessionNotFoundError
+from google.adk.events import Event
+from google.adk.sessions import Session
+from google.adk.sessions.base_session_service import BaseSessionService, GetSessionConfig, ListSessionsResponse
+from google.adk.sessions.state import State
+from pydantic import PrivateAttr
+
+from sensor_monitoring_agent.state_ops import apply_delta, parse_op_key
+from sensor_monitoring_agent.store import drop_store_hook, find_reading_store, on_new_store, parse_timestamp
+from sensor_monitoring_agent.telemetry import telemetry
+
+# List-valued state keys persisted as append-only rows, and their tables
+APPEND_ONLY_KEYS = {
+    "analysis_results": "analyses",
+    "interaction_history": "history",
+}
+# Rows of each append-only key loaded back into session state
+DEFAULT_RECENT_ROWS = 100
+# Events loaded into a session when no GetSessionConfig limit is given
+DEFAULT_RECENT_EVENTS = 200
+# How long a connection waits for another process's write lock
+BUSY_TIMEOUT_MS = 10_000
+# Retention policy: a session's rows older than this many seconds, counted back
+# from its newest row in the same table, are trimmed (None keeps every row).
+# Raw readings cover what a restart restores and the 1-minute rollups rebuild
+# from; analyses match the 1-hour rollups
+DEFAULT_RETENTION_SECONDS = {
+    "readings": 2 * 24 * 3600,
+    "events": 7 * 24 * 3600,
+    "history": 30 * 24 * 3600,
+    "analyses": 90 * 24 * 3600,
+}
+# A session's tables are trimmed on its first write in a process, then every this many writes
+TRIM_EVERY = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    pk INTEGER PRIMARY KEY AUTOINCREMENT,
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    create_time REAL NOT NULL,
+    update_time REAL NOT NULL,
+    UNIQUE (app_name, user_id, id)
+);
+CREATE TABLE IF NOT EXISTS app_states (
+    app_name TEXT PRIMARY KEY,
+    state TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS user_states (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    PRIMARY KEY (app_name, user_id)
+);
+CREATE TABLE IF NOT EXISTS events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_pk INTEGER NOT NULL,
+    timestamp REAL NOT NULL,
+    event TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_events_session_ts ON events (session_pk, timestamp);
+CREATE INDEX IF NOT EXISTS idx_events_session_seq ON events (session_pk, seq);
+CREATE TABLE IF NOT EXISTS readings (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_pk INTEGER NOT NULL,
+    collection_id TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_readings_collection ON readings (session_pk, collection_id);
+CREATE INDEX IF NOT EXISTS idx_readings_session_ts ON readings (session_pk, timestamp);
+CREATE INDEX IF NOT EXISTS idx_readings_session_seq ON readings (session_pk, seq);
+CREATE TABLE IF NOT EXISTS analyses (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_pk INTEGER NOT NULL,
+    collection_id TEXT,
+    timestamp REAL NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_analyses_collection ON analyses (session_pk, collection_id);
+CREATE INDEX IF NOT EXISTS idx_analyses_session_ts ON analyses (session_pk, timestamp);
+CREATE INDEX IF NOT EXISTS idx_analyses_session_seq ON analyses (session_pk, seq);
+CREATE TABLE IF NOT EXISTS history (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_pk INTEGER NOT NULL,
+    timestamp REAL NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_history_session_ts ON history (session_pk, timestamp);
+CREATE INDEX IF NOT EXISTS idx_history_session_seq ON history (session_pk, seq);
+CREATE TABLE IF NOT EXISTS trimmed (
+    session_pk INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    before REAL NOT NULL,
+    PRIMARY KEY (session_pk, name)
+);
+"""
+
+
+class _TrackedSession(Session):
+    """Session that remembers how many rows of each append-only key it holds"""
+
+    _row_counts: dict = PrivateAttr(default_factory=dict)
+    # Tools check this on their session before writing state_ops op keys
+    supports_state_ops: ClassVar[bool] = True
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, separators=(",", ":"), default=str)
+
+
+def _row_timestamp(item: dict, fallback: float) -> float:
+    for key in ("timestamp", "analysis_timestamp"):
+        if item.get(key):
+            try:
+                return parse_timestamp(item[key])
+            except (TypeError, ValueError):
+                pass
+    return fallback
+
+
+def _split_state(state: dict) -> tuple:
+    """Split a state dict into (app, user, session) parts, dropping temp: keys"""
+    app_state, user_state, session_state = {}, {}, {}
+    for key, value in state.items():
+        if key.startswith(State.APP_PREFIX):
+            app_state[key.removeprefix(State.APP_PREFIX)] = value
+        elif key.startswith(State.USER_PREFIX):
+            user_state[key.removeprefix(State.USER_PREFIX)] = value
+        elif not key.startswith(State.TEMP_PREFIX):
+            session_state[key] = value
+    return app_state, user_state, session_state
+
+
+class SqliteMonitoringSessionService(BaseSessionService):
+    """
+    Session service backed by a local SQLite database in WAL mode.
+
+    Small scalar state (constraints, monitoring_status, the readings summary,
+    report aggregates ...) lives in one JSON row per session. Readings,
+    analyses, interaction history and events are append-only rows indexed by
+    session and timestamp, and only the most recent rows are loaded into a
+    session, so the cost of get_session/append_event does not depend on how
+    much history has accumulated.
+
+    Every reading appended to the ReadingStore of a session this service
+    has created or loaded is persisted: a store listener takes the new rows
+    as they land (before the rollups' raw retention can evict them) and a
+    background task writes them in order, whether or not any event follows.
+    Rows past the retention policy are trimmed as sessions are written to
+    (counts kept in `trimmed`).
+
+    Tools append to analysis_results / interaction_history with the
+    state_ops helpers, whose op keys carry only the new items; those are
+    inserted as rows directly, and increment / set-field ops are applied to
+    the JSON row. Whole-list assignments still work: each session object
+    returned by this service tracks how many rows it was loaded with, and
+    append_event persists only the items beyond that.
+    """
+
+    # Resolves state_ops op keys (see _update_session_state / _persist_event)
+    supports_state_ops = True
+
+    def __init__(self, db_path: str = "sensor_monitoring.db",
+                 recent_rows: int = DEFAULT_RECENT_ROWS,
+                 recent_events: int = DEFAULT_RECENT_EVENTS,
+                 retention: Optional[dict] = None):
+        self.db_path = db_path
+        self.recent_rows = recent_rows
+        self.recent_events = recent_events
+        self.retention = {**DEFAULT_RETENTION_SECONDS, **(retention or {})}
+        self._writes = {}  # session pk -> events persisted by this process, for trimming
+        self._followed = {}  # session id -> pk, for sessions whose store is persisted as it fills
+        self._unwritten = []  # reading rows taken from stores, not yet inserted
+        self._flusher = None  # task inserting _unwritten
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        # Sharded plant workers share the database from several processes
+        self._conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        on_new_store(self._store_created)
+
+    def close(self) -> None:
+        drop_store_hook(self._store_created)
+        self._followed.clear()
+        if self._unwritten:
+            self._locked(self._insert_unwritten, begin="BEGIN IMMEDIATE")
+        with self._lock:
+            self._conn.close()
+
+    async def _run(self, fn, *args):
+        with telemetry.span("session", fn.__name__.lstrip("_")):
+            return await asyncio.to_thread(self._locked, fn, *args)
+
+    async def _write(self, fn, *args):
+        with telemetry.span("session", fn.__name__.lstrip("_")):
+            return await asyncio.to_thread(self._locked, fn, *args, begin="BEGIN IMMEDIATE")
+
+    def _locked(self, fn, *args, begin="BEGIN"):
+        with self._lock:
+            # Writers take the write lock up front (BEGIN IMMEDIATE) so that
+            # when another process holds it they wait out busy_timeout instead
+            # of failing on a read-to-write upgrade
+            self._conn.execute(begin)
+            try:
+                result = fn(*args)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    # --- sessions -----------------------------------------------------------
+
+    def _session_row(self, app_name, user_id, session_id):
+        return self._conn.execute(
+            "SELECT pk, state, update_time FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?",
+            (app_name, user_id, session_id),
+        ).fetchone()
+
+    async def create_session(self, *, app_name: str, user_id: str,
+                             state: Optional[dict[str, Any]] = None,
+                             session_id: Optional[str] = None) -> Session:
+        session_id = session_id.strip() if session_id else str(uuid.uuid4())
+        return await self._write(self._create_session, app_name, user_id, state or {}, session_id)
+
+    def _create_session(self, app_name, user_id, state, session_id):
+        if self._session_row(app_name, user_id, session_id):
+            raise AlreadyExistsError(f"Session with id {session_id} already exists.")
+
+        app_state, user_state, session_state = _split_state(state)
+        self._merge_scoped_state(app_name, user_id, app_state, user_state)
+        lists = {key: session_state.pop(key) for key in APPEND_ONLY_KEYS if key in session_state}
+        now = time.time()
+        pk = self._conn.execute(
+            "INSERT INTO sessions (app_name, user_id, id, state, create_time, update_time) VALUES (?, ?, ?, ?, ?, ?)",
+            (app_name, user_id, session_id, _dumps(session_state), now, now),
+        ).lastrowid
+        for key, items in lists.items():
+            self._insert_rows(pk, key, items, now)
+        self._insert_latest_reading(pk, session_state.get("sensor_readings"), now)
+        return self._load_session(app_name, user_id, session_id, GetSessionConfig(num_recent_events=0))
+
+    async def get_session(self, *, app_name: str, user_id: str, session_id: str,
+                          config: Optional[GetSessionConfig] = None) -> Optional[Session]:
+        return await self._run(self._load_session, app_name, user_id, session_id, config)
+
+    def _load_session(self, app_name, user_id, session_id, config):
+        row = self._session_row(app_name, user_id, session_id)
+        if row is None:
+            return None
+        pk, state, update_time = row
+        state = json.loads(state)
+        self._follow(session_id, pk)
+
+        row_counts = {}
+        for key, table in APPEND_ONLY_KEYS.items():
+            payloads = self._conn.execute(
+                f"SELECT payload FROM (SELECT seq, payload FROM {table} INDEXED BY idx_{table}_session_seq WHERE session_pk = ? "
+                f"ORDER BY seq DESC LIMIT ?) ORDER BY seq",
+                (pk, self.recent_rows),
+            ).fetchall()
+            state[key] = [json.loads(p[0]) for p in payloads]
+            row_counts[key] = len(state[key])
+        state.update(self._scoped_state(app_name, user_id))
+
+        limit = self.recent_events
+        after = None
+        if config:
+            if config.num_recent_events is not None:
+                limit = config.num_recent_events
+            after = config.after_timestamp
+        events = []
+        if limit:
+            query = "SELECT event FROM (SELECT seq, event FROM events INDEXED BY idx_events_session_seq WHERE session_pk = ?"
+            params = [pk]
+            if after:
+                query += " AND timestamp >= ?"
+                params.append(after)
+            query += " ORDER BY seq DESC LIMIT ?) ORDER BY seq"
+            params.append(limit)
+            events = [Event.model_validate_json(e[0]) for e in self._conn.execute(query, params)]
+
+        session = _TrackedSession(
+            app_name=app_name,
+            user_id=user_id,
+            id=session_id,
+            state=state,
+            events=events,
+            last_update_time=update_time,
+        )
+        session._row_counts = row_counts
+        return session
+
+    async def list_sessions(self, *, app_name: str, user_id: Optional[str] = None) -> ListSessionsResponse:
+        return await self._run(self._list_sessions, app_name, user_id)
+
+    def _list_sessions(self, app_name, user_id):
+        query = "SELECT user_id, id, state, update_time FROM sessions WHERE app_name = ?"
+        params = [app_name]
+        if user_id is not None:
+            query += " AND user_id = ?"
+            params.append(user_id)
+        query += " ORDER BY update_time, user_id, id"
+        sessions = []
+        for uid, sid, state, update_time in self._conn.execute(query, params).fetchall():
+            state = json.loads(state)
+            state.update(self._scoped_state(app_name, uid))
+            sessions.append(Session(app_name=app_name, user_id=uid, id=sid, state=state, last_update_time=update_time))
+        return ListSessionsResponse(sessions=sessions)
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        await self._write(self._delete_session, app_name, user_id, session_id)
+
+    def _delete_session(self, app_name, user_id, session_id):
+        row = self._session_row(app_name, user_id, session_id)
+        if row is None:
+            return
+        self._followed.pop(session_id, None)
+        self._unwritten = [reading for reading in self._unwritten if reading[0] != row[0]]
+        for table in ("events", "readings", "trimmed", *APPEND_ONLY_KEYS.values()):
+            self._conn.execute(f"DELETE FROM {table} WHERE session_pk = ?", (row[0],))
+        self._conn.execute("DELETE FROM sessions WHERE pk = ?", (row[0],))
+
+    async def get_user_state(self, *, app_name: str, user_id: str) -> dict[str, Any]:
+        return await self._run(self._user_state, app_name, user_id)
+
+    # --- events -------------------------------------------------------------
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+        event = await super().append_event(session=session, event=event)
+        session.last_update_time = event.timestamp
+        await self._write(self._persist_event, session, event)
+        return event
+
+    def _update_session_state(self, session: Session, event: Event) -> None:
+        # Op keys have already been applied to the live state by the tool
+        if not event.actions or not event.actions.state_delta:
+            return
+        for key, value in event.actions.state_delta.items():
+            if parse_op_key(key) is None:
+                session.state[key] = value
+
+    def _persist_event(self, session, event):
+        row = self._session_row(session.app_name, session.user_id, session.id)
+        if row is None:
+            raise SessionNotFoundError(f"Session {session.id} not found.")
+        pk, state, _ = row
+        state = json.loads(state)
+
+        delta = dict(event.actions.state_delta) if event.actions else {}
+        app_state, user_state, session_delta = _split_state(delta)
+        self._merge_scoped_state(session.app_name, session.user_id, app_state, user_state)
+
+        # Sessions not loaded through this service have no row counts; treat
+        # every item of their lists as new
+        row_counts = getattr(session, "_row_counts", {})
+        for key in APPEND_ONLY_KEYS:
+            items = session_delta.pop(key, None)
+            if not isinstance(items, list):
+                continue
+            self._insert_rows(pk, key, items[row_counts.get(key, 0):], event.timestamp)
+            row_counts[key] = len(items)
+        # Appended items arrive one op key each; the session's list already holds them
+        appended, row_keys = {}, [key for key in delta if key in APPEND_ONLY_KEYS]
+        for delta_key in list(session_delta):
+            parsed = parse_op_key(delta_key)
+            if parsed and parsed[1] == "append" and parsed[0] in APPEND_ONLY_KEYS:
+                appended.setdefault(parsed[0], []).append(session_delta.pop(delta_key))
+                row_keys.append(delta_key)
+        for key, items in appended.items():
+            self._insert_rows(pk, key, items, event.timestamp)
+            if key in row_counts:
+                row_counts[key] += len(items)
+        if self._followed.get(session.id) != pk:
+            self._insert_latest_reading(pk, session_delta.get("sensor_readings"), event.timestamp)
+
+        if session_delta:
+            apply_delta(state, session_delta)
+            self._conn.execute(
+                "UPDATE sessions SET state = ?, update_time = ? WHERE pk = ?",
+                (_dumps(state), event.timestamp, pk),
+            )
+        else:
+            self._conn.execute("UPDATE sessions SET update_time = ? WHERE pk = ?", (event.timestamp, pk))
+
+        # List deltas already live in their own tables; keep the stored event small
+        stored = event
+        if row_keys:
+            stored = event.model_copy(deep=True)
+            for key in row_keys:
+                stored.actions.state_delta.pop(key, None)
+        self._conn.execute(
+            "INSERT INTO events (session_pk, timestamp, event) VALUES (?, ?, ?)",
+            (pk, event.timestamp, stored.model_dump_json(exclude_none=True)),
+        )
+
+        writes = self._writes.get(pk, 0)
+        self._writes[pk] = writes + 1
+        if writes % TRIM_EVERY == 0:
+            self._trim(pk)
+
+    # --- rows ---------------------------------------------------------------
+
+    def _insert_rows(self, pk, key, items, fallback_time):
+        if not items:
+            return
+        table = APPEND_ONLY_KEYS[key]
+        if table == "analyses":
+            self._conn.executemany(
+                "INSERT INTO analyses (session_pk, collection_id, timestamp, payload) VALUES (?, ?, ?, ?)",
+                [(pk, item.get("reading_id"), _row_timestamp(item, fallback_time), _dumps(item))
+                 for item in items],
+            )
+        else:
+            self._conn.executemany(
+                f"INSERT INTO {table} (session_pk, timestamp, payload) VALUES (?, ?, ?)",
+                [(pk, _row_timestamp(item, fallback_time), _dumps(item)) for item in items],
+            )
+
+    def _insert_latest_reading(self, pk, summary, fallback_time):
+        """Persist a sensor_readings summary's latest reading, for stores this process doesn't follow"""
+        if not isinstance(summary, dict) or not summary.get("latest"):
+            return
+        reading = summary["latest"]
+        self._conn.execute(
+            "INSERT OR IGNORE INTO readings (session_pk, collection_id, timestamp, payload) VALUES (?, ?, ?, ?)",
+            (pk, reading.get("collection_id"), _row_timestamp(reading, fallback_time), _dumps(reading)),
+        )
+
+    # --- reading stores -----------------------------------------------------
+
+    def _store_created(self, session_id, store):
+        pk = self._followed.get(session_id)
+        if pk is not None:
+            # A restored store holds rows read back from this database
+            self._listen(session_id, pk, store, store.collected)
+
+    def _follow(self, session_id, pk):
+        """Persist the session's store as it fills, from now on (and its retained rows, if it has one)"""
+        if self._followed.get(session_id) == pk:
+            return
+        self._followed[session_id] = pk
+        store = find_reading_store(session_id)
+        if store is not None:
+            # Rows already persisted are skipped by the collection id index
+            self._listen(session_id, pk, store, store.collected - len(store))
+
+    def _listen(self, session_id, pk, store, position):
+        def persist(store):
+            nonlocal position
+            if self._followed.get(session_id) != pk:
+                # The session was deleted or the service closed
+                return
+            slots = store.collected_slots(position)
+            position = store.collected
+            self._unwritten.extend(
+                (pk, reading["collection_id"], parse_timestamp(reading["timestamp"]), _dumps(reading))
+                for reading in (store.reading(slot) for slot in slots.tolist())
+            )
+            self._schedule_flush()
+
+        # Ahead of the rollups, whose raw retention may evict part of a batch
+        store.listeners.insert(0, persist)
+
+    def _schedule_flush(self):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._locked(self._insert_unwritten, begin="BEGIN IMMEDIATE")
+            return
+        if self._flusher is None or self._flusher.done():
+            self._flusher = loop.create_task(self.flush_readings())
+
+    async def flush_readings(self) -> None:
+        """Insert the reading rows taken from stores so far"""
+        while self._unwritten:
+            await self._write(self._insert_unwritten)
+
+    def _insert_unwritten(self):
+        rows, self._unwritten = self._unwritten, []
+        try:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO readings (session_pk, collection_id, timestamp, payload) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+        except BaseException:
+            # Kept for the next write
+            self._unwritten[:0] = rows
+            raise
+
+    def _trim(self, pk) -> dict:
+        """Apply the retention policy to one session's rows; returns rows deleted per table"""
+        deleted = {}
+        for table, seconds in self.retention.items():
+            if seconds is None:
+                continue
+            newest = self._conn.execute(
+                f"SELECT MAX(timestamp) FROM {table} WHERE session_pk = ?", (pk,)
+            ).fetchone()[0]
+            if newest is None:
+                continue
+            before = newest - seconds
+            count = self._conn.execute(
+                f"DELETE FROM {table} WHERE session_pk = ? AND timestamp < ?", (pk, before)
+            ).rowcount
+            if count:
+                self._conn.execute(
+                    "INSERT INTO trimmed (session_pk, name, rows, before) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (session_pk, name) DO UPDATE SET rows = rows + excluded.rows, before = excluded.before",
+                    (pk, table, count, before),
+                )
+                deleted[table] = count
+        return deleted
+
+    async def apply_retention(self, app_name: str, user_id: str, session_id: str) -> dict:
+        """Trim a session's rows past the retention policy now; returns rows deleted per table"""
+        return await self._write(self._apply_retention, app_name, user_id, session_id)
+
+    def _apply_retention(self, app_name, user_id, session_id):
+        row = self._session_row(app_name, user_id, session_id)
+        return {} if row is None else self._trim(row[0])
+
+    async def trimmed_rows(self, app_name: str, user_id: str, session_id: str) -> dict:
+        """Rows trimmed so far per table, with the newest cutoff: {table: {"rows": n, "before": epoch}}"""
+        return await self._run(self._trimmed_rows, app_name, user_id, session_id)
+
+    def _trimmed_rows(self, app_name, user_id, session_id):
+        row = self._session_row(app_name, user_id, session_id)
+        if row is None:
+            return {}
+        rows = self._conn.execute("SELECT name, rows, before FROM trimmed WHERE session_pk = ?", (row[0],))
+        return {name: {"rows": count, "before": before} for name, count, before in rows}
+
+    async def recent_readings(self, app_name: str, user_id: str, session_id: str, limit: int) -> list:
+        """Most recent persisted readings, oldest first (for rehydrating a ReadingStore)"""
+        await self.flush_readings()
+        return await self._run(self._recent_readings, app_name, user_id, session_id, limit)
+
+    def _recent_readings(self, app_name, user_id, session_id, limit):
+        row = self._session_row(app_name, user_id, session_id)
+        if row is None:
+            return []
+        rows = self._conn.execute(
+            "SELECT payload FROM (SELECT seq, payload FROM readings INDEXED BY idx_readings_session_seq WHERE session_pk = ? "
+            "ORDER BY seq DESC LIMIT ?) ORDER BY seq",
+            (row[0], limit),
+        ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    async def analysis_history(self, app_name: str, user_id: str, session_id: str) -> list:
+        """Every persisted analysis for a session, oldest first"""
+        return await self._run(self._analysis_history, app_name, user_id, session_id)
+
+    def _analysis_history(self, app_name, user_id, session_id):
+        row = self._session_row(app_name, user_id, session_id)
+        if row is None:
+            return []
+        rows = self._conn.execute("SELECT payload FROM analyses WHERE session_pk = ? ORDER BY seq", (row[0],))
+        return [json.loads(r[0]) for r in rows]
+
+    # --- app / user state ---------------------------------------------------
+
+    def _app_state(self, app_name):
+        row = self._conn.execute("SELECT state FROM app_states WHERE app_name = ?", (app_name,)).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def _user_state(self, app_name, user_id):
+        row = self._conn.execute(
+            "SELECT state FROM user_states WHERE app_name = ? AND user_id = ?", (app_name, user_id)
+        ).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def _scoped_state(self, app_name, user_id):
+        state = {State.APP_PREFIX + k: v for k, v in self._app_state(app_name).items()}
+        state.update({State.USER_PREFIX + k: v for k, v in self._user_state(app_name, user_id).items()})
+        return state
+
+    def _merge_scoped_state(self, app_name, user_id, app_delta, user_delta):
+        if app_delta:
+            state = self._app_state(app_name)
+            state.update(app_delta)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO app_states (app_name, state) VALUES (?, ?)", (app_name, _dumps(state))
+            )
+        if user_delta:
+            state = self._user_state(app_name, user_id)
+            state.update(user_delta)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO user_states (app_name, user_id, state) VALUES (?, ?, ?)",
+                (app_name, user_id, _dumps(state)),
+            )
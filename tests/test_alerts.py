@@ -0,0 +1,118 @@
+from types import SimpleNamespace
+
+from sensor_monitoring_agent.alerts import CLEAR_AFTER, COOLDOWN_SECONDS, RAISE_AFTER, AlertManager, drop_alert_manager
+from sensor_monitoring_agent.anomaly import drop_detectors
+from sensor_monitoring_agent.constraints import drop_compiled_constraints
+from sensor_monitoring_agent.rollups import drop_rollups
+from sensor_monitoring_agent.store import drop_reading_store, get_reading_store
+from sensor_monitoring_agent.sub_agents.analysis_agent.agent import analyze_readings
+from sensor_monitoring_agent.tool_runner import DirectToolContext
+
+LIMITS = {"temperature": {"min": 1000, "max": 1200}}
+HOT = [("temperature", "above_max", "Temperature reading is above maximum threshold (1200)")]
+
+
+def _update(manager, now, value, conditions=None):
+    if conditions is None:
+        conditions = HOT if value > 1200 else []
+    return manager.update(conditions, now, {"temperature": value}, LIMITS)
+
+
+def test_raise_needs_consecutive_violations():
+    manager = AlertManager()
+    assert RAISE_AFTER >= 2
+    assert not any(_update(manager, 0, 1250).values())
+    # A clean analysis breaks the streak
+    _update(manager, 1, 1100)
+    for now in range(2, 2 + RAISE_AFTER - 1):
+        assert not _update(manager, now, 1250)["raised"]
+    raised = _update(manager, 10, 1260)["raised"]
+    assert [incident["kind"] for incident in raised] == ["above_max"]
+    assert manager.is_active("temperature", "above_max") and len(manager) == 1
+
+    # Repeats update the incident without raising again
+    changes = _update(manager, 11, 1300)
+    assert not any(changes.values())
+    incident = manager.active_alerts()[0]
+    assert incident["samples"] == 2 and incident["peak"] == 1300
+
+
+def test_streaks_count_readings_not_analyses():
+    manager = AlertManager()
+    for _ in range(RAISE_AFTER + 1):
+        assert not any(_update(manager, 0, 1250).values())
+    assert manager.pending == {("temperature", "above_max"): 1}
+    assert _update(manager, 1, 1250)["raised"]
+    _update(manager, 1, 1250)
+    assert manager.active_alerts()[0]["samples"] == 1
+
+
+def test_on_demand_limit_breaches_raise_at_once():
+    manager = AlertManager()
+    raised = manager.update(HOT, 0, {"temperature": 1250}, LIMITS, continuous=False)["raised"]
+    assert [incident["kind"] for incident in raised] == ["above_max"]
+    # Anomaly warnings still need a streak
+    drift = [("temperature", "drift_up", "Temperature is drifting upward")]
+    assert not manager.update(drift, 1, {"temperature": 1150}, LIMITS, continuous=False)["raised"]
+
+
+def test_analyze_readings_lists_current_conditions_and_new_incidents():
+    session = SimpleNamespace(id="alerts-check", state={
+        "constraints": {"temperature": {"min": 1000, "max": 1200, "unit": "C"}},
+        "constraints_version": 1,
+    })
+    store = get_reading_store(session.id)
+    try:
+        store.append({"temperature": 1250.0, "feeder_rate": 100.0, "vibration": 15.0}, timestamp=1_700_000_000.0)
+        first = analyze_readings(DirectToolContext(session))["analysis"]
+        assert first["overall_status"] == "alert" and len(first["alerts"]) == 1
+        assert first["raised"] == first["alerts"] and first["active_alerts"] == 1
+        again = analyze_readings(DirectToolContext(session))["analysis"]
+        assert again["alerts"] == first["alerts"] and again["raised"] == []
+        assert session.state["alerts"]["active"][0]["samples"] == 1
+        assert session.state["interaction_history"][-1]["alerts_count"] == 1
+    finally:
+        for drop in (drop_reading_store, drop_alert_manager, drop_detectors, drop_compiled_constraints, drop_rollups):
+            drop(session.id)
+
+
+def test_clear_needs_the_value_inside_the_band():
+    manager = AlertManager()
+    for now in range(RAISE_AFTER):
+        _update(manager, now, 1250)
+    # Just under the limit is still inside the clear band, so it never counts toward clearing
+    for now in range(10, 10 + 2 * CLEAR_AFTER):
+        assert not _update(manager, now, 1199.5)["cleared"]
+    for now in range(20, 20 + CLEAR_AFTER - 1):
+        assert not _update(manager, now, 1100)["cleared"]
+    cleared = _update(manager, 30, 1100)["cleared"]
+    assert [incident["state"] for incident in cleared] == ["cleared"]
+    assert len(manager) == 0 and len(manager.resolved) == 1
+
+
+def test_cooldown_reopens_then_expires():
+    manager = AlertManager()
+
+    def excursion(start):
+        for now in range(start, start + RAISE_AFTER):
+            changes = _update(manager, now, 1250)
+        for now in range(start + RAISE_AFTER, start + RAISE_AFTER + CLEAR_AFTER):
+            _update(manager, now, 1100)
+        return changes
+
+    first = excursion(0)["raised"][0]
+    reopened = excursion(60)["reopened"]
+    assert [incident["id"] for incident in reopened] == [first["id"]]
+    assert reopened[0]["reopened"] == 1
+    later = excursion(60 + int(COOLDOWN_SECONDS) + 100)["raised"]
+    assert later and later[0]["id"] != first["id"]
+    assert manager.stats == {"raised": 2, "reopened": 1, "cleared": 3, "repeats": 0}
+
+
+def test_snapshot_round_trip():
+    manager = AlertManager()
+    for now in range(RAISE_AFTER):
+        _update(manager, now, 1250)
+    restored = AlertManager.from_state(manager.snapshot())
+    assert restored.active_alerts() == manager.active_alerts()
+    assert restored.next_id == manager.next_id and restored.stats == manager.stats
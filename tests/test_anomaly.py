@@ -0,0 +1,53 @@
+import numpy as np
+
+from sensor_monitoring_agent.anomaly import StreamingDetectors
+from sensor_monitoring_agent.store import ReadingStore
+
+STATE = ("mean", "var", "rate", "cusum_pos", "cusum_neg", "last_value", "last_time", "count")
+
+
+def _samples(rows=3_000, sensors=4):
+    rng = np.random.default_rng(3)
+    timestamps = np.cumsum(rng.choice([0.0, 1.0, 1.0, 2.0], size=rows)) + 1_000
+    values = rng.normal(100, 2, size=(rows, sensors))
+    values[rows // 2:, 1] += np.linspace(0, 40, rows - rows // 2)  # drift
+    values[rng.random((rows, sensors)) < 0.002] += 30  # spikes
+    values[rng.random((rows, sensors)) < 0.05] = np.nan
+    values[:400, -1] = np.nan  # a sensor that starts late
+    online = rng.random((rows, sensors)) > 0.03
+    return timestamps, values, online
+
+
+def test_update_block_matches_per_row_updates():
+    timestamps, values, online = _samples()
+    per_row, block = StreamingDetectors(), StreamingDetectors()
+    flags = {"spike": [], "drift_up": [], "z": []}
+    for i in range(len(timestamps)):
+        per_row.update(values[i], online[i], timestamps[i])
+        for key in flags:
+            flags[key].append(per_row.__dict__[key].copy())
+    pieces = [block.update_block(values[a:b], online[a:b], timestamps[a:b])
+              for a, b in ((0, 1), (1, 37), (37, 1_200), (1_200, len(timestamps)))]
+
+    for key in STATE:
+        assert np.allclose(getattr(per_row, key), getattr(block, key), rtol=1e-9, atol=1e-9, equal_nan=True), key
+    for key, expected in flags.items():
+        rows = np.concatenate([piece[key] for piece in pieces])
+        assert np.allclose(np.array(expected), rows, equal_nan=True), key
+    assert np.array(flags["drift_up"]).any() and np.array(flags["spike"]).any()
+
+
+def test_consume_catches_up_on_the_whole_backlog():
+    timestamps, values, online = _samples(rows=5_000, sensors=3)
+    values = np.where(online, values, np.nan)
+    store = ReadingStore()
+    store.append_batch(timestamps, values, list(store.sensors))
+    detectors = StreamingDetectors()
+    assert detectors.consume(store) == 5_000
+    assert detectors.skipped == 0
+
+    per_row = StreamingDetectors()
+    for i in range(len(timestamps)):
+        per_row.update(values[i], ~np.isnan(values[i]), timestamps[i])
+    for key in STATE:
+        assert np.allclose(getattr(per_row, key), getattr(detectors, key), rtol=1e-9, atol=1e-9, equal_nan=True), key
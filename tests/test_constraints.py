@@ -0,0 +1,19 @@
+import numpy as np
+
+from sensor_monitoring_agent.constraints import compile_constraints
+
+
+def test_bounds_follow_the_current_layout_only():
+    compiled = compile_constraints({"temperature": {"min": 1000, "max": 1200}, "vibration": {"max": 20}})
+    sensors = ["vibration", "temperature"]
+    first = compiled.bounds_for(sensors)
+    assert compiled.bounds_for(sensors) is first
+    # A store adding a column changes the layout in place; the bounds are realigned
+    sensors.append("TI-101")
+    mins, maxs, known = compiled.bounds_for(sensors)
+    assert known.tolist() == [True, True, False]
+    assert np.array_equal(maxs, [20, 1200, np.nan], equal_nan=True)
+    assert np.array_equal(mins, [np.nan, 1000, np.nan], equal_nan=True)
+    for i in range(100):
+        compiled.bounds_for([f"tag{i}"])
+    assert compiled._aligned[0] == ["tag99"]
@@ -0,0 +1,35 @@
+import json
+
+from sensor_monitoring_agent.constraints import drop_compiled_constraints
+from sensor_monitoring_agent.context import estimate_tokens, render_context
+from sensor_monitoring_agent.store import drop_reading_store, get_reading_store
+
+SESSION_ID = "context-test"
+
+
+def test_constraints_view_stays_bounded():
+    constraints = {f"TT-{i}": {"min": 0, "max": 100, "unit": "C"} for i in range(2000)}
+    state = {
+        "constraints": constraints,
+        "constraints_version": 1,
+        "interaction_history": [
+            {"action": "constraint_set", "sensor_type": "TT-7"},
+            {"action": "constraint_set", "sensor_type": "TT-1500"},
+        ],
+    }
+    store = get_reading_store(SESSION_ID)
+    try:
+        store.append({"TT-3": 150.0, "TT-4": 50.0})
+        views = render_context(state, SESSION_ID, token_budget=1500)
+        view = json.loads(views["constraints"])
+        assert (view["tags"], view["with_limits"]) == (2000, 2000)
+        assert list(view["violated"]) == ["TT-3"]
+        assert list(view["recently_changed"]) == ["TT-1500", "TT-7"]
+        assert sum(estimate_tokens(text) for text in views.values()) <= 1500
+
+        # A handful of constraints is listed in full
+        small = {"constraints": {"TT-3": constraints["TT-3"]}, "constraints_version": 2}
+        assert json.loads(render_context(small, SESSION_ID)["constraints"])["constraints"] == small["constraints"]
+    finally:
+        drop_reading_store(SESSION_ID)
+        drop_compiled_constraints(SESSION_ID)
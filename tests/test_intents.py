@@ -0,0 +1,26 @@
+from sensor_monitoring_agent.intents import parse_command
+
+
+def _calls(query, known=()):
+    calls = parse_command(query, known)
+    return None if calls is None else [(tool.__name__, kwargs) for tool, _, kwargs in calls]
+
+
+def test_constraints_need_a_set_verb():
+    assert _calls("temperature above 1000") is None
+    assert _calls("collect a reading, vibration below 3") is None
+    assert _calls("set temperature above 1000") == [("set_constraint", {"sensor_type": "temperature", "min_value": 1000})]
+    assert _calls("keep TI-101 below 5") == [("set_constraint", {"sensor_type": "TI-101", "max_value": 5})]
+
+
+def test_chained_constraints_share_the_verb():
+    assert _calls("set temperature between 1000 and 1200, feeder rate between 50 and 150") == [
+        ("set_constraint", {"sensor_type": "temperature", "min_value": 1000, "max_value": 1200}),
+        ("set_constraint", {"sensor_type": "feeder_rate", "min_value": 50, "max_value": 150}),
+    ]
+    # The verb doesn't carry over a clause of another kind
+    assert _calls("set temperature between 1 and 2, collect a reading, vibration below 3") is None
+
+
+def test_canonical_collect_prompt_is_parsed_locally():
+    assert _calls("Collect current sensor readings") == [("collect_sensor_reading", {})]
@@ -0,0 +1,89 @@
+import numpy as np
+
+import replay
+from sensor_monitoring_agent.loadgen import SYNTHETIC_RANGES, LoadGenerator, sensor_names
+
+START = 1_700_000_000.0
+NO_FAULTS = {"step": 0, "stuck": 0, "offline": 0}
+
+
+def _stacked(generator, rows, blocks):
+    parts = [generator.block(rows) for _ in range(blocks)]
+    return tuple(np.concatenate(arrays) for arrays in zip(*parts))
+
+
+def test_same_seed_and_blocks_repeat_the_workload():
+    first = _stacked(LoadGenerator(plants=2, sensors=6, seed=3, start=START), 500, 3)
+    again = _stacked(LoadGenerator(plants=2, sensors=6, seed=3, start=START), 500, 3)
+    other = _stacked(LoadGenerator(plants=2, sensors=6, seed=4, start=START), 500, 3)
+    for a, b in zip(first, again):
+        np.testing.assert_array_equal(a, b)
+    assert not np.array_equal(np.nan_to_num(first[1]), np.nan_to_num(other[1]))
+
+
+def test_blocks_are_shaped_per_plant_and_sensor_at_the_rate():
+    generator = LoadGenerator(plants=3, sensors=4, rate_hz=4.0, seed=1, start=START)
+    timestamps, values, online = generator.block(100)
+    assert generator.sensors == sensor_names(4) == ["temperature", "feeder_rate", "vibration", "temperature_2"]
+    assert values.shape == online.shape == (100, 3, 4)
+    np.testing.assert_allclose(np.diff(timestamps), 0.25)
+    assert generator.block(1)[0][0] == timestamps[-1] + 0.25
+
+
+def test_temperature_follows_feeder_rate_without_faults():
+    generator = LoadGenerator(plants=1, sensors=3, seed=5, start=START, fault_rates=NO_FAULTS)
+    _, values, online = generator.block(20_000)
+    assert online.all()
+    temperature, feeder_rate, vibration = values[:, 0].T
+    assert np.corrcoef(temperature, feeder_rate)[0, 1] > 0.7
+    assert np.corrcoef(vibration, feeder_rate)[0, 1] < np.corrcoef(temperature, feeder_rate)[0, 1]
+    for col, sensor in enumerate(generator.sensors):
+        low, high = SYNTHETIC_RANGES[sensor]
+        assert low < np.median(values[:, 0, col]) < high
+
+
+def test_faults_take_sensors_offline_and_stick_them():
+    offline = LoadGenerator(plants=2, sensors=3, seed=9, start=START,
+                            fault_rates={"step": 0, "stuck": 0, "offline": 50})
+    _, values, online = offline.block(3_600)
+    assert offline.faults["offline"] > 0 and not online.all()
+    np.testing.assert_array_equal(np.isnan(values), ~online)
+
+    stuck = LoadGenerator(plants=1, sensors=3, seed=9, start=START,
+                          fault_rates={"step": 0, "stuck": 50, "offline": 0})
+    _, values, _ = stuck.block(3_600)
+    repeats = (np.diff(values[:, 0], axis=0) == 0).sum()
+    # Noise alone almost never repeats a value to two decimals for a whole fault
+    assert stuck.faults["stuck"] > 0 and repeats >= stuck.fault_rows["stuck"]
+
+
+def test_written_files_replay_as_generated(tmp_path):
+    seconds = 300
+    expected = _stacked(LoadGenerator(plants=2, sensors=3, seed=11, start=START), 100, 3)
+
+    csv_paths = LoadGenerator(plants=2, sensors=3, seed=11, start=START).write_csv(tmp_path / "csv", seconds, 100)
+    column_dirs = LoadGenerator(plants=2, sensors=3, seed=11, start=START).write_columns(tmp_path / "npy", seconds, 100)
+    lp_paths = LoadGenerator(plants=2, sensors=3, seed=11, start=START).write_line_protocol(tmp_path / "lp", seconds, 100)
+
+    for plant, (csv_path, column_dir, lp_path) in enumerate(zip(csv_paths, column_dirs, lp_paths)):
+        for chunks in (replay.iter_csv_chunks(csv_path), replay.iter_column_chunks(column_dir)):
+            parts = list(chunks)
+            sensors = parts[0][0]
+            timestamps = np.concatenate([part[1] for part in parts])
+            values = np.concatenate([part[2] for part in parts])
+            assert sorted(sensors) == sorted(SYNTHETIC_RANGES)
+            np.testing.assert_array_equal(timestamps, expected[0])
+            order = [["temperature", "feeder_rate", "vibration"].index(sensor) for sensor in sensors]
+            np.testing.assert_array_equal(values, expected[1][:, plant, order])
+        with open(lp_path) as f:
+            lines = f.read().splitlines()
+        assert len(lines) == expected[2][:, plant].any(axis=1).sum()
+
+
+def test_sample_hands_out_rows_one_at_a_time():
+    generator = LoadGenerator(plants=2, sensors=3, seed=2, start=START)
+    _, values, online = LoadGenerator(plants=2, sensors=3, seed=2, start=START).block(256)
+    for row in range(3):
+        reading = generator.sample(plant=1)
+        for col, sensor in enumerate(generator.sensors):
+            assert reading[sensor] == (values[row, 1, col] if online[row, 1, col] else None)
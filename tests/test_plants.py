@@ -0,0 +1,129 @@
+import asyncio
+
+import plants
+from plants import PlantRunner, ShardedPlantRunner, plant_user_id, shard_for, split_plant_command
+from sqlite_session_service import SqliteMonitoringSessionService
+
+
+def test_split_plant_command():
+    assert split_plant_command("kiln1: generate a report", ["kiln1"]) == ("kiln1", "generate a report")
+    assert split_plant_command("kiln9: hello", ["kiln1"]) == (None, "kiln9: hello")
+
+
+def test_free_form_queries_wait_for_llm_slots(tmp_path, monkeypatch):
+    running = {"now": 0, "max": 0}
+
+    async def fake_agent(runner, user_id, session_id, query, verbose=False):
+        running["now"] += 1
+        running["max"] = max(running["max"], running["now"])
+        await asyncio.sleep(0.05)
+        running["now"] -= 1
+        return "ok"
+
+    monkeypatch.setattr(plants, "call_agent_async", fake_agent)
+
+    async def run():
+        service = SqliteMonitoringSessionService(str(tmp_path / "plants.db"))
+        runner = PlantRunner(service, max_llm_calls=1)
+        try:
+            free_form = [runner.turn(f"kiln{i}", "why is the kiln running hot?") for i in range(4)]
+            results = await asyncio.gather(*free_form)
+            await runner.turn("kiln0", "collect a reading")
+        finally:
+            await runner.close()
+            service.close()
+        return runner, results
+
+    runner, results = asyncio.run(run())
+    assert all(result["status"] == "success" for result in results)
+    assert running["max"] == 1
+    assert runner.stats["max_llm_in_flight"] == 1
+    assert runner.stats["local_turns"] == 1
+
+
+def test_shards_are_stable_and_in_range():
+    names = [f"kiln{i}" for i in range(50)]
+    shards = [shard_for(plant, 4) for plant in names]
+    assert shards == [shard_for(plant, 4) for plant in names]
+    assert set(shards) == {0, 1, 2, 3}
+    assert all(shard_for(plant, 1) == 0 for plant in names)
+
+
+def test_turns_are_serialized_per_plant_but_not_across_plants(tmp_path, monkeypatch):
+    running = {}
+    overlap = {"same_plant": 0, "plants": 0}
+
+    async def fake_agent(runner, user_id, session_id, query, verbose=False):
+        running[user_id] = running.get(user_id, 0) + 1
+        overlap["same_plant"] = max(overlap["same_plant"], running[user_id])
+        overlap["plants"] = max(overlap["plants"], sum(1 for count in running.values() if count))
+        await asyncio.sleep(0.02)
+        running[user_id] -= 1
+        return "ok"
+
+    monkeypatch.setattr(plants, "call_agent_async", fake_agent)
+
+    async def run():
+        service = SqliteMonitoringSessionService(str(tmp_path / "plants.db"))
+        runner = PlantRunner(service, max_llm_calls=4)
+        try:
+            queries = [runner.turn(plant, "how is the kiln doing?") for plant in ("kiln1", "kiln2") for _ in range(3)]
+            results = await asyncio.gather(*queries)
+            sessions = dict(runner.sessions)
+        finally:
+            await runner.close()
+            service.close()
+        return results, sessions
+
+    results, sessions = asyncio.run(run())
+    assert all(result["status"] == "success" for result in results)
+    assert overlap == {"same_plant": 1, "plants": 2}
+    assert len(set(sessions.values())) == 2
+
+
+def test_plants_keep_separate_state(tmp_path):
+    async def run():
+        service = SqliteMonitoringSessionService(str(tmp_path / "plants.db"))
+        runner = PlantRunner(service)
+        try:
+            await runner.turn("kiln1", "set temperature max 1200")
+            await runner.open("kiln2")
+            kiln1, kiln2 = await runner.session("kiln1"), await runner.session("kiln2")
+        finally:
+            await runner.close()
+            service.close()
+        return kiln1, kiln2
+
+    kiln1, kiln2 = asyncio.run(run())
+    assert kiln1.user_id == plant_user_id("kiln1") and kiln2.user_id == plant_user_id("kiln2")
+    assert kiln1.state["constraints"]["temperature"]["max"] == 1200
+    assert kiln2.state["constraints"]["temperature"]["max"] is None
+
+
+def test_sharded_runner_answers_every_plant(tmp_path):
+    db_path = str(tmp_path / "shards.db")
+    names = ["kiln1", "kiln2", "kiln3"]
+
+    async def run():
+        runner = ShardedPlantRunner(2, db_path)
+        runner.start()
+        try:
+            return await asyncio.gather(*(runner.turn(plant, "set vibration max 20") for plant in names)), runner
+        finally:
+            await runner.close()
+
+    results, runner = asyncio.run(run())
+    assert [result["plant"] for result in results] == names
+    assert all(result["status"] == "success" for result in results)
+    assert runner.stats == {"turns": 3, "errors": 0}
+
+    async def stored():
+        service = SqliteMonitoringSessionService(db_path)
+        try:
+            listed = [await service.list_sessions(app_name=plants.APP_NAME, user_id=plant_user_id(plant))
+                      for plant in names]
+        finally:
+            service.close()
+        return listed
+
+    assert all(len(listing.sessions) == 1 for listing in asyncio.run(stored()))
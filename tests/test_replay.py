@@ -0,0 +1,111 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import replay
+from replay import ReplayAnalyzer
+from sensor_monitoring_agent.aggregates import empty_aggregates
+from sensor_monitoring_agent.alerts import drop_alert_manager
+from sensor_monitoring_agent.anomaly import drop_detectors
+from sensor_monitoring_agent.constraints import drop_compiled_constraints
+from sensor_monitoring_agent.loadgen import LoadGenerator
+from sensor_monitoring_agent.rollups import drop_rollups
+from sensor_monitoring_agent.store import drop_reading_store, get_reading_store
+from sensor_monitoring_agent.sub_agents.analysis_agent.agent import analyze_readings
+from sensor_monitoring_agent.tool_runner import DirectToolContext
+
+CONSTRAINTS = {
+    "temperature": {"min": 1000.0, "max": 1200.0, "unit": "C"},
+    "vibration": {"min": None, "max": 20.0, "unit": "mm/s"},
+}
+
+
+def test_replay_matches_analyze_readings():
+    generator = LoadGenerator(sensors=3, seed=7, start=1_700_000_000)
+    timestamps, values, online = generator.block(1_500)
+    values = np.round(np.where(online[:, 0], values[:, 0], np.nan), 2)
+    sensors = generator.sensors
+
+    # No scheduler is running, so live analyses raise limit alerts on demand
+    analyzer = ReplayAnalyzer(CONSTRAINTS, continuous=False)
+    analyzer.analyze(sensors, timestamps[:600], values[:600])
+    analyzer.analyze(sensors, timestamps[600:], values[600:])
+
+    session = SimpleNamespace(id="replay-check", state={
+        "constraints": CONSTRAINTS, "report_aggregates": empty_aggregates(), "analysis_results": [],
+    })
+    store = get_reading_store(session.id)
+    try:
+        for timestamp, row in zip(timestamps, values):
+            store.append({sensor: None if np.isnan(value) else float(value) for sensor, value in zip(sensors, row)},
+                         timestamp=float(timestamp))
+            analyze_readings(DirectToolContext(session))
+    finally:
+        for drop in (drop_reading_store, drop_alert_manager, drop_detectors, drop_compiled_constraints, drop_rollups):
+            drop(session.id)
+
+    live = session.state["report_aggregates"]
+    for key in ("total_analyses", "status_counts", "sensor_violations", "total_alerts", "alert_ring"):
+        assert analyzer.aggregates[key] == live[key], key
+    assert 0 < live["total_alerts"] < live["total_analyses"]
+    latest = analyzer.latest_analysis()
+    for key in ("overall_status", "sensor_analyses", "alerts", "raised", "active_alerts"):
+        assert latest[key] == session.state["analysis_results"][-1][key], key
+
+
+def _archive(rows=50):
+    timestamps = 1_700_000_000.0 + np.arange(rows, dtype=np.float64)
+    values = np.column_stack([1100 + np.arange(rows) * 5.0, np.linspace(5, 30, rows)])
+    values[3, 0] = np.nan
+    values[10, 1] = np.nan
+    return ["temperature", "vibration"], timestamps, values
+
+
+def _gather(chunks):
+    parts = list(chunks)
+    return parts[0][0], np.concatenate([p[1] for p in parts]), np.concatenate([p[2] for p in parts]), len(parts)
+
+
+def test_csv_and_column_files_replay_the_same_rows(tmp_path):
+    sensors, timestamps, values = _archive()
+    with open(tmp_path / "archive.csv", "w") as f:
+        f.write("timestamp," + ",".join(sensors) + "\n")
+        for timestamp, row in zip(timestamps, values):
+            f.write(f"{timestamp:.0f}," + ",".join("" if np.isnan(v) else f"{v:.17g}" for v in row) + "\n")
+    columns = tmp_path / "columns"
+    columns.mkdir()
+    np.save(columns / "timestamp.npy", timestamps)
+    np.save(columns / "temperature.npy", values[:, 0])
+    values[:, 1].tofile(columns / "vibration.f64")
+
+    for chunks in (replay.iter_csv_chunks(str(tmp_path / "archive.csv"), chunk_rows=7),
+                   replay.iter_column_chunks(str(columns), chunk_rows=7)):
+        read_sensors, read_timestamps, read_values, count = _gather(chunks)
+        assert read_sensors == sensors and count > 1
+        np.testing.assert_array_equal(read_timestamps, timestamps)
+        np.testing.assert_array_equal(read_values, values)
+
+    np.save(columns / "temperature.npy", values[:-1, 0])
+    with pytest.raises(ValueError):
+        list(replay.iter_column_chunks(str(columns)))
+
+
+def test_csv_accepts_formatted_timestamps(tmp_path):
+    path = tmp_path / "formatted.csv"
+    path.write_text("timestamp,temperature\n2025-01-01 00:00:00,1100\n2025-01-01 00:00:01,\n")
+    _, timestamps, values, _ = _gather(replay.iter_csv_chunks(str(path)))
+    assert timestamps[1] - timestamps[0] == 1.0
+    assert values[0, 0] == 1100.0 and np.isnan(values[1, 0])
+
+
+def test_paced_replay_analyzes_every_row_on_the_data_clock():
+    sensors, timestamps, values = _archive(rows=21)
+    fast, paced = ReplayAnalyzer(CONSTRAINTS), ReplayAnalyzer(CONSTRAINTS)
+    replay.replay([(sensors, timestamps, values)], fast)
+    # 20 data seconds at 100x take at least 0.2 s
+    result = replay.replay([(sensors, timestamps[:10], values[:10]), (sensors, timestamps[10:], values[10:])],
+                           paced, speed=100.0)
+    assert result["rows"] == fast.rows == len(timestamps)
+    assert result["seconds"] >= 0.18
+    assert paced.aggregates == fast.aggregates
@@ -0,0 +1,98 @@
+import asyncio
+
+from google.adk.events import Event, EventActions
+from google.genai import types
+
+from sensor_monitoring_agent.pipeline import initial_state
+from sensor_monitoring_agent.store import drop_reading_store, get_reading_store
+from sqlite_session_service import SqliteMonitoringSessionService
+from utils import ResponseCache, call_agent_async, state_fingerprint
+
+APP_NAME = "cache-test"
+USER_ID = "operator"
+
+
+class FakeRunner:
+    """Answers every query with one final event and counts the runs"""
+
+    def __init__(self, session_service):
+        self.session_service = session_service
+        self.app_name = APP_NAME
+        self.runs = 0
+
+    async def run_async(self, user_id, session_id, new_message):
+        self.runs += 1
+        yield Event(author="analysis_agent", invocation_id=f"run{self.runs}",
+                    content=types.Content(role="model", parts=[types.Part(text=f"answer {self.runs}")]))
+
+
+def test_normalized_queries_hit_until_the_fingerprint_moves():
+    cache = ResponseCache()
+    assert cache.get("s1", "What's the status?", "f1") is None
+    assert cache.put("s1", "What's the status?", "f1", "analysis_agent", "all good")
+    assert cache.get("s1", "  what's   the STATUS ", "f1") == ("analysis_agent", "all good")
+    assert cache.get("s2", "what's the status", "f1") is None
+    # A new fingerprint for the session drops its older entries
+    assert cache.get("s1", "what's the status", "f2") is None
+    assert cache.get("s1", "what's the status", "f1") is None
+    counters = cache.counters()
+    assert counters["hits"] == 1 and counters["invalidated"] == 1 and counters["entries"] == 0
+
+
+def test_runs_that_change_state_are_not_stored():
+    cache = ResponseCache()
+    assert not cache.put("s1", "start monitoring", "f1", "sensor_agent", "started", fingerprint_after="f2")
+    assert cache.get("s1", "start monitoring", "f2") is None
+    assert cache.counters()["skipped"] == 1
+
+
+def test_entries_expire_and_the_oldest_is_evicted():
+    cache = ResponseCache(max_entries=2, ttl=-1)
+    cache.put("s1", "a", "f", "agent", "1")
+    assert cache.get("s1", "a", "f") is None
+    cache = ResponseCache(max_entries=2)
+    for query in ("a", "b", "c"):
+        cache.put("s1", query, "f", "agent", query)
+    assert cache.get("s1", "a", "f") is None
+    assert cache.get("s1", "c", "f") == ("agent", "c")
+    assert cache.counters()["evicted"] == 1
+
+
+def test_fingerprint_follows_relevant_state_and_the_store():
+    session_id = "cache-fingerprint"
+    state = initial_state()
+    try:
+        before = state_fingerprint(state, session_id)
+        assert state_fingerprint({**state, "unrelated": 1}, session_id) == before
+        constrained = {**state, "constraints_version": state.get("constraints_version", 0) + 1}
+        assert state_fingerprint(constrained, session_id) != before
+        get_reading_store(session_id).append({"temperature": 1100.0})
+        assert state_fingerprint(state, session_id) != before
+    finally:
+        drop_reading_store(session_id)
+
+
+def test_call_agent_async_reuses_answers_until_a_delta_lands(tmp_path):
+    async def run():
+        service = SqliteMonitoringSessionService(str(tmp_path / "cache.db"))
+        session = await service.create_session(app_name=APP_NAME, user_id=USER_ID, state=initial_state())
+        runner, cache = FakeRunner(service), ResponseCache()
+        try:
+            ask = lambda: call_agent_async(runner, USER_ID, session.id, "Why is the kiln running hot?",
+                                           verbose=False, cache=cache)
+            first, second = await ask(), await ask()
+            current = await service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session.id)
+            await service.append_event(current, Event(
+                author="user", invocation_id="limits",
+                actions=EventActions(state_delta={"constraints_version": 99}),
+            ))
+            third = await ask()
+        finally:
+            service.close()
+            drop_reading_store(session.id)
+        return runner, cache, (first, second, third)
+
+    runner, cache, answers = asyncio.run(run())
+    assert answers == ("answer 1", "answer 1", "answer 2")
+    assert runner.runs == 2
+    assert cache.counters()["hits"] == 1 and cache.counters()["invalidated"] == 1
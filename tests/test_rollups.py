@@ -0,0 +1,115 @@
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+
+from sensor_monitoring_agent.constraints import compile_constraints, drop_compiled_constraints, get_compiled_constraints
+from sensor_monitoring_agent.ingestion import MicroBatcher
+from sensor_monitoring_agent.rollups import RAW_RETENTION_SECONDS, drop_rollups, fold_pending, follow_store, get_rollups
+from sensor_monitoring_agent.store import ReadingStore, drop_reading_store, restore_reading_store
+from sensor_monitoring_agent.sub_agents.analysis_agent.agent import (
+    _report_period,
+    analyze_reading_window,
+    analyze_readings,
+    generate_report,
+)
+from sensor_monitoring_agent.tool_runner import DirectToolContext
+
+SESSION_ID = "rollup-test"
+START = 1_700_000_040.0
+
+
+def _cleanup():
+    drop_rollups(SESSION_ID)
+    drop_reading_store(SESSION_ID)
+    drop_compiled_constraints(SESSION_ID)
+
+
+def test_batches_are_folded_before_the_ring_wraps():
+    store = ReadingStore({"temperature": "C"}, capacity=100)
+    try:
+        get_compiled_constraints(SESSION_ID, {"constraints": {"temperature": {"max": 50}}, "constraints_version": 1})
+        follow_store(SESSION_ID, store)
+        batcher = MicroBatcher(store, batch_size=80)
+        for i in range(400):
+            batcher.add(START + i, {"temperature": float(i % 100)})
+        batcher.flush()
+        rollups = get_rollups(SESSION_ID)
+        tier = rollups.tier("1m")
+        slots = tier.window_slots(None, None)
+        assert rollups.skipped == 0 and tier.readings[slots].sum() == 400
+        assert tier.summarize(slots, 1)["above"][0] == 4 * 49
+    finally:
+        _cleanup()
+
+
+def test_restore_rebuilds_the_tiers():
+    readings = [
+        {"collection_id": f"reading_{i + 1}", "timestamp": START + i,
+         "readings": {"temperature": {"value": 20.0, "unit": "C", "status": "online"}}}
+        for i in range(300)
+    ]
+    try:
+        store = restore_reading_store(SESSION_ID, readings, total=300)
+        tier = get_rollups(SESSION_ID).tier("1m")
+        assert tier.readings[tier.window_slots(None, None)].sum() == 300
+        store.append({"temperature": 21.0}, timestamp=START + 300)
+        # A single append waits for the next reader (or a full backlog) to be folded
+        assert tier.readings[tier.window_slots(None, None)].sum() == 300
+        get_rollups(SESSION_ID, store, compile_constraints({}))
+        assert tier.readings[tier.window_slots(None, None)].sum() == 301
+    finally:
+        _cleanup()
+
+
+def test_pending_readings_fold_under_the_limits_they_were_taken_with():
+    store = ReadingStore({"temperature": "C"})
+    try:
+        get_compiled_constraints(SESSION_ID, {"constraints": {"temperature": {"max": 50}}, "constraints_version": 1})
+        follow_store(SESSION_ID, store)
+        for i in range(10):
+            store.append({"temperature": 60.0}, timestamp=START + i)
+        fold_pending(SESSION_ID, store)
+        get_compiled_constraints(SESSION_ID, {"constraints": {}, "constraints_version": 2})
+        store.append({"temperature": 60.0}, timestamp=START + 10)
+        tier = get_rollups(SESSION_ID, store, get_compiled_constraints(SESSION_ID, {})).tier("1m")
+        slots = tier.window_slots(None, None)
+        assert tier.readings[slots].sum() == 11
+        assert tier.summarize(slots, 1)["above"][0] == 10
+    finally:
+        _cleanup()
+
+
+def test_report_period_uses_raw_readings_while_they_cover_it():
+    store = ReadingStore({"temperature": "C"})
+    try:
+        follow_store(SESSION_ID, store)
+        hours = 3
+        timestamps = START + np.arange(hours * 3600, dtype=np.float64)
+        # In feed-sized batches; a single batch larger than the ring would overwrite itself
+        for chunk in np.array_split(timestamps, hours * 6):
+            store.append_batch(chunk, np.full((len(chunk), 1), 20.0), ["temperature"])
+        rollups = get_rollups(SESSION_ID)
+        assert len(store) == RAW_RETENTION_SECONDS + 1
+        now = float(timestamps[-1])
+        compiled = compile_constraints({})
+        recent = _report_period(rollups, store, compiled, 0.5, now, trends=True)
+        assert recent["tier"] == "raw" and recent["readings"] == 1801
+        assert recent["sensors"]["temperature"]["mean"] == 20.0
+        assert len(recent["trends"]["temperature"]) <= 48
+        older = _report_period(rollups, store, compiled, 2, now, trends=False)
+        assert older["tier"] == "1m"
+    finally:
+        _cleanup()
+
+
+def test_tools_answer_an_empty_store_without_the_rollups():
+    session = SimpleNamespace(id=SESSION_ID, state={"constraints": {}, "constraints_version": 1})
+    try:
+        assert analyze_readings(DirectToolContext(session))["status"] == "error"
+        assert analyze_reading_window(DirectToolContext(session), last_minutes=5)["status"] == "error"
+        report = asyncio.run(generate_report(DirectToolContext(session), "trends", 2))["report"]
+        assert report["trends"] == {"period_hours": 2, "tier": None, "rows": 0, "sensors": {}}
+        assert get_rollups(SESSION_ID).position == 0
+    finally:
+        _cleanup()
@@ -0,0 +1,135 @@
+import asyncio
+import sqlite3
+import time
+
+import pytest
+from google.adk.events import Event, EventActions
+
+from sensor_monitoring_agent.pipeline import initial_state
+from sensor_monitoring_agent.alerts import drop_alert_manager
+from sensor_monitoring_agent.constraints import drop_compiled_constraints
+from sensor_monitoring_agent.scheduler import MonitoringScheduler
+from sensor_monitoring_agent.store import drop_reading_store, get_reading_store
+from sensor_monitoring_agent.tool_runner import new_invocation_id
+from sensor_monitoring_agent.sub_agents.analysis_agent.agent import analyze_readings
+from sensor_monitoring_agent.sub_agents.sensor_agent.agent import load_sampler
+from sqlite_session_service import SqliteMonitoringSessionService
+
+APP_NAME = "test"
+USER_ID = "operator"
+
+
+def _scheduler(service, session_id):
+    return MonitoringScheduler(
+        service, APP_NAME, USER_ID, session_id,
+        analyze_tool=analyze_readings,
+        sample_fn=load_sampler(session_id),
+        sample_rates={"temperature": 200.0, "feeder_rate": 200.0, "vibration": 400.0},
+        analysis_interval=0.01,
+        commit_ticks=5,
+    )
+
+
+def _cleanup(session_id):
+    for drop in (drop_reading_store, drop_alert_manager, drop_compiled_constraints):
+        drop(session_id)
+
+
+def test_ticks_are_committed_in_batches(tmp_path):
+    db_path = str(tmp_path / "scheduler.db")
+
+    async def run():
+        service = SqliteMonitoringSessionService(db_path)
+        session = await service.create_session(app_name=APP_NAME, user_id=USER_ID, state=initial_state())
+        scheduler = _scheduler(service, session.id)
+        try:
+            for _ in range(12):
+                await scheduler.tick()
+            stats = await scheduler.stop()
+            collected = get_reading_store(session.id).collected
+        finally:
+            _cleanup(session.id)
+            service.close()
+        return session.id, stats, collected
+
+    session_id, stats, collected = asyncio.run(run())
+    assert stats["analyses"] == 12 and stats["commits"] == 3
+    conn = sqlite3.connect(db_path)
+    events = conn.execute("SELECT event FROM events").fetchall()
+    readings = conn.execute("SELECT COUNT(*) FROM readings").fetchone()[0]
+    analyses = conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+    state = conn.execute("SELECT state FROM sessions").fetchone()[0]
+    conn.close()
+    assert len(events) == 3
+    assert not any("function_call" in event[0] or "function_response" in event[0] for event in events)
+    assert readings == collected == 12 and analyses == 12
+    assert '"count":12' in state
+
+
+def test_ticks_see_changes_committed_between_them(tmp_path):
+    async def run():
+        service = SqliteMonitoringSessionService(str(tmp_path / "scheduler.db"))
+        session = await service.create_session(app_name=APP_NAME, user_id=USER_ID, state=initial_state())
+        scheduler = _scheduler(service, session.id)
+
+        def sample():
+            for sensor, value in (("temperature", 1100.0), ("feeder_rate", 100.0), ("vibration", 10.0)):
+                scheduler.queues[sensor].put_nowait((value, time.time()))
+
+        try:
+            sample()
+            before = await scheduler.tick()
+            # An operator tightens the limit while the scheduler has uncommitted ticks
+            operator = await service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session.id)
+            constraints = dict(operator.state["constraints"], temperature={"min": 1000, "max": 1050, "unit": "C"})
+            await service.append_event(operator, Event(
+                invocation_id=new_invocation_id(), author="constraint_agent",
+                actions=EventActions(state_delta={
+                    "constraints": constraints,
+                    "constraints_version": operator.state.get("constraints_version", 0) + 1,
+                }),
+            ))
+            sample()
+            after = await scheduler.tick()
+            await scheduler.stop()
+            loaded = await service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session.id)
+        finally:
+            _cleanup(session.id)
+            service.close()
+        return before, after, loaded
+
+    before, after, loaded = asyncio.run(run())
+    assert before["analysis"]["sensor_analyses"]["temperature"]["constraint_status"] == "normal"
+    assert after["analysis"]["sensor_analyses"]["temperature"]["constraint_status"] == "violation"
+    assert loaded.state["constraints"]["temperature"]["max"] == 1050
+    assert loaded.state["report_aggregates"]["total_analyses"] == 2
+
+
+def test_failed_commit_keeps_the_buffered_changes(tmp_path):
+    async def run():
+        service = SqliteMonitoringSessionService(str(tmp_path / "scheduler.db"))
+        session = await service.create_session(app_name=APP_NAME, user_id=USER_ID, state=initial_state())
+        scheduler = _scheduler(service, session.id)
+        append_event = service.append_event
+
+        async def failing(*args, **kwargs):
+            raise OSError("disk full")
+
+        try:
+            for _ in range(4):
+                await scheduler.tick()
+            service.append_event = failing
+            with pytest.raises(OSError):
+                await scheduler.tick()
+            assert scheduler.pending == 5
+            service.append_event = append_event
+            stats = await scheduler.stop()
+            loaded = await service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session.id)
+        finally:
+            _cleanup(session.id)
+            service.close()
+        return stats, loaded
+
+    stats, loaded = asyncio.run(run())
+    assert stats["commits"] == 1
+    assert loaded.state["report_aggregates"]["total_analyses"] == 5
@@ -0,0 +1,68 @@
+from starlette.testclient import TestClient
+
+from plants import PlantRunner
+from service import AlertHub, create_app
+from sqlite_session_service import SqliteMonitoringSessionService
+
+
+def test_hub_publishes_transitions_to_matching_subscribers():
+    hub = AlertHub(queue_size=2)
+    kiln1, everything = hub.subscribe({"kiln1"}), hub.subscribe()
+    assert not hub.publish("kiln1", {"raised": [], "cleared": [], "alerts": ["still active"]})
+    for i in range(3):
+        assert hub.publish("kiln2", {"raised": [f"alert {i}"], "cleared": []})
+    assert kiln1.empty()
+    assert [everything.get_nowait()["alerts"] for _ in range(2)] == [["alert 1"], ["alert 2"]]
+    assert hub.stats == {"published": 3, "delivered": 3, "dropped": 1}
+    hub.unsubscribe(kiln1)
+    assert len(hub.subscribers) == 1
+
+
+def test_endpoints_serve_plant_state_as_json(tmp_path):
+    service = SqliteMonitoringSessionService(str(tmp_path / "service.db"))
+    hub = AlertHub()
+    try:
+        with TestClient(create_app(PlantRunner(service), hub)) as client:
+            # Synthetic temperatures are 900-1300 C, so every reading breaches this limit
+            turn = client.post("/plants/kiln1/turns", json={"query": "set temperature max 800"}).json()
+            assert turn["status"] == "success" and turn["plant"] == "kiln1"
+
+            analyzed = client.post("/plants/kiln1/analyze", json={"collect": True}).json()
+            assert analyzed["analysis"]["status"] == "success"
+            assert hub.stats["published"] == 1
+
+            readings = client.get("/plants/kiln1/readings", params={"last_n": 1}).json()
+            assert readings["collected"] >= 1 and len(readings["readings"]) == 1
+
+            latest = client.get("/plants/kiln1/analysis").json()["analysis"]
+            assert latest["overall_status"] == "alert"
+            assert client.get("/plants/kiln2/analysis").status_code == 404
+
+            alerts = client.get("/plants/kiln1/alerts", params={"sensor": "temperature"}).json()
+            assert [alert["sensor"] for alert in alerts["active_alerts"]] == ["temperature"]
+
+            report = client.get("/plants/kiln1/report", params={"report_type": "alerts"}).json()
+            assert report["status"] == "success" and report["report"]["active_alerts"]
+            window = client.get("/plants/kiln1/window", params={"last_n": 5}).json()
+            assert window["status"] == "success"
+
+            stats = client.get("/stats").json()
+            assert stats["plants"] == ["kiln1", "kiln2"] and stats["runner"]["turns"] == 1
+    finally:
+        service.close()
+
+
+def test_websocket_runs_turns_and_rejects_bad_messages(tmp_path):
+    service = SqliteMonitoringSessionService(str(tmp_path / "service.db"))
+    try:
+        with TestClient(create_app(PlantRunner(service), AlertHub())) as client:
+            with client.websocket_connect("/ws?plants=kiln1") as socket:
+                socket.send_json({"id": 1, "plant": "kiln1"})
+                assert socket.receive_json() == {
+                    "type": "error", "id": 1, "message": 'Expected {"plant": ..., "query": ...}',
+                }
+                socket.send_json({"id": 2, "plant": "kiln1", "query": "set vibration max 20"})
+                reply = socket.receive_json()
+                assert reply["type"] == "turn" and reply["id"] == 2 and reply["status"] == "success"
+    finally:
+        service.close()
@@ -0,0 +1,96 @@
+import asyncio
+
+import numpy as np
+from google.adk.events import Event
+
+from sensor_monitoring_agent.pipeline import initial_state
+from sensor_monitoring_agent.ingestion import MicroBatcher
+from sensor_monitoring_agent.rollups import RAW_RETENTION_SECONDS, drop_rollups
+from sensor_monitoring_agent.store import drop_reading_store, get_reading_store
+from sensor_monitoring_agent.tool_runner import DirectToolContext, new_invocation_id
+from sqlite_session_service import SqliteMonitoringSessionService
+
+APP_NAME = "test"
+USER_ID = "operator"
+START = 1_700_000_000.0
+
+
+async def _record_summary(service, session, store):
+    context = DirectToolContext(session)
+    context.state["sensor_readings"] = store.summary()
+    await service.append_event(session, Event(invocation_id=new_invocation_id(), author="test", actions=context.actions))
+
+
+def test_every_collected_reading_is_persisted(tmp_path):
+    async def run():
+        service = SqliteMonitoringSessionService(str(tmp_path / "readings.db"))
+        session = await service.create_session(app_name=APP_NAME, user_id=USER_ID, state=initial_state())
+        store = get_reading_store(session.id)
+        try:
+            timestamps = START + np.arange(500, dtype=np.float64)
+            store.append_batch(timestamps, np.column_stack([timestamps, timestamps]), ["temperature", "vibration"])
+            await _record_summary(service, session, store)
+            first = await service.recent_readings(APP_NAME, USER_ID, session.id, 10_000)
+            store.append({"temperature": 1.0}, timestamp=START + 500)
+            store.append({"temperature": 2.0}, timestamp=START + 501)
+            await _record_summary(service, session, store)
+            second = await service.recent_readings(APP_NAME, USER_ID, session.id, 10_000)
+        finally:
+            drop_reading_store(session.id)
+            drop_rollups(session.id)
+            service.close()
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert [reading["collection_id"] for reading in first] == [f"reading_{i}" for i in range(1, 501)]
+    assert len(second) == 502 and second[-1]["readings"]["temperature"]["value"] == 2.0
+
+
+def test_ingested_readings_are_persisted_without_events(tmp_path):
+    db_path = str(tmp_path / "ingest.db")
+
+    async def run():
+        service = SqliteMonitoringSessionService(db_path)
+        session = await service.create_session(app_name=APP_NAME, user_id=USER_ID, state=initial_state())
+        store = get_reading_store(session.id)
+        try:
+            # Two hours in batches: the rollups evict raw rows past an hour as they go
+            batcher = MicroBatcher(store, batch_size=600)
+            for i in range(2 * RAW_RETENTION_SECONDS):
+                batcher.add(START + i, {"temperature": float(i)})
+            batcher.flush()
+            retained = len(store)
+            await asyncio.sleep(0)
+        finally:
+            drop_reading_store(session.id)
+            drop_rollups(session.id)
+            service.close()
+        reopened = SqliteMonitoringSessionService(db_path)
+        readings = await reopened.recent_readings(APP_NAME, USER_ID, session.id, 10_000)
+        reopened.close()
+        return retained, readings
+
+    retained, readings = asyncio.run(run())
+    assert retained < 2 * RAW_RETENTION_SECONDS
+    assert len(readings) == 2 * RAW_RETENTION_SECONDS
+    assert readings[-1]["readings"]["temperature"]["value"] == 2 * RAW_RETENTION_SECONDS - 1
+
+
+def test_retention_trims_old_rows(tmp_path):
+    async def run():
+        service = SqliteMonitoringSessionService(str(tmp_path / "retention.db"), recent_rows=1000,
+                                                 retention={"history": 100, "events": None})
+        history = [{"action": "sample", "timestamp": START + i} for i in range(300)]
+        session = await service.create_session(app_name=APP_NAME, user_id=USER_ID,
+                                               state={"interaction_history": history})
+        deleted = await service.apply_retention(APP_NAME, USER_ID, session.id)
+        trimmed = await service.trimmed_rows(APP_NAME, USER_ID, session.id)
+        loaded = await service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session.id)
+        service.close()
+        return deleted, trimmed, loaded
+
+    deleted, trimmed, loaded = asyncio.run(run())
+    assert deleted == {"history": 199}
+    assert trimmed == {"history": {"rows": 199, "before": START + 199}}
+    assert len(loaded.state["interaction_history"]) == 101
+    assert loaded.state["interaction_history"][0]["timestamp"] == START + 199
@@ -0,0 +1,151 @@
+import asyncio
+
+from google.adk.events import Event
+from google.adk.sessions import InMemorySessionService
+
+from sensor_monitoring_agent.aggregates import (
+    aggregate_ops,
+    empty_aggregates,
+    latest_analysis,
+    recent_alerts,
+    update_aggregates,
+)
+from sensor_monitoring_agent.state_ops import append, increment, parse_op_key, push, set_field
+from sensor_monitoring_agent.tool_runner import DirectToolContext, new_invocation_id
+from sqlite_session_service import SqliteMonitoringSessionService
+
+APP_NAME = "test"
+USER_ID = "operator"
+INITIAL_STATE = {
+    "interaction_history": [{"action": "created"}],
+    "constraints": {"temperature": {"min": 1000, "max": 1200, "unit": "C"}},
+    "constraints_version": 1,
+}
+
+
+def _write_ops(context):
+    append(context, "interaction_history", {"action": "constraint_set"})
+    assert increment(context, "constraints_version") == 2
+    set_field(context, "constraints", "pressure", {"min": 1, "max": 3, "unit": "bar"})
+    set_field(context, "constraints", ["temperature", "max"], 1250)
+    increment(context, "report_aggregates", 2, ["status_counts", "normal"])
+
+
+def _expected_state():
+    return {
+        "interaction_history": [{"action": "created"}, {"action": "constraint_set"}],
+        "constraints_version": 2,
+        "constraints": {
+            "temperature": {"min": 1000, "max": 1250, "unit": "C"},
+            "pressure": {"min": 1, "max": 3, "unit": "bar"},
+        },
+        "report_aggregates": {"status_counts": {"normal": 2}},
+    }
+
+
+async def _commit(service, session, context):
+    event = Event(invocation_id=new_invocation_id(), author="test", actions=context.actions)
+    await service.append_event(session, event)
+
+
+def test_op_keys_round_trip_through_sqlite(tmp_path):
+    async def run():
+        db_path = str(tmp_path / "ops.db")
+        service = SqliteMonitoringSessionService(db_path)
+        session = await service.create_session(app_name=APP_NAME, user_id=USER_ID, state=INITIAL_STATE)
+        context = DirectToolContext(session)
+        _write_ops(context)
+        assert all(parse_op_key(key) for key in context.state_delta)
+        # The live state is current before the event is committed
+        assert {key: session.state.get(key) for key in _expected_state()} == _expected_state()
+        await _commit(service, session, context)
+        assert not any(parse_op_key(key) for key in session.state)
+        service.close()
+
+        reopened = SqliteMonitoringSessionService(db_path)
+        loaded = await reopened.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session.id)
+        reopened.close()
+        return loaded
+
+    loaded = asyncio.run(run())
+    assert {key: loaded.state.get(key) for key in _expected_state()} == _expected_state()
+    assert not any(parse_op_key(key) for key in loaded.state)
+
+
+def test_other_services_get_whole_values():
+    async def run():
+        service = InMemorySessionService()
+        session = await service.create_session(app_name=APP_NAME, user_id=USER_ID, state=INITIAL_STATE)
+        context = DirectToolContext(session)
+        _write_ops(context)
+        delta = dict(context.state_delta)
+        await _commit(service, session, context)
+        loaded = await service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session.id)
+        return delta, loaded
+
+    delta, loaded = asyncio.run(run())
+    assert not any(parse_op_key(key) for key in delta)
+    assert {key: loaded.state.get(key) for key in _expected_state()} == _expected_state()
+
+
+def test_concurrent_increments_add_up(tmp_path):
+    async def run():
+        service = SqliteMonitoringSessionService(str(tmp_path / "ops.db"))
+        session = await service.create_session(app_name=APP_NAME, user_id=USER_ID,
+                                               state={"report_aggregates": empty_aggregates()})
+        # Two writers holding the same stale copy of the session
+        first = await service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session.id)
+        second = await service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session.id)
+        for stale, status in ((first, "normal"), (second, "warning")):
+            context = DirectToolContext(stale)
+            analysis = {"reading_id": f"reading_{status}", "overall_status": status, "alerts": [f"{status} alert"]}
+            for op, path, value in aggregate_ops(stale.state["report_aggregates"], analysis):
+                if op == "increment":
+                    increment(context, "report_aggregates", value, path)
+                elif op == "push":
+                    push(context, "report_aggregates", path, *value)
+                else:
+                    set_field(context, "report_aggregates", path, value)
+            await _commit(service, stale, context)
+        loaded = await service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session.id)
+        service.close()
+        return loaded.state["report_aggregates"]
+
+    aggregates = asyncio.run(run())
+    assert aggregates["total_analyses"] == 2
+    assert aggregates["status_counts"] == {"normal": 1, "warning": 1}
+    # Both writers saw an empty ring; the pushes still land in separate slots
+    assert aggregates["total_alerts"] == 2
+    assert recent_alerts(aggregates) == ["normal alert", "warning alert"]
+
+
+def test_whole_value_fallback_is_a_copy():
+    async def run():
+        service = InMemorySessionService()
+        session = await service.create_session(app_name=APP_NAME, user_id=USER_ID, state=INITIAL_STATE)
+        context = DirectToolContext(session)
+        append(context, "interaction_history", {"action": "constraint_set"})
+        delta = context.state_delta["interaction_history"]
+        session.state["interaction_history"].append({"action": "later"})
+        return delta
+
+    delta = asyncio.run(run())
+    assert delta == [{"action": "created"}, {"action": "constraint_set"}]
+
+
+def test_update_aggregates_applies_its_ops():
+    aggregates = empty_aggregates(alert_capacity=2)
+    for i in range(3):
+        update_aggregates(aggregates, {
+            "reading_id": f"reading_{i}",
+            "overall_status": "critical",
+            "sensor_analyses": {"temperature": {"violations": ["Above maximum"], "constraint_status": "above_max"}},
+            "alerts": [f"alert {i}"],
+        })
+    assert aggregates["total_analyses"] == 3
+    assert aggregates["status_counts"] == {"critical": 3}
+    assert aggregates["sensor_violations"] == {"temperature": {"below_min": 0, "above_max": 3, "offline": 0}}
+    assert aggregates["total_alerts"] == 3
+    assert aggregates["alert_ring"] == ["alert 2", "alert 1"]
+    assert aggregates["latest_reading_id"] == "reading_2"
+    assert latest_analysis(aggregates, [{"reading_id": "reading_1"}, {"reading_id": "reading_2"}]) == {"reading_id": "reading_2"}
@@ -0,0 +1,54 @@
+import numpy as np
+
+from sensor_monitoring_agent.store import ReadingStore
+
+SENSORS = {"temperature": "C", "vibration": "mm/s"}
+
+
+def _fill(store, count, start=0):
+    for i in range(start, start + count):
+        store.append({"temperature": 1000.0 + i, "vibration": float(i)}, timestamp=float(i))
+
+
+def test_wraparound_evicts_the_oldest_readings():
+    store = ReadingStore(SENSORS, capacity=4)
+    _fill(store, 6)
+    assert len(store) == 4 and store.collected == 6
+    assert store.get("reading_1") is None and store.get("reading_2") is None
+    assert sorted(store.index) == ["reading_3", "reading_4", "reading_5", "reading_6"]
+    # Oldest first, across the wrap
+    assert store.ids[store.slots()[0]] == "reading_3"
+    assert store.timestamps[store.slots()].tolist() == [2.0, 3.0, 4.0, 5.0]
+    latest = store.latest()
+    assert latest["collection_id"] == "reading_6"
+    assert latest["readings"]["temperature"]["value"] == 1005.0
+    assert store.next_collection_id() == "reading_7"
+
+
+def test_append_batch_over_capacity_keeps_the_newest_rows():
+    store = ReadingStore(SENSORS, capacity=4)
+    _fill(store, 2)
+    timestamps = np.arange(2, 12, dtype=np.float64)
+    values = np.column_stack([timestamps, np.where(timestamps == 10, np.nan, timestamps)])
+    assert store.append_batch(timestamps, values, ["temperature", "vibration"]) == 10
+    assert store.collected == 12 and len(store) == 4
+    assert sorted(store.index) == ["reading_10", "reading_11", "reading_12", "reading_9"]
+    assert store.get("reading_11")["readings"]["vibration"]["status"] == "offline"
+    assert store.next_collection_id() == "reading_13"
+
+
+def test_evict_before_stops_at_an_out_of_order_reading():
+    store = ReadingStore(SENSORS, capacity=8)
+    for timestamp in (0.0, 1.0, 5.0, 2.0, 6.0):
+        store.append({"temperature": 1000.0}, timestamp=timestamp)
+    assert store.evict_before(3.0) == 2
+    assert len(store) == 3 and store.first == 2
+    # reading_4 (t=2) arrived after reading_3 (t=5) and stays with it
+    assert sorted(store.index) == ["reading_3", "reading_4", "reading_5"]
+    assert store.select().tolist() == store.slots().tolist()
+    assert store.evict_before(100.0) == 3
+    assert len(store) == 0 and store.latest() is None
+    assert store.collected == 5
+
+    _fill(store, 10, start=20)
+    assert len(store) == 8 and store.ids[store.slots()[0]] == "reading_8"
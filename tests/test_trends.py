@@ -0,0 +1,62 @@
+import asyncio
+
+import numpy as np
+
+from sensor_monitoring_agent import trends
+from sensor_monitoring_agent.constraints import drop_compiled_constraints, get_compiled_constraints
+from sensor_monitoring_agent.intents import _report_text
+from sensor_monitoring_agent.rollups import drop_rollups, follow_store, get_rollups
+from sensor_monitoring_agent.store import ReadingStore, drop_reading_store
+from sensor_monitoring_agent.sub_agents.analysis_agent.agent import _trend_report
+
+SESSION_ID = "trends-test"
+START = 1_700_000_000.0
+
+
+def _window(rows=120, columns=3):
+    rng = np.random.default_rng(7)
+    timestamps = START + np.arange(rows, dtype=float)
+    values = rng.normal(50, 10, size=(rows, columns)) + np.arange(rows)[:, None] * 0.1
+    values[::17, 1] = np.nan
+    violated = (values > 60).astype(float)
+    return timestamps, trends.reading_durations(timestamps), values, violated
+
+
+def test_pool_matches_inline(monkeypatch):
+    window = _window()
+    inline = trends.compute_trends(*window)
+    monkeypatch.setattr(trends, "POOL_MIN_VALUES", 0)
+    try:
+        pooled, computed = asyncio.run(trends.run_trends(*window))
+    finally:
+        trends.shutdown_trend_pool()
+    assert computed == "pool"
+    assert inline.keys() == pooled.keys()
+    for name in inline:
+        np.testing.assert_allclose(pooled[name], inline[name], equal_nan=True)
+    assert inline["excursions"].sum() > 0
+
+
+def test_single_reading_has_a_duration():
+    assert trends.reading_durations(np.array([START])).tolist() == [trends.NOMINAL_INTERVAL_SECONDS]
+    assert len(trends.reading_durations(np.array([]))) == 0
+
+
+def test_report_says_when_there_are_too_few_readings():
+    store = ReadingStore({"temperature": "C"}, capacity=100)
+    try:
+        compiled = get_compiled_constraints(
+            SESSION_ID, {"constraints": {"temperature": {"max": 50}}, "constraints_version": 1})
+        follow_store(SESSION_ID, store)
+        store.append({"temperature": 60.0}, timestamp=START)
+        report = asyncio.run(_trend_report(get_rollups(SESSION_ID), store, compiled, 1, START + 1))
+        assert report["rows"] == 1 and not report["sensors"]
+        text = _report_text({"report_type": "trend", "generated_at": "now", "total_readings": 1,
+                             "total_analyses": 0, "constraints_set": 1, "monitoring_status": "inactive",
+                             "trends": report})
+        assert "Not enough readings for trends" in text
+        assert "None" not in text
+    finally:
+        drop_rollups(SESSION_ID)
+        drop_reading_store(SESSION_ID)
+        drop_compiled_constraints(SESSION_ID)
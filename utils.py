@@ -1,5 +1,32 @@
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict
 from datetime import datetime
+from google.adk.events import Event
+from google.adk.sessions.base_session_service import GetSessionConfig
 from google.genai import types
+from sensor_monitoring_agent.alerts import get_alert_manager
+from sensor_monitoring_agent.ingestion import feed_active
+from sensor_monitoring_agent.intents import parse_command, run_command
+from sensor_monitoring_agent.scheduler import get_scheduler
+from sensor_monitoring_agent.state_ops import append
+from sensor_monitoring_agent.store import get_reading_store
+from sensor_monitoring_agent.tool_runner import DirectToolContext, new_invocation_id
+
+# State keys an agent answer can depend on. interaction_history is left out
+# (every turn appends to it) and analysis_results is covered by
+# report_aggregates, which changes with every analysis.
+CACHE_STATE_KEYS = (
+    "user_name",
+    "constraints",
+    "constraints_version",
+    "sensor_readings",
+    "report_aggregates",
+    "monitoring_status",
+    "monitoring_config",
+)
 
 class Colors:
     RESET = "\033[0m"
@@ -22,23 +49,77 @@ class Colors:
     BG_CYAN = "\033[46m"
     BG_WHITE = "\033[47m"
 
-async def update_interaction_history(session_service, app_name, user_id, session_id, entry):
-    try:
-        session = await session_service.get_session(app_name=app_name, user_id=user_id, session_id=session_id)
-        history = session.state.get("interaction_history", [])
+# Analysis overall_status -> console marker
+STATUS_EMOJI = {"alert": "🔴", "warning": "🟡", "normal": "🟢"}
+
+class HistoryWriter:
+    """
+    Buffers interaction_history entries for one session and commits them in batches.
+
+    A flush loads the session without its event list and appends a single
+    event whose state delta carries the new entries (as append ops), so a
+    turn no longer copies and rewrites the whole session state. Session
+    services that don't resolve op keys are sent the whole list instead.
+    """
+
+    def __init__(self, session_service, app_name, user_id, session_id, max_batch=20):
+        self.session_service = session_service
+        self.app_name = app_name
+        self.user_id = user_id
+        self.session_id = session_id
+        self.max_batch = max_batch
+        self.pending = []
+
+    async def add(self, entry):
         if "timestamp" not in entry:
             entry["timestamp"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        history.append(entry)
-        updated_state = session.state.copy()
-        updated_state["interaction_history"] = history
-        await session_service.create_session(
-            app_name=app_name,
-            user_id=user_id,
-            session_id=session_id,
-            state=updated_state,
-        )
-    except Exception as e:
-        print(f"Error updating interaction history: {e}")
+        self.pending.append(entry)
+        if len(self.pending) >= self.max_batch:
+            await self.flush()
+
+    async def flush(self):
+        """Commit buffered entries; returns how many were written"""
+        if not self.pending:
+            return 0
+        entries, self.pending = self.pending, []
+        try:
+            session = await self.session_service.get_session(
+                app_name=self.app_name,
+                user_id=self.user_id,
+                session_id=self.session_id,
+                config=GetSessionConfig(num_recent_events=0),
+            )
+            # Op keys where the session service resolves them, the whole list otherwise
+            context = DirectToolContext(session)
+            for entry in entries:
+                append(context, "interaction_history", entry)
+            event = Event(
+                invocation_id=new_invocation_id(),
+                author="user",
+                actions=context.actions,
+            )
+            await self.session_service.append_event(session, event)
+        except Exception as e:
+            self.pending = entries + self.pending
+            print(f"Error updating interaction history: {e}")
+            return 0
+        return len(entries)
+
+# Process-local writers, one per session
+_history_writers = {}
+
+def get_history_writer(session_service, app_name, user_id, session_id):
+    key = (app_name, user_id, session_id)
+    writer = _history_writers.get(key)
+    if writer is None or writer.session_service is not session_service:
+        writer = _history_writers[key] = HistoryWriter(session_service, app_name, user_id, session_id)
+    return writer
+
+async def flush_interaction_history(session_service, app_name, user_id, session_id):
+    return await get_history_writer(session_service, app_name, user_id, session_id).flush()
+
+async def update_interaction_history(session_service, app_name, user_id, session_id, entry):
+    await get_history_writer(session_service, app_name, user_id, session_id).add(entry)
 
 async def add_user_query_to_history(session_service, app_name, user_id, session_id, query):
     await update_interaction_history(
@@ -52,6 +133,122 @@ async def add_agent_response_to_history(session_service, app_name, user_id, sess
         {"action": "agent_response", "agent": agent_name, "response": response}
     )
 
+def normalize_query(query):
+    """Lowercase, collapse whitespace and drop trailing punctuation so trivial rephrasings share a cache entry"""
+    return re.sub(r"\s+", " ", query.strip().lower()).rstrip(" ?!.")
+
+def _pending_question(history):
+    """The agent's last response if it asked the operator something, else None"""
+    for entry in reversed(history or []):
+        if entry.get("action") == "agent_response":
+            response = (entry.get("response") or "").rstrip()
+            return response if response.endswith("?") else None
+    return None
+
+def state_fingerprint(state, session_id):
+    """
+    Hash of everything a cached answer depends on: the relevant state keys plus process-local stores.
+
+    If the agent's last answer was a question, it is included too, so a
+    reply like "yes" is only reused as the answer to the same question.
+    """
+    scheduler = get_scheduler(session_id)
+    relevant = {key: state.get(key) for key in CACHE_STATE_KEYS}
+    relevant["_pending_question"] = _pending_question(state.get("interaction_history"))
+    relevant["_readings_collected"] = get_reading_store(session_id).collected
+    relevant["_feed_active"] = feed_active(session_id)
+    relevant["_scheduler_running"] = bool(scheduler and scheduler.running)
+    payload = json.dumps(relevant, sort_keys=True, default=str).encode()
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+class ResponseCache:
+    """
+    LRU + TTL cache of agent answers keyed by session, normalized query and state fingerprint.
+
+    Any state delta that touches a relevant key changes the fingerprint, so
+    stale answers are never served; when a session's fingerprint changes its
+    older entries are dropped right away. Only answers from runs that left
+    the relevant state unchanged are stored, so queries that act (collect,
+    set a constraint, start monitoring) always reach the agents.
+    """
+
+    def __init__(self, max_entries=256, ttl=300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()  # (session_id, query, fingerprint) -> (stored_at, agent, response)
+        self.fingerprints = {}  # session_id -> latest fingerprint seen
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "skipped": 0,
+                      "expired": 0, "evicted": 0, "invalidated": 0}
+
+    def _observe(self, session_id, fingerprint):
+        if self.fingerprints.get(session_id) not in (None, fingerprint):
+            stale = [key for key in self.entries if key[0] == session_id and key[2] != fingerprint]
+            for key in stale:
+                del self.entries[key]
+            self.stats["invalidated"] += len(stale)
+        self.fingerprints[session_id] = fingerprint
+
+    def get(self, session_id, query, fingerprint):
+        """(agent, response) for a query under this state, or None"""
+        self._observe(session_id, fingerprint)
+        key = (session_id, normalize_query(query), fingerprint)
+        entry = self.entries.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+        if time.monotonic() - entry[0] > self.ttl:
+            del self.entries[key]
+            self.stats["expired"] += 1
+            self.stats["misses"] += 1
+            return None
+        self.entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return entry[1], entry[2]
+
+    def put(self, session_id, query, fingerprint, agent, response, fingerprint_after=None):
+        """Store an answer; skipped when the run changed the state it was keyed on"""
+        if fingerprint_after is not None and fingerprint_after != fingerprint:
+            self.stats["skipped"] += 1
+            self._observe(session_id, fingerprint_after)
+            return False
+        key = (session_id, normalize_query(query), fingerprint)
+        self.entries[key] = (time.monotonic(), agent, response)
+        self.entries.move_to_end(key)
+        self.stats["stores"] += 1
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.stats["evicted"] += 1
+        return True
+
+    def clear(self, session_id=None):
+        if session_id is None:
+            self.entries.clear()
+            self.fingerprints.clear()
+            return
+        for key in [key for key in self.entries if key[0] == session_id]:
+            del self.entries[key]
+        self.fingerprints.pop(session_id, None)
+
+    def counters(self):
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self.entries),
+            "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0,
+        }
+
+# Process-wide cache used by call_agent_async
+response_cache = ResponseCache()
+
+async def _state_fingerprint(session_service, app_name, user_id, session_id):
+    session = await session_service.get_session(
+        app_name=app_name,
+        user_id=user_id,
+        session_id=session_id,
+        config=GetSessionConfig(num_recent_events=0),
+    )
+    return state_fingerprint(session.state, session_id)
+
 async def display_state(session_service, app_name, user_id, session_id, label="Current State"):
     sensor_order = ["temperature", "feeder_rate", "vibration"]
 
@@ -71,9 +268,8 @@ async def display_state(session_service, app_name, user_id, session_id, label="C
             unit = constraint.get("unit", "")
             label_txt = sensor_type.replace("_", " ").title()
             print(f"  - {label_txt}: {min_val} - {max_val} {unit}")
-        sensor_readings = session.state.get("sensor_readings", [])
-        if sensor_readings:
-            latest_reading = sensor_readings[-1]
+        latest_reading = session.state.get("sensor_readings", {}).get("latest")
+        if latest_reading:
             print(f"📊 Latest Reading ({latest_reading.get('timestamp', 'Unknown time')}):")
             for sensor_type in sensor_order:
                 reading_info = latest_reading.get("readings", {}).get(sensor_type, {})
@@ -89,13 +285,13 @@ async def display_state(session_service, app_name, user_id, session_id, label="C
         if analysis_results:
             latest_analysis = analysis_results[-1]
             overall_status = latest_analysis.get("overall_status", "unknown")
-            alerts = latest_analysis.get("alerts", [])
-            status_emoji = "🔴" if overall_status == "alert" else "🟢"
+            alerts = get_alert_manager(session_id, session.state).active_alerts()
+            status_emoji = STATUS_EMOJI.get(overall_status, "🟢")
             print(f"🔍 Latest Analysis: {overall_status} {status_emoji}")
             if alerts:
-                print("  ⚠️  Active Alerts:")
+                print(f"  ⚠️  Active Alerts ({len(alerts)}):")
                 for alert in alerts[:3]:
-                    print(f"    - {alert}")
+                    print(f"    - {alert['message']} (since {alert['raised_at']})")
         else:
             print("🔍 Analysis Results: None")
         interaction_history = session.state.get("interaction_history", [])
@@ -109,8 +305,103 @@ async def display_state(session_service, app_name, user_id, session_id, label="C
     except Exception as e:
         print(f"Error displaying state: {e}")
 
-async def process_agent_response(event):
-    print(f"Event ID: {event.id}, Author: {event.author}")
+def display_pipeline_results(results):
+    collection = results.get("collection")
+    if collection:
+        if collection.get("status") == "success":
+            values = ", ".join(
+                f"{sensor.replace('_', ' ').title()} {info.get('value')} {info.get('unit', '')}".rstrip()
+                for sensor, info in collection.get("readings", {}).items()
+            )
+            print(f"📊 Collected {collection.get('collection_id')}: {values}")
+        else:
+            print(f"📊 Collection failed: {collection.get('message')}")
+    analysis = results.get("analysis")
+    if analysis:
+        if analysis.get("status") == "success":
+            overall_status = analysis["analysis"].get("overall_status", "unknown")
+            alerts = analysis["analysis"].get("alerts", [])
+            status_emoji = STATUS_EMOJI.get(overall_status, "🟢")
+            print(f"🔍 Analysis of {analysis['analysis'].get('reading_id')}: {overall_status} {status_emoji}")
+            for alert in alerts:
+                print(f"    - {alert}")
+            for alert in analysis["analysis"].get("cleared", []):
+                print(f"    ✅ cleared: {alert}")
+            raised = len(analysis["analysis"].get("raised", []))
+            if raised:
+                print(f"    ({raised} new incident{'s' if raised != 1 else ''} raised)")
+            still_active = analysis["analysis"].get("active_alerts", 0) - raised
+            if still_active > 0:
+                print(f"    ({still_active} incidents still active)")
+        else:
+            print(f"🔍 Analysis failed: {analysis.get('message')}")
+
+def monitoring_alert_printer(output=print):
+    """Listener for background monitoring that reports alerts through `output` as they are raised and cleared"""
+
+    def show(result, session_id=None):
+        if result.get("status") != "success":
+            return
+        analysis = result["analysis"]
+        # Only incidents that were just raised or cleared; "alerts" repeats every current condition
+        alerts = analysis.get("raised", [])
+        cleared = analysis.get("cleared", [])
+        if alerts:
+            lines = [f"{Colors.BG_RED}{Colors.WHITE}{Colors.BOLD}🚨 Monitoring alert ({analysis.get('reading_id')}):{Colors.RESET}"]
+            lines += [f"{Colors.RED}    - {alert}{Colors.RESET}" for alert in alerts]
+            output("\n".join(lines))
+        if cleared:
+            lines = [f"{Colors.GREEN}✅ Cleared ({analysis.get('reading_id')}):{Colors.RESET}"]
+            lines += [f"{Colors.GREEN}    - {alert}{Colors.RESET}" for alert in cleared]
+            if not analysis.get("active_alerts"):
+                lines.append(f"{Colors.GREEN}🟢 Monitoring: readings back within constraints{Colors.RESET}")
+            output("\n".join(lines))
+
+    return show
+
+class LazyRunner:
+    """
+    Stands in for an ADK Runner until a query first needs the agents.
+
+    Importing google.adk.runners and building the agent tree is most of the
+    startup time, and commands the local parser handles never touch them.
+    `session_service` and `app_name` are available right away; the Runner
+    (and the agent, from `agent_factory` or `build_sensor_monitoring_agent`) is built on
+    the first `run_async`.
+    """
+
+    def __init__(self, app_name, session_service, agent=None, agent_factory=None):
+        self.app_name = app_name
+        self.session_service = session_service
+        self.agent = agent
+        self.agent_factory = agent_factory
+        self._runner = None
+
+    @property
+    def runner(self):
+        if self._runner is None:
+            from google.adk.runners import Runner
+            from sensor_monitoring_agent.telemetry import telemetry
+            agent = self.agent
+            if agent is None:
+                factory = self.agent_factory
+                if factory is None:
+                    from sensor_monitoring_agent.agent import build_sensor_monitoring_agent as factory
+                agent = factory()
+            self._runner = Runner(
+                agent=agent,
+                app_name=self.app_name,
+                session_service=self.session_service,
+                plugins=telemetry.runner_plugins(),
+            )
+        return self._runner
+
+    def run_async(self, **kwargs):
+        return self.runner.run_async(**kwargs)
+
+async def process_agent_response(event, verbose=True):
+    if verbose:
+        print(f"Event ID: {event.id}, Author: {event.author}")
     final_response = None
     if event.is_final_response():
         if (
@@ -118,34 +409,86 @@ async def process_agent_response(event):
             hasattr(event.content.parts[0], "text") and event.content.parts[0].text
         ):
             final_response = event.content.parts[0].text.strip()
-            print(f"\n{Colors.BG_BLUE}{Colors.WHITE}{Colors.BOLD}╔══ AGENT RESPONSE ═══════════════════════════════════════════{Colors.RESET}")
-            print(f"{Colors.CYAN}{Colors.BOLD}{final_response}{Colors.RESET}")
-            print(f"{Colors.BG_BLUE}{Colors.WHITE}{Colors.BOLD}╚═══════════════════════════════════════════════════════════════{Colors.RESET}\n")
+            if verbose:
+                print(f"\n{Colors.BG_BLUE}{Colors.WHITE}{Colors.BOLD}╔══ AGENT RESPONSE ═══════════════════════════════════════════{Colors.RESET}")
+                print(f"{Colors.CYAN}{Colors.BOLD}{final_response}{Colors.RESET}")
+                print(f"{Colors.BG_BLUE}{Colors.WHITE}{Colors.BOLD}╚═══════════════════════════════════════════════════════════════{Colors.RESET}\n")
     return final_response
 
-async def call_agent_async(runner, user_id, session_id, query):
+async def call_agent_async(runner, user_id, session_id, query, verbose=True, cache=response_cache,
+                           show_state=True, local=True):
+    """
+    Run one operator query through the agents and record the response in history.
+
+    With verbose=False nothing is printed, the before/after state dumps are
+    skipped and agent errors are raised to the caller, for runners serving
+    many sessions at once. show_state=False keeps the printed answer but
+    skips the state dumps, which each cost a full get_session. Answers are
+    served from `cache` when the same query was answered under the same
+    state; pass cache=None to always run the agents. Commands the local
+    parser covers (intents.py) run their tools directly unless local=False.
+    """
+    show_state = verbose and show_state
     content = types.Content(role="user", parts=[types.Part(text=query)])
-    print(f"\n{Colors.BG_GREEN}{Colors.BLACK}{Colors.BOLD}--- Processing Query: {query} ---{Colors.RESET}")
+    if verbose:
+        print(f"\n{Colors.BG_GREEN}{Colors.BLACK}{Colors.BOLD}--- Processing Query: {query} ---{Colors.RESET}")
     final_response_text = None
     agent_name = None
 
-    await display_state(runner.session_service, runner.app_name, user_id, session_id, "State BEFORE processing")
+    # Commit buffered history (this query, the previous response) so the agent sees it
+    await flush_interaction_history(runner.session_service, runner.app_name, user_id, session_id)
+
+    # Plain constraint/collect/analyze/report commands skip the model entirely
+    calls = parse_command(query, get_reading_store(session_id).sensors) if local else None
+
+    fingerprint = None
+    if cache is not None and calls is None:
+        fingerprint = await _state_fingerprint(runner.session_service, runner.app_name, user_id, session_id)
+        cached = cache.get(session_id, query, fingerprint)
+        if cached is not None:
+            agent_name, final_response_text = cached
+            if verbose:
+                print(f"{Colors.CYAN}(cached answer, state unchanged){Colors.RESET}")
+                print(f"{Colors.CYAN}{Colors.BOLD}{final_response_text}{Colors.RESET}")
+            await add_agent_response_to_history(
+                runner.session_service, runner.app_name, user_id, session_id, agent_name, final_response_text
+            )
+            return final_response_text
+
+    if show_state:
+        await display_state(runner.session_service, runner.app_name, user_id, session_id, "State BEFORE processing")
 
     try:
-        async for event in runner.run_async(user_id=user_id, session_id=session_id, new_message=content):
-            if event.author:
-                agent_name = event.author
-            response = await process_agent_response(event)
-            if response:
-                final_response_text = response
+        if calls is not None:
+            agent_name, final_response_text = await run_command(
+                runner.session_service, runner.app_name, user_id, session_id, query, calls
+            )
+            if verbose:
+                print(f"{Colors.CYAN}(parsed locally, no model call){Colors.RESET}")
+                print(f"{Colors.CYAN}{Colors.BOLD}{final_response_text}{Colors.RESET}")
+        else:
+            async for event in runner.run_async(user_id=user_id, session_id=session_id, new_message=content):
+                if event.author:
+                    agent_name = event.author
+                response = await process_agent_response(event, verbose)
+                if response:
+                    final_response_text = response
     except Exception as e:
+        if not verbose:
+            raise
         print(f"{Colors.BG_RED}{Colors.WHITE}ERROR during agent run: {e}{Colors.RESET}")
 
     if final_response_text and agent_name:
+        if cache is not None and calls is None:
+            cache.put(
+                session_id, query, fingerprint, agent_name, final_response_text,
+                fingerprint_after=await _state_fingerprint(runner.session_service, runner.app_name, user_id, session_id),
+            )
         await add_agent_response_to_history(
             runner.session_service, runner.app_name, user_id, session_id, agent_name, final_response_text
         )
 
-    await display_state(runner.session_service, runner.app_name, user_id, session_id, "State AFTER processing")
-    print(f"{Colors.YELLOW}{'-' * 30}{Colors.RESET}")
+    if show_state:
+        await display_state(runner.session_service, runner.app_name, user_id, session_id, "State AFTER processing")
+        print(f"{Colors.YELLOW}{'-' * 30}{Colors.RESET}")
     return final_response_text